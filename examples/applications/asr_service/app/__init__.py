@@ -1,7 +1,6 @@
 # Copyright (c) 2019 NVIDIA Corporation
 import os
 
-from app import routes  # noqa
 from flask import Flask
 from ruamel.yaml import YAML
 
@@ -10,10 +9,6 @@ import nemo.collections.asr as nemo_asr
 from nemo.utils import logging
 
 app = Flask(__name__)
-# make sure WORK_DIR exists before calling your service
-# in this folder, the service will store received .wav files and constructed
-# .json manifests
-WORK_DIR = "<PATH_TO_YOUR_WORKDIR>"
 MODEL_YAML = "<PATH_TO_YOUR_YAML>"
 CHECKPOINT_ENCODER = "<PATH_TO_ENCODER_CHECKPOINT>"
 CHECKPOINT_DECODER = "<PATH_TO_DECODER_CHECKPOINT>"
@@ -21,17 +16,24 @@ CHECKPOINT_DECODER = "<PATH_TO_DECODER_CHECKPOINT>"
 ENABLE_NGRAM = False
 # This is only necessary if ENABLE_NGRAM = True. Otherwise, set to empty string
 LM_PATH = "<PATH_TO_KENLM_BINARY>"
+# Dynamic batching of concurrent requests, see ASRInferenceEngine
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10.0
+MAX_BATCH_DURATION = 160.0
 
 # Read model YAML
 yaml = YAML(typ="safe")
 with open(MODEL_YAML) as f:
     jasper_model_definition = yaml.load(f)
 labels = jasper_model_definition['labels']
+sample_rate = jasper_model_definition['sample_rate']
 
 # Instantiate necessary Neural Modules
-# Note that data layer is missing from here
+# Note that data layer is missing from here: the engine is fed with raw audio
 neural_factory = nemo.core.NeuralModuleFactory(placement=nemo.core.DeviceType.GPU, backend=nemo.core.Backend.PyTorch)
-data_preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor()
+data_preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor(
+    sample_rate=sample_rate, **jasper_model_definition['AudioToMelSpectrogramPreprocessor']
+)
 jasper_encoder = nemo_asr.JasperEncoder(
     jasper=jasper_model_definition['JasperEncoder']['jasper'],
     activation=jasper_model_definition['JasperEncoder']['activation'],
@@ -40,14 +42,27 @@ jasper_encoder = nemo_asr.JasperEncoder(
 jasper_encoder.restore_from(CHECKPOINT_ENCODER, local_rank=0)
 jasper_decoder = nemo_asr.JasperDecoderForCTC(feat_in=1024, num_classes=len(labels))
 jasper_decoder.restore_from(CHECKPOINT_DECODER, local_rank=0)
-greedy_decoder = nemo_asr.GreedyCTCDecoder()
 
+beam_search_with_lm = None
 if ENABLE_NGRAM and os.path.isfile(LM_PATH):
     beam_search_with_lm = nemo_asr.BeamSearchDecoderWithLM(
         vocab=labels, beam_width=64, alpha=2.0, beta=1.0, lm_path=LM_PATH, num_cpus=max(os.cpu_count(), 1),
     )
 else:
+    ENABLE_NGRAM = False
     logging.info("Beam search is not enabled")
 
-if __name__ == '__main__':
-    app.run()
+# The model stays resident in the engine; requests handled by concurrent Flask threads share forward passes.
+engine = nemo_asr.ASRInferenceEngine(
+    preprocessor=data_preprocessor,
+    encoder=jasper_encoder,
+    decoder=jasper_decoder,
+    labels=labels,
+    beam_search_decoder=beam_search_with_lm,
+    sample_rate=sample_rate,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS,
+    max_batch_duration=MAX_BATCH_DURATION,
+).start()
+
+from app import routes  # noqa isort:skip
@@ -1,66 +1,17 @@
 # Copyright (c) 2019 NVIDIA Corporation
-import json
-import os
+import io
 import time
 
-from app import (
-    ENABLE_NGRAM,
-    MODEL_YAML,
-    WORK_DIR,
-    app,
-    data_preprocessor,
-    greedy_decoder,
-    jasper_decoder,
-    jasper_encoder,
-    neural_factory,
-)
-from flask import request
-from werkzeug.utils import secure_filename
+from app import ENABLE_NGRAM, app, engine
+from flask import jsonify, request
 
-import nemo.collections.asr as nemo_asr
-from nemo.utils import logging
+from nemo.collections.asr.parts.segment import AudioSegment
 
-try:
-    from app import beam_search_with_lm
-except ImportError:
-    logging.info("Not using Beam Search Decoder with LM")
-    ENABLE_NGRAM = False
 
-
-def wav_to_text(manifest, greedy=True):
-    from ruamel.yaml import YAML
-
-    yaml = YAML(typ="safe")
-    with open(MODEL_YAML) as f:
-        jasper_model_definition = yaml.load(f)
-    labels = jasper_model_definition['labels']
-
-    # Instantiate necessary neural modules
-    data_layer = nemo_asr.AudioToTextDataLayer(shuffle=False, manifest_filepath=manifest, labels=labels, batch_size=1)
-
-    # Define inference DAG
-    audio_signal, audio_signal_len, _, _ = data_layer()
-    processed_signal, processed_signal_len = data_preprocessor(input_signal=audio_signal, length=audio_signal_len)
-    encoded, encoded_len = jasper_encoder(audio_signal=processed_signal, length=processed_signal_len)
-    log_probs = jasper_decoder(encoder_output=encoded)
-    predictions = greedy_decoder(log_probs=log_probs)
-
-    if ENABLE_NGRAM:
-        logging.info('Running with beam search')
-        beam_predictions = beam_search_with_lm(log_probs=log_probs, log_probs_length=encoded_len)
-        eval_tensors = [beam_predictions]
-
-    if greedy:
-        eval_tensors = [predictions]
-
-    tensors = neural_factory.infer(tensors=eval_tensors)
-    if greedy:
-        from nemo.collections.asr.helpers import post_process_predictions
-
-        prediction = post_process_predictions(tensors[0], labels)
-    else:
-        prediction = tensors[0][0][0][0][1]
-    return prediction
+def wav_to_text(wav_bytes, greedy=True):
+    # Decode the uploaded file in memory and resample it to the model sample rate
+    audio = AudioSegment.from_file(io.BytesIO(wav_bytes), target_sr=engine.sample_rate)
+    return engine.transcribe(audio.samples, beam=not greedy)
 
 
 result_template = """
@@ -79,29 +30,30 @@ result_template = """
 @app.route('/transcribe_file', methods=['GET', 'POST'])
 def transcribe_file():
     if request.method == 'POST':
-        # upload wav_file to work directory
         f = request.files['file']
         greedy = True
         if request.form.get('beam'):
             if not ENABLE_NGRAM:
                 return "Error: Beam Search with ngram LM is not enabled on this server"
             greedy = False
-        file_path = os.path.join(WORK_DIR, secure_filename(f.filename))
-        f.save(file_path)
-        # create manifest
-        manifest = dict()
-        manifest['audio_filepath'] = file_path
-        manifest['duration'] = 18000
-        manifest['text'] = 'todo'
-        with open(file_path + ".json", 'w') as fout:
-            fout.write(json.dumps(manifest))
         start_t = time.time()
-        transcription = wav_to_text(file_path + ".json", greedy=greedy)
+        transcription = wav_to_text(f.read(), greedy=greedy)
         total_t = time.time() - start_t
         result = result_template.format(total_t, transcription)
         return str(result)
 
 
+@app.route('/transcribe', methods=['POST'])
+def transcribe():
+    """Transcribes a .wav file sent as the request body and returns JSON."""
+    greedy = request.args.get('beam', '0') in ('0', 'false', 'False')
+    if not greedy and not ENABLE_NGRAM:
+        return jsonify(error="Beam Search with ngram LM is not enabled on this server"), 400
+    start_t = time.time()
+    transcription = wav_to_text(request.get_data(), greedy=greedy)
+    return jsonify(transcription=transcription, time=time.time() - start_t)
+
+
 @app.route('/')
 @app.route('/index')
 def index():
@@ -0,0 +1,137 @@
+# Copyright (c) 2020 NVIDIA Corporation
+"""
+Load generator for ASRInferenceEngine. It issues requests from concurrent client threads against an in-process engine
+and reports latency percentiles and throughput, so that the batching parameters of the service can be tuned.
+
+Example:
+    python benchmark.py --model_config=<PATH_TO_YAML> --encoder_checkpoint=<PATH_TO_ENCODER_CHECKPOINT> \
+        --decoder_checkpoint=<PATH_TO_DECODER_CHECKPOINT> --manifest=<PATH_TO_MANIFEST> --concurrency=1,8,32 --max_batch_size=16
+"""
+import json
+import threading
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+from ruamel.yaml import YAML
+
+import nemo
+import nemo.collections.asr as nemo_asr
+from nemo.collections.asr.parts.segment import AudioSegment
+from nemo.utils import logging
+
+
+def load_audio(args, sample_rate):
+    if args.manifest is None:
+        rng = np.random.RandomState(0)
+        durations = rng.uniform(args.min_duration, args.max_duration, size=args.num_requests)
+        return [0.1 * rng.randn(int(d * sample_rate)).astype(np.float32) for d in durations]
+    audios = []
+    with open(args.manifest, 'r') as f:
+        for line in f:
+            item = json.loads(line)
+            audios.append(AudioSegment.from_file(item['audio_filepath'], target_sr=sample_rate).samples)
+            if len(audios) == args.num_requests:
+                break
+    return audios
+
+
+def run_load(engine, audios, concurrency, num_requests):
+    latencies = [None] * num_requests
+    counter = iter(range(num_requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            engine.transcribe(audios[i % len(audios)])
+            latencies[i] = time.perf_counter() - start
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--model_config", type=str, required=True, help="model yaml, e.g. examples/asr/configs/*.yaml")
+    parser.add_argument("--encoder_checkpoint", type=str, default=None, help="path to JasperEncoder checkpoint")
+    parser.add_argument("--decoder_checkpoint", type=str, default=None, help="path to JasperDecoderForCTC checkpoint")
+    parser.add_argument("--manifest", type=str, default=None, help="audio to send; random audio if not set")
+    parser.add_argument("--num_requests", type=int, default=256)
+    parser.add_argument("--min_duration", type=float, default=2.0, help="used for random audio only")
+    parser.add_argument("--max_duration", type=float, default=10.0, help="used for random audio only")
+    parser.add_argument("--concurrency", type=str, default="1,4,16,64", help="comma separated client thread counts")
+    parser.add_argument("--max_batch_size", type=int, default=16)
+    parser.add_argument("--max_wait_ms", type=float, default=10.0)
+    parser.add_argument("--max_batch_duration", type=float, default=160.0)
+    parser.add_argument("--cpu", action="store_true", help="run on CPU")
+    parser.add_argument("--amp_opt_level", default="O0", type=str, choices=["O0", "O1", "O2", "O3"])
+    args = parser.parse_args()
+
+    nemo.core.NeuralModuleFactory(
+        placement=nemo.core.DeviceType.CPU if args.cpu else nemo.core.DeviceType.GPU,
+        optimization_level=args.amp_opt_level,
+    )
+
+    yaml = YAML(typ="safe")
+    with open(args.model_config) as f:
+        jasper_params = yaml.load(f)
+    labels = jasper_params['labels']
+    sample_rate = jasper_params['sample_rate']
+
+    preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor(
+        sample_rate=sample_rate, **jasper_params["AudioToMelSpectrogramPreprocessor"]
+    )
+    encoder = nemo_asr.JasperEncoder(
+        feat_in=jasper_params["AudioToMelSpectrogramPreprocessor"]["features"], **jasper_params["JasperEncoder"]
+    )
+    decoder = nemo_asr.JasperDecoderForCTC(
+        feat_in=jasper_params["JasperEncoder"]["jasper"][-1]["filters"], num_classes=len(labels)
+    )
+    if args.encoder_checkpoint is not None and args.decoder_checkpoint is not None:
+        encoder.restore_from(args.encoder_checkpoint, local_rank=0)
+        decoder.restore_from(args.decoder_checkpoint, local_rank=0)
+    else:
+        logging.warning("No checkpoint given, benchmarking randomly initialized weights")
+
+    audios = load_audio(args, sample_rate)
+    total_audio = sum(len(a) for a in audios) / sample_rate
+    logging.info(f"Loaded {len(audios)} utterances, {total_audio:.1f} seconds of audio")
+
+    engine = nemo_asr.ASRInferenceEngine(
+        preprocessor,
+        encoder,
+        decoder,
+        labels,
+        sample_rate=sample_rate,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_batch_duration=args.max_batch_duration,
+    )
+    with engine:
+        # Warm-up, excluded from the measurements
+        engine.transcribe_batch(audios[: args.max_batch_size])
+        for concurrency in [int(c) for c in args.concurrency.split(',')]:
+            latencies, elapsed = run_load(engine, audios, concurrency, args.num_requests)
+            audio_seconds = sum(len(audios[i % len(audios)]) for i in range(args.num_requests)) / sample_rate
+            logging.info(
+                f"concurrency {concurrency:4d}: "
+                f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, "
+                f"p90 {np.percentile(latencies, 90) * 1000:.1f} ms, "
+                f"p99 {np.percentile(latencies, 99) * 1000:.1f} ms, "
+                f"{args.num_requests / elapsed:.1f} requests/s, "
+                f"{audio_seconds / elapsed:.1f} audio seconds/s"
+            )
+
+
+if __name__ == '__main__':
+    main()
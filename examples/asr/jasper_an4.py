@@ -189,8 +189,8 @@ def main():
     if args.test_after_training:
         logging.info("Testing greedy and beam search with LM WER.")
         # Create BeamSearch NM
-        if nf.world_size > 1 or args.lm is None:
-            logging.warning("Skipping beam search WER as it does not work if doing distributed training.")
+        if args.lm is None:
+            logging.warning("Skipping beam search WER as no language model was given.")
         else:
             beam_search_with_lm = nemo_asr.BeamSearchDecoderWithLM(
                 vocab=vocab, beam_width=64, alpha=2.0, beta=1.5, lm_path=args.lm, num_cpus=max(os.cpu_count(), 1),
@@ -209,7 +209,7 @@ def main():
                 raise ValueError(f"Final eval greedy WER {wer * 100:.2f}% > :" f"than {wer_thr * 100:.2f}%")
         nf.sync_all_processes()
 
-        if nf.world_size == 1 and args.lm is not None:
+        if nf.global_rank in [0, None] and args.lm is not None:
             beam_hypotheses = []
             # Over mini-batch
             for i in evaluated_tensors[-1]:
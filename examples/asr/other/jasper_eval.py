@@ -17,15 +17,29 @@ import copy
 import os
 import pickle
 
+import editdistance
 import numpy as np
 from ruamel.yaml import YAML
 
 import nemo
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.helpers import post_process_predictions, post_process_transcripts, word_error_rate
+from nemo.collections.asr.parts.ctc_beam_search import (
+    CTCPrefixBeamSearch,
+    create_pool,
+    decode_batch,
+    load_language_model,
+    rescore_nbest,
+)
 from nemo.utils import logging
 
 
+def _word_errors(hypotheses, reference):
+    """Word level edit distances of hypotheses to reference."""
+    reference = reference.split()
+    return [editdistance.eval(hypothesis.split(), reference) for hypothesis in hypotheses]
+
+
 def main():
     parser = argparse.ArgumentParser(description='Jasper')
     # model params
@@ -66,7 +80,12 @@ def main():
         required=False,
         default=0.1,
     )
-    parser.add_argument("--beam_width", default=128, type=int)
+    parser.add_argument(
+        "--beam_width",
+        default=128,
+        type=int,
+        help='beam width, the hypotheses kept are rescored for every (alpha, beta) of the grid search',
+    )
 
     args = parser.parse_args()
     batch_size = args.batch_size
@@ -171,29 +190,37 @@ def main():
         # include beta_max in tuning range
         args.beta_max += args.beta_step / 10.0
 
+        alphas = np.arange(args.alpha, args.alpha_max, args.alpha_step)
+        betas = np.arange(args.beta, args.beta_max, args.beta_step)
+        grid = [(alpha, beta) for alpha in alphas for beta in betas]
+
+        # The language model is loaded and the beam search run once, with the weights in the middle of the grid, the
+        # hypotheses it keeps are rescored with the weights of every grid point
+        base_alpha, base_beta = (alphas[0] + alphas[-1]) / 2, (betas[0] + betas[-1]) / 2
+        logging.info(f'Decoding with beam width {args.beam_width} and (alpha, beta): ({base_alpha}, {base_beta})')
+        search = CTCPrefixBeamSearch(
+            vocab, args.beam_width, base_alpha, base_beta, language_model=load_language_model(args.lm_path)
+        )
+        num_cpus = max(os.cpu_count(), 1)
+        pool = create_pool(search, num_cpus) if num_cpus > 1 else None
+        try:
+            nbest = decode_batch(search, logprob, pool=pool, nbest=True)
+            # Word errors of every hypothesis, so that the error rate of any weights is a sum over the chosen ones
+            texts = [[hypothesis.text for hypothesis in hypotheses] for hypotheses in nbest]
+            if pool is None:
+                errors = [_word_errors(hypotheses, reference) for hypotheses, reference in zip(texts, references)]
+            else:
+                errors = pool.starmap(_word_errors, zip(texts, references), chunksize=16)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        best = rescore_nbest(nbest, [alpha for alpha, _ in grid], [beta for _, beta in grid])
+        num_words = sum(len(reference.split()) for reference in references)
         beam_wers = []
-
-        logprobexp = [np.exp(p) for p in logprob]
-        for alpha in np.arange(args.alpha, args.alpha_max, args.alpha_step):
-            for beta in np.arange(args.beta, args.beta_max, args.beta_step):
-                logging.info('================================')
-                logging.info(f'Infering with (alpha, beta): ({alpha}, {beta})')
-                beam_search_with_lm = nemo_asr.BeamSearchDecoderWithLM(
-                    vocab=vocab,
-                    beam_width=args.beam_width,
-                    alpha=alpha,
-                    beta=beta,
-                    lm_path=args.lm_path,
-                    num_cpus=max(os.cpu_count(), 1),
-                    input_tensor=False,
-                )
-
-                beam_predictions = beam_search_with_lm(log_probs=logprobexp, log_probs_length=None, force_pt=True)
-
-                beam_predictions = [b[0][1] for b in beam_predictions[0]]
-                lm_wer = word_error_rate(hypotheses=beam_predictions, references=references)
-                logging.info("Beam WER {:.2f}%".format(lm_wer * 100))
-                beam_wers.append(((alpha, beta), lm_wer * 100))
+        for (alpha, beta), indices in zip(grid, best):
+            lm_wer = sum(utterance_errors[i] for utterance_errors, i in zip(errors, indices)) / num_words
+            beam_wers.append(((alpha, beta), lm_wer * 100))
 
         logging.info('Beam WER for (alpha, beta)')
         logging.info('================================')
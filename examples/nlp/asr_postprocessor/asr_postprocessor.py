@@ -24,7 +24,7 @@ import nemo.collections.nlp as nemo_nlp
 from nemo import logging
 from nemo.collections.nlp.callbacks.machine_translation_callback import (
     eval_epochs_done_callback_wer,
-    eval_iter_callback,
+    eval_iter_callback_wer,
 )
 from nemo.core import WeightShareTransform
 from nemo.core.callbacks import CheckpointCallback
@@ -210,7 +210,7 @@ callbacks = [callback_train]
 for eval_dataset in args.eval_datasets:
     callback = nemo.core.EvaluatorCallback(
         eval_tensors=all_eval_tensors[eval_dataset],
-        user_iter_callback=lambda x, y: eval_iter_callback(x, y, tokenizer),
+        user_iter_callback=lambda x, y: eval_iter_callback_wer(x, y, tokenizer),
         user_epochs_done_callback=eval_epochs_done_callback_wer,
         eval_step=args.eval_freq,
         tb_writer=nf.tb_writer,
@@ -110,6 +110,8 @@ decoder = TRADEGenerator(
     data_desc.slots,
     len(data_desc.gating_dict),
     teacher_forcing=args.teacher_forcing,
+    compact_outputs=True,
+    ptr_gate_id=data_desc.gating_dict['ptr'],
 )
 
 gate_loss_fn = CrossEntropyLossNM(logits_ndim=3)
@@ -151,7 +153,7 @@ def create_pipeline(num_samples, batch_size, num_gpus, input_dropout, data_prefi
 
     outputs, hidden = encoder(inputs=input_data.src_ids, input_lens=input_data.src_lens)
 
-    point_outputs, gate_outputs = decoder(
+    point_preds, point_log_probs, gate_outputs = decoder(
         encoder_hidden=hidden,
         encoder_outputs=outputs,
         dialog_lens=input_data.src_lens,
@@ -160,7 +162,7 @@ def create_pipeline(num_samples, batch_size, num_gpus, input_dropout, data_prefi
     )
 
     gate_loss = gate_loss_fn(logits=gate_outputs, labels=input_data.gating_labels)
-    ptr_loss = ptr_loss_fn(logits=point_outputs, labels=input_data.tgt_ids, length_mask=input_data.tgt_lens)
+    ptr_loss = ptr_loss_fn(log_probs=point_log_probs, length_mask=input_data.tgt_lens)
     total_loss = total_loss_fn(loss_1=gate_loss, loss_2=ptr_loss)
 
     if is_training:
@@ -168,7 +170,7 @@ def create_pipeline(num_samples, batch_size, num_gpus, input_dropout, data_prefi
     else:
         tensors_to_evaluate = [
             total_loss,
-            point_outputs,
+            point_preds,
             gate_outputs,
             input_data.gating_labels,
             input_data.turn_domain,
@@ -188,6 +188,7 @@ if __name__ == "__main__":
         nb_gate=len(data_desc.gating_dict),
         teacher_forcing=0,
         max_res_len=4,
+        ptr_gate_id=data_desc.gating_dict['ptr'],
     )
 
     if exists(expanduser(args.encoder_ckpt)) and exists(expanduser(args.decoder_ckpt)):
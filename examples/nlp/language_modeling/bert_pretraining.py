@@ -234,6 +234,14 @@ parser_preprocessed.add_argument(
 parser_preprocessed.add_argument(
     "--num_iters", default=100, type=int, help="Number of training steps.",
 )
+parser_preprocessed.add_argument(
+    "--lazy_data",
+    action="store_true",
+    help="Read the samples from the HDF5 files batch by batch instead of loading each file whole.",
+)
+parser_preprocessed.add_argument(
+    "--num_workers", default=0, type=int, help="Number of processes reading the HDF5 files.",
+)
 
 args = parser.parse_args()
 
@@ -340,7 +348,12 @@ def create_pipeline(data_file, batch_size, preprocessed_data=False, batches_per_
     else:
         mode, max_predictions_per_seq = (kwargs['mode'], kwargs['max_predictions_per_seq'])
         data_layer = nemo_nlp.nm.data_layers.BertPretrainingPreprocessedDataLayer(
-            data_file, max_predictions_per_seq, batch_size=batch_size, mode=mode,
+            data_file,
+            max_predictions_per_seq,
+            batch_size=batch_size,
+            mode=mode,
+            lazy=kwargs['lazy'],
+            num_workers=kwargs['num_workers'],
         )
 
     steps_per_epoch = math.ceil(len(data_layer) / (batch_size * args.num_gpus * batches_per_step))
@@ -391,6 +404,8 @@ else:
         mode="train",
         batch_size=args.batch_size,
         batches_per_step=args.batches_per_step,
+        lazy=args.lazy_data,
+        num_workers=args.num_workers,
     )
     eval_loss, eval_mlm_loss, eval_nsp_loss, eval_steps_per_epoch = create_pipeline(
         data_file=args.eval_data,
@@ -399,6 +414,8 @@ else:
         mode="eval",
         batch_size=args.batch_size,
         batches_per_step=args.batches_per_step,
+        lazy=args.lazy_data,
+        num_workers=args.num_workers,
     )
 
 logging.info("steps per epoch", steps_per_epoch)
@@ -64,6 +64,11 @@ parser.add_argument("--predict_last_k", default=16, type=int)
 parser.add_argument("--save_epoch_freq", default=1, type=int)
 parser.add_argument("--save_step_freq", default=-1, type=int)
 parser.add_argument("--interactive", action="store_true")
+parser.add_argument(
+    "--random_offset",
+    action="store_true",
+    help="Shift every training segment by a random number of tokens, so segments differ between epochs",
+)
 args = parser.parse_args()
 
 """
@@ -123,9 +128,15 @@ log_softmax.tie_weights_with(
 
 
 def create_pipeline(
-    dataset, max_seq_length=args.max_seq_length, batch_step=args.max_seq_length, batch_size=args.batch_size
+    dataset,
+    max_seq_length=args.max_seq_length,
+    batch_step=args.max_seq_length,
+    batch_size=args.batch_size,
+    random_offset=False,
 ):
-    data_layer = LanguageModelingDataLayer(dataset, tokenizer, max_seq_length, batch_size, batch_step)
+    data_layer = LanguageModelingDataLayer(
+        dataset, tokenizer, max_seq_length, batch_size, batch_step, random_offset=random_offset
+    )
     input_data = data_layer()
     src_hiddens = encoder(input_ids=input_data.input_ids, input_mask_src=input_data.input_mask)
     logits = log_softmax(hidden_states=src_hiddens)
@@ -137,6 +148,7 @@ train_loss = create_pipeline(
     args.max_seq_length,
     batch_step=args.max_seq_length,
     batch_size=args.batch_size,
+    random_offset=args.random_offset,
 )
 eval_loss = create_pipeline(
     f"{args.data_dir}/{args.eval_dataset}",
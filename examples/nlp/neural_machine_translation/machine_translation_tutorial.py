@@ -233,8 +233,10 @@ train_callback = nemo.core.SimpleLossLoggerCallback(
 # scores between outputs of beam search and reference translations
 eval_callback = nemo.core.EvaluatorCallback(
     eval_tensors=eval_tensors,
-    user_iter_callback=lambda x, y: eval_iter_callback(x, y, tgt_tokenizer),
-    user_epochs_done_callback=lambda x: eval_epochs_done_callback(x, validation_dataset=eval_dataset_tgt),
+    user_iter_callback=lambda x, y: eval_iter_callback(x, y, tgt_tokenizer, validation_dataset=eval_dataset_tgt),
+    user_epochs_done_callback=eval_epochs_done_callback,
+    # only the BLEU statistics are combined across workers, translations stay on their worker
+    reduce_in_place=True,
     eval_step=args.eval_freq,
     tb_writer=nf.tb_writer,
 )
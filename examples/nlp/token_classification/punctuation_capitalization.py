@@ -293,6 +293,7 @@ eval_callback = nemo.core.EvaluatorCallback(
         x, punct_label_ids, capit_label_ids, f'{nf.work_dir}/graphs'
     ),
     tb_writer=nf.tb_writer,
+    reduce_in_place=True,
     eval_step=steps_per_epoch,
 )
 
@@ -265,6 +265,7 @@ if "eval" in args.mode:
         user_iter_callback=lambda x, y: eval_iter_callback(x, y),
         user_epochs_done_callback=lambda x: eval_epochs_done_callback(x, label_ids, f'{nf.work_dir}/graphs'),
         tb_writer=nf.tb_writer,
+        reduce_in_place=True,
         eval_step=args.eval_step_freq if args.eval_step_freq > 0 else steps_per_epoch,
     )
     callbacks.append(eval_callback)
@@ -16,11 +16,9 @@ import argparse
 import os
 
 import numpy as np
-from scipy.interpolate import interp1d
-from scipy.optimize import brentq
-from sklearn.metrics import roc_curve
-from tqdm import tqdm
+import torch
 
+from nemo.collections.asr.speaker_scoring import equal_error_rate, min_detection_cost, score_trials, speaker_centroids
 
 """
 This script faciliates to get EER % based on cosine-smilarity 
@@ -41,73 +39,43 @@ def get_acc(data_root='./myExps/hi-mia/', emb='', emb_labels='', emb_size=512):
     label_files = np.load(emb_labels)
 
     assert len(X_test) == len(label_files)
-    trail_file = root + 'trials_1m'
-
-    test_list = {}
-    speaker_list = {}
-
-    for idx, line in enumerate(label_files):
-        line = line.strip()
-        speaker = line.split('.')[0].split('_')[0]
-        test_list[line] = idx
-
-        if speaker in speaker_list:
-            speaker_list[speaker].append(idx)
-        else:
-            speaker_list[speaker] = [idx]
-
-    emb = int(emb_size)
-
-    tmp_file = open(trail_file, 'r').readlines()
-    trail_score = open('trial_score.txt', 'w')
-
-    trial_embs = []
-    keys = []
-    all_scores = []
-    all_keys = []
-
-    # for each of trails in trial file
-    for line in tqdm(tmp_file):
-        line = line.strip()
-        x_speaker = line.split(' ')[0]
-        y_speaker = line.split(' ')[1]
-
-        X = np.zeros(emb,)
-        for idx in speaker_list[x_speaker]:
-            X = X + X_test[idx]
-
-        X = X / len(speaker_list[x_speaker])
-
-        if x_speaker not in keys:
-            keys.append(x_speaker)
-            trial_embs.extend([X])
-
-        Y = np.zeros(emb,)
-        for idx in speaker_list[y_speaker]:
-            Y = Y + X_test[idx]
-
-        Y = Y / len(speaker_list[y_speaker])
-
-        if y_speaker not in keys:
-            keys.append(y_speaker)
-            trial_embs.extend([Y])
-
-        # X=Y
-        score = (X @ Y.T) / (((X @ X.T) * (Y @ Y.T)) ** 0.5)
-        score = (score + 1) / 2
-
-        all_scores.append(score)
-        truth = 0 if line.split(' ')[-1] == 'nontarget' else 1
-
-        all_keys.append(truth)
-
-        trail_score.write(str(score) + "\t" + line.split(' ')[-1])
-        trail_score.write('\n')
-
-    np.save(basename + '/all_embs_himia.npy', np.asarray(trial_embs))
-    np.save(basename + '/all_ids_himia.npy', np.asarray(keys))
-
-    return np.asarray(all_scores), np.asarray(all_keys)
+    assert X_test.shape[1] == int(emb_size)
+    trail_file = os.path.join(data_root, 'trials_1m')
+
+    # The centroids of all speakers are computed once
+    utterance_speakers = [line.strip().split('.')[0].split('_')[0] for line in label_files]
+    speakers, speaker_ids = np.unique(utterance_speakers, return_inverse=True)
+    embeddings = torch.from_numpy(X_test).double()
+    speaker_ids = torch.from_numpy(speaker_ids)
+    centroids = speaker_centroids(embeddings, speaker_ids, num_speakers=len(speakers))
+
+    with open(trail_file, 'r') as f:
+        trials = [line.strip().split(' ') for line in f]
+    x_speakers = [trial[0] for trial in trials]
+    y_speakers = [trial[1] for trial in trials]
+    x_ids = np.searchsorted(speakers, x_speakers)
+    y_ids = np.searchsorted(speakers, y_speakers)
+    for trial_speakers, ids in ((x_speakers, x_ids), (y_speakers, y_ids)):
+        unknown = speakers[np.minimum(ids, len(speakers) - 1)] != np.asarray(trial_speakers)
+        if unknown.any():
+            raise KeyError(f"Speaker {np.asarray(trial_speakers)[unknown][0]} of the trials has no embeddings")
+
+    all_scores = score_trials(centroids, torch.from_numpy(x_ids), torch.from_numpy(y_ids)).numpy()
+    all_scores = (all_scores + 1) / 2
+    all_keys = np.asarray([0 if trial[-1] == 'nontarget' else 1 for trial in trials])
+
+    with open('trial_score.txt', 'w') as trail_score:
+        trail_score.writelines(f"{score}\t{trial[-1]}\n" for score, trial in zip(all_scores, trials))
+
+    # Mean embeddings of the speakers of the trials, in the order they first appear in the trial file
+    trial_ids = np.stack((x_ids, y_ids), axis=1).reshape(-1)
+    _, first = np.unique(trial_ids, return_index=True)
+    keys = trial_ids[np.sort(first)]
+    means = speaker_centroids(embeddings, speaker_ids, num_speakers=len(speakers), normalize=False)
+    np.save(basename + '/all_embs_himia.npy', means[torch.from_numpy(keys)].numpy())
+    np.save(basename + '/all_ids_himia.npy', speakers[keys])
+
+    return all_scores, all_keys
 
 
 if __name__ == "__main__":
@@ -120,7 +88,7 @@ if __name__ == "__main__":
     root, emb, emb_labels, emb_size = args.data_root, args.emb, args.emb_labels, args.emb_size
 
     y_score, y = get_acc(data_root=root, emb=emb, emb_labels=emb_labels, emb_size=emb_size)
-    fpr, tpr, thresholds = roc_curve(y, y_score, pos_label=1)
-
-    eer = brentq(lambda x: 1.0 - x - interp1d(fpr, tpr)(x), 0.0, 1.0)
+    eer, _ = equal_error_rate(torch.from_numpy(y_score), torch.from_numpy(y))
+    min_dcf, _ = min_detection_cost(torch.from_numpy(y_score), torch.from_numpy(y))
     print("EER: {:.2f}%".format(eer * 100))
+    print("minDCF (p_target=0.01): {:.4f}".format(min_dcf))
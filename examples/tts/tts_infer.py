@@ -256,6 +256,8 @@ def main():
 
         logging.info("Saving results to disk")
         for i, batch in enumerate(evaluated_tensors[0]):
+            if args.waveglow_denoiser_strength > 0:
+                batch, _ = waveglow.denoise(batch, strength=args.waveglow_denoiser_strength)
             audio = batch.cpu().numpy()
             for j, sample in enumerate(audio):
                 sample_len = mel_len[i][j] * tacotron2_params["n_stride"]
@@ -263,10 +265,7 @@ def main():
                 save_file = f"sample_{i * 32 + j}.wav"
                 if args.save_dir:
                     save_file = os.path.join(args.save_dir, save_file)
-                if args.waveglow_denoiser_strength > 0:
-                    sample, spec = waveglow.denoise(sample, strength=args.waveglow_denoiser_strength)
-                else:
-                    spec, _ = librosa.core.magphase(librosa.core.stft(sample, n_fft=waveglow_params["n_fft"]))
+                spec, _ = librosa.core.magphase(librosa.core.stft(sample, n_fft=waveglow_params["n_fft"]))
                 write(save_file, waveglow_params["sample_rate"], sample)
                 spec = np.dot(filterbank, spec)
                 spec = np.log(np.clip(spec, a_min=1e-5, a_max=None))
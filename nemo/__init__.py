@@ -34,10 +34,16 @@ from .package_info import (
 
 if "NEMO_PACKAGE_BUILDING" not in os.environ:
     from nemo.utils import logging, logging_mode
+    from nemo.utils.lazy_import import lazy_import
 
-    from nemo import backends
-    from nemo import core
-    from nemo import utils
-    from nemo import collections
-
-    from nemo.backends.pytorch import tutorials
+    # The backends, core and collections (and torch with them) are imported when first accessed.
+    __getattr__, __dir__ = lazy_import(
+        __name__,
+        submodules={
+            'backends': 'nemo.backends',
+            'core': 'nemo.core',
+            'utils': 'nemo.utils',
+            'collections': 'nemo.collections',
+            'tutorials': 'nemo.backends.pytorch.tutorials',
+        },
+    )
@@ -14,9 +14,13 @@
 # limitations under the License.
 # =============================================================================
 
+from nemo.utils.lazy_import import lazy_import
+
 from .load_backend import backend
 
 # Load backend specific classes, functions etc.
 if backend() == 'pytorch':
     from .torch_backend import save, load, get_state_dict, set_state_dict
-    from . import pytorch
+
+    # The modules of the backend import nemo.core, which imports this package: they are imported when first accessed.
+    __getattr__, __dir__ = lazy_import(__name__, submodules={'pytorch': 'nemo.backends.pytorch'})
@@ -3,7 +3,14 @@
 This package provides Neural Modules building blocks for building Software
 2.0 projects
 """
-from . import torchvision, tutorials
+from nemo.utils.lazy_import import lazy_import
+
 from .actions import PtActions
 from .common import *
 from .nm import DataLayerNM, LossNM, NonTrainableNM, TrainableNM
+
+# torchvision (the package) and the tutorials are imported when first accessed.
+__getattr__, __dir__ = lazy_import(
+    __name__,
+    submodules={'torchvision': 'nemo.backends.pytorch.torchvision', 'tutorials': 'nemo.backends.pytorch.tutorials'},
+)
@@ -4,11 +4,13 @@ import importlib
 import itertools
 import json
 import os
-from collections import defaultdict
+import pickle
+from collections import OrderedDict, defaultdict
 from contextlib import ExitStack
 from pathlib import Path
 from typing import List, Optional
 
+import numpy as np
 import torch
 import torch.distributed as dist
 import torch.nn as nn
@@ -27,6 +29,7 @@ from nemo.core.neural_types import AxisKind, NeuralType
 from nemo.utils.app_state import AppState
 from nemo.utils.decorators import deprecated
 from nemo.utils.helpers import get_checkpoint_from_dir
+from nemo.utils.inference_store import InferenceStore, InferenceStoreWriter
 
 # these imports will happen on as-needed basis
 amp = None
@@ -49,6 +52,95 @@ _float_2_half_req = {
 }
 
 
+class _CallChainModule(nn.Module):
+    """Wraps the modules of an inference call chain (without its data layer) into a single torch.nn.Module, so that
+    the whole chain can be traced and exported as one graph.
+
+    Args:
+        call_chain: topologically sorted call chain, as returned by topological_sort_from_leaves(). The data layer
+            in the first position is skipped; its outputs become the inputs of this module.
+        output_tensors (List[NmTensor]): tensors returned by forward(), in this order.
+    """
+
+    def __init__(self, call_chain, output_tensors):
+        super().__init__()
+        self._call_chain = call_chain[1:]
+        self._input_names = [t.unique_name for t in call_chain[0][2].values() if t is not None]
+        self._output_names = [t.unique_name for t in output_tensors]
+        # Registered so that the weights are part of the traced graph
+        self.chain_modules = nn.ModuleList([m[0] for m in self._call_chain if isinstance(m[0], nn.Module)])
+
+    def forward(self, *inputs):
+        registered_tensors = dict(zip(self._input_names, inputs))
+        for module, call_args, output_tensors in self._call_chain:
+            call_set = {port: registered_tensors[nmtensor.unique_name] for port, nmtensor in call_args.items()}
+            new_tensors = module(force_pt=True, **call_set)
+            if not isinstance(new_tensors, (list, tuple)):
+                new_tensors = [new_tensors]
+            for t_tensor, nm_tensor in zip(new_tensors, output_tensors.values()):
+                if nm_tensor is not None:
+                    registered_tensors[nm_tensor.unique_name] = t_tensor
+        return tuple(registered_tensors[name] for name in self._output_names)
+
+
+class _ExecutionPlan(object):
+    """A call chain compiled for repeated execution. Every NmTensor of the chain gets a slot index, so that running
+    the chain is a walk over a flat list of (module, input slots, output slots) steps against a list of slots,
+    instead of resolving every input port by unique name on every call.
+
+    Args:
+        call_chain: topologically sorted call chain, as returned by topological_sort_from_leaves()
+    """
+
+    def __init__(self, call_chain):
+        self.call_chain = call_chain
+        slot_ids = {}
+
+        def slot(nmtensor):
+            return slot_ids.setdefault(nmtensor.unique_name, len(slot_ids))
+
+        # The first element is the data layer, or an empty placeholder for chains that start from computed tensors
+        if call_chain[0]:
+            for nmtensor in call_chain[0][2].values():
+                if nmtensor is not None:
+                    slot(nmtensor)
+
+        produced = set()
+        self.steps = []
+        for module, call_args, output_tensors in call_chain[1:]:
+            input_ports = tuple(call_args.keys())
+            input_slots = tuple(slot(nmtensor) for nmtensor in call_args.values())
+            output_slots = tuple(None if nmtensor is None else slot(nmtensor) for nmtensor in output_tensors.values())
+            for nmtensor, output_slot in zip(output_tensors.values(), output_slots):
+                if output_slot is None:
+                    continue
+                if output_slot in produced:
+                    raise ValueError(f"A NMTensor was produced twice in the same DAG. {nmtensor.unique_name}")
+                produced.add(output_slot)
+            self.steps.append((module, module.unique_instance_id, input_ports, input_slots, output_slots))
+        self.slot_names = [None] * len(slot_ids)
+        for name, slot_id in slot_ids.items():
+            self.slot_names[slot_id] = name
+
+
+class _EvalShardSampler(torch.utils.data.Sampler):
+    """Splits a map-style dataset into disjoint, unpadded shards, one per rank. Unlike DistributedSampler no sample is
+    repeated, which is what reduce-in-place evaluation needs: ranks never synchronize per batch, so their shards do
+    not have to be of equal length.
+    """
+
+    def __init__(self, dataset, num_replicas, rank):
+        self._num_samples = len(dataset)
+        self._num_replicas = num_replicas
+        self._rank = rank
+
+    def __iter__(self):
+        return iter(range(self._rank, self._num_samples, self._num_replicas))
+
+    def __len__(self):
+        return len(range(self._rank, self._num_samples, self._num_replicas))
+
+
 class PtActions(Actions):
     def __init__(
         self, local_rank=None, global_rank=None, tb_writer=None, optimization_level=Optimization.mxprO0,
@@ -93,6 +185,10 @@ class PtActions(Actions):
         self.ddp_initialized = False
         self.ddp_module_dict = {}
         self._train_called = False
+        # Call chains and their compiled execution plans, cached per requested tensor set
+        self._call_chain_cache = OrderedDict()
+        self._execution_plans = OrderedDict()
+        self._graph_version = None
 
     @property
     def step(self):
@@ -135,6 +231,16 @@ class PtActions(Actions):
             top_sorted_modules: the callchain DAG
             tdataset: the datalayer at the top of the callchain
         """
+        if isinstance(hook, list):
+            # Works on a copy, the caller's list is left as is
+            hook = list(OrderedDict.fromkeys(hook))
+        key = tuple(t.unique_name for t in (hook if isinstance(hook, list) else [hook]))
+        self._invalidate_stale_plans()
+        if key in self._call_chain_cache:
+            self._call_chain_cache.move_to_end(key)
+            top_sorted_modules = self._call_chain_cache[key]
+            return top_sorted_modules, top_sorted_modules[0][0].dataset
+
         top_sorted_modules = topological_sort_from_leaves(hook)
 
         if not isinstance(top_sorted_modules[0][0], DataLayerNM):
@@ -150,8 +256,36 @@ class PtActions(Actions):
                     "`factory` parameter to all your Neural Module objects.".format(str(m[0]))
                 )
 
+        self._call_chain_cache[key] = top_sorted_modules
+        if len(self._call_chain_cache) > self._MAX_CACHED_PLANS:
+            self._call_chain_cache.popitem(last=False)
         return top_sorted_modules, tdataset
 
+    _MAX_CACHED_PLANS = 16
+
+    def _invalidate_stale_plans(self):
+        """Drops cached call chains and execution plans once modules or tensors were registered (or renamed) since
+        they were built, e.g. when a new evaluation pipeline is built or a module is replaced."""
+        graph_version = (AppState().modules.version, AppState().tensor_names.version)
+        if graph_version != self._graph_version:
+            self.clear_execution_plans()
+            self._graph_version = graph_version
+
+    def clear_execution_plans(self):
+        """Drops all cached call chains and compiled execution plans."""
+        self._call_chain_cache.clear()
+        self._execution_plans.clear()
+
+    def _get_execution_plan(self, call_chain):
+        # Keyed by identity, the plan keeps a reference to the chain so that its id() can not be reused
+        plan = self._execution_plans.get(id(call_chain))
+        if plan is None or plan.call_chain is not call_chain:
+            plan = _ExecutionPlan(call_chain)
+            self._execution_plans[id(call_chain)] = plan
+            if len(self._execution_plans) > self._MAX_CACHED_PLANS:
+                self._execution_plans.popitem(last=False)
+        return plan
+
     def create_optimizer(self, optimizer, things_to_optimize, optimizer_params=None):
         """
         Wrapper function around __setup_optimizer()
@@ -322,58 +456,43 @@ class PtActions(Actions):
         return optimizer
 
     def nm_graph_forward_pass(self, callchain, registered_tensors):
-        self.__nm_graph_forward_pass(callchain, registered_tensors)
+        # Call chains passed here are built on the fly, their plans are not worth caching
+        self.__nm_graph_forward_pass(callchain, registered_tensors, cache_plan=False)
 
     def __nm_graph_forward_pass(
-        self, call_chain, registered_tensors, mode=OperationMode.training, use_cache=False,
+        self, call_chain, registered_tensors, mode=OperationMode.training, use_cache=False, cache_plan=True,
     ):
-        for ind in range(1, len(call_chain)):
+        if mode == OperationMode.training:
+            training = True
+        elif mode == OperationMode.evaluation:
+            training = False
+        else:
+            raise ValueError("Unknown OperationMode")
+
+        plan = self._get_execution_plan(call_chain) if cache_plan else _ExecutionPlan(call_chain)
+        slots = [registered_tensors.get(name) for name in plan.slot_names]
+        slot_names = plan.slot_names
+        for module, m_id, input_ports, input_slots, output_slots in plan.steps:
             if use_cache:
-                in_cache = True
-                for tensor in call_chain[ind][2].values():
-                    if tensor is None:
-                        # NM has an output tensor that is not used in the
-                        # current call chain, so we don't care if it's not in
-                        # cache
-                        continue
-                    if tensor.unique_name not in registered_tensors:
-                        in_cache = False
-                if in_cache:
+                # NM may have an output tensor that is not used in the current call chain, so we don't care if it's
+                # not in cache
+                if all(slots[i] is not None for i in output_slots if i is not None):
                     continue
-            call_args = call_chain[ind][1]
-            m_id = call_chain[ind][0].unique_instance_id
-            pmodule = self.ddp_module_dict[m_id] if self.ddp_initialized else call_chain[ind][0]
-
-            if mode == OperationMode.training:
-                # if module.is_trainable():
-                if isinstance(pmodule, nn.Module):
-                    pmodule.train()
-            elif mode == OperationMode.evaluation:
-                # if module.is_trainable():
-                if isinstance(pmodule, nn.Module):
-                    pmodule.eval()
-            else:
-                raise ValueError("Unknown OperationMode")
-            # prepare call signature for `module`
-            call_set = {}
-            for tensor_name, nmtensor in call_args.items():
-                key = nmtensor.unique_name
-                call_set[tensor_name] = registered_tensors[key]
-            new_tensors = pmodule(force_pt=True, **call_set)
-
-            if not isinstance(new_tensors, List):
-                if not isinstance(new_tensors, tuple):
-                    new_tensors = [new_tensors]
-                else:
-                    new_tensors = list(new_tensors)
-            for t_tensor, nm_tensor in zip(new_tensors, call_chain[ind][2].values()):
-                if nm_tensor is None:
+            pmodule = self.ddp_module_dict[m_id] if self.ddp_initialized else module
+
+            if isinstance(pmodule, nn.Module):
+                pmodule.train(training)
+            new_tensors = pmodule(force_pt=True, **{port: slots[i] for port, i in zip(input_ports, input_slots)})
+
+            if not isinstance(new_tensors, (list, tuple)):
+                new_tensors = [new_tensors]
+            for t_tensor, i in zip(new_tensors, output_slots):
+                if i is None:
                     continue
-                t_name = nm_tensor.unique_name
-                if t_name not in registered_tensors or registered_tensors[t_name] is None:
-                    registered_tensors[t_name] = t_tensor
-                else:
-                    raise ValueError(f"A NMTensor was produced twice in the same DAG. {t_name}")
+                if slots[i] is not None:
+                    raise ValueError(f"A NMTensor was produced twice in the same DAG. {slot_names[i]}")
+                slots[i] = t_tensor
+                registered_tensors[slot_names[i]] = t_tensor
 
     @staticmethod
     def pad_tensor(t: torch.Tensor, target_size: torch.Size):
@@ -411,6 +530,107 @@ class PtActions(Actions):
             raise NotImplementedError
         return depadded_t
 
+    @staticmethod
+    def _all_gather_object(obj):
+        """Gathers a picklable object from all workers, returns the list of objects in rank order."""
+        world_size = dist.get_world_size()
+        data = torch.from_numpy(np.frombuffer(pickle.dumps(obj), dtype=np.uint8).copy()).cuda()
+        size = torch.tensor([data.numel()], dtype=torch.long).cuda()
+        sizes = [torch.empty_like(size) for _ in range(world_size)]
+        dist.all_gather(sizes, size)
+        max_size = int(max(sizes))
+        padded = torch.zeros(max_size, dtype=torch.uint8).cuda()
+        padded[: data.numel()] = data
+        gathered = [torch.empty_like(padded) for _ in range(world_size)]
+        dist.all_gather(gathered, padded)
+        return [pickle.loads(t[: int(n)].cpu().numpy().tobytes()) for t, n in zip(gathered, sizes)]
+
+    @staticmethod
+    def _global_var_spec(value):
+        """Describes the structure of a global variable, the kind, shape and type of its leaves, so that workers
+        missing a value can stand in for it in the collectives of _combine_global_vars().
+        """
+        if isinstance(value, dict):
+            return 'dict', {key: PtActions._global_var_spec(v) for key, v in value.items()}
+        if isinstance(value, torch.Tensor):
+            return 'tensor', tuple(value.shape), value.dtype
+        if isinstance(value, (np.ndarray, np.number)):
+            return 'array', value.shape, value.dtype.str, isinstance(value, np.number)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return 'number', isinstance(value, float)
+        if isinstance(value, (list, set)):
+            return type(value).__name__, None
+        return 'other', value
+
+    @staticmethod
+    def _merge_global_var_specs(specs):
+        """Union of the specs of all workers, in rank order. Numbers are floats if any worker holds a float."""
+        first = specs[0]
+        if first[0] == 'dict':
+            keys = []
+            for spec in specs:
+                keys.extend(key for key in spec[1] if key not in keys)
+            return (
+                'dict',
+                {
+                    key: PtActions._merge_global_var_specs([spec[1][key] for spec in specs if key in spec[1]])
+                    for key in keys
+                },
+            )
+        if first[0] == 'number':
+            return 'number', any(spec[1] for spec in specs)
+        return first
+
+    @staticmethod
+    def _combine_global_vars(global_var_dict):
+        """Default cross-worker combine of reduce-in-place evaluation. Tensors, numpy arrays and numbers (including
+        numpy scalars) are summed with all_reduce, dicts are combined value by value, lists are concatenated and sets
+        merged in rank order. Other values are taken from the first worker holding them. A worker missing a key, e.g.
+        because its shard was empty, contributes zeros or an empty list or set, so every worker runs the same
+        collectives.
+        """
+        spec = PtActions._merge_global_var_specs(
+            PtActions._all_gather_object(PtActions._global_var_spec(global_var_dict))
+        )
+        missing = object()
+
+        def combine(value, spec):
+            kind = spec[0]
+            if kind == 'dict':
+                if not isinstance(value, dict):
+                    value = {}
+                keys = sorted(spec[1].keys(), key=str)
+                return {key: combine(value.get(key, missing), spec[1][key]) for key in keys}
+            if kind == 'tensor':
+                if value is missing:
+                    reduced = torch.zeros(spec[1], dtype=spec[2]).cuda()
+                else:
+                    reduced = value.detach().clone().cuda()
+                dist.all_reduce(reduced)
+                return reduced.to(value.device) if value is not missing else reduced.cpu()
+            if kind == 'array':
+                array = np.zeros(spec[1], dtype=spec[2]) if value is missing else np.asarray(value)
+                reduced = torch.from_numpy(np.ascontiguousarray(array)).cuda()
+                dist.all_reduce(reduced)
+                reduced = reduced.cpu().numpy()
+                return reduced[()] if spec[3] else reduced
+            if kind == 'number':
+                if value is missing:
+                    value = 0
+                reduced = torch.tensor(value, dtype=torch.float64 if spec[1] else torch.long).cuda()
+                dist.all_reduce(reduced)
+                return reduced.item()
+            if kind in ('list', 'set'):
+                if value is missing:
+                    value = set() if kind == 'set' else []
+                gathered = PtActions._all_gather_object(value)
+                if kind == 'set':
+                    return set().union(*gathered)
+                return [v for values in gathered for v in values]
+            return spec[1]
+
+        return combine(global_var_dict, spec)
+
     def _eval(self, tensors_2_evaluate, callback, step, verbose=False):
         """
         Evaluation process.
@@ -421,6 +641,11 @@ class PtActions(Actions):
           callback: instance of EvaluatorCallback
           step: current training step, used for logging
 
+        If the callback sets reduce_in_place and evaluation is distributed, every worker runs the iter callback on
+        its own disjoint shard of the data, and only the resulting global variables are combined across workers
+        (with callback.user_combine_callback or _combine_global_vars()) before the epochs done callback runs on
+        rank 0. Otherwise every evaluated tensor is gathered to rank 0, which runs the iter callback for all of them.
+
         Returns:
           None
         """
@@ -435,17 +660,22 @@ class PtActions(Actions):
             # all data on every worker
             is_distributed = False
             world_size = None
+            reduce_in_place = False
             if dl_nm.placement == DeviceType.AllGpu:
                 assert dist.is_initialized()
+                reduce_in_place = getattr(callback, 'reduce_in_place', False)
                 is_distributed = True
                 world_size = torch.distributed.get_world_size()
 
                 if dl_nm.dataset is not None:
                     sampler = None
                     if not isinstance(dl_nm.dataset, torch.utils.data.IterableDataset):
-                        sampler = torch.utils.data.distributed.DistributedSampler(
-                            dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
-                        )
+                        if reduce_in_place:
+                            sampler = _EvalShardSampler(dl_nm.dataset, world_size, self.global_rank)
+                        else:
+                            sampler = torch.utils.data.distributed.DistributedSampler(
+                                dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
+                            )
                     dataloader_params = {
                         'dataset': dl_nm.dataset,
                         'sampler': sampler,
@@ -460,7 +690,7 @@ class PtActions(Actions):
                 else:
                     eval_dataloader = dl_nm.data_iterator
 
-                if hasattr(eval_dataloader, 'sampler'):
+                if hasattr(getattr(eval_dataloader, 'sampler', None), 'set_epoch'):
                     eval_dataloader.sampler.set_epoch(0)
             else:  # Not distributed
                 if dl_nm.dataset is not None:
@@ -512,6 +742,19 @@ class PtActions(Actions):
                     call_chain=call_chain, registered_tensors=registered_e_tensors, mode=OperationMode.evaluation,
                 )
 
+                if reduce_in_place:
+                    # Every worker reduces its own batches, nothing is communicated per batch
+                    values_dict = {"IS_FROM_DIST_EVAL": False}
+                    for t2e in tensors_2_evaluate:
+                        key = t2e.unique_name
+                        if key not in registered_e_tensors.keys():
+                            logging.info("WARNING: Tensor {} was not found during eval".format(key))
+                            continue
+                        values_dict[key] = [registered_e_tensors[key]]
+                    if callback.user_iter_callback:
+                        callback.user_iter_callback(values_dict, callback._global_var_dict)
+                    continue
+
                 if not is_distributed or self.global_rank == 0:
                     values_dict = {}
                 # If distributed. For the outer loop, we need to ensure that
@@ -575,6 +818,10 @@ class PtActions(Actions):
                     # values_dict will contain results from all workers
                     callback.user_iter_callback(values_dict, callback._global_var_dict)
 
+            if reduce_in_place:
+                combine = getattr(callback, 'user_combine_callback', None) or self._combine_global_vars
+                callback._global_var_dict = combine(callback._global_var_dict)
+
             # final aggregation (over minibatches) and logging of results
             # should happend only on one worker
             if callback.user_done_callback and (self.global_rank is None or self.global_rank == 0):
@@ -724,7 +971,12 @@ class PtActions(Actions):
                     if key not in registered_e_tensors.keys():
                         logging.info("WARNING: Tensor {} was not found during eval".format(key))
                         continue
-                    if is_distributed:
+                    if is_distributed and not isinstance(registered_e_tensors[key], torch.Tensor):
+                        # Other outputs, e.g. the hypotheses of a beam search decoder, are gathered as objects
+                        gathered = self._all_gather_object(registered_e_tensors[key])
+                        if self.global_rank == 0:
+                            values_dict[key] += gathered
+                    elif is_distributed:
                         # where we will all_gather results from all workers
                         tensors_list = []
                         # where we will all_gather tensor sizes
@@ -773,6 +1025,132 @@ class PtActions(Actions):
             # For all other ranks
             return None
 
+    def _infer_to_store(self, tensors_to_return, output_dir, lengths=None, resume=False, verbose=False):
+        """
+        Does the same as _infer(), but writes the values of the samples of every batch to an InferenceStore in
+        output_dir, instead of returning them. Every worker writes its own shard.
+        """
+        lengths = lengths or {}
+        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(
+            hook=list(tensors_to_return) + list(lengths.values())
+        )
+        dl_nm = call_chain[0][0]
+        is_distributed = dl_nm.placement == DeviceType.AllGpu
+        rank = self.global_rank if is_distributed else 0
+        writer = InferenceStoreWriter(output_dir, rank=rank, resume=resume)
+        if writer.completed_batches > 0:
+            logging.info(f"Resuming inference after batch {writer.completed_batches} of {writer.path}")
+
+        with torch.no_grad():
+            dataset = dl_nm.dataset
+            if dataset is not None and not isinstance(dataset, torch.utils.data.IterableDataset):
+                # The samples are drawn from a list of dataset indices, recorded as the sample ids and sliced to resume
+                if dl_nm.shuffle:
+                    # A fixed seed, so that a resumed run draws the same order
+                    sample_ids = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(0)).tolist()
+                else:
+                    sample_ids = list(range(len(dataset)))
+                if is_distributed:
+                    # Disjoint, unpadded shards as with _EvalShardSampler, workers only synchronize at the end
+                    sample_ids = sample_ids[rank :: dist.get_world_size()]
+                sample_ids = sample_ids[writer.completed_samples :]
+                dataloader_params = {
+                    'dataset': dataset,
+                    'sampler': sample_ids,
+                    'num_workers': dl_nm.num_workers,
+                    'batch_size': dl_nm.batch_size,
+                    'shuffle': False,
+                    'pin_memory': dl_nm.pin_memory,
+                }
+                if hasattr(dl_nm, 'collate_fn'):
+                    dataloader_params['collate_fn'] = dl_nm.collate_fn
+                loop_iterator = torch.utils.data.DataLoader(**dataloader_params)
+                skipped_batches = 0
+            else:
+                # Samples are numbered in the order they are produced, resuming skips the completed batches
+                sample_ids = None
+                loop_iterator = dl_nm.data_iterator if dataset is None else self._get_eval_dataloader(dl_nm)
+                skipped_batches = writer.completed_batches
+            num_batches = len(loop_iterator) if hasattr(loop_iterator, '__len__') else None
+
+            position = 0
+            for epoch_i, data in enumerate(loop_iterator, 0):
+                if epoch_i < skipped_batches:
+                    continue
+                if (
+                    verbose
+                    and num_batches is not None
+                    and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0))
+                ):
+                    logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
+                if isinstance(data, torch.Tensor):
+                    data = (data,)
+                tensors = [d.to(dl_nm._device) if isinstance(d, torch.Tensor) else d for d in data]
+                registered_e_tensors = {
+                    t.unique_name: d for t, d in zip(call_chain[0][2].values(), tensors) if t is not None
+                }
+                self.__nm_graph_forward_pass(
+                    call_chain=call_chain, registered_tensors=registered_e_tensors, mode=OperationMode.evaluation,
+                )
+
+                outputs = {}
+                for t in tensors_to_return:
+                    value = registered_e_tensors[t.unique_name]
+                    if not isinstance(value, torch.Tensor):
+                        raise TypeError(f"Only tensors can be written to output_dir, {t.unique_name} is {type(value)}")
+                    outputs[t.unique_name] = value.cpu().numpy()
+                batch_size = len(next(iter(outputs.values())))
+                if sample_ids is not None:
+                    batch_ids = sample_ids[position : position + batch_size]
+                else:
+                    start = writer.completed_samples
+                    batch_ids = range(start, start + batch_size)
+                position += batch_size
+                batch_lengths = {
+                    t.unique_name: registered_e_tensors[length.unique_name].cpu().numpy()
+                    for t, length in lengths.items()
+                }
+                writer.write(outputs, batch_ids, batch_lengths)
+        writer.close()
+
+        if is_distributed:
+            dist.barrier()
+        return InferenceStore(output_dir)
+
+    def _onnx_infer(self, tensors_to_return, onnx_model, verbose=False):
+        """
+        Does the same as _infer(), but executes a call chain exported with deployment_export() using ONNX Runtime
+        on CPU. Only the data layer is run in PyTorch.
+        """
+        ort = importlib.import_module('onnxruntime')
+
+        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(hook=tensors_to_return)
+        dl_nm = call_chain[0][0]
+        if dl_nm.placement == DeviceType.AllGpu:
+            raise NotImplementedError("ONNX Runtime inference is not available for distributed execution.")
+        _, output_names = self._get_call_chain_port_names(call_chain, tensors_to_return)
+        port_names = list(call_chain[0][2].keys())
+
+        session = ort.InferenceSession(onnx_model, providers=['CPUExecutionProvider'])
+        session_inputs = set(node_arg.name for node_arg in session.get_inputs())
+        missing = set(output_names) - set(node_arg.name for node_arg in session.get_outputs())
+        if missing:
+            raise ValueError(f"{onnx_model} was not exported from the requested tensors, missing outputs: {missing}")
+
+        eval_dataloader = self._get_eval_dataloader(dl_nm)
+        num_batches = len(eval_dataloader) if hasattr(eval_dataloader, "__len__") else None
+        values = [[] for _ in tensors_to_return]
+        for epoch_i, data in enumerate(eval_dataloader, 0):
+            if verbose and num_batches is not None and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0)):
+                logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
+            if isinstance(data, torch.Tensor):
+                data = (data,)
+            feed_dict = {name: d.cpu().numpy() for name, d in zip(port_names, data) if name in session_inputs}
+            outputs = session.run(output_names, feed_dict)
+            for value_list, output in zip(values, outputs):
+                value_list.append(torch.from_numpy(output))
+        return values
+
     def append_to_cache(self, registered_tensors: dict, offload_to_cpu):
         """Simpler helper function to add results of __nm_graph_forward_pass to
         current cache.
@@ -952,12 +1330,116 @@ class PtActions(Actions):
         finally:
             type(module).__call__ = __orig_call__
 
+    @staticmethod
+    def _get_call_chain_port_names(call_chain, tensors):
+        """Returns the names under which the inputs (data layer output ports) and outputs (producer output ports) of
+        an exported call chain are exposed. Clashing output port names are suffixed with their position.
+        """
+        input_names = [name for name, t in call_chain[0][2].items() if t is not None]
+        output_names = []
+        for ind, tensor in enumerate(tensors):
+            name = tensor.name
+            if name in input_names or name in output_names:
+                name = f"{name}_{ind}"
+            output_names.append(name)
+        return input_names, output_names
+
+    @staticmethod
+    def _get_call_chain_dynamic_axes(call_chain, tensors):
+        """Marks batch and time axes of the call chain inputs and outputs as dynamic."""
+        input_names, output_names = PtActions._get_call_chain_port_names(call_chain, tensors)
+        dl_nm = call_chain[0][0]
+        ntypes = [dl_nm.output_ports[name] for name in input_names]
+        ntypes += [t.producer.output_ports[t.name] for t in tensors]
+        dynamic_axes = {}
+        for port_name, ntype in zip(input_names + output_names, ntypes):
+            if ntype.axes:
+                axes = [ind for ind, axis in enumerate(ntype.axes) if axis.kind in (AxisKind.Batch, AxisKind.Time)]
+                if axes:
+                    dynamic_axes[port_name] = axes
+        return dynamic_axes
+
+    @staticmethod
+    def _get_eval_dataloader(dl_nm):
+        """Creates a non-distributed dataloader over the data layer, in the same way as _infer() does."""
+        if dl_nm.dataset is None:
+            return dl_nm.data_iterator
+        dataloader_params = {
+            'dataset': dl_nm.dataset,
+            'sampler': None,
+            'num_workers': dl_nm.num_workers,
+            'batch_size': dl_nm.batch_size,
+            'shuffle': dl_nm.shuffle,
+            'pin_memory': dl_nm.pin_memory,
+        }
+        if hasattr(dl_nm, 'collate_fn'):
+            dataloader_params['collate_fn'] = dl_nm.collate_fn
+        return torch.utils.data.DataLoader(**dataloader_params)
+
+    @staticmethod
+    def __call_chain_export(tensors, output, d_format: DeploymentFormat, input_example=None):
+        destination = Path(output)
+        if destination.exists():
+            raise FileExistsError(f"Destination {output} already exists. " f"Aborting export.")
+
+        call_chain = topological_sort_from_leaves(list(tensors))
+        if not isinstance(call_chain[0][0], DataLayerNM):
+            raise ValueError("The first module in your DAG was not a DataLayer NeuralModule.")
+        dl_nm = call_chain[0][0]
+        input_names, output_names = PtActions._get_call_chain_port_names(call_chain, tensors)
+
+        if input_example is None:
+            # Take the first batch produced by the data layer
+            data = next(iter(PtActions._get_eval_dataloader(dl_nm)))
+            if isinstance(data, torch.Tensor):
+                data = (data,)
+            input_example = tuple(
+                d.to(dl_nm._device) for d, t in zip(data, call_chain[0][2].values()) if t is not None
+            )
+        elif isinstance(input_example, dict):
+            input_example = tuple(input_example[name] for name in input_names)
+        elif isinstance(input_example, torch.Tensor):
+            input_example = (input_example,)
+
+        prepared = []
+        try:
+            for module, _, _ in call_chain[1:]:
+                prepared.append(module)
+                module._prepare_for_deployment()
+                if isinstance(module, nn.Module):
+                    module.eval()
+            chain_module = _CallChainModule(call_chain, tensors)
+            chain_module.eval()
+
+            if d_format == DeploymentFormat.TORCHSCRIPT:
+                traced_m = torch.jit.trace(chain_module, input_example, check_trace=False)
+                traced_m.save(output)
+            elif d_format == DeploymentFormat.ONNX or d_format == DeploymentFormat.TRTONNX:
+                torch.onnx.export(
+                    chain_module,
+                    input_example,
+                    output,
+                    input_names=input_names,
+                    output_names=output_names,
+                    verbose=False,
+                    export_params=True,
+                    do_constant_folding=True,
+                    dynamic_axes=PtActions._get_call_chain_dynamic_axes(call_chain, tensors),
+                    opset_version=11,
+                )
+            else:
+                raise NotImplementedError(f"Not supported deployment format for a call chain: {d_format}")
+        finally:
+            for module in prepared:
+                module._restore_after_deployment()
+
     @staticmethod
     def deployment_export(module, output: str, d_format: DeploymentFormat, input_example=None, output_example=None):
         """Exports Neural Module instance for deployment.
 
         Args:
-            module: neural module to export
+            module: neural module to export. Alternatively, a list of NmTensors whose whole call chain (without the
+                data layer) is exported as a single graph. The outputs of the data layer become the graph inputs.
             output (str): where export results should be saved
             d_format (DeploymentFormat): which deployment format to use
             input_example: sometimes tracing will require input examples
@@ -967,13 +1449,19 @@ class PtActions(Actions):
         """
 
         with torch.no_grad():
-            PtActions.__module_export(
-                module=module,
-                output=output,
-                d_format=d_format,
-                input_example=input_example,
-                output_example=output_example,
-            )
+            if isinstance(module, (list, tuple, NmTensor)):
+                tensors = module if isinstance(module, (list, tuple)) else [module]
+                PtActions.__call_chain_export(
+                    tensors=tensors, output=output, d_format=d_format, input_example=input_example,
+                )
+            else:
+                PtActions.__module_export(
+                    module=module,
+                    output=output,
+                    d_format=d_format,
+                    input_example=input_example,
+                    output_example=output_example,
+                )
 
     def train(
         self,
@@ -1532,11 +2020,28 @@ class PtActions(Actions):
         use_cache=False,
         offload_to_cpu=True,
         modules_to_restore=None,
+        onnx_model=None,
+        output_dir=None,
+        lengths=None,
+        resume=False,
     ):
         """See NeuralModuleFactory.infer()
         """
 
-        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(hook=tensors)
+        if onnx_model is not None:
+            if checkpoint_dir or cache or use_cache or output_dir:
+                raise ValueError(
+                    "checkpoint_dir, cache, use_cache and output_dir cannot be used together with onnx_model"
+                )
+            return self._onnx_infer(tensors_to_return=tensors, onnx_model=onnx_model, verbose=verbose)
+        if output_dir is None and (lengths or resume):
+            raise ValueError("lengths and resume are only used with output_dir")
+        if output_dir is not None and (cache or use_cache):
+            raise ValueError("cache and use_cache cannot be used together with output_dir")
+
+        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(
+            hook=list(tensors) + list((lengths or {}).values())
+        )
         if checkpoint_dir:
             # Find all modules that need to be restored
             if modules_to_restore is None:
@@ -1581,6 +2086,10 @@ class PtActions(Actions):
             self.amp_initialized = True
 
         # Run infer
+        if output_dir is not None:
+            return self._infer_to_store(
+                tensors_to_return=tensors, output_dir=output_dir, lengths=lengths, resume=resume, verbose=verbose
+            )
         return self._infer(
             tensors_to_return=tensors,
             verbose=verbose,
@@ -1,3 +1,4 @@
+from nemo.backends.pytorch.common.activation_checkpointing import *
 from nemo.backends.pytorch.common.losses import *
 from nemo.backends.pytorch.common.multi_data import *
 from nemo.backends.pytorch.common.other import *
@@ -0,0 +1,186 @@
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+__all__ = ['ActivationCheckpointing']
+
+import inspect
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import torch
+from torch import nn
+from torch.utils.checkpoint import checkpoint
+
+from nemo.utils import logging
+
+# The non-reentrant implementation keeps the parameters of the recomputed layers in the autograd graph, which DDP
+# created with find_unused_parameters=True (as done by PtActions.train) relies on, also when the inputs of a layer do
+# not require grad. The reentrant one of older torch versions does neither, so checkpointing is disabled there.
+_HAS_NON_REENTRANT_CHECKPOINT = 'use_reentrant' in inspect.signature(checkpoint).parameters
+
+
+@contextmanager
+def _frozen_batch_norm_stats(module):
+    """Keeps the running statistics of the batch norm layers of module unchanged, e.g. while it is recomputed."""
+    saved = []
+    for m in module.modules():
+        if isinstance(m, nn.modules.batchnorm._BatchNorm) and m.training and m.track_running_stats:
+            saved.append((m, m.momentum, m.num_batches_tracked.clone()))
+            m.momentum = 0.0
+    try:
+        yield
+    finally:
+        for m, momentum, num_batches_tracked in saved:
+            m.momentum = momentum
+            m.num_batches_tracked.copy_(num_batches_tracked)
+
+
+def _run_layer(index, layer, *args, function=None):
+    return (function or layer)(*args)
+
+
+def _nbytes(outputs):
+    if isinstance(outputs, torch.Tensor):
+        return outputs.numel() * outputs.element_size()
+    if isinstance(outputs, (list, tuple)):
+        return sum(_nbytes(output) for output in outputs)
+    return 0
+
+
+class ActivationCheckpointing(object):
+    """
+    Recomputes the activations of every k-th layer of a stack of layers during the backward pass instead of keeping
+    them in memory for it. Checkpointing is only applied while training with gradients enabled, evaluation and
+    inference run the layers as usual.
+
+    The dropout masks and the batch norm statistics of the recomputed layers are the same as in the forward pass, so
+    the gradients are the ones of the non-checkpointed layers, and the running statistics of the batch norm layers
+    are updated only once per step.
+
+    On the first checkpointed forward pass, the activation memory saved per step and the extra compute are estimated
+    and logged. They are also available in the report attribute afterwards.
+
+    Checkpointing requires the non-reentrant implementation of torch.utils.checkpoint (torch 1.11 and later). On older
+    torch versions a warning is logged and the layers are run without checkpointing.
+
+    Args:
+        every (int): checkpoints the layers with index k-1, 2k-1, ... for every=k, 0 disables checkpointing
+        name (str): name of the layer stack used in the report
+    """
+
+    def __init__(self, every=0, name="layers"):
+        if every < 0:
+            raise ValueError(f"every has to be non-negative, got {every}")
+        if every > 0 and not _HAS_NON_REENTRANT_CHECKPOINT:
+            logging.warning(
+                f"Activation checkpointing of the {name} is disabled, it requires torch.utils.checkpoint with "
+                f"use_reentrant (torch {torch.__version__} has none)."
+            )
+            every = 0
+        self.every = every
+        self.name = name
+        self.report = None
+
+    def is_checkpointed(self, index):
+        return self.every > 0 and (index + 1) % self.every == 0
+
+    def is_active(self, module):
+        """Whether the layers of the module are checkpointed in its current forward pass."""
+        return self.every > 0 and module.training and torch.is_grad_enabled()
+
+    @contextmanager
+    def forward(self, module, num_layers):
+        """
+        Context of a forward pass of module through its layers. Reports the savings after the first checkpointed one.
+
+        Args:
+            module (nn.Module): module running the layers
+            num_layers (int): number of layers in the stack
+
+        Yields:
+            function run_layer(index, layer, *args, function=None) running function (defaults to the layer) on args,
+            checkpointed if the layer is one of the every-th layers and the module is training. function has to return
+            (nested tuples of) tensors. The batch norm statistics of the layer are left unchanged when it is recomputed.
+        """
+        if not self.is_active(module):
+            yield _run_layer
+        elif self.report is not None:
+            yield self._run
+        else:
+            profile = {'times': [0.0] * num_layers, 'activation_bytes': 0}
+            yield partial(self._run_profiled, profile)
+            self._log_report(profile, num_layers)
+
+    def _run_profiled(self, profile, index, layer, *args, function=None):
+        hooks = []
+        if self.is_checkpointed(index):
+            # Estimates the activations kept for the backward pass by the outputs of the sub-modules of the layer.
+            def count_activations(module, inputs, outputs):
+                profile['activation_bytes'] += _nbytes(outputs)
+
+            hooks = [m.register_forward_hook(count_activations) for m in layer.modules() if m is not layer]
+        try:
+            self._synchronize()
+            start = time.perf_counter()
+            outputs = self._run(index, layer, *args, function=function)
+            self._synchronize()
+            profile['times'][index] = time.perf_counter() - start
+        finally:
+            for hook in hooks:
+                hook.remove()
+        return outputs
+
+    def _run(self, index, layer, *args, function=None):
+        function = function or layer
+        if not self.is_checkpointed(index):
+            return function(*args)
+
+        num_calls = [0]
+
+        def run_function(*inputs):
+            num_calls[0] += 1
+            if num_calls[0] == 1:
+                return function(*inputs)
+            with _frozen_batch_norm_stats(layer):
+                return function(*inputs)
+
+        return checkpoint(run_function, *args, use_reentrant=False)
+
+    @staticmethod
+    def _synchronize():
+        if torch.cuda.is_available() and torch.cuda.is_initialized():
+            torch.cuda.synchronize()
+
+    def _log_report(self, profile, num_layers):
+        checkpointed = [i for i in range(num_layers) if self.is_checkpointed(i)]
+        total_time = sum(profile['times'])
+        recompute_time = sum(profile['times'][i] for i in checkpointed)
+        recompute_fraction = recompute_time / total_time if total_time > 0 else 0.0
+        self.report = {
+            'checkpointed_layers': checkpointed,
+            'num_layers': num_layers,
+            'activation_memory_saved': profile['activation_bytes'],
+            'forward_recompute_fraction': recompute_fraction,
+            # The backward pass takes about twice as long as the forward pass.
+            'step_overhead_fraction': recompute_fraction / 3,
+        }
+        logging.info(
+            f"Activation checkpointing of {len(checkpointed)}/{num_layers} {self.name} saves about "
+            f"{profile['activation_bytes'] / 2 ** 20:.1f} MB of activations per step at the cost of recomputing "
+            f"{100 * recompute_fraction:.0f}% of their forward pass (about {100 * recompute_fraction / 3:.0f}% more "
+            f"compute per training step)."
+        )
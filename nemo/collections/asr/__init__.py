@@ -12,28 +12,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # =============================================================================
-from nemo.backends.pytorch.common.losses import CrossEntropyLossNM
-from nemo.collections.asr import models
-from nemo.collections.asr.audio_preprocessing import *
-from nemo.collections.asr.beam_search_decoder import BeamSearchDecoderWithLM
-from nemo.collections.asr.contextnet import ContextNetDecoderForCTC, ContextNetEncoder
-from nemo.collections.asr.data_layer import (
-    AudioToSpeechLabelDataLayer,
-    AudioToTextDataLayer,
-    KaldiFeatureDataLayer,
-    TarredAudioToTextDataLayer,
-    TranscriptDataLayer,
-)
-from nemo.collections.asr.greedy_ctc_decoder import GreedyCTCDecoder
-from nemo.collections.asr.jasper import (
-    JasperDecoderForClassification,
-    JasperDecoderForCTC,
-    JasperDecoderForSpkrClass,
-    JasperEncoder,
-)
-from nemo.collections.asr.las.misc import JasperRNNConnector
-from nemo.collections.asr.losses import CTCLossNM
 from nemo.core import Backend
+from nemo.utils.lazy_import import lazy_import
+
+# The modules (and librosa, webdataset, etc. with them) are imported when first accessed.
+__getattr__, __dir__ = lazy_import(
+    __name__,
+    submodules={'models': 'nemo.collections.asr.models'},
+    module_attributes={
+        'nemo.backends.pytorch.common.losses': ['CrossEntropyLossNM'],
+        'nemo.collections.asr.audio_preprocessing': [
+            'AudioPreprocessing',
+            'AudioPreprocessor',
+            'AudioToMFCCPreprocessor',
+            'AudioToMelSpectrogramPreprocessor',
+            'AudioToSpectrogramPreprocessor',
+            'CropOrPadSpectrogramAugmentation',
+            'MultiplyBatch',
+            'SpectrogramAugmentation',
+            'TimeStretchAugmentation',
+        ],
+        'nemo.collections.asr.beam_search_decoder': ['BeamSearchDecoderWithLM'],
+        'nemo.collections.asr.contextnet': ['ContextNetDecoderForCTC', 'ContextNetEncoder'],
+        'nemo.collections.asr.data_layer': [
+            'AudioToSpeechLabelDataLayer',
+            'AudioToTextDataLayer',
+            'KaldiFeatureDataLayer',
+            'TarredAudioToTextDataLayer',
+            'TranscriptDataLayer',
+        ],
+        'nemo.collections.asr.greedy_ctc_decoder': ['GreedyCTCDecoder'],
+        'nemo.collections.asr.inference_engine': ['ASRInferenceEngine'],
+        'nemo.collections.asr.jasper': [
+            'JasperDecoderForClassification',
+            'JasperDecoderForCTC',
+            'JasperDecoderForSpkrClass',
+            'JasperEncoder',
+        ],
+        'nemo.collections.asr.las.misc': ['JasperRNNConnector'],
+        'nemo.collections.asr.losses': ['CTCLossNM'],
+    },
+)
 
 __all__ = [
     'Backend',
@@ -61,6 +80,7 @@ __all__ = [
     'ContextNetDecoderForCTC',
     'CTCLossNM',
     'CrossEntropyLossNM',
+    'ASRInferenceEngine',
 ]
 
 backend = Backend.PyTorch
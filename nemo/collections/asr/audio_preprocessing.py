@@ -388,6 +388,17 @@ class AudioToMelSpectrogramPreprocessor(AudioPreprocessor):
     def get_seq_len(self, seq_len):
         return self.featurizer.get_seq_len(seq_len)
 
+    def _prepare_for_deployment(self):
+        self.featurizer.prepare_for_export()
+        logging.warning("Featurizer switched to convolutional STFT and dithering was disabled for export")
+
+        input_example = torch.randn(4, self._sample_rate, device=self._device)
+        length = torch.full((4,), self._sample_rate, dtype=torch.long, device=self._device)
+        return (input_example, length), None
+
+    def _restore_after_deployment(self):
+        self.featurizer.restore_after_export()
+
     @property
     def filter_banks(self):
         return self.featurizer.filter_banks
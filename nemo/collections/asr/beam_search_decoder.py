@@ -1,14 +1,15 @@
 # Copyright (c) 2019 NVIDIA Corporation
-# Requires Baidu's CTC decoders from
-# https://github.com/PaddlePaddle/DeepSpeech/decoders/swig
-
-import torch
+import numpy as np
 
 from nemo.backends.pytorch.nm import NonTrainableNM
-from nemo.core import DeviceType
+from nemo.collections.asr.parts.ctc_beam_search import (
+    CTCPrefixBeamSearch,
+    create_pool,
+    decode_batch,
+    load_language_model,
+)
 from nemo.core.neural_types import *
 from nemo.utils.decorators import add_port_docs
-from nemo.utils.helpers import get_cuda_device
 
 
 class BeamSearchDecoderWithLM(NonTrainableNM):
@@ -19,6 +20,12 @@ class BeamSearchDecoderWithLM(NonTrainableNM):
     Each element in the list is a list of size beam_search, and each element
     in that list is a tuple of (final_log_prob, hyp_string).
 
+    The native prefix beam search (see parts.ctc_beam_search) runs in a pool
+    of num_cpus processes, each decoding whole utterances. Baidu's CTC
+    decoders (ctc_decoders, see scripts/install_decoders.sh) can be used
+    instead with backend='ctc_decoders'. In distributed inference, every
+    worker decodes the utterances of its shard of the data.
+
     Args:
         vocab (list): List of characters that can be output by the ASR model. For Jasper, this is the 28 character set
             {a-z '}. The CTC blank symbol is automatically added later for models using ctc.
@@ -26,14 +33,18 @@ class BeamSearchDecoderWithLM(NonTrainableNM):
             predictions
         alpha (float): The amount of importance to place on the n-gram language model. Larger alpha means more
             importance on the LM and less importance on the acoustic model (Jasper).
-        beta (float): A penalty term given to longer word sequences. Larger beta will result in shorter sequences.
-        lm_path (str): Path to n-gram language model
+        beta (float): A bonus added per word of the hypotheses. Larger beta will result in longer word sequences.
+        lm_path (str): Path to n-gram language model, preferably a KenLM binary. With the native backend, binaries are
+            read with the kenlm module, and ARPA files, meant for small models, are read into memory. Decodes without
+            language model if None.
         num_cpus (int): Number of cpus to use
         cutoff_prob (float): Cutoff probability in vocabulary pruning, default 1.0, no pruning
         cutoff_top_n (int): Cutoff number in pruning, only top cutoff_top_n characters with highest probs in
             vocabulary will be used in beam search, default 40.
         input_tensor (bool): Set to True if you intend to pass pytorch Tensors, set to False if you intend to pass
             numpy arrays.
+        backend (str): 'native' (default) for the native prefix beam search, or 'ctc_decoders' for Baidu's CTC
+            decoders, which have to be installed.
     """
 
     @property
@@ -60,44 +71,82 @@ class BeamSearchDecoderWithLM(NonTrainableNM):
         return {"predictions": NeuralType(('B', 'T'), PredictionsType())}
 
     def __init__(
-        self, vocab, beam_width, alpha, beta, lm_path, num_cpus, cutoff_prob=1.0, cutoff_top_n=40, input_tensor=True
+        self,
+        vocab,
+        beam_width,
+        alpha,
+        beta,
+        lm_path,
+        num_cpus,
+        cutoff_prob=1.0,
+        cutoff_top_n=40,
+        input_tensor=True,
+        backend='native',
     ):
-
-        try:
-            from ctc_decoders import Scorer
-            from ctc_decoders import ctc_beam_search_decoder_batch
-        except ModuleNotFoundError:
-            raise ModuleNotFoundError(
-                "BeamSearchDecoderWithLM requires the "
-                "installation of ctc_decoders "
-                "from nemo/scripts/install_decoders.py"
-            )
-
         super().__init__()
-        # Override the default placement from neural factory and set placement/device to be CPU.
-        self._placement = DeviceType.CPU
-        self._device = get_cuda_device(self._placement)
-
-        if self._factory.world_size > 1:
-            raise ValueError("BeamSearchDecoderWithLM does not run in distributed mode")
+        if backend not in ('native', 'ctc_decoders'):
+            raise ValueError(f"backend has to be 'native' or 'ctc_decoders', got {backend}")
 
-        self.scorer = Scorer(alpha, beta, model_path=lm_path, vocabulary=vocab)
-        self.beam_search_func = ctc_beam_search_decoder_batch
+        self.backend = backend
+        self.beam_search_func = None
+        self.scorer = None
+        self.search = None
+        if backend == 'ctc_decoders':
+            try:
+                from ctc_decoders import Scorer
+                from ctc_decoders import ctc_beam_search_decoder_batch
+            except ImportError:
+                raise ImportError(
+                    "backend='ctc_decoders' requires Baidu's CTC decoders, see scripts/install_decoders.sh."
+                )
+            self.beam_search_func = ctc_beam_search_decoder_batch
+            if lm_path is not None:
+                self.scorer = Scorer(alpha, beta, model_path=lm_path, vocabulary=vocab)
+        else:
+            language_model = load_language_model(lm_path) if lm_path is not None else None
+            self.search = CTCPrefixBeamSearch(
+                vocab,
+                beam_width,
+                alpha=alpha,
+                beta=beta,
+                language_model=language_model,
+                cutoff_prob=cutoff_prob,
+                cutoff_top_n=cutoff_top_n,
+            )
         self.vocab = vocab
         self.beam_width = beam_width
         self.num_cpus = num_cpus
         self.cutoff_prob = cutoff_prob
         self.cutoff_top_n = cutoff_top_n
         self.input_tensor = input_tensor
+        self._pool = None
 
     def forward(self, log_probs, log_probs_length):
-        probs_list = log_probs
+        if self.backend == 'ctc_decoders':
+            return [self._decode_ctc_decoders(log_probs, log_probs_length)]
+
         if self.input_tensor:
-            probs = torch.exp(log_probs)
-            probs_list = []
-            for i, prob in enumerate(probs):
-                probs_list.append(prob[: log_probs_length[i], :])
-        res = self.beam_search_func(
+            # One copy of the batch to the host
+            log_probs = log_probs.detach().float().cpu().numpy()
+            log_probs_length = log_probs_length.cpu().tolist()
+            log_probs_list = [log_probs[i, :length] for i, length in enumerate(log_probs_length)]
+        else:
+            # Probabilities of each utterance
+            with np.errstate(divide='ignore'):
+                log_probs_list = [np.log(probs) for probs in log_probs]
+
+        if self._pool is None and self.num_cpus > 1:
+            self._pool = create_pool(self.search, self.num_cpus)
+        res = decode_batch(self.search, log_probs_list, pool=self._pool)
+        return [res]
+
+    def _decode_ctc_decoders(self, log_probs, log_probs_length):
+        if self.input_tensor:
+            probs = log_probs.detach().float().exp().cpu().numpy()
+            probs_list = [probs[i, :length] for i, length in enumerate(log_probs_length.cpu().tolist())]
+        else:
+            probs_list = log_probs
+        return self.beam_search_func(
             probs_list,
             self.vocab,
             beam_size=self.beam_width,
@@ -106,4 +155,7 @@ class BeamSearchDecoderWithLM(NonTrainableNM):
             cutoff_prob=self.cutoff_prob,
             cutoff_top_n=self.cutoff_top_n,
         )
-        return [res]
+
+    def __del__(self):
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
@@ -624,6 +624,13 @@ class KaldiFeatureDataLayer(DataLayerNM):
         drop_last (bool): See PyTorch DataLoader. Defaults to False.
         shuffle (bool): See PyTorch DataLoader. Defaults to True.
         num_workers (int): See PyTorch DataLoader. Defaults to 0.
+        cache_size (int): Number of feature matrices kept in memory by every
+            worker, the least recently used ones are dropped. Features are
+            otherwise read from the .ark files for every batch. Defaults to 0.
+        fp16_features (bool): Whether to return the features as float16,
+            for mixed precision training. They are then read from a float16
+            copy of the arks, written once to feats_fp16.bin in kaldi_dir.
+            Defaults to False.
     """
 
     @property
@@ -657,6 +664,8 @@ class KaldiFeatureDataLayer(DataLayerNM):
         drop_last=False,
         shuffle=True,
         num_workers=0,
+        cache_size=0,
+        fp16_features=False,
     ):
         super().__init__()
 
@@ -667,6 +676,8 @@ class KaldiFeatureDataLayer(DataLayerNM):
             "min_duration": min_duration,
             "max_duration": max_duration,
             "normalize": normalize_transcripts,
+            "cache_size": cache_size,
+            "fp16_features": fp16_features,
         }
         self._dataset = KaldiFeatureDataset(**dataset_params)
 
@@ -0,0 +1,250 @@
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+"""
+In-process speech recognition engine that keeps the acoustic model resident and groups concurrent requests into
+dynamic micro-batches.
+"""
+__all__ = ['ASRInferenceEngine']
+
+import copy
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.helpers import post_process_predictions
+from nemo.utils import logging
+
+
+class _Request(object):
+    def __init__(self, audio, beam):
+        self.audio = audio
+        self.beam = beam
+        self.future = Future()
+
+
+class ASRInferenceEngine(object):
+    """Runs CTC speech recognition on raw audio buffers without building a NeMo DAG or a data layer per request.
+
+    The preprocessor, encoder and decoder are called directly, so the model stays resident between requests.
+    The engine uses a copy of the featurizer of the preprocessor with dithering disabled, so transcriptions are
+    deterministic, and computes the features of every utterance at its own length, so they do not depend on the
+    utterances it is batched with.
+    Requests submitted concurrently (e.g. from the threads of a web server) are grouped by a background worker into
+    micro-batches that share a single forward pass. A micro-batch is closed when it holds ``max_batch_size``
+    utterances, when ``max_wait_ms`` passed since its first request arrived, or when adding the next utterance would
+    make the padded batch longer than ``max_batch_duration`` seconds of audio.
+
+    Args:
+        preprocessor: AudioToMelSpectrogramPreprocessor instance
+        encoder: JasperEncoder instance
+        decoder: JasperDecoderForCTC instance
+        labels (list): vocabulary of the model, without the CTC blank symbol
+        beam_search_decoder: optional BeamSearchDecoderWithLM instance used for requests submitted with beam=True.
+            Defaults to None.
+        sample_rate (int): sample rate of the audio passed to the engine. Defaults to 16000.
+        max_batch_size (int): maximum number of utterances in a micro-batch. Defaults to 16.
+        max_wait_ms (float): maximum time (in milliseconds) the first request of a micro-batch waits for others to
+            join it. Defaults to 10.
+        max_batch_duration (float): maximum padded duration (batch size times the longest utterance, in seconds)
+            of a micro-batch. A single longer utterance is still processed, alone. Defaults to 160.
+    """
+
+    def __init__(
+        self,
+        preprocessor,
+        encoder,
+        decoder,
+        labels,
+        beam_search_decoder=None,
+        sample_rate=16000,
+        max_batch_size=16,
+        max_wait_ms=10.0,
+        max_batch_duration=160.0,
+    ):
+        self._featurizer = copy.deepcopy(preprocessor.featurizer)
+        self._featurizer.dither = 0.0
+        self._featurizer.eval()
+        self._encoder = encoder
+        self._decoder = decoder
+        self._beam_search_decoder = beam_search_decoder
+        self._labels = labels
+        self._sample_rate = sample_rate
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._max_batch_samples = int(max_batch_duration * sample_rate)
+        self._device = encoder._device
+
+        self._encoder.eval()
+        self._decoder.eval()
+
+        self._queue = queue.Queue()
+        self._worker = None
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    def start(self):
+        """Starts the background worker that forms micro-batches."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="ASRInferenceEngine", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        """Stops the background worker after all already submitted requests are processed."""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def submit(self, audio, beam=False):
+        """Queues one utterance for recognition.
+
+        Args:
+            audio: 1D float numpy array or torch tensor with samples in [-1, 1], at the engine sample rate
+            beam (bool): decode with the beam search decoder instead of greedily
+
+        Returns:
+            concurrent.futures.Future resolving to the transcription
+        """
+        if beam and self._beam_search_decoder is None:
+            raise ValueError("beam=True requires the engine to be created with a beam_search_decoder")
+        if self._worker is None:
+            raise RuntimeError("The engine was not started. Call start() first.")
+        request = _Request(self._to_tensor(audio), beam)
+        self._queue.put(request)
+        return request.future
+
+    def transcribe(self, audio, beam=False, timeout=None):
+        """Blocking version of submit(). Returns the transcription of a single utterance."""
+        return self.submit(audio, beam=beam).result(timeout=timeout)
+
+    @torch.no_grad()
+    def transcribe_batch(self, audios, beam=False):
+        """Transcribes a list of utterances in a single forward pass, bypassing the request queue.
+
+        Args:
+            audios (list): 1D float numpy arrays or torch tensors at the engine sample rate
+            beam (bool): decode with the beam search decoder instead of greedily
+
+        Returns:
+            list of transcriptions
+        """
+        return self._infer([self._to_tensor(audio) for audio in audios], [beam] * len(audios))
+
+    @staticmethod
+    def _to_tensor(audio):
+        if isinstance(audio, np.ndarray):
+            audio = torch.from_numpy(audio.astype(np.float32, copy=False))
+        if audio.dim() != 1:
+            raise ValueError(f"Expected a 1D audio buffer, got shape {tuple(audio.shape)}")
+        return audio
+
+    def _features(self, audios):
+        # Batch padding would replace the reflect padding of the STFT at the end of the shorter utterances, so the
+        # features are computed per utterance and only then padded. The encoder masks the padded frames.
+        lengths = torch.tensor([len(audio) for audio in audios], dtype=torch.long, device=self._device)
+        features = [
+            self._featurizer(audio.to(self._device, torch.float).unsqueeze(0), length.unsqueeze(0))[0]
+            for audio, length in zip(audios, lengths)
+        ]
+        processed_length = self._featurizer.get_seq_len(lengths.float())
+        processed_signal = features[0].new_zeros(
+            len(features), features[0].shape[0], max(f.shape[1] for f in features)
+        )
+        for i, feature in enumerate(features):
+            processed_signal[i, :, : feature.shape[1]] = feature
+        return processed_signal, processed_length
+
+    def _infer(self, audios, beams):
+        processed_signal, processed_length = self._features(audios)
+        encoded, encoded_len = self._encoder(force_pt=True, audio_signal=processed_signal, length=processed_length)
+        log_probs = self._decoder(force_pt=True, encoder_output=encoded)
+
+        # Frames past the end of an utterance are padding and must not be decoded
+        predictions = log_probs.argmax(dim=-1).cpu()
+        encoded_len = encoded_len.long().cpu()
+        transcriptions = post_process_predictions(
+            [predictions[i : i + 1, : encoded_len[i]] for i in range(len(audios))], self._labels
+        )
+
+        beam_rows = [i for i, beam in enumerate(beams) if beam]
+        if beam_rows:
+            beam_rows_t = torch.tensor(beam_rows, device=log_probs.device)
+            beam_results = self._beam_search_decoder(
+                force_pt=True,
+                log_probs=log_probs.index_select(0, beam_rows_t),
+                log_probs_length=encoded_len.to(log_probs.device).index_select(0, beam_rows_t),
+            )[0]
+            for i, result in zip(beam_rows, beam_results):
+                transcriptions[i] = result[0][1]
+        return transcriptions
+
+    def _run(self):
+        carry_over = None
+        while True:
+            first = carry_over if carry_over is not None else self._queue.get()
+            carry_over = None
+            if first is None:
+                break
+            batch = [first]
+            longest = len(first.audio)
+            deadline = time.monotonic() + self._max_wait
+            stop = False
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                if max(longest, len(request.audio)) * (len(batch) + 1) > self._max_batch_samples:
+                    # Does not fit, opens the next micro-batch instead
+                    carry_over = request
+                    break
+                batch.append(request)
+                longest = max(longest, len(request.audio))
+
+            self._process(batch)
+            if stop:
+                break
+
+    def _process(self, batch):
+        try:
+            with torch.no_grad():
+                transcriptions = self._infer([r.audio for r in batch], [r.beam for r in batch])
+        except Exception as e:  # nopep8
+            logging.error(f"Inference failed for a batch of {len(batch)} requests with exception {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, transcription in zip(batch, transcriptions):
+            request.future.set_result(transcription)
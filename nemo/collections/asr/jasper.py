@@ -1,4 +1,5 @@
 # Copyright (c) 2019 NVIDIA Corporation
+from functools import partial
 from typing import Optional
 
 import torch
@@ -6,6 +7,7 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 from .parts.jasper import JasperBlock, StatsPoolLayer, init_weights, jasper_activations
+from nemo.backends.pytorch.common.activation_checkpointing import ActivationCheckpointing
 from nemo.backends.pytorch.nm import TrainableNM
 from nemo.core.neural_types import *
 from nemo.utils import logging
@@ -98,6 +100,12 @@ class JasperEncoder(TrainableNM):
             initialized. Options are ['xavier_uniform', 'xavier_normal',
             'kaiming_uniform','kaiming_normal'].
             Defaults to "xavier_uniform".
+        activation_checkpointing_every (int): Recomputes the activations of
+            every k-th Jasper block during the backward pass instead of
+            keeping them in memory, which trades compute for memory while
+            training. The outputs feeding dense residual connections are
+            kept once and not recomputed. 0 disables it.
+            Defaults to 0.
     """
 
     length: Optional[torch.Tensor]
@@ -160,6 +168,7 @@ class JasperEncoder(TrainableNM):
         conv_mask=True,
         frame_splicing=1,
         init_mode='xavier_uniform',
+        activation_checkpointing_every=0,
     ):
         super().__init__()
 
@@ -217,18 +226,36 @@ class JasperEncoder(TrainableNM):
             feat_in = lcfg['filters']
 
         self.encoder = nn.Sequential(*encoder_layers)
+        self.activation_checkpointing = ActivationCheckpointing(activation_checkpointing_every, name="Jasper blocks")
         self.apply(lambda x: init_weights(x, mode=init_mode))
         self.to(self._device)
 
     def forward(self, audio_signal, length=None):
         # type: (Tensor, Optional[Tensor]) -> Tensor, Optional[Tensor]
 
-        s_input, length = self.encoder(([audio_signal], length))
+        if self.activation_checkpointing.is_active(self):
+            s_input, length = self._checkpointed_forward(audio_signal, length)
+        else:
+            s_input, length = self.encoder(([audio_signal], length))
         if length is None:
             return s_input[-1]
 
         return s_input[-1], length
 
+    def _checkpointed_forward(self, audio_signal, length):
+        xs = [audio_signal]
+        with self.activation_checkpointing.forward(self, len(self.encoder)) as run_layer:
+            for i, block in enumerate(self.encoder):
+                # Only the block output is recomputed, not the earlier outputs a dense residual block passes on
+                out, length = run_layer(i, block, length, *xs, function=partial(_run_jasper_block, block))
+                xs = xs + [out] if block.res is not None and block.dense_residual else [out]
+        return xs, length
+
+
+def _run_jasper_block(block, length, *xs):
+    outputs, length = block((list(xs), length))
+    return outputs[-1], length
+
 
 class JasperDecoderForCTC(TrainableNM):
     """
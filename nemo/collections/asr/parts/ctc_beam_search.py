@@ -0,0 +1,467 @@
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""CTC prefix beam search with word n-gram language model fusion."""
+
+import importlib
+import math
+import multiprocessing
+import os
+from collections import OrderedDict, namedtuple
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = [
+    'ArpaLanguageModel',
+    'KenLMLanguageModel',
+    'CTCPrefixBeamSearch',
+    'Hypothesis',
+    'load_language_model',
+    'create_pool',
+    'decode_batch',
+    'rescore_nbest',
+]
+
+# Log probability of the words missing from the language model, as in Baidu's CTC decoders
+OOV_SCORE = -1000.0
+_LN_10 = math.log(10.0)
+# ARPA files larger than this are read with a warning, see ArpaLanguageModel
+_LARGE_ARPA_BYTES = 100 * 1024 * 1024
+
+
+def _cache_get(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value, max_size: int):
+    cache[key] = value
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+class ArpaLanguageModel(object):
+    """
+    Word n-gram language model read from a file in the ARPA format.
+
+    All n-grams are held in Python dictionaries, which takes many times the size of the file: this is meant for small
+    models. Use KenLMLanguageModel with a KenLM binary for large ones.
+
+    Args:
+        path: path to the ARPA file
+        cache_size: number of (context, word) scores kept, least recently used first out
+    """
+
+    def __init__(self, path: str, cache_size: int = 1000000):
+        self._log10_probs = {}
+        self._log10_backoffs = {}
+        order = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('\\data\\') or line.startswith('ngram '):
+                    continue
+                if line.startswith('\\end\\'):
+                    break
+                if line.endswith('-grams:'):
+                    order = int(line[1:].split('-')[0])
+                    continue
+                fields = line.split()
+                ngram = tuple(fields[1 : 1 + order])
+                self._log10_probs[ngram] = float(fields[0])
+                if len(fields) > 1 + order:
+                    self._log10_backoffs[ngram] = float(fields[1 + order])
+        self.order = order
+        # The state cache: scores of the words already scored in a context
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def _log10_prob(self, context: Tuple[str, ...], word: str) -> float:
+        # Backs off to shorter contexts until the n-gram is found, the unigram of word is always found
+        log10_prob = 0.0
+        while (*context, word) not in self._log10_probs:
+            log10_prob += self._log10_backoffs.get(context, 0.0)
+            context = context[1:]
+        return log10_prob + self._log10_probs[(*context, word)]
+
+    def score(self, context: Tuple[str, ...], word: str) -> float:
+        """
+        Natural log probability of word after the words of context.
+
+        Args:
+            context: previous words, starting with <s> at the beginning of the sentence, only the last order - 1 are
+                used
+            word: the word
+
+        Returns:
+            the log probability, OOV_SCORE for a word missing from the model
+        """
+        key = (context[len(context) - self.order + 1 :] if self.order > 1 else (), word)
+        score = _cache_get(self._cache, key)
+        if score is None:
+            if (word,) not in self._log10_probs:
+                score = OOV_SCORE
+            else:
+                score = self._log10_prob(*key) * _LN_10
+            _cache_put(self._cache, key, score, self._cache_size)
+        return score
+
+
+class KenLMLanguageModel(object):
+    """
+    Word n-gram language model in any format read by KenLM, e.g. its binary format, scored with the kenlm module.
+
+    Args:
+        path: path to the model
+        cache_size: number of (context, word) scores and of context states kept, least recently used first out
+    """
+
+    def __init__(self, path: str, cache_size: int = 1000000):
+        try:
+            self._kenlm = importlib.import_module('kenlm')
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(
+                f"Reading the language model {path} requires the kenlm module, or use a language model in the ARPA "
+                f"format."
+            )
+        self._model = self._kenlm.Model(path)
+        self.order = self._model.order
+        self._states = OrderedDict()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def _state(self, context: Tuple[str, ...]):
+        state = _cache_get(self._states, context)
+        if state is None:
+            state = self._kenlm.State()
+            if not context:
+                self._model.NullContextWrite(state)
+            elif context == ('<s>',):
+                self._model.BeginSentenceWrite(state)
+            else:
+                self._model.BaseScore(self._state(context[:-1]), context[-1], state)
+            _cache_put(self._states, context, state, self._cache_size)
+        return state
+
+    def score(self, context: Tuple[str, ...], word: str) -> float:
+        """See ArpaLanguageModel.score."""
+        key = (context[len(context) - self.order + 1 :] if self.order > 1 else (), word)
+        score = _cache_get(self._cache, key)
+        if score is None:
+            if word not in self._model:
+                score = OOV_SCORE
+            else:
+                score = self._model.BaseScore(self._state(key[0]), word, self._kenlm.State()) * _LN_10
+            _cache_put(self._cache, key, score, self._cache_size)
+        return score
+
+
+def load_language_model(path: str):
+    """Reads an ARPA file natively, other formats (e.g. KenLM binaries) with the kenlm module."""
+    with open(path, 'rb') as f:
+        header = f.read(64).lstrip()
+    if header.startswith(b'\\data\\'):
+        if os.path.getsize(path) > _LARGE_ARPA_BYTES:
+            logging.warning(
+                f"{path} is read into memory, in every decoding process. Convert large language models to KenLM "
+                f"binaries with KenLM's build_binary and install the kenlm module to read them."
+            )
+        return ArpaLanguageModel(path)
+    return KenLMLanguageModel(path)
+
+
+# A result of the beam search: score = acoustic_score + alpha * lm_score + beta * num_words, where acoustic_score is
+# the log probability of the CTC alignments of text and lm_score the natural log probability of its words
+Hypothesis = namedtuple('Hypothesis', ['score', 'acoustic_score', 'lm_score', 'num_words', 'text'])
+
+
+class CTCPrefixBeamSearch(object):
+    """
+    CTC prefix beam search over the characters of a vocabulary, fused with a word language model.
+
+    A hypothesis is scored by the log probability of all its CTC alignments, plus alpha times the log probability of
+    its words under the language model and beta per word. Words are separated by spaces, the language model scores a
+    word when the space after it or the end of the utterance is reached, like Baidu's CTC decoders. If the vocabulary
+    has no space, every character is a word, as for character based language models.
+
+    Args:
+        vocab: characters of the vocabulary, the CTC blank has the index len(vocab)
+        beam_width: number of prefixes kept after each frame
+        alpha: weight of the language model
+        beta: score added per word
+        language_model: object with an order attribute and a score(context, word) method returning natural log
+            probabilities, e.g. ArpaLanguageModel. Decodes without language model if None.
+        cutoff_prob: only the most probable characters of a frame with this cumulative probability are expanded
+        cutoff_top_n: at most this many characters of a frame are expanded
+    """
+
+    def __init__(
+        self,
+        vocab: Sequence[str],
+        beam_width: int,
+        alpha: float = 0.0,
+        beta: float = 0.0,
+        language_model=None,
+        cutoff_prob: float = 1.0,
+        cutoff_top_n: int = 40,
+    ):
+        self.vocab = list(vocab)
+        self.blank_id = len(self.vocab)
+        self.space_id = self.vocab.index(' ') if ' ' in self.vocab else None
+        self.beam_width = beam_width
+        self.alpha = alpha
+        self.beta = beta
+        self.language_model = language_model
+        self.cutoff_prob = cutoff_prob
+        self.cutoff_top_n = cutoff_top_n
+        self._context_size = language_model.order - 1 if language_model is not None else 0
+
+    def _pruned_labels(self, log_probs: np.ndarray) -> np.ndarray:
+        """Labels expanded in a frame, see cutoff_prob and cutoff_top_n."""
+        num_labels = min(self.cutoff_top_n, len(log_probs))
+        if self.cutoff_prob >= 1.0 and num_labels == len(log_probs):
+            return np.arange(len(log_probs))
+        labels = np.argsort(-log_probs, kind='stable')
+        if self.cutoff_prob < 1.0:
+            cumulative = np.cumsum(np.exp(log_probs[labels]))
+            num_labels = min(num_labels, int(np.searchsorted(cumulative, self.cutoff_prob)) + 1)
+        return labels[:num_labels]
+
+    def _push(self, context: Tuple[str, ...], word: str) -> Tuple[str, ...]:
+        """The context after word, keeping the words the language model conditions on."""
+        if self._context_size == 0:
+            return ()
+        return (*context, word)[-self._context_size :]
+
+    def _lm_score(self, context: Tuple[str, ...], word: str) -> float:
+        if self.language_model is None or not word:
+            return 0.0
+        return self.language_model.score(context, word)
+
+    def _word_score(self, context: Tuple[str, ...], word: str) -> float:
+        if self.language_model is None or not word:
+            return 0.0
+        return self.alpha * self.language_model.score(context, word) + self.beta
+
+    def decode(self, log_probs: np.ndarray) -> List[Tuple[float, str]]:
+        """
+        Decodes one utterance.
+
+        Args:
+            log_probs: log probabilities of the labels [T x len(vocab) + 1]
+
+        Returns:
+            up to beam_width (score, text) tuples, best first
+        """
+        return [(hypothesis.score, hypothesis.text) for hypothesis in self.decode_nbest(log_probs)]
+
+    def decode_nbest(self, log_probs: np.ndarray) -> List[Hypothesis]:
+        """
+        Decodes one utterance, keeping the acoustic and language model scores of the hypotheses apart, so that they
+        can be rescored with other weights, see rescore_nbest().
+
+        Args:
+            log_probs: log probabilities of the labels [T x len(vocab) + 1]
+
+        Returns:
+            up to beam_width hypotheses, best first
+        """
+        log_probs = np.asarray(log_probs, dtype=np.float64)
+        # The beams: prefixes (tuples of labels), log probs of their alignments ending in a blank and in a label, last
+        # labels (-1 for the empty prefix), the last words before the last word (starting with <s>) and characters of
+        # the last word, language model log probability and number of the words before the last word
+        prefixes = [()]
+        p_blank = np.zeros(1)
+        p_label = np.full(1, -np.inf)
+        last = np.full(1, -1)
+        words = [(self._push((), '<s>'), '')]
+        lm_scores = [(0.0, 0)]
+
+        for frame in log_probs:
+            labels = self._pruned_labels(frame)
+            has_blank = bool(np.any(labels == self.blank_id))
+            labels = labels[labels != self.blank_id]
+            column = np.full(self.blank_id, -1)
+            column[labels] = np.arange(len(labels))
+            p_total = np.logaddexp(p_blank, p_label)
+
+            # Alignments staying on the prefixes: a blank, or the last label repeated without a blank in between
+            stay_blank = p_total + frame[self.blank_id] if has_blank else np.full(len(prefixes), -np.inf)
+            repeated = (last >= 0) & (column[last] >= 0)
+            stay_label = np.where(repeated, p_label + frame[last], -np.inf)
+
+            # Alignments extending the prefixes by each label [prefixes x labels], a repeated label needs a blank
+            extensions = p_total[:, None] + frame[labels][None, :]
+            is_last = labels[None, :] == last[:, None]
+            extensions = np.where(is_last, p_blank[:, None] + frame[labels][None, :], extensions)
+            if self.language_model is not None:
+                if self.space_id is None:
+                    # Every character is a word
+                    for i, j in zip(*np.nonzero(extensions > -np.inf)):
+                        extensions[i, j] += self._word_score(words[i][0], self.vocab[labels[j]])
+                elif column[self.space_id] >= 0:
+                    extensions[:, column[self.space_id]] += [self._word_score(*w) for w in words]
+
+            # An extension that is already a prefix of the beams merges into it
+            index = {prefix: i for i, prefix in enumerate(prefixes)}
+            for j, prefix in enumerate(prefixes):
+                if prefix and column[prefix[-1]] >= 0:
+                    i = index.get(prefix[:-1])
+                    if i is not None:
+                        stay_label[j] = np.logaddexp(stay_label[j], extensions[i, column[prefix[-1]]])
+                        extensions[i, column[prefix[-1]]] = -np.inf
+
+            scores = np.concatenate([np.logaddexp(stay_blank, stay_label), extensions.ravel()])
+            candidates = np.flatnonzero(scores > -np.inf)
+            if len(candidates) > self.beam_width:
+                candidates = candidates[np.argpartition(-scores[candidates], self.beam_width - 1)[: self.beam_width]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+            num_prefixes = len(prefixes)
+            next_prefixes, next_words, next_lm_scores = [], [], []
+            next_p_blank = np.full(len(candidates), -np.inf)
+            next_p_label = np.empty(len(candidates))
+            next_last = np.empty(len(candidates), dtype=np.int64)
+            for k, candidate in enumerate(candidates):
+                if candidate < num_prefixes:
+                    next_prefixes.append(prefixes[candidate])
+                    next_words.append(words[candidate])
+                    next_lm_scores.append(lm_scores[candidate])
+                    next_p_blank[k] = stay_blank[candidate]
+                    next_p_label[k] = stay_label[candidate]
+                    next_last[k] = last[candidate]
+                    continue
+                i, j = divmod(int(candidate) - num_prefixes, len(labels))
+                label = int(labels[j])
+                context, word = words[i]
+                if self.space_id is None:
+                    word = self.vocab[label]
+                if self.space_id is None or label == self.space_id:
+                    lm_score, num_words = lm_scores[i]
+                    if self.language_model is not None and word:
+                        lm_score, num_words = lm_score + self._lm_score(context, word), num_words + 1
+                    next_words.append((self._push(context, word) if word else context, ''))
+                    next_lm_scores.append((lm_score, num_words))
+                else:
+                    next_words.append((context, word + self.vocab[label]))
+                    next_lm_scores.append(lm_scores[i])
+                next_prefixes.append(prefixes[i] + (label,))
+                next_p_label[k] = extensions[i, j]
+                next_last[k] = label
+            prefixes, p_blank, p_label, last = next_prefixes, next_p_blank, next_p_label, next_last
+            words, lm_scores = next_words, next_lm_scores
+
+        results = []
+        for prefix, p_total, (context, word), (lm_score, num_words) in zip(
+            prefixes, np.logaddexp(p_blank, p_label), words, lm_scores
+        ):
+            # The last word is scored at the end of the utterance
+            if self.language_model is not None and word:
+                lm_score, num_words = lm_score + self._lm_score(context, word), num_words + 1
+            score = float(p_total) + self._word_score(context, word)
+            acoustic_score = score - self.alpha * lm_score - self.beta * num_words
+            text = ''.join(self.vocab[label] for label in prefix)
+            results.append(Hypothesis(score, acoustic_score, lm_score, num_words, text))
+        results.sort(key=lambda result: -result.score)
+        return results
+
+
+# The search run by the processes of a pool, see CTCPrefixBeamSearch.decode_batch
+_worker_search = None
+
+
+def _init_worker(search):
+    global _worker_search
+    _worker_search = search
+
+
+def _decode_in_worker(log_probs):
+    return _worker_search.decode(log_probs)
+
+
+def _decode_nbest_in_worker(log_probs):
+    return _worker_search.decode_nbest(log_probs)
+
+
+def create_pool(search: CTCPrefixBeamSearch, num_processes: int):
+    """
+    Pool of processes decoding utterances with search, see decode_batch. The language model is copied once into each
+    process.
+    """
+    return multiprocessing.Pool(num_processes, initializer=_init_worker, initargs=(search,))
+
+
+def decode_batch(
+    search: CTCPrefixBeamSearch, log_probs: Sequence[np.ndarray], pool=None, nbest: bool = False
+) -> List[List[Tuple[float, str]]]:
+    """
+    Decodes utterances, in the processes of the pool if one is given.
+
+    Args:
+        search: the beam search, the one the pool was created with
+        log_probs: log probabilities of each utterance [T x len(vocab) + 1]
+        pool: pool created by create_pool()
+        nbest: returns the hypotheses of search.decode_nbest() instead
+
+    Returns:
+        the results of search.decode() for each utterance
+    """
+    if pool is None or len(log_probs) < 2:
+        decode = search.decode_nbest if nbest else search.decode
+        return [decode(utterance) for utterance in log_probs]
+    return pool.map(_decode_nbest_in_worker if nbest else _decode_in_worker, log_probs, chunksize=1)
+
+
+def rescore_nbest(
+    nbest: Sequence[Sequence[Hypothesis]], alphas: Sequence[float], betas: Sequence[float]
+) -> np.ndarray:
+    """
+    Picks the best hypothesis of each utterance for each pair of language model weights, without decoding again.
+
+    The hypotheses are the ones the beam search kept with its own weights, so the results can differ from a search
+    with the new weights when it would keep other prefixes; a wide beam makes it unlikely.
+
+    Args:
+        nbest: hypotheses of each utterance, see CTCPrefixBeamSearch.decode_nbest()
+        alphas: weights of the language model [G]
+        betas: scores added per word, paired with alphas [G]
+
+    Returns:
+        index in nbest[u] of the best hypothesis of each utterance u for each weight pair [G x len(nbest)], -1 for
+        utterances without hypotheses
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)
+    betas = np.asarray(betas, dtype=np.float64)
+    width = max((len(hypotheses) for hypotheses in nbest), default=0)
+    best = np.full((len(alphas), len(nbest)), -1, dtype=np.int64)
+    if width == 0:
+        return best
+    # Padding hypotheses never win
+    acoustic_scores = np.full((len(nbest), width), -np.inf)
+    lm_scores = np.zeros((len(nbest), width))
+    num_words = np.zeros((len(nbest), width))
+    for i, hypotheses in enumerate(nbest):
+        for j, hypothesis in enumerate(hypotheses):
+            acoustic_scores[i, j] = hypothesis.acoustic_score
+            lm_scores[i, j] = hypothesis.lm_score
+            num_words[i, j] = hypothesis.num_words
+    has_hypotheses = np.array([len(hypotheses) > 0 for hypotheses in nbest])
+    for g, (alpha, beta) in enumerate(zip(alphas, betas)):
+        scores = acoustic_scores + alpha * lm_scores + beta * num_words
+        best[g, has_hypotheses] = scores[has_hypotheses].argmax(axis=1)
+    return best
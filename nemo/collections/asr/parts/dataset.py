@@ -1,9 +1,14 @@
 # Audio dataset and corresponding functions taken from Patter
 # https://github.com/ryanleary/patter
 # TODO: review, and copyright and fix/add comments
+import json
+import mmap
 import os
+import struct
+from collections import OrderedDict
 
 import kaldi_io
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 
@@ -240,12 +245,125 @@ class AudioDataset(Dataset):
         return len(self.collection)
 
 
+# Types of the uncompressed binary matrices of Kaldi archives
+_KALDI_MATRIX_DTYPES = {b'FM ': np.dtype('<f4'), b'DM ': np.dtype('<f8')}
+# '\0B', the type, then the number of rows and columns, each an int32 preceded by its size
+_KALDI_MATRIX_HEADER = struct.Struct('<2s3sbibi')
+
+
+def index_kaldi_scp(scp_path):
+    """
+    Finds where the matrices of a Kaldi scp file are stored, without reading them.
+
+    Args:
+        scp_path: path to the scp file, e.g. feats.scp
+
+    Returns:
+        a dict mapping utterance ids to (ark path, offset of the values, rows, columns, dtype) for the uncompressed
+        binary matrices, or to the scp entry itself, read with kaldi_io, for the other ones (compressed or text
+        matrices, pipes)
+    """
+    entries = {}
+    with open(scp_path, 'r') as f:
+        for line in f:
+            utt_id, rxfile = line.strip().split(None, 1)
+            entries[utt_id] = rxfile
+
+    index = {}
+    arks = {}
+    try:
+        for utt_id, rxfile in entries.items():
+            index[utt_id] = rxfile
+            path, _, offset = rxfile.rpartition(':')
+            if rxfile.endswith('|') or not offset.isdigit():
+                continue
+            if path not in arks:
+                arks[path] = open(path, 'rb')
+            arks[path].seek(int(offset))
+            header = arks[path].read(_KALDI_MATRIX_HEADER.size)
+            if len(header) < _KALDI_MATRIX_HEADER.size:
+                continue
+            binary, matrix_type, _, rows, _, cols = _KALDI_MATRIX_HEADER.unpack(header)
+            if binary == b'\0B' and matrix_type in _KALDI_MATRIX_DTYPES:
+                dtype = _KALDI_MATRIX_DTYPES[matrix_type]
+                index[utt_id] = (path, int(offset) + _KALDI_MATRIX_HEADER.size, rows, cols, dtype)
+    finally:
+        for f in arks.values():
+            f.close()
+    return index
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def convert_kaldi_features_to_fp16(index, fp16_path):
+    """
+    Writes a float16 copy of the uncompressed binary matrices of a Kaldi scp index, so that they can be memory-mapped
+    and read with half of the I/O. The copy is reused as long as the indexed utterances and the arks it was made from
+    are unchanged.
+
+    Args:
+        index: dict returned by index_kaldi_scp()
+        fp16_path: path of the float16 matrices. Their locations are stored next to it, in fp16_path + '.json'
+
+    Returns:
+        index with the locations of the matrices in the float16 copy instead of the arks
+    """
+    matrices = {utt_id: location for utt_id, location in index.items() if not isinstance(location, str)}
+    sources = {path: _file_stamp(path) for path in sorted({location[0] for location in matrices.values()})}
+    index_path = fp16_path + '.json'
+    locations = None
+    if os.path.exists(fp16_path) and os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            header = json.load(f)
+        if header['sources'] == sources and header['matrices'].keys() == matrices.keys():
+            locations = header['matrices']
+
+    if locations is None:
+        logging.info(f"Writing the float16 copy of {len(matrices)} Kaldi feature matrices to {fp16_path}")
+        locations = {}
+        arks = {}
+        tmp_path = f'{fp16_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as out:
+                for utt_id, (path, offset, rows, cols, dtype) in matrices.items():
+                    if path not in arks:
+                        with open(path, 'rb') as f:
+                            arks[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    features = np.frombuffer(arks[path], dtype=dtype, count=rows * cols, offset=offset)
+                    locations[utt_id] = [out.tell(), rows, cols]
+                    out.write(features.astype(np.float16).tobytes())
+                    del features
+            # Written under temporary names and renamed, so that concurrent processes never read a partial copy
+            with open(tmp_path + '.json', 'w') as f:
+                json.dump({'sources': sources, 'matrices': locations}, f)
+            os.replace(tmp_path, fp16_path)
+            os.replace(tmp_path + '.json', index_path)
+        finally:
+            for ark in arks.values():
+                ark.close()
+            for path in (tmp_path, tmp_path + '.json'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    fp16_index = dict(index)
+    for utt_id, (offset, rows, cols) in locations.items():
+        fp16_index[utt_id] = (fp16_path, offset, rows, cols, np.dtype(np.float16))
+    return fp16_index
+
+
 class KaldiFeatureDataset(Dataset):
     """
     Dataset that provides basic Kaldi-compatible dataset loading. Assumes that
     the files `feats.scp`, `text`, and (optionally) `utt2dur` exist, as well
     as the .ark files that `feats.scp` points to.
 
+    Only the location of every feature matrix is read when the dataset is
+    created. The matrices are read when the samples are requested, through
+    memory maps of the .ark files opened by every process.
+
     Args:
         kaldi_dir: Path to directory containing the aforementioned files.
         labels: All possible characters to map to.
@@ -258,6 +376,12 @@ class KaldiFeatureDataset(Dataset):
         blank_index: blank character index, default = -1
         normalize: whether to normalize transcript text. Defaults to True.
         eos_id: Id of end of sequence symbol to append if not None.
+        cache_size: number of feature matrices kept in memory by every
+            process, the least recently used ones are dropped. Defaults to 0.
+        fp16_features: returns the features as float16, e.g. for mixed
+            precision training. The matrices are then read from a float16
+            copy of the arks, feats_fp16.bin in kaldi_dir, written once,
+            which halves their I/O, memory and transfers. Defaults to False.
     """
 
     def __init__(
@@ -271,19 +395,28 @@ class KaldiFeatureDataset(Dataset):
         blank_index=-1,
         normalize=True,
         eos_id=None,
+        cache_size=0,
+        fp16_features=False,
     ):
         self.eos_id = eos_id
         self.unk_index = unk_index
         self.blank_index = blank_index
         self.labels_map = {label: i for i, label in enumerate(labels)}
+        self.cache_size = cache_size
+        self.fp16_features = fp16_features
+        # Opened by every process on first use
+        self._arks = {}
+        self._cache = OrderedDict()
 
         data = []
         duration = 0.0
         filtered_duration = 0.0
 
-        # Read Kaldi features (MFCC, PLP) using feats.scp
+        # Locate Kaldi features (MFCC, PLP) using feats.scp
         feats_path = os.path.join(kaldi_dir, 'feats.scp')
-        id2feats = {utt_id: torch.from_numpy(feats) for utt_id, feats in kaldi_io.read_mat_scp(feats_path)}
+        id2feats = index_kaldi_scp(feats_path)
+        if fp16_features:
+            id2feats = convert_kaldi_features_to_fp16(id2feats, os.path.join(kaldi_dir, 'feats_fp16.bin'))
 
         # Get durations, if utt2dur exists
         utt2dur_path = os.path.join(kaldi_dir, 'utt2dur')
@@ -334,12 +467,13 @@ class KaldiFeatureDataset(Dataset):
                         'utt_id': utt_id,
                         'text': text,
                         'tokens': parser(text),
-                        'audio': audio_features.t(),
+                        'audio': audio_features,
                         'duration': dur,
                     }
 
                     data.append(sample)
-                    duration += dur
+                    if dur is not None:
+                        duration += dur
 
                     if max_utts > 0 and len(data) >= max_utts:
                         logging.warning(f"Stop parsing due to max_utts ({max_utts})")
@@ -354,14 +488,48 @@ class KaldiFeatureDataset(Dataset):
 
         self.data = data
 
+    def __getstate__(self):
+        # Memory maps are not shared with the DataLoader workers, they open their own
+        state = self.__dict__.copy()
+        state['_arks'] = {}
+        state['_cache'] = OrderedDict()
+        return state
+
+    def _read_features(self, location):
+        """Reads a feature matrix located by index_kaldi_scp() or convert_kaldi_features_to_fp16()."""
+        if isinstance(location, str):
+            features = kaldi_io.read_mat(location)
+        else:
+            path, offset, rows, cols, dtype = location
+            if path not in self._arks:
+                with open(path, 'rb') as f:
+                    self._arks[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            features = np.frombuffer(self._arks[path], dtype=dtype, count=rows * cols, offset=offset)
+            features = features.reshape(rows, cols)
+        # Copied out of the map. Matrices of the float16 copy of the arks need no conversion then.
+        return features.astype(np.float16 if self.fp16_features else np.float32)
+
+    def features(self, index):
+        """Features of a sample [D x T]."""
+        features = self._cache.get(index)
+        if features is not None:
+            self._cache.move_to_end(index)
+            return features
+        features = torch.from_numpy(self._read_features(self.data[index]['audio'])).t()
+        if self.cache_size > 0:
+            self._cache[index] = features
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return features
+
     def __getitem__(self, index):
         sample = self.data[index]
-        f = sample['audio']
+        f = self.features(index)
         fl = torch.tensor(f.shape[1]).long()
         t, tl = sample['tokens'], len(sample['tokens'])
 
         if self.eos_id is not None:
-            t.append(self.eos_id)
+            t = t + [self.eos_id]
             tl += 1
 
         return f, fl, torch.tensor(t).long(), torch.tensor(tl).long()
@@ -15,24 +15,20 @@ CONSTANT = 1e-5
 
 
 def normalize_batch(x, seq_len, normalize_type):
-    if normalize_type == "per_feature":
-        x_mean = torch.zeros((seq_len.shape[0], x.shape[1]), dtype=x.dtype, device=x.device)
-        x_std = torch.zeros((seq_len.shape[0], x.shape[1]), dtype=x.dtype, device=x.device)
-        for i in range(x.shape[0]):
-            x_mean[i, :] = x[i, :, : seq_len[i]].mean(dim=1)
-            x_std[i, :] = x[i, :, : seq_len[i]].std(dim=1)
+    if normalize_type == "per_feature" or normalize_type == "all_features":
+        # Statistics are computed over the valid frames of every utterance at once with a length mask, which avoids a
+        # per-utterance Python loop and keeps the op traceable for export.
+        mask = torch.arange(x.size(-1), device=x.device).unsqueeze(0) < seq_len.unsqueeze(1)
+        mask = mask.unsqueeze(1).to(dtype=x.dtype)
+        reduce_dims = (2,) if normalize_type == "per_feature" else (1, 2)
+        num_values = mask.sum(dim=reduce_dims, keepdim=True)
+        if normalize_type == "all_features":
+            num_values = num_values * x.size(1)
+        x_mean = (x * mask).sum(dim=reduce_dims, keepdim=True) / num_values
+        x_var = ((x - x_mean) * mask).pow(2).sum(dim=reduce_dims, keepdim=True) / (num_values - 1)
         # make sure x_std is not zero
-        x_std += CONSTANT
-        return (x - x_mean.unsqueeze(2)) / x_std.unsqueeze(2)
-    elif normalize_type == "all_features":
-        x_mean = torch.zeros(seq_len.shape, dtype=x.dtype, device=x.device)
-        x_std = torch.zeros(seq_len.shape, dtype=x.dtype, device=x.device)
-        for i in range(x.shape[0]):
-            x_mean[i] = x[i, :, : seq_len[i].item()].mean()
-            x_std[i] = x[i, :, : seq_len[i].item()].std()
-        # make sure x_std is not zero
-        x_std += CONSTANT
-        return (x - x_mean.view(-1, 1, 1)) / x_std.view(-1, 1, 1)
+        x_std = x_var.sqrt() + CONSTANT
+        return (x - x_mean) / x_std
     elif "fixed_mean" in normalize_type and "fixed_std" in normalize_type:
         x_mean = torch.tensor(normalize_type["fixed_mean"], device=x.device)
         x_std = torch.tensor(normalize_type["fixed_std"], device=x.device)
@@ -230,6 +226,47 @@ class FilterbankFeatures(nn.Module):
                 )
         self.log_zero_guard_type = log_zero_guard_type
 
+        # Set by prepare_for_export(). When present, the STFT is computed as a convolution with this fixed DFT basis.
+        self.dft_basis = None
+        self._dither_before_export = None
+
+    def prepare_for_export(self):
+        """Switches the featurizer to a traceable formulation so that it can be exported (e.g. to ONNX) as part of a
+        larger graph: the STFT is computed as a strided convolution with a fixed DFT basis instead of torch.stft, and
+        dithering is disabled so that the exported graph is deterministic.
+        """
+        if self.stft_conv:
+            raise ValueError(f"{self} cannot be exported when stft_conv=True.")
+        window = self.window if self.window is not None else torch.ones(self.win_length, device=self.fb.device)
+        # torch.stft centers a window that is shorter than n_fft
+        left_pad = (self.n_fft - self.win_length) // 2
+        window = nn.functional.pad(window.to(dtype=torch.float), (left_pad, self.n_fft - self.win_length - left_pad))
+
+        num_freqs = self.n_fft // 2 + 1
+        n = torch.arange(self.n_fft, dtype=torch.float, device=window.device)
+        k = torch.arange(num_freqs, dtype=torch.float, device=window.device)
+        angle = 2 * math.pi * k.unsqueeze(1) * n.unsqueeze(0) / self.n_fft
+        basis = torch.cat((torch.cos(angle), -torch.sin(angle)), dim=0) * window
+        self.dft_basis = basis.unsqueeze(1)
+        if self._dither_before_export is None:
+            self._dither_before_export = self.dither
+        self.dither = 0
+
+    def restore_after_export(self):
+        """Undoes prepare_for_export(): torch.stft and the original dithering are used again."""
+        self.dft_basis = None
+        if self._dither_before_export is not None:
+            self.dither = self._dither_before_export
+            self._dither_before_export = None
+
+    def _conv_stft(self, x):
+        # Same result and (batch, freq, time, 2) layout as torch.stft(x, center=True, pad_mode='reflect')
+        pad = self.n_fft // 2
+        x = nn.functional.pad(x.unsqueeze(1), (pad, pad), mode="reflect")
+        x = nn.functional.conv1d(x, self.dft_basis.to(x.dtype), stride=self.hop_length)
+        real, imag = torch.split(x, self.n_fft // 2 + 1, dim=1)
+        return torch.stack((real, imag), dim=-1)
+
     def get_seq_len(self, seq_len):
         return torch.ceil(seq_len / self.hop_length).to(dtype=torch.long)
 
@@ -249,7 +286,10 @@ class FilterbankFeatures(nn.Module):
         if self.preemph is not None:
             x = torch.cat((x[:, 0].unsqueeze(1), x[:, 1:] - self.preemph * x[:, :-1]), dim=1,)
 
-        x = self.stft(x)
+        if self.dft_basis is not None:
+            x = self._conv_stft(x)
+        else:
+            x = self.stft(x)
 
         # get power spectrum
         if self.mag_power != 1.0:
@@ -290,7 +330,7 @@ class FilterbankFeatures(nn.Module):
         if pad_to == "max":
             x = nn.functional.pad(x, (0, self.max_length - x.size(-1)), value=self.pad_value)
         elif pad_to > 0:
-            pad_amt = x.size(-1) % pad_to
-            if pad_amt != 0:
-                x = nn.functional.pad(x, (0, pad_to - pad_amt), value=self.pad_value)
+            # No data-dependent branch here, so that traced graphs stay valid for every input length
+            pad_amt = (pad_to - x.size(-1) % pad_to) % pad_to
+            x = nn.functional.pad(x, (0, pad_amt), value=self.pad_value)
         return x
@@ -0,0 +1,164 @@
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+"""Batched scoring of speaker verification trials and speaker identification with speaker embeddings."""
+
+from typing import Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+__all__ = [
+    'speaker_centroids',
+    'score_trials',
+    'equal_error_rate',
+    'min_detection_cost',
+    'identify_speakers',
+]
+
+
+def speaker_centroids(
+    embeddings: torch.Tensor, speaker_ids: torch.Tensor, num_speakers: Optional[int] = None, normalize: bool = True
+) -> torch.Tensor:
+    """
+    Averages the embeddings of the utterances of each speaker.
+
+    Args:
+        embeddings: utterance embeddings [N x D]
+        speaker_ids: speaker index of each utterance in [0, num_speakers) [N]
+        num_speakers: number of speakers, defaults to the largest speaker index + 1
+        normalize: L2 normalizes the centroids, so that their dot products are cosine similarities
+
+    Returns:
+        centroids [num_speakers x D], zero for speakers without utterances
+    """
+    embeddings = torch.as_tensor(embeddings)
+    speaker_ids = torch.as_tensor(speaker_ids, device=embeddings.device).long()
+    if num_speakers is None:
+        num_speakers = int(speaker_ids.max()) + 1 if len(speaker_ids) > 0 else 0
+    sums = embeddings.new_zeros(num_speakers, embeddings.size(1)).index_add_(0, speaker_ids, embeddings)
+    if normalize:
+        return F.normalize(sums, dim=1)
+    counts = torch.bincount(speaker_ids, minlength=num_speakers).clamp_(min=1)
+    return sums / counts.unsqueeze(1).to(sums.dtype)
+
+
+def score_trials(centroids: torch.Tensor, enroll_ids: torch.Tensor, test_ids: torch.Tensor) -> torch.Tensor:
+    """
+    Scores verification trials by the dot products of the centroids of their speakers, i.e. by their cosine
+    similarities for normalized centroids.
+
+    Args:
+        centroids: speaker centroids [S x D], see speaker_centroids()
+        enroll_ids: index of the enrollment speaker of each trial [T]
+        test_ids: index of the test speaker of each trial [T]
+
+    Returns:
+        scores of the trials [T]
+    """
+    centroids = torch.as_tensor(centroids)
+    enroll_ids = torch.as_tensor(enroll_ids, device=centroids.device).long()
+    test_ids = torch.as_tensor(test_ids, device=centroids.device).long()
+    return (centroids[enroll_ids] * centroids[test_ids]).sum(dim=1)
+
+
+def _roc(scores: torch.Tensor, labels: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    False positive and true positive rates when accepting the trials scored at least each distinct score, from the
+    highest score down, preceded by the point accepting no trial, as computed by sklearn.metrics.roc_curve.
+    Raises a ValueError unless there are both target and nontarget trials, which the rates are relative to.
+    """
+    scores = torch.as_tensor(scores).double().flatten()
+    labels = torch.as_tensor(labels, device=scores.device).flatten().double()
+    num_targets = int(labels.sum())
+    if num_targets == 0 or num_targets == len(labels):
+        raise ValueError(
+            f"Scoring needs both target and nontarget trials, got {num_targets} target and "
+            f"{len(labels) - num_targets} nontarget trials."
+        )
+    scores, order = torch.sort(scores, descending=True)
+    labels = labels[order]
+    true_positives = labels.cumsum(0)
+    false_positives = (1 - labels).cumsum(0)
+    # Tied scores are accepted together
+    last = torch.ones_like(scores, dtype=torch.bool)
+    last[:-1] = scores[1:] != scores[:-1]
+    zero = scores.new_zeros(1)
+    fpr = torch.cat((zero, false_positives[last] / false_positives[-1]))
+    tpr = torch.cat((zero, true_positives[last] / true_positives[-1]))
+    thresholds = torch.cat((scores.new_full((1,), float('inf')), scores[last]))
+    return fpr, tpr, thresholds
+
+
+def equal_error_rate(scores: torch.Tensor, labels: torch.Tensor) -> Tuple[float, float]:
+    """
+    Computes the equal error rate of verification trials, where the false acceptance rate equals the false rejection
+    rate on the linearly interpolated ROC curve.
+
+    Args:
+        scores: scores of the trials [T]
+        labels: 1 for target trials, 0 for nontarget trials [T]
+
+    Returns:
+        equal error rate and the highest score threshold with a false rejection rate not above the false
+        acceptance rate
+    """
+    fpr, tpr, thresholds = _roc(scores, labels)
+    # fnr - fpr decreases along the curve, from 1 at its start to -1 at its end
+    gap = (1 - tpr) - fpr
+    i = int(torch.nonzero(gap <= 0, as_tuple=False)[0]) - 1
+    fraction = gap[i] / (gap[i] - gap[i + 1])
+    eer = fpr[i] + fraction * (fpr[i + 1] - fpr[i])
+    return float(eer), float(thresholds[i + 1])
+
+
+def min_detection_cost(
+    scores: torch.Tensor, labels: torch.Tensor, p_target: float = 0.01, c_miss: float = 1.0, c_fa: float = 1.0
+) -> Tuple[float, float]:
+    """
+    Computes the minimum of the normalized detection cost function of verification trials over the score thresholds.
+
+    Args:
+        scores: scores of the trials [T]
+        labels: 1 for target trials, 0 for nontarget trials [T]
+        p_target: prior probability of target trials
+        c_miss: cost of a false rejection
+        c_fa: cost of a false acceptance
+
+    Returns:
+        minimum normalized detection cost and the score threshold it is reached at
+    """
+    fpr, tpr, thresholds = _roc(scores, labels)
+    costs = c_miss * p_target * (1 - tpr) + c_fa * (1 - p_target) * fpr
+    i = int(torch.argmin(costs))
+    return float(costs[i] / min(c_miss * p_target, c_fa * (1 - p_target))), float(thresholds[i])
+
+
+def identify_speakers(
+    embeddings: torch.Tensor, enrollment: torch.Tensor, top_k: int = 1
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Finds the enrolled speakers most similar to each test embedding by cosine similarity.
+
+    Args:
+        embeddings: test embeddings [N x D]
+        enrollment: enrollment embeddings of the speakers [S x D], e.g. their centroids
+        top_k: number of speakers returned per test embedding
+
+    Returns:
+        cosine similarities [N x top_k] and indices [N x top_k] of the top_k speakers, most similar first
+    """
+    embeddings = F.normalize(torch.as_tensor(embeddings), dim=1)
+    enrollment = F.normalize(torch.as_tensor(enrollment, device=embeddings.device).to(embeddings.dtype), dim=1)
+    return torch.topk(embeddings @ enrollment.t(), k=min(top_k, enrollment.size(0)), dim=1)
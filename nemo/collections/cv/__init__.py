@@ -14,7 +14,18 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.cv.modules import *
+from nemo.utils.lazy_import import lazy_import
+
+# The modules (and torchvision with them) are imported when first accessed.
+__getattr__, __dir__ = lazy_import(
+    __name__,
+    submodules={
+        'data_layers': 'nemo.collections.cv.modules.data_layers',
+        'losses': 'nemo.collections.cv.modules.losses',
+        'non_trainables': 'nemo.collections.cv.modules.non_trainables',
+        'trainables': 'nemo.collections.cv.modules.trainables',
+    },
+)
 
 # __version__ = "0.1"
 # __name__ = "nemo.collections.cv"
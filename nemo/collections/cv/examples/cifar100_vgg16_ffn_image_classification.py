@@ -34,7 +34,7 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.CPU)
 
     # Data layer - upscale the CIFAR100 images to ImageNet resolution.
-    cifar100_dl = CIFAR100DataLayer(height=224, width=224, train=True)
+    cifar100_dl = CIFAR100DataLayer(height=224, width=224, train=True, in_memory=True)
     # The "model".
     image_encoder = ImageEncoder(model_type="vgg16", return_feature_maps=True, pretrained=True, name="vgg16")
     reshaper = ReshapeTensor(input_sizes=[-1, 7, 7, 512], output_sizes=[-1, 25088])
@@ -34,7 +34,7 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.CPU)
 
     # Data layer for training.
-    cifar10_dl = CIFAR10DataLayer(train=True)
+    cifar10_dl = CIFAR10DataLayer(train=True, in_memory=True)
     # The "model".
     cnn = ConvNetEncoder(input_depth=3, input_height=32, input_width=32)
     reshaper = ReshapeTensor(input_sizes=[-1, 16, 2, 2], output_sizes=[-1, 64])
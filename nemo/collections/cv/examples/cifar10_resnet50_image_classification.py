@@ -34,7 +34,7 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.CPU)
 
     # Data layer - upscale the CIFAR10 images to ImageNet resolution.
-    cifar10_dl = CIFAR10DataLayer(height=224, width=224, train=True)
+    cifar10_dl = CIFAR10DataLayer(height=224, width=224, train=True, in_memory=True)
     # The "model".
     image_classifier = ImageEncoder(model_type="resnet50", output_size=10, pretrained=True, name="resnet50")
     nl = NonLinearity(type="logsoftmax", sizes=[-1, 10])
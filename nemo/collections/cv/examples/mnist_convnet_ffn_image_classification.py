@@ -34,7 +34,7 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.CPU)
 
     # Data layers for training and validation.
-    dl = MNISTDataLayer(height=28, width=28, train=True)
+    dl = MNISTDataLayer(height=28, width=28, train=True, in_memory=True)
     # The "model".
     cnn = ConvNetEncoder(input_depth=1, input_height=28, input_width=28)
     reshaper = ReshapeTensor(input_sizes=[-1, 16, 1, 1], output_sizes=[-1, 16])
@@ -34,7 +34,7 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.CPU)
 
     # Data layers for training and validation.
-    dl = MNISTDataLayer(height=28, width=28, train=True)
+    dl = MNISTDataLayer(height=28, width=28, train=True, in_memory=True)
     # The "model".
     reshaper = ReshapeTensor(input_sizes=[-1, 1, 32, 32], output_sizes=[-1, 784])
     ffn = FeedForwardNetwork(input_size=784, output_size=10, hidden_sizes=[100, 100], dropout_rate=0.1)
@@ -42,8 +42,8 @@ if __name__ == "__main__":
     nf = NeuralModuleFactory(local_rank=args.local_rank, placement=DeviceType.GPU)
 
     # Data layers for training and validation.
-    dl = MNISTDataLayer(height=32, width=32, train=True)
-    dl_e = MNISTDataLayer(height=32, width=32, train=False)
+    dl = MNISTDataLayer(height=32, width=32, train=True, in_memory=True)
+    dl_e = MNISTDataLayer(height=32, width=32, train=False, in_memory=True)
     # The "model".
     lenet5 = LeNet5()
     # Loss.
@@ -16,4 +16,5 @@
 
 from nemo.collections.cv.modules.data_layers.cifar10_datalayer import *
 from nemo.collections.cv.modules.data_layers.cifar100_datalayer import *
+from nemo.collections.cv.modules.data_layers.in_memory_image_iterator import *
 from nemo.collections.cv.modules.data_layers.mnist_datalayer import *
@@ -18,11 +18,13 @@
 from os.path import expanduser
 from typing import Optional
 
+import torch
 from torch.utils.data import Dataset
 from torchvision.datasets import CIFAR10
-from torchvision.transforms import Compose, Resize, ToTensor
+from torchvision.transforms import Compose, RandomCrop, RandomHorizontalFlip, Resize, ToTensor
 
 from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.collections.cv.modules.data_layers.in_memory_image_iterator import InMemoryImageIterator
 from nemo.core.neural_types import AxisKind, AxisType, ClassificationTarget, ImageValue, Index, NeuralType
 from nemo.utils.decorators import add_port_docs
 
@@ -33,6 +35,9 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
     """
     A "thin DataLayer" -  wrapper around the torchvision's CIFAR10 dataset.
 
+    In the in_memory mode the whole dataset is kept as a single uint8 tensor and the batches are sliced from it,
+    augmented and resized on the device, instead of being loaded image by image by a DataLoader.
+
     Reference page: http://www.cs.toronto.edu/~kriz/cifar.html
     """
 
@@ -45,6 +50,10 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
         name: Optional[str] = None,
         batch_size: int = 64,
         shuffle: bool = True,
+        in_memory: bool = False,
+        keep_on_device: bool = True,
+        random_flip: bool = False,
+        random_crop_padding: int = 0,
     ):
         """
         Initializes the CIFAR10 datalayer.
@@ -57,6 +66,12 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
             name: Name of the module (DEFAULT: None)
             batch_size: size of batch (DEFAULT: 64) [PARAMETER OF DATALOADER]
             shuffle: shuffle data (DEFAULT: True) [PARAMETER OF DATALOADER]
+            in_memory: keep the dataset in memory as a uint8 tensor and preprocess whole batches (DEFAULT: False)
+            keep_on_device: in the in_memory mode, keep the dataset on the device of the module instead of in
+                pinned host memory (DEFAULT: True)
+            random_flip: augment the data by flipping the images horizontally with probability 0.5 (DEFAULT: False)
+            random_crop_padding: augment the data by cropping the images at a random position after padding their
+                borders with this many zero pixels, 0 disables the cropping (DEFAULT: 0)
         """
         # Call the base class constructor of DataLayer.
         DataLayerNM.__init__(self, name=name)
@@ -65,8 +80,13 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
         self._height = height
         self._width = width
 
-        # Create transformations: up-scale and transform to tensors.
-        mnist_transforms = Compose([Resize((self._height, self._width)), ToTensor()])
+        # Create transformations: augment, up-scale and transform to tensors.
+        augmentations = []
+        if random_crop_padding > 0:
+            augmentations.append(RandomCrop(32, padding=random_crop_padding))
+        if random_flip:
+            augmentations.append(RandomHorizontalFlip())
+        mnist_transforms = Compose(augmentations + [Resize((self._height, self._width)), ToTensor()])
 
         # Get absolute path.
         abs_data_folder = expanduser(data_folder)
@@ -78,6 +98,23 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
         self._batch_size = batch_size
         self._shuffle = shuffle
 
+        # Keep the decoded images: [N x 32 x 32 x 3] -> [N x 3 x 32 x 32].
+        self._iterator = None
+        if in_memory:
+            self._targets = torch.as_tensor(self._dataset.targets, dtype=torch.long)
+            self._iterator = InMemoryImageIterator(
+                images=torch.from_numpy(self._dataset.data).permute(0, 3, 1, 2).contiguous(),
+                batch_collate=self._collate_batch,
+                batch_size=batch_size,
+                shuffle=shuffle,
+                height=height,
+                width=width,
+                device=self._device,
+                keep_on_device=keep_on_device,
+                random_flip=random_flip,
+                random_crop_padding=random_crop_padding,
+            )
+
     @property
     @add_port_docs()
     def output_ports(self):
@@ -119,10 +156,30 @@ class CIFAR10DataLayer(DataLayerNM, Dataset):
         # Return sample.
         return index, img, target
 
+    def _collate_batch(self, indices: torch.Tensor, images: torch.Tensor):
+        """
+        Returns a batch of the in_memory mode, as collated by a DataLoader from the samples of __getitem__.
+
+        Args:
+            indices: indices of the samples
+            images: preprocessed images of the samples
+        """
+        return indices, images, self._targets[indices]
+
     @property
     def dataset(self):
         """
         Returns:
-            Self - just to be "compatible" with the current NeMo train action.
+            Self - just to be "compatible" with the current NeMo train action, None in the in_memory mode.
         """
+        if self._iterator is not None:
+            return None
         return self  # ! Important - as we want to use this __getitem__ method!
+
+    @property
+    def data_iterator(self):
+        """
+        Returns:
+            Iterator over the batches in the in_memory mode, None otherwise.
+        """
+        return self._iterator
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import inspect
+from typing import Callable, Optional
+
+import torch
+import torch.nn.functional as F
+from torch.utils.data.distributed import DistributedSampler
+
+__all__ = ['InMemoryImageIterator']
+
+# F.interpolate can low-pass filter downscaled images since torch 1.11
+_INTERPOLATE_HAS_ANTIALIAS = 'antialias' in inspect.signature(F.interpolate).parameters
+
+
+class InMemoryImageIterator(object):
+    """
+    Iterates over batches of a whole image dataset kept in memory as a single uint8 tensor.
+
+    Batches are sliced from the tensor by index and converted, resized and augmented batched on the target device,
+    instead of converting the samples to PIL images one at a time. The images are returned as floats in <0-1>,
+    as done by torchvision's Resize and ToTensor transforms.
+    """
+
+    def __init__(
+        self,
+        images: torch.Tensor,
+        batch_collate: Callable,
+        batch_size: int,
+        shuffle: bool,
+        height: int,
+        width: int,
+        device: Optional[torch.device] = None,
+        keep_on_device: bool = True,
+        random_flip: bool = False,
+        random_crop_padding: int = 0,
+    ):
+        """
+        Initializes the iterator.
+
+        Args:
+            images: uint8 tensor with all images of the dataset [N x C x H x W], can be pinned or on the device
+            batch_collate: function returning the batch given the indices (LongTensor on the CPU) and the images
+            batch_size: size of batch
+            shuffle: shuffle data
+            height: height of the returned images
+            width: width of the returned images
+            device: device the images are returned on (DEFAULT: device of images)
+            keep_on_device: move the whole dataset to the device once, otherwise it is kept in (pinned, if the
+                device is a GPU) host memory and copied batch by batch (DEFAULT: True)
+            random_flip: flip the images horizontally with probability 0.5 (DEFAULT: False)
+            random_crop_padding: crop the images at a random position after padding their borders with this many
+                zero pixels, 0 disables the cropping (DEFAULT: 0)
+        """
+        if keep_on_device and device is not None:
+            images = images.to(device)
+        elif device is not None and torch.device(device).type == 'cuda' and not images.is_cuda:
+            images = images.pin_memory()
+        self._images = images
+        self._batch_collate = batch_collate
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._height = height
+        self._width = width
+        self._device = device if device is not None else images.device
+        self._random_flip = random_flip
+        self._random_crop_padding = random_crop_padding
+
+        # Shards the data between the workers, set_epoch() is called by the train action.
+        self.sampler = None
+        if torch.distributed.is_initialized():
+            self.sampler = DistributedSampler(dataset=range(len(images)), shuffle=shuffle)
+
+    def __len__(self):
+        """
+        Returns:
+            Number of batches.
+        """
+        num_samples = len(self.sampler) if self.sampler is not None else len(self._images)
+        return (num_samples + self._batch_size - 1) // self._batch_size
+
+    def __iter__(self):
+        if self.sampler is not None:
+            indices = torch.tensor(list(self.sampler), dtype=torch.long)
+        elif self._shuffle:
+            indices = torch.randperm(len(self._images))
+        else:
+            indices = torch.arange(len(self._images))
+
+        for batch_indices in indices.split(self._batch_size):
+            images = self._images.index_select(0, batch_indices.to(self._images.device))
+            images = self.transform(images.to(self._device, non_blocking=True))
+            yield self._batch_collate(batch_indices, images)
+
+    def transform(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        Converts a batch of uint8 images to floats in <0-1>, augments them and resizes them.
+
+        Args:
+            images: uint8 tensor [B x C x H x W]
+
+        Returns:
+            Float tensor [B x C x height x width]
+        """
+        images = images.float().div_(255)
+
+        if self._random_crop_padding > 0:
+            padding = self._random_crop_padding
+            batch_size, _, height, width = images.shape
+            padded = F.pad(images, [padding] * 4)
+            top = torch.randint(2 * padding + 1, (batch_size, 1), device=images.device)
+            left = torch.randint(2 * padding + 1, (batch_size, 1), device=images.device)
+            rows = (top + torch.arange(height, device=images.device)).view(batch_size, 1, height, 1)
+            cols = (left + torch.arange(width, device=images.device)).view(batch_size, 1, 1, width)
+            images = padded.gather(2, rows.expand(-1, padded.size(1), -1, padded.size(3)))
+            images = images.gather(3, cols.expand(-1, images.size(1), height, -1))
+
+        if self._random_flip:
+            flip = torch.rand(images.size(0), device=images.device) < 0.5
+            images = torch.where(flip.view(-1, 1, 1, 1), images.flip(3), images)
+
+        if images.shape[2:] != (self._height, self._width):
+            # Like PIL, low-pass filters the images when they are downscaled.
+            kwargs = {}
+            if images.size(2) > self._height or images.size(3) > self._width:
+                if _INTERPOLATE_HAS_ANTIALIAS:
+                    kwargs['antialias'] = True
+                else:
+                    # Before torch 1.11, approximated by averaging blocks of pixels first
+                    kernel = (max(images.size(2) // self._height, 1), max(images.size(3) // self._width, 1))
+                    images = F.avg_pool2d(images, kernel)
+            images = F.interpolate(
+                images, size=(self._height, self._width), mode='bilinear', align_corners=False, **kwargs
+            )
+            images = images.clamp_(0, 1)
+
+        return images
@@ -18,11 +18,13 @@
 from os.path import expanduser
 from typing import Optional
 
+import torch
 from torch.utils.data import Dataset
 from torchvision.datasets import MNIST
 from torchvision.transforms import Compose, Resize, ToTensor
 
 from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.collections.cv.modules.data_layers.in_memory_image_iterator import InMemoryImageIterator
 from nemo.core.neural_types import (
     AxisKind,
     AxisType,
@@ -40,6 +42,9 @@ __all__ = ['MNISTDataLayer']
 class MNISTDataLayer(DataLayerNM, Dataset):
     """
     A "thin DataLayer" -  wrapper around the torchvision's MNIST dataset.
+
+    In the in_memory mode the whole dataset is kept as a single uint8 tensor and the batches are sliced from it and
+    resized on the device, instead of being loaded image by image by a DataLoader.
     """
 
     def __init__(
@@ -51,6 +56,8 @@ class MNISTDataLayer(DataLayerNM, Dataset):
         name: Optional[str] = None,
         batch_size: int = 64,
         shuffle: bool = True,
+        in_memory: bool = False,
+        keep_on_device: bool = True,
     ):
         """
         Initializes the MNIST datalayer.
@@ -63,6 +70,9 @@ class MNISTDataLayer(DataLayerNM, Dataset):
             name: Name of the module (DEFAULT: None)
             batch_size: size of batch (DEFAULT: 64) [PARAMETER OF DATALOADER]
             shuffle: shuffle data (DEFAULT: True) [PARAMETER OF DATALOADER]
+            in_memory: keep the dataset in memory as a uint8 tensor and preprocess whole batches (DEFAULT: False)
+            keep_on_device: in the in_memory mode, keep the dataset on the device of the module instead of in
+                pinned host memory (DEFAULT: True)
         """
         # Call the base class constructor of DataLayer.
         DataLayerNM.__init__(self, name=name)
@@ -91,6 +101,21 @@ class MNISTDataLayer(DataLayerNM, Dataset):
         # Reverse mapping.
         self._ix_to_word = {value: key for (key, value) in word_to_ix.items()}
 
+        # Keep the decoded images: [N x 28 x 28] -> [N x 1 x 28 x 28].
+        self._iterator = None
+        if in_memory:
+            self._targets = torch.as_tensor(self._dataset.targets, dtype=torch.long)
+            self._iterator = InMemoryImageIterator(
+                images=self._dataset.data.unsqueeze(1),
+                batch_collate=self._collate_batch,
+                batch_size=batch_size,
+                shuffle=shuffle,
+                height=height,
+                width=width,
+                device=self._device,
+                keep_on_device=keep_on_device,
+            )
+
     @property
     @add_port_docs()
     def output_ports(self):
@@ -133,6 +158,17 @@ class MNISTDataLayer(DataLayerNM, Dataset):
         # Return sample.
         return index, img, target, self._ix_to_word[target]
 
+    def _collate_batch(self, indices: torch.Tensor, images: torch.Tensor):
+        """
+        Returns a batch of the in_memory mode, as collated by a DataLoader from the samples of __getitem__.
+
+        Args:
+            indices: indices of the samples
+            images: preprocessed images of the samples
+        """
+        targets = self._targets[indices]
+        return indices, images, targets, tuple(self._ix_to_word[target] for target in targets.tolist())
+
     @property
     def ix_to_word(self):
         """
@@ -146,6 +182,16 @@ class MNISTDataLayer(DataLayerNM, Dataset):
     def dataset(self):
         """
         Returns:
-            Self - just to be "compatible" with the current NeMo train action.
+            Self - just to be "compatible" with the current NeMo train action, None in the in_memory mode.
         """
+        if self._iterator is not None:
+            return None
         return self  # ! Important - as we want to use this __getitem__ method!
+
+    @property
+    def data_iterator(self):
+        """
+        Returns:
+            Iterator over the batches in the in_memory mode, None otherwise.
+        """
+        return self._iterator
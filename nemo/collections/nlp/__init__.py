@@ -14,5 +14,26 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp import callbacks, data, nm, utils
-from nemo.collections.nlp.neural_types import *
+from nemo.utils.lazy_import import lazy_import
+
+# The modules (and transformers, sentencepiece, h5py, etc. with them) are imported when first accessed.
+_submodules = {
+    'callbacks': 'nemo.collections.nlp.callbacks',
+    'data': 'nemo.collections.nlp.data',
+    'nm': 'nemo.collections.nlp.nm',
+    'utils': 'nemo.collections.nlp.utils',
+}
+_module_attributes = {
+    'nemo.collections.nlp.neural_types': [
+        'DialogAxisKind',
+        'Utterance',
+        'UserUtterance',
+        'SystemUtterance',
+        'AgentUtterance',
+        'SlotValue',
+        'MultiWOZBeliefState',
+    ]
+}
+__getattr__, __dir__ = lazy_import(__name__, submodules=_submodules, module_attributes=_module_attributes)
+
+__all__ = list(_submodules) + [name for names in _module_attributes.values() for name in names]
@@ -14,74 +14,157 @@
 # limitations under the License.
 # =============================================================================
 
+import random
+from functools import lru_cache
+
 import numpy as np
 
 from nemo import logging
 from nemo.collections.asr.metrics import word_error_rate
-from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+from nemo.collections.nlp.metrics.sacrebleu import NGRAM_ORDER, compute_bleu, corpus_bleu_statistics
 
-__all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
+__all__ = [
+    'eval_iter_callback',
+    'eval_epochs_done_callback',
+    'eval_iter_callback_wer',
+    'eval_epochs_done_callback_wer',
+]
 
 GLOBAL_KEYS = ["eval_loss", "ref", "sys", "sent_ids", "nonpad_tokens"]
 
+# metric name -> sacrebleu tokenizer
+BLEU_TOKENIZERS = {"token_bleu": "fairseq", "sacre_bleu": "13a"}
+NUM_LOGGED_EXAMPLES = 3
 
-def eval_iter_callback(tensors, global_vars, tgt_tokenizer):
-    for key in GLOBAL_KEYS:
-        if key not in global_vars.keys():
-            global_vars[key] = []
 
+@lru_cache(maxsize=4)
+def _read_references(validation_dataset):
+    with open(validation_dataset, "r") as f:
+        return f.readlines()
+
+
+def _decode_batch(tensors, tgt_tokenizer):
+    """Decodes translations and references of one evaluation batch (from all workers)."""
+    sys, ref, sent_ids, losses, nonpad_tokens = [], [], [], [], []
     for kv, v in tensors.items():
 
         if "output_ids" in kv:
-            sys = []
             for beam in v:
                 beam_search_translation = beam.cpu().numpy().tolist()
                 for sentence in beam_search_translation:
                     sys.append(tgt_tokenizer.ids_to_text(sentence))
-            global_vars["sys"].append(sys)
 
         if "tgt" in kv:
-            ref = []
             for tgt in v:
-                nonpad_tokens = (tgt != tgt_tokenizer.pad_id).sum().item()
+                nonpad_tokens.append((tgt != tgt_tokenizer.pad_id).sum().item())
                 tgt_sentences = tgt.cpu().numpy().tolist()
                 for sentence in tgt_sentences:
                     ref.append(tgt_tokenizer.ids_to_text(sentence))
-                global_vars["nonpad_tokens"].append(nonpad_tokens)
-            global_vars["ref"].append(ref)
 
         if "sent_ids" in kv:
-            for sent_ids in v:
-                global_vars["sent_ids"].extend(sent_ids.cpu().numpy().tolist())
+            for ids in v:
+                sent_ids.extend(ids.cpu().numpy().tolist())
 
         if "loss" in kv:
             for eval_loss in v:
-                global_vars["eval_loss"].append(eval_loss.item())
+                losses.append(eval_loss.item())
+    return sys, ref, sent_ids, losses, nonpad_tokens
+
+
+def bleu_statistics(sys, ref, tokenize):
+    """Returns the BLEU sufficient statistics of (sys, ref) sentence pairs as one vector:
+    correct ngram counts, total ngram counts, hypothesis length and reference length.
+    Vectors of disjoint sets of sentences can be summed (e.g. across batches or workers)."""
+    correct, total, sys_len, ref_len = corpus_bleu_statistics(sys, [ref], tokenize=tokenize)
+    return np.array(correct + total + [sys_len, ref_len], dtype=np.int64)
+
+
+def bleu_from_statistics(statistics):
+    """Computes corpus BLEU, identical to sacrebleu.corpus_bleu, from summed bleu_statistics() vectors."""
+    statistics = statistics.tolist()
+    correct, total = statistics[:NGRAM_ORDER], statistics[NGRAM_ORDER : 2 * NGRAM_ORDER]
+    return compute_bleu(correct, total, statistics[-2], statistics[-1], smooth_method='exp').score
+
+
+def eval_iter_callback(tensors, global_vars, tgt_tokenizer, validation_dataset=None):
+    """Accumulates the loss and the BLEU sufficient statistics of an evaluation batch, so that no
+    translations are kept in memory until the end of evaluation.
+
+    Args:
+        tensors: evaluated tensors of the batch
+        global_vars: dictionary of the EvaluatorCallback
+        tgt_tokenizer: tokenizer used to decode translations and references
+        validation_dataset: optional path to the file with references, one per line indexed by sent_ids.
+            If not given, references are decoded from the target ids.
+    """
+    if "bleu_statistics" not in global_vars:
+        global_vars["eval_loss"] = []
+        global_vars["nonpad_tokens"] = []
+        global_vars["sent_ids"] = set()
+        global_vars["num_sentences"] = 0
+        global_vars["examples"] = []
+        global_vars["bleu_statistics"] = {
+            metric: np.zeros(2 * NGRAM_ORDER + 2, dtype=np.int64) for metric in BLEU_TOKENIZERS
+        }
+        global_vars["validation_dataset"] = validation_dataset
+
+    sys, ref, sent_ids, losses, nonpad_tokens = _decode_batch(tensors, tgt_tokenizer)
+    global_vars["eval_loss"].extend(losses)
+    global_vars["nonpad_tokens"].extend(nonpad_tokens)
+
+    if validation_dataset is not None:
+        references = _read_references(validation_dataset)
+        ref = [references[i] for i in sent_ids]
+
+    # Distributed samplers repeat sentences to even out the workers, every sentence is scored once
+    if sent_ids:
+        seen = global_vars["sent_ids"]
+        keep = []
+        for i, sent_id in enumerate(sent_ids):
+            if sent_id not in seen:
+                seen.add(sent_id)
+                keep.append(i)
+        sys = [sys[i] for i in keep]
+        ref = [ref[i] for i in keep]
+
+    for metric, tokenize in BLEU_TOKENIZERS.items():
+        global_vars["bleu_statistics"][metric] += bleu_statistics(sys, ref, tokenize)
+
+    # Reservoir sampling of a few sentences to log
+    examples = global_vars["examples"]
+    for pair in zip(ref, sys):
+        global_vars["num_sentences"] += 1
+        if len(examples) < NUM_LOGGED_EXAMPLES:
+            examples.append(pair)
+        else:
+            j = random.randrange(global_vars["num_sentences"])
+            if j < NUM_LOGGED_EXAMPLES:
+                examples[j] = pair
 
 
 def eval_epochs_done_callback(global_vars, validation_dataset=None):
+    """Computes the evaluation loss and corpus BLEU from the statistics accumulated by eval_iter_callback.
+
+    Args:
+        global_vars: dictionary of the EvaluatorCallback
+        validation_dataset: deprecated, references are read per batch by eval_iter_callback, pass it there
+    """
+    if validation_dataset is not None and validation_dataset != global_vars.get("validation_dataset"):
+        logging.warning(
+            "validation_dataset is only used when passed to eval_iter_callback, "
+            "BLEU was computed against references decoded from the target ids."
+        )
+
     losses = np.array(global_vars["eval_loss"])
     counts = np.array(global_vars["nonpad_tokens"])
     eval_loss = np.sum(losses * counts) / np.sum(counts)
 
-    all_sys = [j for i in global_vars["sys"] for j in i]
-    _, indices = np.unique(global_vars["sent_ids"], return_index=True)
-    all_sys = [all_sys[i] for i in indices]
-
-    if validation_dataset is not None:
-        all_ref = [open(validation_dataset, "r").readlines()]
-        # _, *refs = download_test_set("wmt14/full", "en-de")
-        # all_ref = [smart_open(x).readlines() for x in refs]
-    else:
-        all_ref = [[j for i in global_vars["ref"] for j in i]]
-
-    token_bleu = corpus_bleu(all_sys, all_ref, tokenize="fairseq").score
-    sacre_bleu = corpus_bleu(all_sys, all_ref, tokenize="13a").score
+    token_bleu = bleu_from_statistics(global_vars["bleu_statistics"]["token_bleu"])
+    sacre_bleu = bleu_from_statistics(global_vars["bleu_statistics"]["sacre_bleu"])
 
-    for i in range(3):
-        sent_id = np.random.randint(len(all_sys))
-        logging.info("Ground truth: {0}\n".format(all_ref[0][sent_id]))
-        logging.info("Translation:  {0}\n".format(all_sys[sent_id]))
+    for ref, sys in global_vars["examples"]:
+        logging.info("Ground truth: {0}\n".format(ref))
+        logging.info("Translation:  {0}\n".format(sys))
 
     logging.info("------------------------------------------------------------")
     logging.info("Validation loss: {0}".format(np.round(eval_loss, 3)))
@@ -89,14 +172,26 @@ def eval_epochs_done_callback(global_vars, validation_dataset=None):
     logging.info("SacreBLEU: {0}".format(np.round(sacre_bleu, 2)))
     logging.info("------------------------------------------------------------")
 
-    for key in GLOBAL_KEYS:
-        global_vars[key] = []
+    global_vars.clear()
 
     metrics = dict({"eval_loss": eval_loss, "token_bleu": token_bleu, "sacre_bleu": sacre_bleu})
 
     return metrics
 
 
+def eval_iter_callback_wer(tensors, global_vars, tgt_tokenizer):
+    for key in GLOBAL_KEYS:
+        if key not in global_vars.keys():
+            global_vars[key] = []
+
+    sys, ref, sent_ids, losses, nonpad_tokens = _decode_batch(tensors, tgt_tokenizer)
+    global_vars["sys"].append(sys)
+    global_vars["ref"].append(ref)
+    global_vars["sent_ids"].extend(sent_ids)
+    global_vars["eval_loss"].extend(losses)
+    global_vars["nonpad_tokens"].extend(nonpad_tokens)
+
+
 def eval_epochs_done_callback_wer(global_vars):
     eval_loss = np.mean(global_vars["eval_loss"])
     all_ref = []
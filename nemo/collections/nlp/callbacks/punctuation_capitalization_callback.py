@@ -14,72 +14,46 @@
 # limitations under the License.
 # =============================================================================
 
-import random
-
-import numpy as np
-
 from nemo import logging
 from nemo.collections.nlp.utils.callback_utils import (
-    get_classification_report,
+    get_classification_report_from_cm,
+    get_prediction_sample,
     list2str,
-    plot_confusion_matrix,
-    tensor2list,
+    plot_confusion_matrix_from_cm,
+    update_confusion_matrix,
+    update_prediction_sample,
 )
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
 
 
 def eval_iter_callback(tensors, global_vars):
-    if "punct_all_preds" not in global_vars.keys():
-        global_vars["punct_all_preds"] = []
-    if "punct_all_labels" not in global_vars.keys():
-        global_vars["punct_all_labels"] = []
-    if "capit_all_preds" not in global_vars.keys():
-        global_vars["capit_all_preds"] = []
-    if "capit_all_labels" not in global_vars.keys():
-        global_vars["capit_all_labels"] = []
-    if "all_subtokens_mask" not in global_vars.keys():
-        global_vars["all_subtokens_mask"] = []
-
+    all_logits = {'punct': [], 'capit': []}
+    all_labels = {'punct': [], 'capit': []}
     all_subtokens_mask = []
-    punct_all_logits, punct_all_labels = [], []
-    capit_all_logits, capit_all_labels = [], []
 
     for kv, v in tensors.items():
         if 'Punctuation' in kv and 'logits' in kv:
-            for v_tensor in v:
-                for logit_tensor in v_tensor:
-                    punct_all_logits.append(tensor2list(logit_tensor))
-
+            all_logits['punct'].extend(v)
         elif kv.startswith('punct_labels'):
-            for v_tensor in v:
-                for label_tensor in v_tensor:
-                    punct_all_labels.extend(tensor2list(label_tensor))
-
+            all_labels['punct'].extend(v)
         elif 'Capitalization' in kv and 'logits' in kv:
-            for v_tensor in v:
-                for logit_tensor in v_tensor:
-                    capit_all_logits.append(tensor2list(logit_tensor))
-
+            all_logits['capit'].extend(v)
         elif kv.startswith('capit_labels'):
-            for v_tensor in v:
-                for label_tensor in v_tensor:
-                    capit_all_labels.extend(tensor2list(label_tensor))
-
+            all_labels['capit'].extend(v)
         elif kv.startswith('subtokens_mask'):
-            for v_tensor in v:
-                for subtokens_mask_tensor in v_tensor:
-                    all_subtokens_mask.extend(tensor2list(subtokens_mask_tensor))
-
-    punct_all_preds = list(np.argmax(np.asarray(punct_all_logits), 2).flatten())
-    global_vars["punct_all_preds"].extend(punct_all_preds)
-    global_vars["punct_all_labels"].extend(punct_all_labels)
-
-    capit_all_preds = list(np.argmax(np.asarray(capit_all_logits), 2).flatten())
-    global_vars["capit_all_preds"].extend(capit_all_preds)
-    global_vars["capit_all_labels"].extend(capit_all_labels)
+            all_subtokens_mask.extend(v)
 
-    global_vars["all_subtokens_mask"].extend(all_subtokens_mask)
+    # confusion matrices are accumulated on the device of the logits, only the (small) samples are copied to host
+    for task_name in ['punct', 'capit']:
+        for logits, labels, subtokens_mask in zip(all_logits[task_name], all_labels[task_name], all_subtokens_mask):
+            mask = subtokens_mask > 0.5
+            labels = labels[mask]
+            preds = logits.argmax(dim=-1)[mask]
+            global_vars[task_name + '_confusion_matrix'] = update_confusion_matrix(
+                global_vars.get(task_name + '_confusion_matrix'), labels, preds, logits.shape[-1]
+            )
+            update_prediction_sample(global_vars, labels, preds, prefix=task_name + '_')
 
 
 def eval_epochs_done_callback(global_vars, punct_label_ids, capit_label_ids, graph_fold=None, normalize_cm=True):
@@ -90,6 +64,10 @@ def eval_epochs_done_callback(global_vars, punct_label_ids, capit_label_ids, gra
         normalize confusion matrix
     '''
 
+    if 'punct_confusion_matrix' not in global_vars or 'capit_confusion_matrix' not in global_vars:
+        logging.warning("No evaluation batch was processed, metrics are not computed.")
+        return {}
+
     punct_accuracy = _eval_epochs_done_callback('punct', global_vars, punct_label_ids, graph_fold, normalize_cm)
 
     capit_accuracy = _eval_epochs_done_callback('capit', global_vars, capit_label_ids, graph_fold, normalize_cm)
@@ -98,28 +76,20 @@ def eval_epochs_done_callback(global_vars, punct_label_ids, capit_label_ids, gra
 
 
 def _eval_epochs_done_callback(task_name, global_vars, label_ids, graph_fold=None, normalize_cm=True):
-    labels = np.asarray(global_vars[task_name + '_all_labels'])
-    preds = np.asarray(global_vars[task_name + '_all_preds'])
-    subtokens_mask = np.asarray(global_vars['all_subtokens_mask']) > 0.5
-
-    labels = labels[subtokens_mask]
-    preds = preds[subtokens_mask]
+    cm = global_vars[task_name + '_confusion_matrix']
 
-    accuracy = sum(labels == preds) / labels.shape[0]
+    accuracy = (cm.trace().double() / cm.sum()).item()
     logging.info(f'Accuracy for task {task_name}: {accuracy}')
 
     # print predictions and labels for a small random subset of data
-    sample_size = 20
-    i = 0
-    if preds.shape[0] > sample_size + 1:
-        i = random.randint(0, preds.shape[0] - sample_size - 1)
-    logging.info("Sampled preds: [%s]" % list2str(preds[i : i + sample_size]))
-    logging.info("Sampled labels: [%s]" % list2str(labels[i : i + sample_size]))
-
-    classification_report = get_classification_report(labels, preds, label_ids)
+    sample_labels, sample_preds = get_prediction_sample(global_vars, prefix=task_name + '_')
+    logging.info("Sampled preds: [%s]" % list2str(sample_preds))
+    logging.info("Sampled labels: [%s]" % list2str(sample_labels))
+
+    classification_report = get_classification_report_from_cm(cm, label_ids)
     logging.info(classification_report)
 
-    # calculate and plot confusion_matrix
+    # plot confusion_matrix
     if graph_fold:
-        plot_confusion_matrix(labels, preds, graph_fold, label_ids, normalize=normalize_cm, prefix=task_name)
+        plot_confusion_matrix_from_cm(cm, graph_fold, label_ids, normalize=normalize_cm, prefix=task_name)
     return accuracy
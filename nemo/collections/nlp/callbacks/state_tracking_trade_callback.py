@@ -45,6 +45,9 @@ def eval_iter_callback(tensors, global_vars, data_desc):
             for values in values_list:
                 p_max = torch.argmax(values, dim=-1)
                 point_outputs_max_list.append(tensor2numpy(p_max))
+        elif tensor_name.startswith('point_preds'):
+            for values in values_list:
+                point_outputs_max_list.append(tensor2numpy(values))
         elif tensor_name.startswith('gate_outputs'):
             for values in values_list:
                 g_max = torch.argmax(values, axis=-1)
@@ -14,82 +14,64 @@
 # limitations under the License.
 # =============================================================================
 
-import random
-
-import numpy as np
-
 from nemo import logging
 from nemo.collections.nlp.utils.callback_utils import (
-    get_classification_report,
-    get_f1_scores,
+    get_classification_report_from_cm,
+    get_f1_scores_from_cm,
+    get_prediction_sample,
     list2str,
-    plot_confusion_matrix,
-    tensor2list,
+    plot_confusion_matrix_from_cm,
+    update_confusion_matrix,
+    update_prediction_sample,
 )
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
 
 
 def eval_iter_callback(tensors, global_vars):
-    if "all_preds" not in global_vars.keys():
-        global_vars["all_preds"] = []
-    if "all_labels" not in global_vars.keys():
-        global_vars["all_labels"] = []
-    if "all_subtokens_mask" not in global_vars.keys():
-        global_vars["all_subtokens_mask"] = []
-
-    all_subtokens_mask, all_logits, all_labels = [], [], []
-
+    all_logits, all_labels, all_subtokens_mask = [], [], []
     for kv, v in tensors.items():
         if kv.startswith('logits'):
-            for v_tensor in v:
-                for logit_tensor in v_tensor:
-                    all_logits.append(tensor2list(logit_tensor))
-
+            all_logits.extend(v)
         elif kv.startswith('labels'):
-            for v_tensor in v:
-                for label_tensor in v_tensor:
-                    all_labels.extend(tensor2list(label_tensor))
-
+            all_labels.extend(v)
         elif kv.startswith('subtokens_mask'):
-            for v_tensor in v:
-                for subtokens_mask_tensor in v_tensor:
-                    all_subtokens_mask.extend(tensor2list(subtokens_mask_tensor))
+            all_subtokens_mask.extend(v)
 
-    all_preds = list(np.argmax(np.asarray(all_logits), 2).flatten())
-    global_vars["all_preds"].extend(all_preds)
-    global_vars["all_labels"].extend(all_labels)
-    global_vars["all_subtokens_mask"].extend(all_subtokens_mask)
+    # the confusion matrix is accumulated on the device of the logits, only the (small) sample is copied to host
+    for logits, labels, subtokens_mask in zip(all_logits, all_labels, all_subtokens_mask):
+        mask = subtokens_mask > 0.5
+        labels = labels[mask]
+        preds = logits.argmax(dim=-1)[mask]
+        global_vars['confusion_matrix'] = update_confusion_matrix(
+            global_vars.get('confusion_matrix'), labels, preds, logits.shape[-1]
+        )
+        update_prediction_sample(global_vars, labels, preds)
 
 
 def eval_epochs_done_callback(global_vars, label_ids, graph_fold=None, normalize_cm=True):
-    labels = np.asarray(global_vars['all_labels'])
-    preds = np.asarray(global_vars['all_preds'])
-    subtokens_mask = np.asarray(global_vars['all_subtokens_mask']) > 0.5
-
-    labels = labels[subtokens_mask]
-    preds = preds[subtokens_mask]
+    cm = global_vars.get('confusion_matrix')
+    if cm is None:
+        logging.warning("No evaluation batch was processed, metrics are not computed.")
+        return {}
 
     # print predictions and labels for a small random subset of data
-    sample_size = 20
-    i = 0
-    if preds.shape[0] > sample_size + 1:
-        i = random.randint(0, preds.shape[0] - sample_size - 1)
-    logging.info("Sampled preds: [%s]" % list2str(preds[i : i + sample_size]))
-    logging.info("Sampled labels: [%s]" % list2str(labels[i : i + sample_size]))
+    sample_labels, sample_preds = get_prediction_sample(global_vars)
+    logging.info("Sampled preds: [%s]" % list2str(sample_preds))
+    logging.info("Sampled labels: [%s]" % list2str(sample_labels))
 
-    accuracy = sum(labels == preds) / labels.shape[0]
+    accuracy = (cm.trace().double() / cm.sum()).item()
     logging.info(f'Accuracy: {accuracy}')
 
-    f1_scores = get_f1_scores(labels, preds, average_modes=['weighted', 'macro', 'micro'])
+    f1_scores = get_f1_scores_from_cm(cm, average_modes=['weighted', 'macro', 'micro'])
     for k, v in f1_scores.items():
         logging.info(f'{k}: {v}')
 
-    classification_report = get_classification_report(labels, preds, label_ids)
+    classification_report = get_classification_report_from_cm(cm, label_ids)
     logging.info(classification_report)
 
-    # calculate and plot confusion_matrix
+    # plot confusion_matrix
     if graph_fold:
-        plot_confusion_matrix(labels, preds, graph_fold, label_ids, normalize=normalize_cm)
+        plot_confusion_matrix_from_cm(cm, graph_fold, label_ids, normalize=normalize_cm)
 
     return dict({'Accuracy': accuracy})
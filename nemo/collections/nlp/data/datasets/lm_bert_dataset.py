@@ -22,9 +22,7 @@ import os
 import pickle
 import random
 
-import h5py
 import numpy as np
-from sentencepiece import SentencePieceTrainer as SPT
 from torch.utils.data import Dataset
 from tqdm import tqdm
 
@@ -336,44 +334,108 @@ class BertPretrainingDataset(Dataset):
 
 
 class BertPretrainingPreprocessedDataset(Dataset):
-    def __init__(self, input_file, max_pred_length):
+    """
+    Preprocessed BERT pretraining samples of an HDF5 file, with the datasets input_ids, input_mask, segment_ids,
+    masked_lm_positions, masked_lm_ids and next_sentence_labels.
+
+    Indexing with an int returns the arrays of a sample, indexing with a sequence of indices returns the arrays of
+    the samples stacked, read with one slice per block of the file that the samples belong to. The output ids and
+    mask are built from the masked positions per batch, see mask_batch().
+
+    Args:
+        input_file: path to the HDF5 file
+        max_pred_length: maximum number of masked positions per sample
+        lazy: reads the samples from the file when they are requested, instead of loading the whole file. Every
+            process, e.g. every DataLoader worker, opens the file itself.
+        block_size: number of samples of the blocks read in lazy mode, rounded up to a multiple of the HDF5 chunk
+            size of the file
+    """
+
+    keys = [
+        'input_ids',
+        'input_mask',
+        'segment_ids',
+        'masked_lm_positions',
+        'masked_lm_ids',
+        'next_sentence_labels',
+    ]
+
+    def __init__(self, input_file, max_pred_length, lazy=False, block_size=64):
         self.input_file = input_file
         self.max_pred_length = max_pred_length
-        f = h5py.File(input_file, "r")
-        keys = [
-            'input_ids',
-            'input_mask',
-            'segment_ids',
-            'masked_lm_positions',
-            'masked_lm_ids',
-            'next_sentence_labels',
-        ]
-        self.inputs = [np.asarray(f[key][:]) for key in keys]
-        f.close()
+        self.lazy = lazy
+        import h5py
+
+        with h5py.File(input_file, "r") as f:
+            self.num_samples = len(f['input_ids'])
+            chunks = f['input_ids'].chunks
+            if lazy:
+                self.inputs = None
+            else:
+                self.inputs = [np.asarray(f[key][:]) for key in self.keys]
+        chunk_rows = chunks[0] if chunks else 1
+        self.block_size = -(-max(block_size, 1) // chunk_rows) * chunk_rows
+        self._file = None
+        self._pid = None
+
+    def __getstate__(self):
+        # HDF5 handles are not shared between processes
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    def _datasets(self):
+        if self.inputs is not None:
+            return self.inputs
+        if self._file is None or self._pid != os.getpid():
+            import h5py
+
+            self._file = h5py.File(self.input_file, "r")
+            self._pid = os.getpid()
+        return [self._file[key] for key in self.keys]
 
     def __len__(self):
         'Denotes the total number of samples'
-        return len(self.inputs[0])
+        return self.num_samples
 
     def __getitem__(self, index):
-        [input_ids, input_mask, segment_ids, masked_lm_positions, masked_lm_ids, next_sentence_labels] = [
-            input[index].astype(np.int64) for input in self.inputs
-        ]
-
-        output_mask = np.zeros_like(input_ids)
-        output_ids = input_ids.copy()
-
-        index = self.max_pred_length
-        padded_mask_indices = (masked_lm_positions == 0).nonzero()
-        if len(padded_mask_indices[0]) != 0:
-            index = padded_mask_indices[0][0]
+        if np.ndim(index) == 0:
+            return tuple(values[0] for values in self[[index]])
+        indices = np.asarray(index, dtype=np.int64)
+        if self.inputs is not None:
+            return tuple(values[indices].astype(np.int64) for values in self.inputs)
+
+        # Reads the samples block by block, in increasing order
+        order = np.argsort(indices, kind='stable')
+        sorted_indices = indices[order]
+        runs = np.split(sorted_indices, np.flatnonzero(np.diff(sorted_indices // self.block_size)) + 1)
+        batch = []
+        for dataset in self._datasets():
+            values = np.concatenate([dataset[run[0] : run[-1] + 1][run - run[0]] for run in runs if len(run)])
+            unsorted = np.empty_like(values)
+            unsorted[order] = values
+            batch.append(unsorted.astype(np.int64))
+        return tuple(batch)
+
+    def mask_batch(self, input_ids, input_mask, segment_ids, masked_lm_positions, masked_lm_ids, next_sentence_labels):
+        """
+        Builds the inputs of BERT pretraining from stacked samples. The masked positions of a sample end at the first
+        zero position or after max_pred_length positions.
 
-        output_mask[masked_lm_positions[:index]] = 1.0
-        output_ids[masked_lm_positions[:index]] = masked_lm_ids[:index]
+        Returns:
+            input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels
+        """
+        valid = np.cumprod(masked_lm_positions != 0, axis=1).astype(bool)
+        valid[:, self.max_pred_length :] = False
+        rows = np.broadcast_to(np.arange(len(input_ids))[:, None], masked_lm_positions.shape)[valid]
+        positions = masked_lm_positions[valid]
 
+        output_mask = np.zeros(input_ids.shape, dtype=np.float32)
+        output_mask[rows, positions] = 1.0
+        output_ids = input_ids.copy()
+        output_ids[rows, positions] = masked_lm_ids[valid]
         input_mask = np.asarray(input_mask, dtype=np.float32)
-        output_mask = np.asarray(output_mask, dtype=np.float32)
-        return (input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels)
+        return input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels
 
 
 class BERTPretrainingDataDesc:
@@ -429,6 +491,8 @@ class BERTPretrainingDataDesc:
             f"--bos_id=-1 --eos_id=-1"
         )
 
+        from sentencepiece import SentencePieceTrainer as SPT
+
         SPT.Train(cmd)
 
         # Add BERT control symbols
@@ -15,38 +15,140 @@
 # =============================================================================
 
 """Pytorch Dataset for training Neural Machine Translation."""
+import hashlib
 import os
 import re
 
 import numpy as np
+import torch
 from torch.utils.data import Dataset
 
 from nemo import logging
-from nemo.collections.nlp.data.datasets.datasets_utils import dataset_to_ids, if_exist
+from nemo.collections.nlp.data.datasets.datasets_utils import if_exist
 
 __all__ = ['LanguageModelingDataset', 'LanguageModelDataDesc']
 
 
 class LanguageModelingDataset(Dataset):
-    def __init__(self, tokenizer, dataset, max_seq_length=512, batch_step=None):
+    """
+    Splits the tokenized text of a file into (possibly overlapping) segments of max_seq_length tokens.
+
+    The file is tokenized once, line by line, into a binary token stream stored next to it, which uses the smallest
+    integer type fitting the vocabulary of the tokenizer. The stream is memory-mapped, so the corpus does not have to
+    fit in host memory. Its name includes a hash of the modification time and size of the file and of the vocabulary
+    of the tokenizer, so that the file is tokenized again when either changes.
+
+    Args:
+        tokenizer (TokenizerSpec): tokenizer
+        dataset (str): path to text document with data
+        max_seq_length (int): length of the text segments
+        batch_step (int): how many tokens to skip between two successive segments, defaults to max_seq_length
+        random_offset (bool): whether to shift every segment by a random number of tokens in [0, batch_step), drawn
+            each time it is loaded, so that the same tokens do not land at the same positions in every epoch
+    """
+
+    def __init__(self, tokenizer, dataset, max_seq_length=512, batch_step=None, random_offset=False):
         self.tokenizer = tokenizer
         self.max_seq_length = max_seq_length
         self.batch_step = batch_step or self.max_seq_length
-        ids = dataset_to_ids(dataset, tokenizer, add_bos_eos=False)
-        self.ids = np.array([j for i in ids for j in i])
+        self.random_offset = random_offset
+
+        vocab_size = getattr(tokenizer, "vocab_size", 0)
+        dtype = _get_token_dtype(vocab_size)
+        data_dir, filename = os.path.split(dataset)
+        tokenizer_type = type(getattr(tokenizer, "tokenizer", tokenizer)).__name__
+        cache_key = _get_cache_key(dataset, tokenizer)
+        ids_file = os.path.join(
+            data_dir, f"cached_{filename}_{tokenizer_type}_{vocab_size}_{cache_key}.{np.dtype(dtype).name}"
+        )
+
+        master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
+        if master_device and not os.path.exists(ids_file):
+            _write_token_stream(dataset, tokenizer, ids_file, dtype)
+        if torch.distributed.is_initialized():
+            torch.distributed.barrier()
+
+        logging.info(f"Loading tokenized dataset from {ids_file}")
+        self.ids = np.memmap(ids_file, dtype=dtype, mode='r')
 
     def __len__(self):
         return (len(self.ids) - self.max_seq_length) // self.batch_step
 
     def __getitem__(self, idx):
         left = idx * self.batch_step
+        if self.random_offset:
+            # torch instead of numpy random state, which would be the same in all data loader workers
+            left += int(torch.randint(self.batch_step, (1,)))
         right = left + self.max_seq_length
-        src_ids = self.ids[left:right]
-        labels = self.ids[left + 1 : right + 1]
+        ids = self.ids[left : right + 1].astype(np.int64)
+        src_ids = ids[:-1]
+        labels = ids[1:]
         src_mask = (src_ids != self.tokenizer.pad_id).astype(np.float32)
         return src_ids, src_mask, labels
 
 
+def _get_token_dtype(vocab_size):
+    """Returns the smallest integer type able to store the ids of a vocabulary, int64 if its size is unknown."""
+    if 0 < vocab_size <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    if 0 < vocab_size <= np.iinfo(np.int32).max + 1:
+        return np.int32
+    return np.int64
+
+
+# Tokenized to tell apart tokenizers whose vocabulary is not accessible
+_PROBE_TEXT = "The quick brown fox jumps over the lazy dog, 1234567890 times! [CLS] <unk> Ümläüts ßé 漢字"
+
+
+def _get_cache_key(dataset, tokenizer):
+    """
+    Returns a short hash of the modification time and size of the dataset file and of the tokenizer: its serialized
+    model or vocabulary if it has one, and the ids of a probe text.
+    """
+    key = hashlib.sha1()
+    stat = os.stat(dataset)
+    key.update(f"{stat.st_mtime_ns} {stat.st_size}".encode())
+
+    model = getattr(tokenizer, "tokenizer", tokenizer)
+    if hasattr(model, "serialized_model_proto"):
+        # SentencePiece
+        key.update(model.serialized_model_proto())
+    else:
+        vocab = getattr(model, "vocab", None) or getattr(model, "encoder", None)
+        if callable(vocab):
+            # YouTokenToMe
+            vocab = vocab()
+        if isinstance(vocab, dict):
+            vocab = sorted(vocab.items())
+        if vocab is not None:
+            key.update(repr(list(vocab)).encode())
+    key.update(repr(list(tokenizer.text_to_ids(_PROBE_TEXT))).encode())
+    return key.hexdigest()[:16]
+
+
+def _write_token_stream(dataset, tokenizer, ids_file, dtype, buffer_size=2 ** 20):
+    """
+    Tokenizes a text file line by line and writes the concatenated token ids to ids_file as a raw array of dtype.
+    At most buffer_size ids are kept in memory. The file is written under a temporary name and renamed when
+    complete, so an interrupted run does not leave a truncated stream.
+    """
+    logging.info(f"Tokenizing dataset {dataset} into {ids_file}")
+    tmp_file = ids_file + ".tmp"
+    num_tokens = 0
+    buffer = []
+    with open(dataset, "rb") as f_in, open(tmp_file, "wb") as f_out:
+        for sentence in f_in:
+            buffer.extend(tokenizer.text_to_ids(sentence.decode("utf-8")))
+            if len(buffer) >= buffer_size:
+                np.array(buffer, dtype=dtype).tofile(f_out)
+                num_tokens += len(buffer)
+                buffer = []
+        np.array(buffer, dtype=dtype).tofile(f_out)
+        num_tokens += len(buffer)
+    os.replace(tmp_file, ids_file)
+    logging.info(f"Wrote {num_tokens} tokens to {ids_file}")
+
+
 class LanguageModelDataDesc:
     def __init__(self, dataset_name, data_dir, do_lower_case):
         if dataset_name == 'wikitext-2':
@@ -22,9 +22,11 @@ https://github.com/google-research/google-research/blob/master/schema_guided_dst
 
 import collections
 import json
+import multiprocessing
 import os
 import pickle
 import re
+import shutil
 
 import numpy as np
 import torch
@@ -32,7 +34,7 @@ import torch
 from nemo.collections.nlp.data.datasets.sgd_dataset.input_example import InputExample
 from nemo.utils import logging
 
-__all__ = ['FILE_RANGES', 'PER_FRAME_OUTPUT_FILENAME', 'SGDDataProcessor']
+__all__ = ['FILE_RANGES', 'PER_FRAME_OUTPUT_FILENAME', 'SGDDataProcessor', 'EXAMPLE_COLUMNS']
 
 FILE_RANGES = {
     "sgd_single_domain": {"train": range(1, 44), "dev": range(1, 8), "test": range(1, 12)},
@@ -45,12 +47,59 @@ FILE_RANGES = {
 # Name of the file containing all predictions and their corresponding frame metrics.
 PER_FRAME_OUTPUT_FILENAME = "dialogues_and_metrics.json"
 
+# The dialogue examples are stored as one fixed width array per feature, in the order the features are returned by
+# SGDDataset. Each entry is (feature name, dtype, function returning the shape of one example from the schema config).
+EXAMPLE_COLUMNS = [
+    ("example_id_num", np.int64, lambda c: (4,)),
+    ("service_id", np.int64, lambda c: ()),
+    ("is_real_example", np.int64, lambda c: ()),
+    ("utterance_ids", np.int64, lambda c: (c["MAX_SEQ_LENGTH"],)),
+    ("utterance_segment", np.int64, lambda c: (c["MAX_SEQ_LENGTH"],)),
+    ("utterance_mask", np.int64, lambda c: (c["MAX_SEQ_LENGTH"],)),
+    ("categorical_slot_status", np.int64, lambda c: (c["MAX_NUM_CAT_SLOT"],)),
+    ("cat_slot_status_mask", np.int64, lambda c: (c["MAX_NUM_CAT_SLOT"],)),
+    ("categorical_slot_values", np.int64, lambda c: (c["MAX_NUM_CAT_SLOT"],)),
+    ("cat_slot_values_mask", np.int64, lambda c: (c["MAX_NUM_CAT_SLOT"], c["MAX_NUM_VALUE_PER_CAT_SLOT"])),
+    ("noncategorical_slot_status", np.int64, lambda c: (c["MAX_NUM_NONCAT_SLOT"],)),
+    ("noncat_slot_status_mask", np.int64, lambda c: (c["MAX_NUM_NONCAT_SLOT"],)),
+    ("noncategorical_slot_value_start", np.int64, lambda c: (c["MAX_NUM_NONCAT_SLOT"],)),
+    ("noncategorical_slot_value_end", np.int64, lambda c: (c["MAX_NUM_NONCAT_SLOT"],)),
+    ("start_char_idx", np.int64, lambda c: (c["MAX_SEQ_LENGTH"],)),
+    ("end_char_idx", np.int64, lambda c: (c["MAX_SEQ_LENGTH"],)),
+    ("num_slots", np.int64, lambda c: ()),
+    ("requested_slot_status", np.float32, lambda c: (c["MAX_NUM_CAT_SLOT"] + c["MAX_NUM_NONCAT_SLOT"],)),
+    ("requested_slot_mask", np.int64, lambda c: (c["MAX_NUM_CAT_SLOT"] + c["MAX_NUM_NONCAT_SLOT"],)),
+    ("intent_status_mask", np.int64, lambda c: (c["MAX_NUM_INTENT"] + 1,)),
+    ("intent_status_labels", np.int64, lambda c: ()),
+]
+
+# SGDDataProcessor and schemas the example building worker processes inherit from the parent process
+_worker_state = None
+
+
+def _create_examples_from_dialog_file(args):
+    """Creates the example columns and slot carry-over counts of one dialogue file, in a worker process."""
+    dialog_path, dataset = args
+    processor, schemas = _worker_state
+    slot_carryover_candlist = collections.defaultdict(int)
+    examples = []
+    for dialog in SGDDataProcessor.load_dialogues([dialog_path]):
+        examples.extend(processor._create_examples_from_dialog(dialog, schemas, dataset, slot_carryover_candlist))
+    return processor._examples_to_columns(examples), dict(slot_carryover_candlist)
+
 
 class SGDDataProcessor(object):
     """Data generator for SGD dialogues."""
 
     def __init__(
-        self, task_name, data_dir, dialogues_example_dir, tokenizer, schema_emb_processor, overwrite_dial_files=False,
+        self,
+        task_name,
+        data_dir,
+        dialogues_example_dir,
+        tokenizer,
+        schema_emb_processor,
+        overwrite_dial_files=False,
+        num_workers=None,
     ):
         """
         Constructs SGD8DataProcessor
@@ -61,6 +110,7 @@ class SGDDataProcessor(object):
             tokenizer (Tokenizer): such as NemoBertTokenizer
             schema_emb_processor (Obj): contains information about schemas
             overwrite_dial_files (bool): whether to overwite dialogue files
+            num_workers (int): number of processes creating the dialogue examples, defaults to the number of CPUs
         """
         self.data_dir = data_dir
         self.dialogues_examples_dir = dialogues_example_dir
@@ -87,6 +137,7 @@ class SGDDataProcessor(object):
 
         self._tokenizer = tokenizer
         self._max_seq_length = self.schema_config["MAX_SEQ_LENGTH"]
+        self._num_workers = num_workers if num_workers is not None else os.cpu_count()
 
         self.dial_files = {}
 
@@ -95,10 +146,15 @@ class SGDDataProcessor(object):
         # This file would get generated from the dialogues in the training set.
         self.slots_relation_file = os.path.join(dialogues_example_dir, f"{task_name}_train_slots_relation_list.np")
 
+        # The examples depend on the tokenization, so the tokenizer and the maximum sequence length are part of the
+        # name of their folder
+        tokenizer_type = type(getattr(tokenizer, "tokenizer", tokenizer)).__name__
+        vocab_size = getattr(tokenizer, "vocab_size", 0)
+
         master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
         for dataset in ["train", "dev", "test"]:
-            # Process dialogue files
-            dial_file = f"{task_name}_{dataset}_examples.processed"
+            # Process dialogue files, the examples of a split are stored as one .npy file per feature in dial_file
+            dial_file = f"{task_name}_{dataset}_examples_{tokenizer_type}_{self._max_seq_length}_{vocab_size}"
             dial_file = os.path.join(dialogues_example_dir, dial_file)
             self.dial_files[(task_name, dataset)] = dial_file
 
@@ -115,8 +171,7 @@ class SGDDataProcessor(object):
                     dial_examples, slots_relation_list = self._generate_dialog_examples(
                         dataset, schema_emb_processor.schemas
                     )
-                    with open(dial_file, "wb") as f:
-                        np.save(f, dial_examples)
+                    self._save_columns(dial_file, dial_examples)
 
                     if dataset == "train":
                         with open(self.slots_relation_file, "wb") as f:
@@ -134,11 +189,12 @@ class SGDDataProcessor(object):
 
     def get_dialog_examples(self, dataset):
         """
-        Returns a list of `InputExample`s of the data splits' dialogues.
+        Returns the features of the data splits' dialogue examples.
         Args:
           dataset(str): can be "train", "dev", or "test".
         Returns:
-          examples: a list of `InputExample`s.
+          examples: a dict mapping the feature names of EXAMPLE_COLUMNS to read-only memory-mapped arrays,
+            the first dimension of which is the example index
         """
         if (self._task_name, dataset) not in self.dial_files or not os.path.exists(
             self.dial_files[(self._task_name, dataset)]
@@ -149,9 +205,9 @@ class SGDDataProcessor(object):
         dial_file = self.dial_files[(self._task_name, dataset)]
         logging.info(f"Loading dialogue examples from {dial_file}.")
 
-        with open(dial_file, "rb") as f:
-            dial_examples = np.load(f, allow_pickle=True)
-            f.close()
+        dial_examples = {
+            name: np.load(os.path.join(dial_file, f"{name}.npy"), mmap_mode="r") for name, _, _ in EXAMPLE_COLUMNS
+        }
 
         if not os.path.exists(self.slots_relation_file):
             raise ValueError(
@@ -171,25 +227,41 @@ class SGDDataProcessor(object):
 
     def _generate_dialog_examples(self, dataset, schemas):
         """
-        Returns a list of `InputExample`s of the data splits' dialogues.
+        Returns the features of the data splits' dialogue examples. The dialogue files are processed in parallel by
+        num_workers processes.
         Args:
           dataset(str): can be "train", "dev", or "test".
           schemas(Schema): for all services and all datasets processed by the schema_processor
         Returns:
-          examples: a list of `InputExample`s.
+          examples: a dict mapping the feature names of EXAMPLE_COLUMNS to arrays
+          slots_relation_list: the candidate slots for the value carry-over between services
         """
+        global _worker_state
+
         logging.info(f'Creating examples and slot relation list from the dialogues started...')
-        dialog_paths = [
+        dialog_paths = sorted(
             os.path.join(self.data_dir, dataset, "dialogues_{:03d}.json".format(i)) for i in self._file_ranges[dataset]
-        ]
-        dialogs = SGDDataProcessor.load_dialogues(dialog_paths)
+        )
+        tasks = [(dialog_path, dataset) for dialog_path in dialog_paths]
+
+        _worker_state = (self, schemas)
+        try:
+            if self._num_workers > 1 and len(tasks) > 1 and "fork" in multiprocessing.get_all_start_methods():
+                # Forked workers inherit the processor, including the tokenizer and the schemas
+                with multiprocessing.get_context("fork").Pool(min(self._num_workers, len(tasks))) as pool:
+                    results = pool.map(_create_examples_from_dialog_file, tasks, chunksize=1)
+            else:
+                results = [_create_examples_from_dialog_file(task) for task in tasks]
+        finally:
+            _worker_state = None
 
-        examples = []
+        # Files are merged in order, so the examples and the slot relation list do not depend on the worker count
+        examples = {name: np.concatenate([columns[name] for columns, _ in results]) for name, _, _ in EXAMPLE_COLUMNS}
         slot_carryover_candlist = collections.defaultdict(int)
-        for dialog_idx, dialog in enumerate(dialogs):
-            if dialog_idx % 1000 == 0:
-                logging.info(f'Processed {dialog_idx} dialogues.')
-            examples.extend(self._create_examples_from_dialog(dialog, schemas, dataset, slot_carryover_candlist))
+        for _, file_candlist in results:
+            for slots_relation, relation_size in file_candlist.items():
+                slot_carryover_candlist[slots_relation] += relation_size
+        logging.info(f'Created {len(examples["example_id_num"])} examples from {len(dialog_paths)} dialogue files.')
 
         slots_relation_list = collections.defaultdict(list)
         for slots_relation, relation_size in slot_carryover_candlist.items():
@@ -203,6 +275,37 @@ class SGDDataProcessor(object):
 
         return examples, slots_relation_list
 
+    def _examples_to_columns(self, examples):
+        """
+        Packs `InputExample`s into one fixed width array per feature of EXAMPLE_COLUMNS.
+        Args:
+            examples (list): `InputExample`s
+        Returns:
+            columns (dict): feature name to array, the first dimension of which is the example index
+        """
+        columns = {}
+        for name, dtype, shape in EXAMPLE_COLUMNS:
+            if name == "service_id":
+                values = [ex.service_schema.service_id for ex in examples]
+            else:
+                values = [getattr(ex, name) for ex in examples]
+            columns[name] = np.array(values, dtype=dtype).reshape((len(examples),) + shape(self.schema_config))
+        return columns
+
+    @staticmethod
+    def _save_columns(dial_file, columns):
+        """
+        Saves the example features as memory-mappable .npy files in the dial_file folder. The folder is written
+        under a temporary name and renamed when complete, so an interrupted run does not leave partial examples.
+        """
+        tmp_dir = dial_file + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, array in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        shutil.rmtree(dial_file, ignore_errors=True)
+        os.rename(tmp_dir, dial_file)
+
     def _create_examples_from_dialog(self, dialog, schemas, dataset, slot_carryover_candlist):
         """
         Create examples for every turn in the dialog.
@@ -21,6 +21,8 @@ https://github.com/google-research/google-research/blob/master/schema_guided_dst
 import numpy as np
 from torch.utils.data import Dataset
 
+from nemo.collections.nlp.data.datasets.sgd_dataset.data_processor import EXAMPLE_COLUMNS
+
 __all__ = ['SGDDataset']
 
 
@@ -33,35 +35,11 @@ class SGDDataset(Dataset):
     """
 
     def __init__(self, dataset_split, dialogues_processor):
+        # memory-mapped feature arrays, shared by the data loader workers through the page cache
         self.features = dialogues_processor.get_dialog_examples(dataset_split)
 
     def __len__(self):
-        return len(self.features)
+        return len(self.features['example_id_num'])
 
     def __getitem__(self, idx):
-        ex = self.features[idx]
-        service_id = ex.service_schema.service_id
-
-        return (
-            np.array(ex.example_id_num),
-            np.array(service_id),
-            np.array(ex.is_real_example, dtype=int),
-            np.array(ex.utterance_ids),
-            np.array(ex.utterance_segment),
-            np.array(ex.utterance_mask, dtype=np.long),
-            np.array(ex.categorical_slot_status),
-            np.array(ex.cat_slot_status_mask),
-            np.array(ex.categorical_slot_values),
-            np.array(ex.cat_slot_values_mask),
-            np.array(ex.noncategorical_slot_status),
-            np.array(ex.noncat_slot_status_mask),
-            np.array(ex.noncategorical_slot_value_start),
-            np.array(ex.noncategorical_slot_value_end),
-            np.array(ex.start_char_idx),  # noncat_alignment_start
-            np.array(ex.end_char_idx),  # noncat_alignment_end
-            np.array(ex.num_slots),  # num_requested_slots
-            np.array(ex.requested_slot_status, dtype=np.float32),
-            np.array(ex.requested_slot_mask),
-            np.array(ex.intent_status_mask),
-            np.array(ex.intent_status_labels),
-        )
+        return tuple(np.array(self.features[name][idx]) for name, _, _ in EXAMPLE_COLUMNS)
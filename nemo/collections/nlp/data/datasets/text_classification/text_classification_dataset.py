@@ -23,7 +23,6 @@ https://github.com/huggingface/pytorch-pretrained-BERT
 import os
 import random
 
-import h5py
 import numpy as np
 from torch.utils.data import Dataset
 
@@ -202,6 +201,8 @@ class BertTextClassificationDataset(Dataset):
             input_mask_array[idx] = features[idx].input_mask
             sent_labels_array[idx] = features[idx].sent_label
 
+        import h5py
+
         f = h5py.File(cached_features_file, mode='w')
         f.create_dataset('input_ids', data=input_ids_array)
         f.create_dataset('segment_ids', data=segment_ids_array)
@@ -210,6 +211,8 @@ class BertTextClassificationDataset(Dataset):
         f.close()
 
     def load_cached_features(self, cached_features_file):
+        import h5py
+
         f = h5py.File(cached_features_file, 'r')
         keys = ['input_ids', 'segment_ids', 'input_mask', 'sent_labels']
         self.features = [np.asarray(f[key], dtype=np.long) for key in keys]
@@ -1474,26 +1474,23 @@ def sentence_bleu(
     return bleu.score
 
 
-def corpus_bleu(
+def corpus_bleu_statistics(
     sys_stream: Union[str, Iterable[str]],
     ref_streams: Union[str, List[Iterable[str]]],
-    smooth_method='exp',
-    smooth_value=SMOOTH_VALUE_DEFAULT,
     force=False,
     lowercase=False,
     tokenize=DEFAULT_TOKENIZER,
-    use_effective_order=False,
-) -> BLEU:
-    """Produces BLEU scores along with its sufficient statistics from a
-    source against one or more references.
+) -> Tuple[List[int], List[int], int, int]:
+    """Computes the sufficient statistics of BLEU for a source against one or
+    more references. The statistics of disjoint parts of a corpus can be summed
+    element-wise and passed to compute_bleu() to get the corpus score.
 
     :param sys_stream: The system stream (a sequence of segments) :param
     ref_streams: A list of one or more reference streams (each a sequence of
-    segments) :param smooth: The smoothing method to use :param smooth_value:
-    For 'floor' smoothing, the floor to use :param force: Ignore data that
-    looks already tokenized :param lowercase: Lowercase the data :param
-    tokenize: The tokenizer to use :return: a BLEU object containing
-    everything you'd want
+    segments) :param force: Ignore data that looks already tokenized :param
+    lowercase: Lowercase the data :param tokenize: The tokenizer to use
+    :return: counts of correct ngrams, counts of total ngrams, the system
+    length and the reference length
     """
 
     # Add some robustness to the input arguments
@@ -1545,6 +1542,35 @@ def corpus_bleu(
             correct[n - 1] += min(sys_ngrams[ngram], ref_ngrams.get(ngram, 0))
             total[n - 1] += sys_ngrams[ngram]
 
+    return correct, total, sys_len, ref_len
+
+
+def corpus_bleu(
+    sys_stream: Union[str, Iterable[str]],
+    ref_streams: Union[str, List[Iterable[str]]],
+    smooth_method='exp',
+    smooth_value=SMOOTH_VALUE_DEFAULT,
+    force=False,
+    lowercase=False,
+    tokenize=DEFAULT_TOKENIZER,
+    use_effective_order=False,
+) -> BLEU:
+    """Produces BLEU scores along with its sufficient statistics from a
+    source against one or more references.
+
+    :param sys_stream: The system stream (a sequence of segments) :param
+    ref_streams: A list of one or more reference streams (each a sequence of
+    segments) :param smooth: The smoothing method to use :param smooth_value:
+    For 'floor' smoothing, the floor to use :param force: Ignore data that
+    looks already tokenized :param lowercase: Lowercase the data :param
+    tokenize: The tokenizer to use :return: a BLEU object containing
+    everything you'd want
+    """
+
+    correct, total, sys_len, ref_len = corpus_bleu_statistics(
+        sys_stream, ref_streams, force=force, lowercase=lowercase, tokenize=tokenize
+    )
+
     return compute_bleu(
         correct,
         total,
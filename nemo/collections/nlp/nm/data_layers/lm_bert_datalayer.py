@@ -16,8 +16,9 @@
 
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-import h5py
 import numpy as np
 import torch
 from torch.utils import data as pt_data
@@ -87,11 +88,18 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
     """
     Data layer for masked language modeling task for preprocessed data.
 
+    The next file is prepared in the background while the batches of a file are produced.
+
     Args:
         dataset (str): directory or a single file with dataset documents
         max_seq_length (int): maximum allowed length of the text segments
         batch_size (int): batch size in segments
         mode (str): model execution mode, e.g. "training"
+        lazy (bool): whether to read the samples from the files batch by
+            batch instead of loading each file whole. The samples are then
+            shuffled by blocks of contiguous samples, which are read at once,
+            and within the blocks. Defaults to False.
+        num_workers (int): See PyTorch DataLoader. Defaults to 0.
     """
 
     @property
@@ -118,7 +126,7 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         }
 
     def __init__(
-        self, dataset, max_pred_length, mode, batch_size=64,
+        self, dataset, max_pred_length, mode, batch_size=64, lazy=False, num_workers=0,
     ):
         super().__init__()
         if os.path.isdir(dataset):
@@ -132,6 +140,10 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         self._batch_size = batch_size
         self.max_pred_length = max_pred_length
         self.mode = mode
+        self.lazy = lazy
+        self._num_workers = num_workers
+        import h5py
+
         total_length = 0
         for f in self.files:
             fp = h5py.File(f, 'r')
@@ -139,21 +151,35 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
             fp.close()
         self.total_length = total_length
 
-    def _collate_fn(self, x):
-        num_components = len(x[0])
-        components = [[] for _ in range(num_components)]
-        batch_size = len(x)
-        for i in range(batch_size):
-            for j in range(num_components):
-                components[j].append(x[i][j])
-        src_ids, src_segment_ids, src_mask, tgt_ids, tgt_mask, sent_ids = [np.stack(x, axis=0) for x in components]
-        src_ids = torch.Tensor(src_ids).long().to(self._device)
-        src_segment_ids = torch.Tensor(src_segment_ids).long().to(self._device)
-        src_mask = torch.Tensor(src_mask).long().to(self._device)
-        tgt_ids = torch.Tensor(tgt_ids).long().to(self._device)
-        tgt_mask = torch.Tensor(tgt_mask).long().to(self._device)
-        sent_ids = torch.Tensor(sent_ids).long().to(self._device)
-        return src_ids, src_segment_ids, src_mask, tgt_ids, tgt_mask, sent_ids
+    @staticmethod
+    def _collate_fn(dataset, batch):
+        """Builds the masks of a batch of stacked samples read by the dataset."""
+        return tuple(torch.from_numpy(np.asarray(x)).long() for x in dataset.mask_batch(*batch))
+
+    def _batches(self, dataset):
+        """Indices of the samples of every batch of a file, in random order."""
+        num_samples = len(dataset)
+        if self.lazy:
+            # Random blocks, in random order within the blocks
+            blocks = np.arange(num_samples) // dataset.block_size
+            block_order = np.random.permutation(blocks[-1] + 1 if num_samples else 0)
+            order = np.lexsort((np.random.rand(num_samples), block_order[blocks]))
+        else:
+            order = np.random.permutation(num_samples)
+        return [order[i : i + self._batch_size] for i in range(0, num_samples, self._batch_size)]
+
+    def _load(self, data_file):
+        train_data = BertPretrainingPreprocessedDataset(
+            input_file=data_file, max_pred_length=self.max_pred_length, lazy=self.lazy, block_size=self._batch_size
+        )
+        if self.lazy and hasattr(os, 'posix_fadvise'):
+            # Lets the system read the file ahead into its page cache
+            fd = os.open(data_file, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        return train_data
 
     def __len__(self):
         return self.total_length
@@ -164,23 +190,24 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
 
     @property
     def data_iterator(self):
-        while True:
-            if self.mode == "train":
-                random.shuffle(self.files)
-            for f_id in range(self.num_files):
-                data_file = self.files[f_id]
-                train_data = BertPretrainingPreprocessedDataset(
-                    input_file=data_file, max_pred_length=self.max_pred_length
-                )
-                train_sampler = pt_data.RandomSampler(train_data)
-                train_dataloader = pt_data.DataLoader(
-                    dataset=train_data,
-                    batch_size=self._batch_size,
-                    collate_fn=self._collate_fn,
-                    shuffle=False,
-                    sampler=train_sampler,
-                )
-                for x in train_dataloader:
-                    yield x
-            if self.mode != "train":
-                break
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                if self.mode == "train":
+                    random.shuffle(self.files)
+                next_data = executor.submit(self._load, self.files[0])
+                for f_id in range(self.num_files):
+                    train_data = next_data.result()
+                    if f_id + 1 < self.num_files:
+                        next_data = executor.submit(self._load, self.files[f_id + 1])
+                    # The dataset reads whole batches, one per sampled list of indices
+                    train_dataloader = pt_data.DataLoader(
+                        dataset=train_data,
+                        batch_size=None,
+                        sampler=self._batches(train_data),
+                        collate_fn=partial(self._collate_fn, train_data),
+                        num_workers=self.num_workers,
+                    )
+                    for x in train_dataloader:
+                        yield x
+                if self.mode != "train":
+                    break
@@ -36,6 +36,8 @@ class LanguageModelingDataLayer(TextDataLayer):
         dataset_type (Dataset):
                 the underlying dataset. Default: LanguageModelingDataset
         shuffle (bool): whether to shuffle data or not. Default: False.
+        random_offset (bool): whether to shift every text segment by a random number of tokens smaller than
+            batch_step when it is loaded. Default: False.
     """
 
     @property
@@ -64,11 +66,13 @@ class LanguageModelingDataLayer(TextDataLayer):
         batch_step=128,
         dataset_type=LanguageModelingDataset,
         shuffle=False,
+        random_offset=False,
     ):
         dataset_params = {
             'dataset': dataset,
             'tokenizer': tokenizer,
             'max_seq_length': max_seq_length,
             'batch_step': batch_step,
+            'random_offset': random_offset,
         }
         super().__init__(dataset_type, dataset_params, batch_size, shuffle=shuffle)
@@ -39,7 +39,7 @@
 import torch
 
 from nemo.backends.pytorch.nm import LossNM
-from nemo.core.neural_types import LabelsType, Length, LogitsType, LossType, NeuralType
+from nemo.core.neural_types import LabelsType, Length, LogitsType, LogprobsType, LossType, NeuralType
 from nemo.utils.decorators import add_port_docs
 
 __all__ = ['MaskedLogLoss']
@@ -52,6 +52,7 @@ class MaskedLogLoss(LossNM):
     Args:
         logits (float): output of the classifier
         labels (long): ground truth targets
+        log_probs (float): log-probabilities of the ground truth targets, used instead of logits and labels
         loss_mask (long): specifies the ones to get ignored in loss calculation
 
 
@@ -66,12 +67,15 @@ class MaskedLogLoss(LossNM):
 
         labels: 3d tensor of labels
 
+        log_probs: 3d tensor of log-probabilities of the labels, used instead of logits and labels
+
         loss_mask: specifies the words to be considered in the loss calculation
 
         """
         return {
-            "logits": NeuralType(('B', 'T', 'D', 'D'), LogitsType()),
-            "labels": NeuralType(('B', 'D', 'T'), LabelsType()),
+            "logits": NeuralType(('B', 'T', 'D', 'D'), LogitsType(), optional=True),
+            "labels": NeuralType(('B', 'D', 'T'), LabelsType(), optional=True),
+            "log_probs": NeuralType(('B', 'D', 'T'), LogprobsType(), optional=True),
             "length_mask": NeuralType(('B', 'D'), Length()),
         }
 
@@ -86,12 +90,15 @@ class MaskedLogLoss(LossNM):
     def __init__(self):
         LossNM.__init__(self)
 
-    def _loss_function(self, logits, labels, length_mask, eps=1e-10):
-        logits_flat = logits.view(-1, logits.size(-1))
-        log_probs_flat = torch.log(torch.clamp(logits_flat, min=eps))
-        labels_flat = labels.view(-1, 1)
-        losses_flat = -torch.gather(log_probs_flat, dim=1, index=labels_flat)
-        losses = losses_flat.view(*labels.size())
+    def _loss_function(self, length_mask, logits=None, labels=None, log_probs=None, eps=1e-10):
+        if log_probs is not None:
+            losses = -log_probs
+        else:
+            logits_flat = logits.view(-1, logits.size(-1))
+            log_probs_flat = torch.log(torch.clamp(logits_flat, min=eps))
+            labels_flat = labels.view(-1, 1)
+            losses_flat = -torch.gather(log_probs_flat, dim=1, index=labels_flat)
+            losses = losses_flat.view(*labels.size())
         loss = self.masking(losses, length_mask)
         return loss
 
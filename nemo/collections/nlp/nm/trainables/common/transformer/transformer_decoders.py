@@ -20,11 +20,11 @@ import copy
 import torch
 import torch.nn as nn
 
+from nemo.backends.pytorch.common.activation_checkpointing import ActivationCheckpointing
 from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import (
     MultiHeadAttention,
     PositionWiseFF,
 )
-from nemo.collections.nlp.utils.transformer_utils import form_attention_mask
 
 __all__ = []
 
@@ -43,6 +43,8 @@ class TransformerDecoderBlock(nn.Module):
             attention layers, but before layer normalization
         ffn_dropout: probability of dropout applied to FFN output
         hidden_act: activation function used between two linear layers in FFN
+        memory_efficient_attention: whether to use the fused scaled dot-product
+            attention kernel of PyTorch in the attention layers
     """
 
     def __init__(
@@ -54,30 +56,38 @@ class TransformerDecoderBlock(nn.Module):
         attn_layer_dropout=0,
         ffn_dropout=0,
         hidden_act="relu",
+        memory_efficient_attention=False,
     ):
         super().__init__()
 
         self.first_sub_layer = MultiHeadAttention(
-            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout
+            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout, memory_efficient_attention
         )
         self.second_sub_layer = MultiHeadAttention(
-            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout
+            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout, memory_efficient_attention
         )
         self.third_sub_layer = PositionWiseFF(hidden_size, inner_size, ffn_dropout, hidden_act)
 
     def forward(self, decoder_query, decoder_mask, decoder_keys, encoder_states, encoder_mask):
-        self_attn_output = self.first_sub_layer(decoder_query, decoder_keys, decoder_keys, decoder_mask)
-        enc_dec_attn_output = self.second_sub_layer(self_attn_output, encoder_states, encoder_states, encoder_mask)
+        self_attn_output = self.first_sub_layer(
+            decoder_query, decoder_keys, decoder_keys, key_padding_mask=decoder_mask, diagonal=0
+        )
+        enc_dec_attn_output = self.second_sub_layer(
+            self_attn_output, encoder_states, encoder_states, key_padding_mask=encoder_mask
+        )
         output_states = self.third_sub_layer(enc_dec_attn_output)
         return output_states
 
 
 class TransformerDecoder(nn.Module):
-    def __init__(self, num_layers, hidden_size, **kwargs):
+    def __init__(self, num_layers, hidden_size, activation_checkpointing_every=0, **kwargs):
         super().__init__()
 
         layer = TransformerDecoderBlock(hidden_size, **kwargs)
         self.layers = nn.ModuleList([copy.deepcopy(layer) for _ in range(num_layers)])
+        self.activation_checkpointing = ActivationCheckpointing(
+            activation_checkpointing_every, name="Transformer decoder layers"
+        )
 
     def _get_memory_states(self, decoder_states, decoder_mems_list=None, i=0):
         if decoder_mems_list is not None:
@@ -102,16 +112,16 @@ class TransformerDecoder(nn.Module):
                 or the last layer only
         """
 
-        decoder_attn_mask = form_attention_mask(decoder_mask, diagonal=0)
-        encoder_attn_mask = form_attention_mask(encoder_mask)
-
         memory_states = self._get_memory_states(decoder_states, decoder_mems_list, 0)
         cached_mems_list = [memory_states]
 
-        for i, layer in enumerate(self.layers):
-            decoder_states = layer(decoder_states, decoder_attn_mask, memory_states, encoder_states, encoder_attn_mask)
-            memory_states = self._get_memory_states(decoder_states, decoder_mems_list, i + 1)
-            cached_mems_list.append(memory_states)
+        with self.activation_checkpointing.forward(self, len(self.layers)) as run_layer:
+            for i, layer in enumerate(self.layers):
+                decoder_states = run_layer(
+                    i, layer, decoder_states, decoder_mask, memory_states, encoder_states, encoder_mask
+                )
+                memory_states = self._get_memory_states(decoder_states, decoder_mems_list, i + 1)
+                cached_mems_list.append(memory_states)
 
         if return_mems:
             return cached_mems_list
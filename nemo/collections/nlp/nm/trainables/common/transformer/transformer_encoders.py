@@ -20,12 +20,12 @@ import copy
 import torch
 import torch.nn as nn
 
+from nemo.backends.pytorch.common.activation_checkpointing import ActivationCheckpointing
 from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import (
     MultiHeadAttention,
     PositionWiseFF,
     TwoStreamSelfAttention,
 )
-from nemo.collections.nlp.utils.transformer_utils import form_attention_mask
 
 __all__ = []
 
@@ -44,6 +44,8 @@ class TransformerEncoderBlock(nn.Module):
             attention layers, but before layer normalization
         ffn_dropout: probability of dropout applied to FFN output
         hidden_act: activation function used between two linear layers in FFN
+        memory_efficient_attention: whether to use the fused scaled dot-product
+            attention kernel of PyTorch in the attention layers
     """
 
     def __init__(
@@ -55,27 +57,33 @@ class TransformerEncoderBlock(nn.Module):
         attn_layer_dropout=0,
         ffn_dropout=0,
         hidden_act="relu",
+        memory_efficient_attention=False,
     ):
         super().__init__()
 
         self.first_sub_layer = MultiHeadAttention(
-            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout
+            hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout, memory_efficient_attention
         )
         self.second_sub_layer = PositionWiseFF(hidden_size, inner_size, ffn_dropout, hidden_act)
 
-    def forward(self, encoder_query, encoder_mask, encoder_keys):
-        self_attn_output = self.first_sub_layer(encoder_query, encoder_keys, encoder_keys, encoder_mask)
+    def forward(self, encoder_query, encoder_mask, encoder_keys, diagonal=None):
+        self_attn_output = self.first_sub_layer(
+            encoder_query, encoder_keys, encoder_keys, key_padding_mask=encoder_mask, diagonal=diagonal
+        )
         output_states = self.second_sub_layer(self_attn_output)
         return output_states
 
 
 class TransformerEncoder(nn.Module):
-    def __init__(self, num_layers, hidden_size, mask_future=False, **kwargs):
+    def __init__(self, num_layers, hidden_size, mask_future=False, activation_checkpointing_every=0, **kwargs):
         super().__init__()
 
         layer = TransformerEncoderBlock(hidden_size, **kwargs)
         self.layers = nn.ModuleList([copy.deepcopy(layer) for _ in range(num_layers)])
         self.diag = 0 if mask_future else None
+        self.activation_checkpointing = ActivationCheckpointing(
+            activation_checkpointing_every, name="Transformer encoder layers"
+        )
 
     def _get_memory_states(self, encoder_states, encoder_mems_list=None, i=0):
         if encoder_mems_list is not None:
@@ -96,15 +104,14 @@ class TransformerEncoder(nn.Module):
                 or the last layer only
         """
 
-        encoder_attn_mask = form_attention_mask(encoder_mask, self.diag)
-
         memory_states = self._get_memory_states(encoder_states, encoder_mems_list, 0)
         cached_mems_list = [memory_states]
 
-        for i, layer in enumerate(self.layers):
-            encoder_states = layer(encoder_states, encoder_attn_mask, memory_states)
-            memory_states = self._get_memory_states(encoder_states, encoder_mems_list, i + 1)
-            cached_mems_list.append(memory_states)
+        with self.activation_checkpointing.forward(self, len(self.layers)) as run_layer:
+            for i, layer in enumerate(self.layers):
+                encoder_states = run_layer(i, layer, encoder_states, encoder_mask, memory_states, self.diag)
+                memory_states = self._get_memory_states(encoder_states, encoder_mems_list, i + 1)
+                cached_mems_list.append(memory_states)
 
         if return_mems:
             return cached_mems_list
@@ -130,10 +137,8 @@ class XLNetEncoderBlock(nn.Module):
         )
         self.second_sub_layer = PositionWiseFF(hidden_size, inner_size, ffn_dropout, hidden_act)
 
-    def forward(self, query_states, content_states, query_attn_mask, content_attn_mask):
-        output_query_states, output_content_states = self.first_sub_layer(
-            query_states, content_states, query_attn_mask, content_attn_mask
-        )
+    def forward(self, query_states, content_states, input_mask):
+        output_query_states, output_content_states = self.first_sub_layer(query_states, content_states, input_mask)
         output_content_states = self.second_sub_layer(output_content_states)
         return output_query_states, output_content_states
 
@@ -146,8 +151,6 @@ class XLNetEncoder(nn.Module):
         self.layers = nn.ModuleList([copy.deepcopy(layer) for _ in range(num_layers)])
 
     def forward(self, query_states, content_states, input_mask):
-        query_attn_mask = form_attention_mask(input_mask, diagonal=-1)
-        content_attn_mask = form_attention_mask(input_mask, diagonal=0)
         for layer in self.layers:
-            query_states, content_states = layer(query_states, content_states, query_attn_mask, content_attn_mask)
+            query_states, content_states = layer(query_states, content_states, input_mask)
         return query_states, content_states
@@ -18,10 +18,12 @@
 import math
 
 import torch
+import torch.nn.functional as F
 from torch import nn
 
 from nemo import logging
 from nemo.collections.nlp.utils.functional_utils import gelu
+from nemo.collections.nlp.utils.transformer_utils import form_future_bias, form_padding_bias
 
 __all__ = []
 
@@ -125,15 +127,25 @@ class MultiHeadAttention(nn.Module):
     """
     Multi-head scaled dot-product attention layer.
 
+    The query, key and value projections are stored as one fused qkv_net
+    layer, which computes all three with a single matmul in self-attention.
+    Checkpoints with separate query_net, key_net and value_net layers are
+    converted to it when loaded.
+
     Args:
         hidden_size: size of the embeddings in the model, also known as d_model
         num_attention_heads: number of heads in multi-head attention
         attn_score_dropout: probability of dropout applied to attention scores
         attn_layer_dropout: probability of dropout applied to the output of the
             whole layer, but before layer normalization
+        memory_efficient: bool, whether to use the fused (flash or memory
+            efficient) scaled dot-product attention kernel of PyTorch, if
+            available, which does not materialize the attention scores
     """
 
-    def __init__(self, hidden_size, num_attention_heads, attn_score_dropout=0.0, attn_layer_dropout=0.0):
+    def __init__(
+        self, hidden_size, num_attention_heads, attn_score_dropout=0.0, attn_layer_dropout=0.0, memory_efficient=False,
+    ):
         super().__init__()
         if hidden_size % num_attention_heads != 0:
             raise ValueError(
@@ -144,42 +156,97 @@ class MultiHeadAttention(nn.Module):
         self.num_attention_heads = num_attention_heads
         self.attn_head_size = int(hidden_size / num_attention_heads)
         self.attn_scale = math.sqrt(math.sqrt(self.attn_head_size))
+        self.memory_efficient = memory_efficient and hasattr(F, 'scaled_dot_product_attention')
 
-        self.query_net = nn.Linear(hidden_size, hidden_size)
-        self.key_net = nn.Linear(hidden_size, hidden_size)
-        self.value_net = nn.Linear(hidden_size, hidden_size)
+        self.qkv_net = nn.Linear(hidden_size, 3 * hidden_size)
+        self.qkv_net.num_fused_layers = 3
         self.out_projection = nn.Linear(hidden_size, hidden_size)
 
         self.attn_dropout = nn.Dropout(attn_score_dropout)
         self.layer_dropout = nn.Dropout(attn_layer_dropout)
         self.layer_norm = FusedLayerNorm(hidden_size, eps=1e-5)
 
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        for name in ('weight', 'bias'):
+            separate_keys = [f"{prefix}{net}.{name}" for net in ('query_net', 'key_net', 'value_net')]
+            if all(key in state_dict for key in separate_keys):
+                state_dict[f"{prefix}qkv_net.{name}"] = torch.cat([state_dict.pop(key) for key in separate_keys])
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
     def transpose_for_scores(self, x):
         new_x_shape = x.size()[:-1] + (self.num_attention_heads, self.attn_head_size)
         x = x.view(*new_x_shape)
         return x.permute(0, 2, 1, 3)
 
-    def forward(self, queries, keys, values, attention_mask):
+    def _project(self, queries, keys, values):
+        if queries is keys and keys is values:
+            return self.qkv_net(queries).chunk(3, dim=-1)
 
-        # attention_mask is needed to hide the tokens which correspond to [PAD]
-        # in the case of BERT, or to hide the future tokens in the case of
-        # vanilla language modeling and translation
-        query = self.query_net(queries)
-        key = self.key_net(keys)
-        value = self.value_net(values)
-        query = self.transpose_for_scores(query) / self.attn_scale
-        key = self.transpose_for_scores(key) / self.attn_scale
-        value = self.transpose_for_scores(value)
+        weight, bias = self.qkv_net.weight, self.qkv_net.bias
+        hidden_size = self.hidden_size
+        query = F.linear(queries, weight[:hidden_size], bias[:hidden_size])
+        if keys is values:
+            key, value = F.linear(keys, weight[hidden_size:], bias[hidden_size:]).chunk(2, dim=-1)
+        else:
+            key = F.linear(keys, weight[hidden_size : 2 * hidden_size], bias[hidden_size : 2 * hidden_size])
+            value = F.linear(values, weight[2 * hidden_size :], bias[2 * hidden_size :])
+        return query, key, value
 
-        # for numerical stability we pre-divide query and key by sqrt(sqrt(d))
-        # and perform attention probs computation in float32
-        attention_scores = torch.matmul(query, key.transpose(-1, -2)).float()
+    def _attention_biases(self, query, key, attention_mask, key_padding_mask, diagonal):
+        """Additive biases of the attention scores, each broadcast over the dimensions it does not depend on."""
+        biases = []
         if attention_mask is not None:
-            attention_scores = attention_scores + attention_mask.float()
-        attention_probs = torch.softmax(attention_scores, dim=-1).to(key.dtype)
-        attention_probs = self.attn_dropout(attention_probs)
+            biases.append(attention_mask.to(query.dtype))
+        if key_padding_mask is not None:
+            biases.append(form_padding_bias(key_padding_mask, query.dtype))
+        if diagonal is not None:
+            biases.append(form_future_bias(query.shape[2], key.shape[2], diagonal, query.device, query.dtype))
+        return biases
+
+    def forward(self, queries, keys, values, attention_mask=None, key_padding_mask=None, diagonal=None):
+        """
+        Args:
+            queries: B x L_q x H
+            keys: B x L_k x H
+            values: B x L_k x H
+            attention_mask: additive mask of the attention scores, broadcast
+                to B x num_heads x L_q x L_k, see form_attention_mask
+            key_padding_mask: binary mask of the keys (B x L_k) with 0s for
+                padding tokens, e.g. to hide the [PAD] tokens
+            diagonal: if not None, hides the future tokens, e.g. in language
+                modeling and translation, see form_attention_mask
+
+        The masks given by key_padding_mask and diagonal are broadcast to the
+        attention scores, none of size B x L_q x L_k is built.
+        """
+        query, key, value = self._project(queries, keys, values)
+        query = self.transpose_for_scores(query)
+        key = self.transpose_for_scores(key)
+        value = self.transpose_for_scores(value)
+        biases = self._attention_biases(query, key, attention_mask, key_padding_mask, diagonal)
+
+        if self.memory_efficient:
+            dropout_p = self.attn_dropout.p if self.training else 0.0
+            if not biases:
+                context = F.scaled_dot_product_attention(query, key, value, dropout_p=dropout_p)
+            elif len(biases) == 1 and diagonal == 0 and query.shape[2] == key.shape[2]:
+                context = F.scaled_dot_product_attention(query, key, value, dropout_p=dropout_p, is_causal=True)
+            else:
+                # The kernel takes a single mask
+                attn_mask = biases[0]
+                for bias in biases[1:]:
+                    attn_mask = attn_mask + bias
+                context = F.scaled_dot_product_attention(query, key, value, attn_mask=attn_mask, dropout_p=dropout_p)
+        else:
+            # for numerical stability we pre-divide query and key by sqrt(sqrt(d)),
+            # the softmax kernels accumulate in float32 for half precision scores
+            attention_scores = torch.matmul(query / self.attn_scale, key.transpose(-1, -2) / self.attn_scale)
+            for bias in biases:
+                attention_scores = attention_scores + bias
+            attention_probs = torch.softmax(attention_scores, dim=-1)
+            attention_probs = self.attn_dropout(attention_probs)
+            context = torch.matmul(attention_probs, value)
 
-        context = torch.matmul(attention_probs, value)
         context = context.permute(0, 2, 1, 3).contiguous()
         new_context_shape = context.size()[:-2] + (self.hidden_size,)
         context = context.view(*new_context_shape)
@@ -264,10 +331,12 @@ class TwoStreamSelfAttention(nn.Module):
             hidden_size, num_attention_heads, attn_score_dropout, attn_layer_dropout
         )
 
-    def forward(self, query_states, content_states, query_attention_mask, content_attention_mask):
-        output_query_states = self.query_stream(query_states, content_states, content_states, query_attention_mask)
+    def forward(self, query_states, content_states, input_mask):
+        output_query_states = self.query_stream(
+            query_states, content_states, content_states, key_padding_mask=input_mask, diagonal=-1
+        )
         output_content_states = self.content_stream(
-            query_states, content_states, content_states, content_attention_mask
+            query_states, content_states, content_states, key_padding_mask=input_mask, diagonal=0
         )
         return output_query_states, output_content_states
 
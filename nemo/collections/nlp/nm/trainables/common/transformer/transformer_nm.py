@@ -56,6 +56,11 @@ class TransformerEncoderNM(TrainableNM):
         attn_score_dropout: dropout ratio applied to attention scores
         attn_layer_dropout: dropout ratio applied to the output of attn layer
         hidden_act: activation function applied in intermediate FFN module
+        activation_checkpointing_every: recompute the activations of every
+            k-th layer during the backward pass instead of keeping them in
+            memory, which trades compute for memory while training, 0 disables it
+        memory_efficient_attention: bool, whether to use the fused (flash or
+            memory efficient) scaled dot-product attention kernel of PyTorch
     """
 
     @property
@@ -93,6 +98,8 @@ class TransformerEncoderNM(TrainableNM):
         learn_positional_encodings=False,
         hidden_act='relu',
         mask_future=False,
+        activation_checkpointing_every=0,
+        memory_efficient_attention=False,
     ):
         super().__init__()
 
@@ -113,6 +120,8 @@ class TransformerEncoderNM(TrainableNM):
             hidden_act=hidden_act,
             attn_score_dropout=attn_score_dropout,
             attn_layer_dropout=attn_layer_dropout,
+            activation_checkpointing_every=activation_checkpointing_every,
+            memory_efficient_attention=memory_efficient_attention,
         )
 
         std_init_range = 1 / math.sqrt(d_model)
@@ -146,6 +155,11 @@ class TransformerDecoderNM(TrainableNM):
         attn_score_dropout: dropout ratio applied to attention scores
         attn_layer_dropout: dropout ratio applied to the output of attn layer
         hidden_act: activation function applied in intermediate FFN module
+        activation_checkpointing_every: recompute the activations of every
+            k-th layer during the backward pass instead of keeping them in
+            memory, which trades compute for memory while training, 0 disables it
+        memory_efficient_attention: bool, whether to use the fused (flash or
+            memory efficient) scaled dot-product attention kernel of PyTorch
     """
 
     @property
@@ -186,6 +200,8 @@ class TransformerDecoderNM(TrainableNM):
         attn_layer_dropout=0.0,
         learn_positional_encodings=False,
         hidden_act='relu',
+        activation_checkpointing_every=0,
+        memory_efficient_attention=False,
     ):
         super().__init__()
 
@@ -205,6 +221,8 @@ class TransformerDecoderNM(TrainableNM):
             hidden_act=hidden_act,
             attn_score_dropout=attn_score_dropout,
             attn_layer_dropout=attn_layer_dropout,
+            activation_checkpointing_every=activation_checkpointing_every,
+            memory_efficient_attention=memory_efficient_attention,
         )
 
         std_init_range = 1 / math.sqrt(d_model)
@@ -34,6 +34,15 @@ from nemo.utils.decorators import add_port_docs
 __all__ = ['SGDDecoderNM']
 
 
+def _project_concatenation(layer, first, second):
+    """Computes layer(torch.cat([first, second], dim=-1)) for inputs that only match after broadcasting, without
+    materializing the broadcast or concatenated inputs: the weight of the linear layer is split into the parts
+    multiplying each input, the inputs are projected separately and the projections are added.
+    """
+    dim = first.size(-1)
+    return F.linear(first, layer.weight[:, :dim], layer.bias) + F.linear(second, layer.weight[:, dim:])
+
+
 class LogitsAttention(nn.Module):
     def __init__(self, num_classes, embedding_dim):
         """Get logits for elements by using attention on token embedding.
@@ -122,17 +131,12 @@ class Logits(nn.Module):
         element_embeddings: A tensor of shape (batch_size, num_elements, embedding_dim).
         utterance_mask: binary mask for token_embeddings, 1 for real tokens 0 for padded tokens. Not used
         """
-        _, num_elements, _ = element_embeddings.size()
-
         # Project the utterance embeddings.
         utterance_embedding = self.utterance_proj(encoded_utterance)
         utterance_embedding = self.activation(utterance_embedding)
 
-        # Combine the utterance and element embeddings.
-        repeated_utterance_embedding = utterance_embedding.unsqueeze(1).repeat(1, num_elements, 1)
-
-        utterance_element_emb = torch.cat([repeated_utterance_embedding, element_embeddings], axis=2)
-        logits = self.layer1(utterance_element_emb)
+        # Combine the utterance and element embeddings, broadcasting the utterance over the elements.
+        logits = _project_concatenation(self.layer1, utterance_embedding.unsqueeze(1), element_embeddings)
         logits = self.activation(logits)
         logits = self.layer2(logits)
         return logits
@@ -314,8 +318,8 @@ class SGDDecoderNM(TrainableNM):
         batch_size = intent_embeddings.size()[0]
 
         # Add a trainable vector for the NONE intent.
-        repeated_none_intent_vector = self.none_intent_vector.repeat(batch_size, 1, 1)
-        intent_embeddings = torch.cat([repeated_none_intent_vector, intent_embeddings], axis=1)
+        none_intent_vector = self.none_intent_vector.expand(batch_size, -1, -1)
+        intent_embeddings = torch.cat([none_intent_vector, intent_embeddings], axis=1)
         logits = self.intent_layer(
             encoded_utterance=encoded_utterance,
             token_embeddings=token_embeddings,
@@ -391,7 +395,6 @@ class SGDDecoderNM(TrainableNM):
         Slot status values: none, dontcare, active
         """
         # Predict the status of all non-categorical slots.
-        max_num_slots = noncat_slot_emb.size()[1]
         status_logits = self.noncat_slot_layer(
             encoded_utterance=encoded_utterance,
             token_embeddings=token_embeddings,
@@ -400,28 +403,22 @@ class SGDDecoderNM(TrainableNM):
         )
 
         # Predict the distribution for span indices.
-        max_num_tokens = token_embeddings.size()[1]
-
-        repeated_token_embeddings = token_embeddings.unsqueeze(1).repeat(1, max_num_slots, 1, 1)
-        repeated_slot_embeddings = noncat_slot_emb.unsqueeze(2).repeat(1, 1, max_num_tokens, 1)
-
-        # Shape: (batch_size, max_num_slots, max_num_tokens, 2 * embedding_dim).
-        slot_token_embeddings = torch.cat([repeated_slot_embeddings, repeated_token_embeddings], axis=3)
-
-        # Project the combined embeddings to obtain logits, Shape: (batch_size, max_num_slots, max_num_tokens, 2)
-        span_logits = self.noncat_layer1(slot_token_embeddings)
+        # Project the slot and token embeddings separately and add them, broadcasting the slots over the tokens
+        # and the tokens over the slots, instead of concatenating their
+        # (batch_size, max_num_slots, max_num_tokens, 2 * embedding_dim) combinations.
+        # Shape: (batch_size, max_num_slots, max_num_tokens, 2)
+        span_logits = _project_concatenation(
+            self.noncat_layer1, noncat_slot_emb.unsqueeze(2), token_embeddings.unsqueeze(1)
+        )
         span_logits = self.noncat_activation(span_logits)
         span_logits = self.noncat_layer2(span_logits)
 
         # Mask out invalid logits for padded tokens.
         utterance_mask = utterance_mask.to(bool)  # Shape: (batch_size, max_num_tokens).
-        repeated_utterance_mask = utterance_mask.unsqueeze(1).unsqueeze(3).repeat(1, max_num_slots, 1, 2)
-        negative_logits = (torch.finfo(span_logits.dtype).max * -0.7) * torch.ones(
-            span_logits.size(), device=self._device, dtype=span_logits.dtype
+        span_logits = span_logits.masked_fill(
+            ~utterance_mask.unsqueeze(1).unsqueeze(3), torch.finfo(span_logits.dtype).max * -0.7
         )
 
-        span_logits = torch.where(repeated_utterance_mask, span_logits, negative_logits)
-
         # Shape of both tensors: (batch_size, max_num_slots, max_num_tokens).
         span_start_logits, span_end_logits = torch.unbind(span_logits, dim=3)
         return status_logits, span_start_logits, span_end_logits
@@ -62,6 +62,12 @@ class TRADEGenerator(TrainableNM):
         slots (list): list of slots
         nb_gate (int): number of gates
         teacher_forcing (float): 0.5
+        max_res_len (int): number of decoding steps when targets are not provided
+        compact_outputs (bool): if True, outputs the predicted token ids (point_preds) and the log-probabilities
+            of the target tokens (point_log_probs, of the predicted tokens when targets are not provided) instead
+            of the full vocabulary distributions of every decoding step (point_outputs)
+        ptr_gate_id (int): id of the gate of slots whose value is generated. When targets are not provided, the
+            other slots (e.g. none/dontcare) stop decoding after the first step.
     """
 
     @property
@@ -83,14 +89,37 @@ class TRADEGenerator(TrainableNM):
         """Returns definitions of module output ports.
 
         point_outputs: outputs of the generator
+
+        point_preds: predicted token ids, if compact_outputs is set
+
+        point_log_probs: log-probabilities of the target tokens, if compact_outputs is set
+
         gate_outputs: outputs of gating heads
         """
+        if self.compact_outputs:
+            return {
+                'point_preds': NeuralType(('B', 'D', 'T'), PredictionsType()),
+                'point_log_probs': NeuralType(('B', 'D', 'T'), LogprobsType()),
+                'gate_outputs': NeuralType(('B', 'D', 'D'), LogitsType()),
+            }
         return {
             'point_outputs': NeuralType(('B', 'T', 'D', 'D'), LogitsType()),
             'gate_outputs': NeuralType(('B', 'D', 'D'), LogitsType()),
         }
 
-    def __init__(self, vocab, embeddings, hid_size, dropout, slots, nb_gate, teacher_forcing=0.5, max_res_len=10):
+    def __init__(
+        self,
+        vocab,
+        embeddings,
+        hid_size,
+        dropout,
+        slots,
+        nb_gate,
+        teacher_forcing=0.5,
+        max_res_len=10,
+        compact_outputs=False,
+        ptr_gate_id=0,
+    ):
         super().__init__()
         self.vocab_size = len(vocab)
         self.vocab = vocab
@@ -107,6 +136,8 @@ class TRADEGenerator(TrainableNM):
         self.teacher_forcing = teacher_forcing
         # max_res_len is used in evaluation mode or when targets are not provided
         self.max_res_len = max_res_len
+        self.compact_outputs = compact_outputs
+        self.ptr_gate_id = ptr_gate_id
 
         self._slots_split_to_index()
         self.slot_emb = nn.Embedding(len(self.slot_w2i), hid_size)
@@ -122,22 +153,22 @@ class TRADEGenerator(TrainableNM):
         self.domain_idx = torch.tensor([self.slot_w2i[domain] for domain in domains], device=self._device)
         self.subslot_idx = torch.tensor([self.slot_w2i[slot] for slot in slots], device=self._device)
 
-    def forward(self, encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, targets=None):
+    def forward(self, encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, targets=None, eps=1e-10):
         if (not self.training) or (random.random() > self.teacher_forcing):
             use_teacher_forcing = False
         else:
             use_teacher_forcing = True
 
+        num_slots = len(self.slots)
         batch_size = encoder_hidden.shape[0]
 
         if isinstance(targets, torch.Tensor):
             max_res_len = targets.shape[2]
-            targets = targets.transpose(0, 1)
+            # rows of the decoder are ordered slot by slot, i.e. row = slot * batch_size + batch
+            targets = targets.transpose(0, 1).reshape(num_slots * batch_size, max_res_len)
         else:
             max_res_len = self.max_res_len
-
-        all_point_outputs = torch.zeros(len(self.slots), batch_size, max_res_len, self.vocab_size, device=self._device)
-        all_gate_outputs = torch.zeros(len(self.slots), batch_size, self.nb_gate, device=self._device)
+            targets = None
 
         domain_emb = self.slot_emb(self.domain_idx).to(self._device)
         subslot_emb = self.slot_emb(self.subslot_idx).to(self._device)
@@ -145,59 +176,108 @@ class TRADEGenerator(TrainableNM):
         slot_emb = slot_emb.unsqueeze(1)
         slot_emb = slot_emb.repeat(1, batch_size, 1)
         decoder_input = self.dropout(slot_emb).view(-1, self.hidden_size)
-        hidden = encoder_hidden[:, 0:1, :].transpose(0, 1).repeat(len(self.slots), 1, 1)
+        hidden = encoder_hidden[:, 0:1, :].transpose(0, 1).repeat(num_slots, 1, 1)
 
         hidden = hidden.view(-1, self.hidden_size).unsqueeze(0)
 
-        enc_len = dialog_lens.repeat(len(self.slots))
-
         maxlen = encoder_outputs.size(1)
-        padding_mask_bool = ~(torch.arange(maxlen, device=self._device)[None, :] <= enc_len[:, None])
+        padding_mask_bool = ~(torch.arange(maxlen, device=self._device)[None, :] <= dialog_lens[:, None])
         padding_mask = torch.zeros_like(padding_mask_bool, dtype=encoder_outputs.dtype, device=self._device)
         padding_mask.masked_fill_(mask=padding_mask_bool, value=-np.inf)
 
+        # The encoder states, padding mask and dialog ids are shared by all slots and are broadcast over them
+        # (attention is computed for a [slots, batch] grid of decoder states) instead of being repeated per step
+        attention_rows = (num_slots, batch_size)
+        rows = slice(None)
+        pointer_ids = dialog_ids.repeat(num_slots, 1)
+        pointer_dist = None
+
+        if self.compact_outputs:
+            point_preds = torch.full(
+                (num_slots * batch_size, max_res_len), self.vocab.pad_id, dtype=torch.long, device=self._device
+            )
+            point_log_probs = torch.zeros(num_slots * batch_size, max_res_len, device=self._device)
+        else:
+            point_outputs = torch.zeros(num_slots * batch_size, max_res_len, self.vocab_size, device=self._device)
+
         for wi in range(max_res_len):
             dec_state, hidden = self.rnn(decoder_input.unsqueeze(1), hidden)
 
-            enc_out = encoder_outputs.repeat(len(self.slots), 1, 1)
-            context_vec, logits, prob = TRADEGenerator.attend(enc_out, hidden.squeeze(0), padding_mask)
+            context_vec, prob = TRADEGenerator.attend(
+                encoder_outputs, hidden.view(*attention_rows, self.hidden_size), padding_mask
+            )
 
             if wi == 0:
-                all_gate_outputs = torch.reshape(self.w_gate(context_vec), all_gate_outputs.size())
+                gate_outputs = self.w_gate(context_vec).view(num_slots, batch_size, self.nb_gate)
 
             p_vocab = TRADEGenerator.attend_vocab(self.embedding.weight, hidden.squeeze(0))
             p_gen_vec = torch.cat([dec_state.squeeze(1), context_vec, decoder_input], -1)
             vocab_pointer_switches = self.sigmoid(self.w_ratio(p_gen_vec))
-            p_context_ptr = torch.zeros(p_vocab.size(), device=self._device)
-
-            p_context_ptr.scatter_add_(1, dialog_ids.repeat(len(self.slots), 1), prob)
+            if torch.is_grad_enabled() or pointer_dist is None or pointer_dist.shape != p_vocab.shape:
+                pointer_dist = torch.zeros(p_vocab.size(), device=self._device)
+            else:
+                # the step buffer can only be reused when no graph keeps a reference to it
+                pointer_dist.zero_()
+            p_context_ptr = pointer_dist.scatter_add_(1, pointer_ids, prob)
 
             final_p_vocab = (1 - vocab_pointer_switches).expand_as(
                 p_context_ptr
             ) * p_context_ptr + vocab_pointer_switches.expand_as(p_context_ptr) * p_vocab
             pred_word = torch.argmax(final_p_vocab, dim=1)
 
-            all_point_outputs[:, :, wi, :] = torch.reshape(
-                final_p_vocab, (len(self.slots), batch_size, self.vocab_size)
-            )
+            if self.compact_outputs:
+                point_preds[rows, wi] = pred_word
+                output_word = targets[:, wi] if targets is not None else pred_word
+                output_p = final_p_vocab.gather(1, output_word.unsqueeze(1)).squeeze(1)
+                point_log_probs[rows, wi] = torch.log(torch.clamp(output_p, min=eps))
+            else:
+                point_outputs[rows, wi] = final_p_vocab
 
-            if use_teacher_forcing and isinstance(targets, torch.Tensor):
-                decoder_input = self.embedding(torch.flatten(targets[:, :, wi]))
+            if use_teacher_forcing and targets is not None:
+                decoder_input = self.embedding(targets[:, wi])
             else:
                 decoder_input = self.embedding(pred_word)
 
             decoder_input = decoder_input.to(self._device)
-        all_point_outputs = all_point_outputs.transpose(0, 1).contiguous()
-        all_gate_outputs = all_gate_outputs.transpose(0, 1).contiguous()
-        return all_point_outputs, all_gate_outputs
+
+            if wi == 0 and targets is None and wi + 1 < max_res_len:
+                # Slots whose value is not generated (e.g. none or dontcare) stop decoding
+                rows = torch.nonzero(gate_outputs.argmax(dim=-1).view(-1) == self.ptr_gate_id).squeeze(1)
+                if len(rows) == 0:
+                    break
+                batch_rows = rows % batch_size
+                encoder_outputs = encoder_outputs.index_select(0, batch_rows)
+                padding_mask = padding_mask.index_select(0, batch_rows)
+                pointer_ids = dialog_ids.index_select(0, batch_rows)
+                attention_rows = (1, len(rows))
+                hidden = hidden.index_select(1, rows)
+                decoder_input = decoder_input.index_select(0, rows)
+
+        gate_outputs = gate_outputs.transpose(0, 1).contiguous()
+        if self.compact_outputs:
+            point_preds = point_preds.view(num_slots, batch_size, max_res_len).transpose(0, 1).contiguous()
+            point_log_probs = point_log_probs.view(num_slots, batch_size, max_res_len).transpose(0, 1).contiguous()
+            return point_preds, point_log_probs, gate_outputs
+        point_outputs = point_outputs.view(num_slots, batch_size, max_res_len, self.vocab_size)
+        point_outputs = point_outputs.transpose(0, 1).contiguous()
+        return point_outputs, gate_outputs
 
     @staticmethod
     def attend(seq, cond, padding_mask):
-        scores_ = cond.unsqueeze(1).expand_as(seq).mul(seq).sum(2)
+        """
+        Attends the encoder states of every batch element with the decoder states of all slots.
+        Args:
+            seq (Tensor): encoder states, batch x time x hidden
+            cond (Tensor): decoder states, slots x batch x hidden
+            padding_mask (Tensor): additive mask of the padded encoder states, batch x time
+        Returns:
+            context vectors, (slots * batch) x hidden, and attention weights, (slots * batch) x time
+        """
+        scores_ = torch.einsum('sbh,bth->sbt', cond, seq)
         scores_ = scores_ + padding_mask
-        scores = F.softmax(scores_, dim=1)
-        context = scores.unsqueeze(2).expand_as(seq).mul(seq).sum(1)
-        return context, scores_, scores
+        scores = F.softmax(scores_, dim=2)
+        context = torch.einsum('sbt,bth->sbh', scores, seq)
+        return context.reshape(-1, seq.size(2)), scores.reshape(-1, seq.size(1))
 
     @staticmethod
     def attend_vocab(seq, cond):
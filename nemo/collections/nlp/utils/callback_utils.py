@@ -15,15 +15,27 @@
 # =============================================================================
 
 import os
+import random
 import time
 
 import numpy as np
-from matplotlib import pyplot as plt
+import torch
 from sklearn.metrics import classification_report, confusion_matrix, f1_score
 
 from nemo import logging
 
-__all__ = ['list2str', 'tensor2list', 'plot_confusion_matrix', 'tensor2numpy']
+__all__ = [
+    'list2str',
+    'tensor2list',
+    'plot_confusion_matrix',
+    'tensor2numpy',
+    'update_confusion_matrix',
+    'update_prediction_sample',
+    'get_prediction_sample',
+    'plot_confusion_matrix_from_cm',
+    'get_classification_report_from_cm',
+    'get_f1_scores_from_cm',
+]
 
 
 def list2str(l):
@@ -61,35 +73,61 @@ def plot_confusion_matrix(labels, preds, graph_fold, label_ids=None, normalize=F
         ids_to_labels = {label_ids[k]: k for k in label_ids}
         classes = [ids_to_labels[id] for id in sorted(label_ids.values())]
 
-        title = 'Confusion matrix'
-        cm = confusion_matrix(labels, preds)
-        if normalize:
-            sums = cm.sum(axis=1)[:, np.newaxis]
-            sums = np.where(sums == 0, 1, sums)
-            cm = cm.astype('float') / sums
-            title = 'Normalized ' + title
+        _plot_labeled_confusion_matrix(confusion_matrix(labels, preds), classes, graph_fold, normalize, prefix)
 
-        fig = plt.figure()
-        ax = fig.add_subplot(111)
 
-        cax = ax.matshow(cm)
-        ax.set_xticks(np.arange(-1, len(classes) + 1))
-        ax.set_yticks(np.arange(-1, len(classes) + 1))
-        ax.set_xticklabels([''] + classes, rotation=90)
-        ax.set_yticklabels([''] + classes)
-        ax.set_ylabel('True')
-        ax.set_xlabel('Predicted')
+def plot_confusion_matrix_from_cm(cm, graph_fold, label_ids, normalize=False, prefix=''):
+    """
+    Plot a confusion matrix accumulated with update_confusion_matrix().
+    Args:
+      cm (Tensor or ndarray): num_classes x num_classes matrix, rows are true labels, columns are predictions
+      graph_fold (str): path to output folder
+      label_ids (dict): label to id map, for example: {'O': 0, 'LOC': 1}
+      normalize (bool): flag to indicate whether to normalize confusion matrix
+      prefix (str): prefix for the plot name
+    """
+    cm = _cm_to_numpy(cm)
+    # remove labels that don't appear in the dev set
+    used = _used_label_ids(cm)
+    ids_to_labels = {v: k for k, v in label_ids.items()}
+    classes = [ids_to_labels[id] for id in used]
+    _plot_labeled_confusion_matrix(cm[np.ix_(used, used)], classes, graph_fold, normalize, prefix)
 
-        os.makedirs(graph_fold, exist_ok=True)
-        fig.colorbar(cax)
 
-        title = (prefix + ' ' + title).strip()
-        plt.savefig(os.path.join(graph_fold, title + '_' + time.strftime('%Y%m%d-%H%M%S')))
+def _plot_labeled_confusion_matrix(cm, classes, graph_fold, normalize, prefix):
+    title = 'Confusion matrix'
+    if normalize:
+        sums = cm.sum(axis=1)[:, np.newaxis]
+        sums = np.where(sums == 0, 1, sums)
+        cm = cm.astype('float') / sums
+        title = 'Normalized ' + title
+
+    # pyplot is slow to import and only needed for plotting.
+    from matplotlib import pyplot as plt
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    cax = ax.matshow(cm)
+    ax.set_xticks(np.arange(-1, len(classes) + 1))
+    ax.set_yticks(np.arange(-1, len(classes) + 1))
+    ax.set_xticklabels([''] + classes, rotation=90)
+    ax.set_yticklabels([''] + classes)
+    ax.set_ylabel('True')
+    ax.set_xlabel('Predicted')
+
+    os.makedirs(graph_fold, exist_ok=True)
+    fig.colorbar(cax)
+
+    title = (prefix + ' ' + title).strip()
+    plt.savefig(os.path.join(graph_fold, title + '_' + time.strftime('%Y%m%d-%H%M%S')))
 
 
 def _plot_confusion_matrix(labels, preds, graph_fold):
     cm = confusion_matrix(labels, preds)
     logging.info(f'Confusion matrix:\n{cm}')
+    from matplotlib import pyplot as plt
+
     fig = plt.figure()
     ax = fig.add_subplot(111)
     cax = ax.matshow(cm)
@@ -129,3 +167,148 @@ def get_f1_scores(labels, preds, average_modes=['binary', 'weighted', 'macro', '
         f1_scores['F1 ' + average] = round(f1_score(labels, preds, average=average) * 100, 2)
 
     return f1_scores
+
+
+def update_confusion_matrix(cm, labels, preds, num_classes, mask=None):
+    """
+    Adds label/prediction pairs to a confusion matrix without leaving the device of the tensors.
+    Args:
+      cm (Tensor or None): num_classes x num_classes matrix to update, None to create a new one
+      labels (Tensor): true labels
+      preds (Tensor): predicted labels, same shape as labels
+      num_classes (int): number of classes
+      mask (Tensor): optional mask of the pairs to count, same shape as labels
+    Returns:
+      updated confusion matrix, rows are true labels, columns are predictions
+    """
+    if mask is not None:
+        labels = labels[mask]
+        preds = preds[mask]
+    counts = torch.bincount(
+        labels.reshape(-1).long() * num_classes + preds.reshape(-1).long(), minlength=num_classes ** 2
+    )
+    counts = counts.view(num_classes, num_classes)
+    if cm is None:
+        return counts
+    return cm + counts.to(cm.device)
+
+
+def update_prediction_sample(global_vars, labels, preds, prefix='', sample_size=20):
+    """
+    Keeps a random window of sample_size consecutive labels and predictions for logging. Every batch is picked with
+    the same probability (reservoir sampling over batches), so that the sample is bounded regardless of data size.
+    """
+    global_vars.setdefault(prefix + 'sample_labels', [])
+    global_vars.setdefault(prefix + 'sample_preds', [])
+    num_batches = global_vars.get(prefix + 'sample_num_batches', 0) + 1
+    global_vars[prefix + 'sample_num_batches'] = num_batches
+    if len(labels) > 0 and random.randrange(num_batches) == 0:
+        i = 0
+        if len(labels) > sample_size + 1:
+            i = random.randint(0, len(labels) - sample_size - 1)
+        global_vars[prefix + 'sample_labels'] = tensor2list(labels[i : i + sample_size])
+        global_vars[prefix + 'sample_preds'] = tensor2list(preds[i : i + sample_size])
+
+
+def get_prediction_sample(global_vars, prefix='', sample_size=20):
+    """
+    Returns the labels and predictions sampled by update_prediction_sample(). The cross-worker combine of
+    reduce-in-place evaluation concatenates the windows of all workers, one of them is picked at random, so that the
+    logged sample does not grow with the number of workers.
+    """
+    labels = global_vars.get(prefix + 'sample_labels', [])
+    preds = global_vars.get(prefix + 'sample_preds', [])
+    if len(labels) > sample_size:
+        i = random.randrange(0, len(labels), sample_size)
+        labels, preds = labels[i : i + sample_size], preds[i : i + sample_size]
+    return labels, preds
+
+
+def _cm_to_numpy(cm):
+    if isinstance(cm, torch.Tensor):
+        cm = tensor2numpy(cm)
+    return np.asarray(cm)
+
+
+def _used_label_ids(cm):
+    """Ids of labels that appear in predictions or ground truths."""
+    return np.nonzero(cm.sum(axis=0) + cm.sum(axis=1))[0]
+
+
+def _precision_recall_f1_support(cm):
+    tp = np.diag(cm).astype(np.float64)
+    predicted = cm.sum(axis=0)
+    support = cm.sum(axis=1)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(tp), where=denominator > 0)
+    return precision, recall, f1, support
+
+
+def get_classification_report_from_cm(cm, label_ids, digits=4):
+    """
+    Returns classification report computed from a confusion matrix, in the format of
+    sklearn.metrics.classification_report
+    Args:
+      cm (Tensor or ndarray): num_classes x num_classes matrix, rows are true labels, columns are predictions
+      label_ids (dict): label to id map, for example: {'O': 0, 'LOC': 1}
+      digits (int): number of digits for formatting output floating point values
+    """
+    cm = _cm_to_numpy(cm)
+    # remove labels from label_ids that don't appear in predictions or ground truths
+    used = _used_label_ids(cm)
+    cm = cm[np.ix_(used, used)]
+    ids_to_labels = {v: k for k, v in label_ids.items()}
+    target_names = [ids_to_labels[id] + ' (label id: ' + str(id) + ')' for id in used]
+    precision, recall, f1, support = _precision_recall_f1_support(cm)
+    total = support.sum()
+
+    headers = ["precision", "recall", "f1-score", "support"]
+    width = max(max([len(name) for name in target_names], default=0), len('weighted avg'), digits)
+    report = ('{:>{width}s} ' + ' {:>9}' * len(headers)).format('', *headers, width=width) + '\n\n'
+    row_fmt = '{:>{width}s} ' + ' {:>9.{digits}f}' * 3 + ' {:>9}\n'
+    for row in zip(target_names, precision, recall, f1, support):
+        report += row_fmt.format(*row, width=width, digits=digits)
+    report += '\n'
+
+    accuracy = np.trace(cm) / total if total > 0 else 0.0
+    accuracy_fmt = '{:>{width}s} ' + ' {:>9.{digits}}' * 2 + ' {:>9.{digits}f}' + ' {:>9}\n'
+    report += accuracy_fmt.format('accuracy', '', '', accuracy, total, width=width, digits=digits)
+    weights = support / total if total > 0 else support
+    for name, average in (('macro avg', np.mean), ('weighted avg', lambda x: np.sum(x * weights))):
+        report += row_fmt.format(
+            name, average(precision), average(recall), average(f1), total, width=width, digits=digits
+        )
+    return report
+
+
+def get_f1_scores_from_cm(cm, average_modes=['weighted', 'macro', 'micro']):
+    """
+    Returns a dictionary with f1_score based on different averaging mode, computed from a confusion matrix
+    Args:
+      cm (Tensor or ndarray): num_classes x num_classes matrix, rows are true labels, columns are predictions
+      average_modes (list): list of possible averaging types. Binary (f1 of label id 1) is supported only for binary
+        target.
+    """
+    cm = _cm_to_numpy(cm)
+    used = _used_label_ids(cm)
+    _, _, f1, support = _precision_recall_f1_support(cm[np.ix_(used, used)])
+    total = support.sum()
+    f1_scores = {}
+    for average in average_modes:
+        if average == 'weighted':
+            score = np.sum(f1 * support) / total if total > 0 else 0.0
+        elif average == 'macro':
+            score = np.mean(f1) if len(f1) > 0 else 0.0
+        elif average == 'micro':
+            # single label multiclass: micro averaged f1 equals accuracy
+            score = np.trace(cm) / total if total > 0 else 0.0
+        elif average == 'binary':
+            if len(used) > 2 or np.any(used > 1):
+                raise ValueError("Binary f1 score is supported only for binary target")
+            score = _precision_recall_f1_support(cm)[2][1] if len(cm) > 1 else 0.0
+        else:
+            raise ValueError(f"Unsupported average mode: {average}")
+        f1_scores['F1 ' + average] = round(score * 100, 2)
+    return f1_scores
@@ -14,15 +14,17 @@
 # limitations under the License.
 # =============================================================================
 
+from functools import lru_cache
+
 import torch
 import torch.nn as nn
 
-__all__ = ['form_attention_mask', 'transformer_weights_init']
+__all__ = ['form_attention_mask', 'form_padding_bias', 'form_future_bias', 'transformer_weights_init']
 
 NEG_INF = -10000.0
 
 
-def form_attention_mask(input_mask, diagonal=None):
+def form_attention_mask(input_mask, diagonal=None, dtype=torch.float):
     """
     Build attention mask with optional masking of future tokens we forbid
     to attend to (e.g. as it is in Transformer decoder).
@@ -34,6 +36,8 @@ def form_attention_mask(input_mask, diagonal=None):
             None -- do not mask anything
             0 -- regular translation or language modeling future masking
             1 -- query stream masking as in XLNet architecture
+        dtype: data type of the returned mask, e.g. the one of the attention
+            scores it is added to
     Returns:
         attention_mask: mask of size B x 1 x L x L with 0s corresponding to
             tokens we plan to attend to and -10000 otherwise
@@ -41,15 +45,54 @@ def form_attention_mask(input_mask, diagonal=None):
 
     if input_mask is None:
         return None
-    attn_shape = (1, input_mask.shape[1], input_mask.shape[1])
-    attn_mask = input_mask.byte().unsqueeze(1)
+    attn_mask = input_mask.bool().unsqueeze(1)
     if diagonal is not None:
-        future_mask = torch.tril(torch.ones(attn_shape).byte().to(input_mask.device), diagonal)
+        length = input_mask.shape[1]
+        future_mask = torch.ones(length, length, dtype=torch.bool, device=input_mask.device).tril(diagonal)
         attn_mask = attn_mask & future_mask
-    attention_mask = (1 - attn_mask.to(torch.float)) * NEG_INF
+    attention_mask = (~attn_mask).to(dtype) * NEG_INF
     return attention_mask.unsqueeze(1)
 
 
+def form_padding_bias(key_padding_mask, dtype=torch.float):
+    """
+    Additive attention bias hiding the padding tokens of the keys, broadcast
+    over the heads and the queries when added to the attention scores.
+
+    Args:
+        key_padding_mask: binary mask of size B x L with 1s corresponding to
+            valid tokens and 0s corresponding to padding tokens
+        dtype: data type of the returned bias
+    Returns:
+        bias of size B x 1 x 1 x L with 0s corresponding to tokens we plan to
+            attend to and -10000 otherwise
+    """
+    return (~key_padding_mask.bool()).to(dtype)[:, None, None, :] * NEG_INF
+
+
+@lru_cache(maxsize=32)
+def form_future_bias(query_length, key_length, diagonal, device, dtype=torch.float):
+    """
+    Additive attention bias hiding the future tokens, shared by all the
+    sequences of the batches with the same lengths. If there are more keys
+    than queries, the queries are the last tokens, e.g. of cached states.
+
+    Args:
+        query_length: number of queries
+        key_length: number of keys
+        diagonal: diagonal where triangular future mask starts, see
+            form_attention_mask
+        device: device of the returned bias
+        dtype: data type of the returned bias
+    Returns:
+        bias of size query_length x key_length with 0s corresponding to
+            tokens we plan to attend to and -10000 otherwise
+    """
+    future_mask = torch.ones(query_length, key_length, dtype=torch.bool, device=device)
+    future_mask = future_mask.tril(diagonal + key_length - query_length)
+    return (~future_mask).to(dtype) * NEG_INF
+
+
 def transformer_weights_init(module, std_init_range=0.02, xavier=True):
     """
     Initialize different weights in Transformer model.
@@ -64,7 +107,9 @@ def transformer_weights_init(module, std_init_range=0.02, xavier=True):
 
     if isinstance(module, nn.Linear):
         if xavier:
-            nn.init.xavier_uniform_(module.weight)
+            # Fused layers, e.g. the query, key and value projections of attention, are initialized as separate ones
+            for weight in module.weight.chunk(getattr(module, 'num_fused_layers', 1)):
+                nn.init.xavier_uniform_(weight)
         else:
             nn.init.normal_(module.weight, mean=0.0, std=std_init_range)
         if module.bias is not None:
@@ -12,7 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # =============================================================================
-from .gan import *
 from nemo.core import Backend
+from nemo.utils.lazy_import import lazy_import
 
 backend = Backend.PyTorch
+
+# The modules (and torchvision with them) are imported when first accessed.
+__getattr__, __dir__ = lazy_import(
+    __name__,
+    module_attributes={
+        'nemo.collections.simple_gan.gan': [
+            'SimpleDiscriminator',
+            'SimpleGenerator',
+            'DiscriminatorLoss',
+            'GradientPenalty',
+            'InterpolateImage',
+            'RandomDataLayer',
+            'MnistGanDataLayer',
+        ]
+    },
+)
@@ -13,21 +13,42 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.tts.data_layers import AudioDataLayer
-from nemo.collections.tts.fastspeech_modules import *
-from nemo.collections.tts.fastspeech_modules import __all__ as fastspeech__all__
-from nemo.collections.tts.parts.helpers import *
-from nemo.collections.tts.parts.helpers import __all__ as helpers__all__
-from nemo.collections.tts.tacotron2_modules import *
-from nemo.collections.tts.tacotron2_modules import __all__ as tacotron2__all__
-from nemo.collections.tts.talknet_modules import *
-from nemo.collections.tts.talknet_modules import __all__ as fasterspeech__all__
-from nemo.collections.tts.waveglow_modules import *
-from nemo.collections.tts.waveglow_modules import __all__ as waveglow__all__
 from nemo.core import Backend
+from nemo.utils.lazy_import import lazy_import
 
 backend = Backend.PyTorch
 
-__all__ = (
-    ["AudioDataLayer"] + helpers__all__ + tacotron2__all__ + waveglow__all__ + fastspeech__all__ + fasterspeech__all__
-)
+# The modules (and librosa, matplotlib, etc. with them) are imported when first accessed.
+_module_attributes = {
+    'nemo.collections.tts.data_layers': ['AudioDataLayer'],
+    'nemo.collections.tts.parts.helpers': [
+        'waveglow_log_to_tb_func',
+        'waveglow_process_eval_batch',
+        'waveglow_eval_log_to_tb_func',
+        'tacotron2_log_to_tb_func',
+        'tacotron2_process_eval_batch',
+        'tacotron2_process_final_eval',
+        'tacotron2_eval_log_to_tb_func',
+    ],
+    'nemo.collections.tts.tacotron2_modules': [
+        'MakeGate',
+        'Tacotron2Loss',
+        'Tacotron2Postnet',
+        'Tacotron2Decoder',
+        'Tacotron2DecoderInfer',
+        'Tacotron2Encoder',
+        'TextEmbedding',
+    ],
+    'nemo.collections.tts.waveglow_modules': ['WaveGlowNM', 'WaveGlowInferNM', 'WaveGlowLoss'],
+    'nemo.collections.tts.fastspeech_modules': ['FastSpeechDataLayer', 'FastSpeech', 'FastSpeechLoss'],
+    'nemo.collections.tts.talknet_modules': [
+        'TalkNetDataLayer',
+        'TalkNet',
+        'LenSampler',
+        'TalkNetDursLoss',
+        'TalkNetMelsLoss',
+    ],
+}
+__getattr__, __dir__ = lazy_import(__name__, module_attributes=_module_attributes)
+
+__all__ = [name for names in _module_attributes.values() for name in names]
@@ -62,23 +62,30 @@ class LengthRegulator(nn.Module):
 
     @staticmethod
     def get_output(encoder_output, duration_predictor_output, alpha, mel_max_length=None):
-        output = list()
-        dec_pos = list()
-
-        for i in range(encoder_output.size(0)):
-            repeats = duration_predictor_output[i].float() * alpha
-            repeats = torch.round(repeats).long()
-            output.append(torch.repeat_interleave(encoder_output[i], repeats, dim=0))
-            dec_pos.append(torch.from_numpy(np.indices((output[i].shape[0],))[0] + 1))
+        """Expands every encoder frame by its (alpha scaled) duration, for the whole batch at once.
+
+        Returns the expanded frames padded with zeros and their 1-based decoder positions padded with 0, both
+        truncated to mel_max_length if it is given.
+        """
+        batch_size, encoder_length, hidden_size = encoder_output.shape
+        repeats = torch.round(duration_predictor_output.float() * alpha).long()
+        ends = repeats.cumsum(dim=1)
+        output_length = int(ends[:, -1].max())
+        if mel_max_length:
+            output_length = min(output_length, mel_max_length)
 
-        output = torch.nn.utils.rnn.pad_sequence(output, batch_first=True)
-        dec_pos = torch.nn.utils.rnn.pad_sequence(dec_pos, batch_first=True)
+        # The encoder frame of output position p is the number of frames ending at or before p, i.e. a cumulative sum
+        # over the frame end positions
+        frame_ends = torch.zeros(batch_size, output_length + 1, dtype=torch.long, device=encoder_output.device)
+        frame_ends.scatter_add_(1, ends.clamp(max=output_length), torch.ones_like(ends))
+        frame_index = frame_ends[:, :-1].cumsum(dim=1).clamp(max=encoder_length - 1)
 
-        dec_pos = dec_pos.to(output.device, non_blocking=True)
+        positions = torch.arange(1, output_length + 1, device=encoder_output.device).unsqueeze(0)
+        mask = positions <= ends[:, -1:]
 
-        if mel_max_length:
-            output = output[:, :mel_max_length]
-            dec_pos = dec_pos[:, :mel_max_length]
+        output = encoder_output.gather(1, frame_index.unsqueeze(-1).expand(-1, -1, hidden_size))
+        output = output.masked_fill(~mask.unsqueeze(-1), 0)
+        dec_pos = positions * mask
 
         return output, dec_pos
 
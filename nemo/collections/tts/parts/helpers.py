@@ -1,6 +1,4 @@
 # Copyright (c) 2019 NVIDIA Corporation
-import librosa
-import matplotlib.pylab as plt
 import numpy as np
 import torch
 
@@ -39,6 +37,8 @@ def waveglow_log_to_tb_func(
             f"{tag}_mel_target", plot_spectrogram_to_numpy(spec_target), step, dataformats="HWC",
         )
         if mel_fb is not None:
+            import librosa
+
             mag, _ = librosa.core.magphase(
                 librosa.core.stft(
                     np.nan_to_num(audio_pred[0].cpu().detach().numpy()),
@@ -163,6 +163,9 @@ def save_figure_to_numpy(fig):
 
 
 def plot_alignment_to_numpy(alignment, info=None):
+    # matplotlib and librosa are slow to import, they are only imported by the functions using them.
+    import matplotlib.pylab as plt
+
     fig, ax = plt.subplots(figsize=(6, 4))
     im = ax.imshow(alignment, aspect='auto', origin='lower', interpolation='none')
     fig.colorbar(im, ax=ax)
@@ -180,6 +183,8 @@ def plot_alignment_to_numpy(alignment, info=None):
 
 
 def plot_spectrogram_to_numpy(spectrogram):
+    import matplotlib.pylab as plt
+
     fig, ax = plt.subplots(figsize=(12, 3))
     im = ax.imshow(spectrogram, aspect="auto", origin="lower", interpolation='none')
     plt.colorbar(im, ax=ax)
@@ -194,6 +199,8 @@ def plot_spectrogram_to_numpy(spectrogram):
 
 
 def plot_gate_outputs_to_numpy(gate_targets, gate_outputs):
+    import matplotlib.pylab as plt
+
     fig, ax = plt.subplots(figsize=(12, 3))
     ax.scatter(
         range(len(gate_targets)), gate_targets, alpha=0.5, color='green', marker='+', s=1, label='target',
@@ -249,6 +249,7 @@ class Decoder(nn.Module):
         p_decoder_dropout,
         early_stopping,
         prenet_p_dropout=0.5,
+        stop_check_interval=10,
     ):
         super(Decoder, self).__init__()
         self.n_mel_channels = n_mel_channels
@@ -262,6 +263,7 @@ class Decoder(nn.Module):
         self.p_attention_dropout = p_attention_dropout
         self.p_decoder_dropout = p_decoder_dropout
         self.early_stopping = early_stopping
+        self.stop_check_interval = stop_check_interval
 
         self.prenet = Prenet(n_mel_channels * n_frames_per_step, [prenet_dim, prenet_dim], prenet_p_dropout)
 
@@ -442,55 +444,95 @@ class Decoder(nn.Module):
 
         return mel_outputs, gate_outputs, alignments
 
+    def select_decoder_states(self, rows, max_time):
+        """ Keeps the decoder states of a subset of the batch
+        PARAMS
+        ------
+        rows: indices of the kept batch elements
+        max_time: length of the longest encoder output of the kept elements,
+            the attention states are cut to it if the memory is masked
+        """
+        if self.mask is None:
+            max_time = self.memory.size(1)
+        for name in ('attention_hidden', 'attention_cell', 'decoder_hidden', 'decoder_cell', 'attention_context'):
+            setattr(self, name, getattr(self, name).index_select(0, rows))
+        for name in ('attention_weights', 'attention_weights_cum', 'memory', 'processed_memory', 'mask'):
+            tensor = getattr(self, name)
+            if tensor is not None:
+                setattr(self, name, tensor.index_select(0, rows)[:, :max_time])
+
     def infer(self, memory, memory_lengths):
         """ Decoder inference
+        The outputs are written into preallocated buffers and the stop
+        condition is only checked every stop_check_interval steps, so the
+        decoding loop does not synchronize with the device at every step.
+        At every check, the finished utterances are removed from the decoded
+        batch. The outputs after the end of an utterance are zero.
         PARAMS
         ------
         memory: Encoder outputs
+        memory_lengths: Encoder output lengths
         RETURNS
         -------
         mel_outputs: mel outputs from the decoder
         gate_outputs: gate outputs from the decoder
         alignments: sequence of attention weights from the decoder
+        mel_lengths: number of decoder steps of each utterance
         """
+        batch_size, max_time = memory.size(0), memory.size(1)
         decoder_input = self.get_go_frame(memory)
 
-        if memory.size(0) > 1:
-            mask = ~get_mask_from_lengths(memory_lengths)
+        if batch_size > 1:
+            mask = ~get_mask_from_lengths(memory_lengths, max_len=max_time)
         else:
             mask = None
 
         self.initialize_decoder_states(memory, mask=mask)
 
-        mel_lengths = torch.zeros([memory.size(0)], dtype=torch.int32)
-        not_finished = torch.ones([memory.size(0)], dtype=torch.int32)
-        if torch.cuda.is_available():
-            mel_lengths = mel_lengths.cuda()
-            not_finished = not_finished.cuda()
+        max_steps = self.max_decoder_steps
+        mel_outputs = memory.new_zeros(batch_size, max_steps, self.n_mel_channels * self.n_frames_per_step)
+        gate_outputs = memory.new_zeros(batch_size, max_steps)
+        alignments = memory.new_zeros(batch_size, max_steps, max_time)
+        mel_lengths = torch.zeros([batch_size], dtype=torch.int32, device=memory.device)
+        not_finished = torch.ones([batch_size], dtype=torch.int32, device=memory.device)
+        rows = torch.arange(batch_size, device=memory.device)
 
-        mel_outputs, gate_outputs, alignments = [], [], []
-        while True:
+        for step in range(max_steps):
             decoder_input = self.prenet(decoder_input, inference=True)
             mel_output, gate_output, alignment = self.decode(decoder_input)
 
             dec = torch.le(torch.sigmoid(gate_output.data), self.gate_threshold).to(torch.int32).squeeze(1)
 
             not_finished = not_finished * dec
-            mel_lengths += not_finished
+            mel_lengths.index_add_(0, rows, not_finished)
 
-            if self.early_stopping and torch.sum(not_finished) == 0:
-                break
-
-            mel_outputs += [mel_output.squeeze(1)]
-            gate_outputs += [gate_output]
-            alignments += [alignment]
-
-            if len(mel_outputs) == self.max_decoder_steps:
-                logging.warning("Reached max decoder steps %d.", self.max_decoder_steps)
-                break
+            mel_outputs[rows, step] = mel_output
+            gate_outputs[rows, step] = gate_output.squeeze(1)
+            alignments[rows, step, : alignment.size(1)] = alignment
 
             decoder_input = mel_output
 
-        mel_outputs, gate_outputs, alignments = self.parse_decoder_outputs(mel_outputs, gate_outputs, alignments)
+            if self.early_stopping and (step + 1) % self.stop_check_interval == 0:
+                active = not_finished.nonzero().squeeze(1)
+                if len(active) == 0:
+                    break
+                if len(active) < len(rows):
+                    rows = rows.index_select(0, active)
+                    not_finished = not_finished.index_select(0, active)
+                    decoder_input = decoder_input.index_select(0, active)
+                    self.select_decoder_states(active, int(memory_lengths[rows].max()))
+
+        if self.early_stopping:
+            if not_finished.any():
+                logging.warning("Reached max decoder steps %d.", self.max_decoder_steps)
+            # Decoding stops at the step all utterances are finished at
+            num_steps = int(mel_lengths.max())
+            padding = ~get_mask_from_lengths(mel_lengths, max_len=num_steps)
+            mel_outputs = mel_outputs[:, :num_steps].masked_fill(padding.unsqueeze(2), 0.0)
+            gate_outputs = gate_outputs[:, :num_steps].masked_fill(padding, 0.0)
+            alignments = alignments[:, :num_steps].masked_fill(padding.unsqueeze(2), 0.0)
+
+        # decouple frames per step, (B, T_out, n_mel_channels) -> (B, n_mel_channels, T_out)
+        mel_outputs = mel_outputs.view(batch_size, -1, self.n_mel_channels).transpose(1, 2)
 
         return mel_outputs, gate_outputs, alignments, mel_lengths
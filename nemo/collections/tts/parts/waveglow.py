@@ -1,5 +1,6 @@
 # Copyright (c) 2019 NVIDIA Corporation
-from typing import Tuple
+import math
+from typing import List, Optional, Tuple
 
 import torch
 import torch.nn.functional as F
@@ -206,7 +207,24 @@ class WaveGlow(torch.nn.Module):
         output_audio.append(audio)
         return torch.cat(output_audio, 1), log_s_list, log_det_W_list
 
-    def infer(self, spect, sigma: float = 1.0):
+    @property
+    def receptive_field(self):
+        """Number of groups of audio samples on each side of a group that it depends on during inference."""
+        kernel_size = self.WN[0].in_layers[0].kernel_size[0]
+        return self.n_flows * sum((kernel_size - 1) // 2 * 2 ** i for i in range(self.WN[0].n_layers))
+
+    def sample_noise(self, batch_size, n_groups, sigma: float = 1.0, device=None, dtype=torch.float):
+        """
+        Samples the latent variables used by infer() for n_groups groups of audio samples, in the order infer() uses
+        them: the input of the last flow followed by the early outputs.
+        """
+        noise = [sigma * torch.randn(batch_size, self.n_remaining_channels, n_groups, device=device).to(dtype)]
+        for k in reversed(range(self.n_flows)):
+            if k % self.n_early_every == 0 and k > 0:
+                noise.append(sigma * torch.randn(batch_size, self.n_early_size, n_groups, device=device).to(dtype))
+        return noise
+
+    def infer(self, spect, sigma: float = 1.0, noise: Optional[List[torch.Tensor]] = None):
         spect = self.upsample(spect)
         # trim conv artifacts. maybe pad spec to kernel multiple
         time_cutoff = self.upsample.kernel_size[0] - self.upsample.stride[0]
@@ -216,12 +234,10 @@ class WaveGlow(torch.nn.Module):
         spect = spect.contiguous().view(spect.size(0), spect.size(1), -1)
         spect = spect.permute(0, 2, 1)
 
-        audio = sigma * torch.randn(spect.size(0), self.n_remaining_channels, spect.size(2), device=spect.device).to(
-            spect.dtype
-        )
-        # audio=sigma * torch.ones(spect.size(0), self.n_remaining_channels, spect.size(2), device=spect.device).to(
-        #     spect.dtype
-        # )
+        if noise is None:
+            noise = self.sample_noise(spect.size(0), spect.size(2), sigma, device=spect.device, dtype=spect.dtype)
+        audio = noise[0]
+        n_early = 1
 
         for k in reversed(range(self.n_flows)):
             n_half = int(audio.size(1) / 2)
@@ -236,13 +252,91 @@ class WaveGlow(torch.nn.Module):
 
             audio = self.convinv[k](audio, reverse=True)
             if k % self.n_early_every == 0 and k > 0:
-                z = sigma * torch.randn(spect.size(0), self.n_early_size, spect.size(2), device=spect.device).to(
-                    spect.dtype
-                )
-                # z = sigma * torch.ones(spect.size(0), self.n_early_size, spect.size(2), device=spect.device).to(spect.dtype)
-                audio = torch.cat((z, audio), 1)
+                audio = torch.cat((noise[n_early], audio), 1)
+                n_early += 1
         return audio.permute(0, 2, 1).contiguous().view(audio.size(0), -1)
 
+    def infer_chunked(
+        self,
+        spect,
+        sigma: float = 1.0,
+        chunk_frames: int = 256,
+        context_frames: Optional[int] = None,
+        crossfade: Optional[int] = None,
+        noise: Optional[List[torch.Tensor]] = None,
+    ):
+        """
+        Vocodes the spectrogram chunk by chunk, yielding the audio of each chunk as soon as it is ready.
+
+        Each chunk is vocoded together with context_frames frames of the spectrogram on both sides and with the same
+        noise as the whole utterance, so with the default context, which covers the receptive field of the flows, the
+        concatenated chunks are the audio infer() returns for that noise. With a shorter context, the audio of
+        consecutive chunks is linearly cross-faded over crossfade samples around their boundary.
+
+        Args:
+            spect: mel spectrogram [B x n_mel_channels x T]
+            sigma: standard deviation of the noise
+            chunk_frames: number of frames of the spectrogram vocoded per chunk
+            context_frames: number of frames on each side of a chunk vocoded with it, defaults to the receptive field
+            crossfade: number of samples on each side of a chunk boundary cross-faded, at most the hop length (the
+                default) and half a chunk
+            noise: latent variables for the whole utterance as returned by sample_noise(), sampled with sigma if not
+                given
+
+        Yields:
+            audio of consecutive chunks [B x samples], T * hop length samples in total
+        """
+        hop_length = self.upsample.stride[0]
+        assert hop_length % self.n_group == 0
+        groups_per_frame = hop_length // self.n_group
+        if context_frames is None:
+            context_frames = math.ceil(self.receptive_field * self.n_group / hop_length)
+        crossfade = min(hop_length if crossfade is None else crossfade, hop_length, chunk_frames * hop_length // 2)
+        # Frames before a sample that contribute to it through the upsampling
+        upsample_frames = math.ceil((self.upsample.kernel_size[0] - hop_length) / hop_length)
+
+        batch_size, _, n_frames = spect.size()
+        if noise is None:
+            noise = self.sample_noise(batch_size, n_frames * groups_per_frame, sigma, spect.device, spect.dtype)
+        # The cross-faded samples of a chunk lie outside of it
+        context_frames += math.ceil(crossfade / hop_length)
+        fade = torch.arange(1, 2 * crossfade + 1, device=spect.device, dtype=spect.dtype) / (2 * crossfade + 1)
+
+        tail = None
+        for start in range(0, n_frames, chunk_frames):
+            end = min(start + chunk_frames, n_frames)
+            left = max(start - context_frames - upsample_frames, 0)
+            right = min(end + context_frames, n_frames)
+            window_noise = [z[:, :, left * groups_per_frame : right * groups_per_frame] for z in noise]
+            audio = self.infer(spect[:, :, left:right], sigma, noise=window_noise)
+
+            # The audio of the chunk extended by crossfade samples into its neighbours
+            first = start * hop_length - (crossfade if start > 0 else 0)
+            last = end * hop_length + (crossfade if end < n_frames else 0)
+            audio = audio[:, first - left * hop_length : last - left * hop_length]
+            if tail is not None:
+                head = audio[:, : 2 * crossfade]
+                audio = torch.cat((tail * (1 - fade) + head * fade, audio[:, 2 * crossfade :]), 1)
+            if end < n_frames:
+                tail = audio[:, audio.size(1) - 2 * crossfade :]
+                audio = audio[:, : audio.size(1) - 2 * crossfade]
+            yield audio
+
+
+def fold_weightnorm_state_dict(state_dict, prefix=''):
+    """
+    Replaces the weight_g and weight_v parameters of the weight normalized convolutions in state_dict by the weights
+    they stand for, so that checkpoints of a model with weight normalization load into the model without it.
+    """
+    for name in [name for name in state_dict if name.startswith(prefix) and name.endswith('.weight_g')]:
+        module_name = name[: -len('weight_g')]
+        if module_name + 'weight_v' in state_dict:
+            weight_g = state_dict.pop(module_name + 'weight_g')
+            weight_v = state_dict.pop(module_name + 'weight_v')
+            norm = weight_v.flatten(1).norm(dim=1).view(-1, *([1] * (weight_v.dim() - 1)))
+            state_dict[module_name + 'weight'] = weight_v * (weight_g / norm)
+    return state_dict
+
 
 def remove_weightnorm(model):
     waveglow = model
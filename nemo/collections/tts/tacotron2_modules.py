@@ -156,6 +156,10 @@ class Tacotron2Decoder(TrainableNM):
         attention_location_kernel_size (int): The kernel size of the
             convolution for the location part of the attention mechanism.
             Defaults to 31.
+        stop_check_interval (int): When not teacher forcing, the number of
+            decoder steps between the checks whether all utterances are
+            finished. Finished utterances are removed from the decoded batch
+            at every check. Defaults to 10.
     """
 
     @property
@@ -209,6 +213,7 @@ class Tacotron2Decoder(TrainableNM):
         attention_location_kernel_size: int = 31,
         prenet_p_dropout: float = 0.5,
         force: bool = False,
+        stop_check_interval: int = 10,
     ):
         super().__init__()
         self.decoder = Decoder(
@@ -227,6 +232,7 @@ class Tacotron2Decoder(TrainableNM):
             attention_location_kernel_size=attention_location_kernel_size,
             prenet_p_dropout=prenet_p_dropout,
             early_stopping=True,
+            stop_check_interval=stop_check_interval,
         )
         self.force = force
         self.to(self._device)
@@ -277,6 +283,10 @@ class Tacotron2DecoderInfer(Tacotron2Decoder):
         attention_location_kernel_size (int): The kernel size of the
             convolution for the location part of the attention mechanism.
             Defaults to 31.
+        stop_check_interval (int): When not teacher forcing, the number of
+            decoder steps between the checks whether all utterances are
+            finished. Finished utterances are removed from the decoded batch
+            at every check. Defaults to 10.
     """
 
     def __init__(
@@ -296,6 +306,7 @@ class Tacotron2DecoderInfer(Tacotron2Decoder):
         attention_location_kernel_size: int = 31,
         prenet_p_dropout: float = 0.5,
         force: bool = False,
+        stop_check_interval: int = 10,
     ):
         super().__init__(
             n_mel_channels=n_mel_channels,
@@ -313,6 +324,7 @@ class Tacotron2DecoderInfer(Tacotron2Decoder):
             attention_location_kernel_size=attention_location_kernel_size,
             prenet_p_dropout=prenet_p_dropout,
             force=force,
+            stop_check_interval=stop_check_interval,
         )
 
     @property
@@ -1,16 +1,21 @@
 # Copyright (c) 2019 NVIDIA Corporation
-import librosa
+import inspect
+from typing import Optional
+
 import numpy as np
 import torch
 
-from nemo import logging
 from nemo.backends.pytorch.nm import LossNM, TrainableNM
-from nemo.collections.tts.parts.waveglow import WaveGlow, remove_weightnorm
+from nemo.collections.tts.parts.waveglow import WaveGlow, fold_weightnorm_state_dict, remove_weightnorm
 from nemo.core.neural_types import *
 from nemo.utils.decorators import add_port_docs
 
 __all__ = ["WaveGlowNM", "WaveGlowInferNM", "WaveGlowLoss"]
 
+# From torch 2.0 on, torch.stft requires return_complex=True and torch.istft a complex spectrum. Older versions without
+# return_complex keep the real and imaginary parts in the last dimension of a real tensor.
+_STFT_RETURNS_COMPLEX = 'return_complex' in inspect.signature(torch.stft).parameters and hasattr(torch, 'view_as_real')
+
 
 class WaveGlowNM(TrainableNM):
     """
@@ -138,6 +143,20 @@ class WaveGlowInferNM(WaveGlowNM):
             Defaults to 3
         sigma (float): Standard deviation of the normal distribution from which
             we sample z. Defaults to 0.6.
+        chunk_frames (int): If positive, the mel spectrogram is vocoded in
+            chunks of this many frames, which bounds the memory used by long
+            utterances. See stream() for vocoding with incremental output.
+            Defaults to 0, vocoding the whole spectrogram at once.
+        context_frames (int): Number of frames on each side of a chunk
+            vocoded with it. Defaults to None, the receptive field of the
+            model, for which the chunked audio is the same as the audio of the
+            whole spectrogram.
+        denoiser_strength (float): If positive, the generated audio is
+            denoised with this strength, see denoise(). Defaults to 0.
+
+    The weight normalization of the model is folded into the convolution
+    weights at construction. Checkpoints with weight normalized convolutions,
+    such as the ones of WaveGlowNM, are folded when they are loaded.
     """
 
     @property
@@ -176,8 +195,14 @@ class WaveGlowInferNM(WaveGlowNM):
         n_wn_channels: int = 512,
         wn_kernel_size: int = 3,
         sigma: float = 0.6,
+        chunk_frames: int = 0,
+        context_frames: Optional[int] = None,
+        denoiser_strength: float = 0.0,
     ):
         self._sigma = sigma
+        self._denoiser_strength = denoiser_strength
+        self._chunk_frames = chunk_frames
+        self._context_frames = context_frames
         # self.sample_rate = sample_rate  # Done in parent class
         super().__init__(
             sample_rate=sample_rate,
@@ -190,32 +215,148 @@ class WaveGlowInferNM(WaveGlowNM):
             n_wn_channels=n_wn_channels,
             wn_kernel_size=wn_kernel_size,
         )
-        self._removed_weight_norm = False
+        self.waveglow = remove_weightnorm(self.waveglow)
+        self.waveglow._register_load_state_dict_pre_hook(self._fold_weight_norm)
+        self.bias_spec = None
+
+    def _fold_weight_norm(self, state_dict, prefix, *args):
+        fold_weightnorm_state_dict(state_dict, prefix)
+        # The inverses of the 1x1 convolutions are computed again with the loaded weights
+        for convinv in self.waveglow.convinv:
+            convinv.__dict__.pop('W_inverse', None)
 
-    def setup_denoiser(self):
+    def setup_denoiser(self, n_fft=1024):
+        """
+        Computes the magnitude spectrum of the audio generated without noise
+        for a spectrogram of zeros, which denoise() subtracts from the spectra
+        of the generated audio. It is called by forward() if the module
+        denoises and was not set up yet, and must be called again after the
+        weights are changed.
+
+        Args:
+            n_fft (int): size of the FFT of the denoiser. Defaults to 1024.
+        """
+        self._denoiser_n_fft = n_fft
         with torch.no_grad():
-            mel_input = torch.zeros((1, 80, 88), device=self._device)
+            mel_input = torch.zeros((1, self.waveglow.upsample.in_channels, 88), device=self._device)
             bias_audio = self.waveglow.infer(mel_input, sigma=0.0).float()
-            bias_audio = bias_audio.squeeze().cpu().numpy()
-            bias_spec, _ = librosa.core.magphase(librosa.core.stft(bias_audio, n_fft=1024))
-            self.bias_spec = np.expand_dims(bias_spec[:, 0], axis=-1)
+            bias_spec, _ = self._magphase(bias_audio)
+            self.bias_spec = bias_spec[0, :, :1]
+
+    def _stft_window(self, device):
+        return torch.hann_window(self._denoiser_n_fft, device=device)
+
+    def _magphase(self, audio):
+        """Magnitudes [B x F x T] and phases [B x F x T x 2] of the STFT of audio, like librosa.magphase."""
+        kwargs = {'return_complex': True} if _STFT_RETURNS_COMPLEX else {}
+        spec = torch.stft(
+            audio,
+            n_fft=self._denoiser_n_fft,
+            hop_length=self._denoiser_n_fft // 4,
+            window=self._stft_window(audio.device),
+            center=True,
+            pad_mode='reflect',
+            **kwargs,
+        )
+        if _STFT_RETURNS_COMPLEX:
+            spec = torch.view_as_real(spec)
+        magnitude = spec.pow(2).sum(-1).sqrt()
+        phase = spec / magnitude.unsqueeze(-1)
+        # The phase of zero is 0
+        phase[magnitude == 0] = torch.tensor([1.0, 0.0], device=audio.device)
+        return magnitude, phase
 
     def denoise(self, audio, strength=0.1):
-        audio_spec, audio_angles = librosa.core.magphase(librosa.core.stft(audio, n_fft=1024))
-        audio_spec_denoised = audio_spec - self.bias_spec * strength
-        audio_spec_denoised = np.clip(audio_spec_denoised, a_min=0.0, a_max=None)
-        audio_denoised = librosa.core.istft(audio_spec_denoised * audio_angles)
-        return audio_denoised, audio_spec_denoised
+        """
+        Removes the bias of the model from the generated audio by subtracting
+        the magnitude spectrum computed by setup_denoiser() from its spectrum,
+        batched on the device of the audio.
+
+        Args:
+            audio (torch.Tensor or np.ndarray): audio [B x T] or [T]
+            strength (float): scale of the subtracted spectrum
+
+        Returns:
+            denoised audio and its magnitude spectrum [B x F x frames] (or
+            [F x frames] for a single utterance), as tensors on the device of
+            audio, or as numpy arrays if audio is a numpy array
+        """
+        if self.bias_spec is None:
+            raise ValueError("setup_denoiser() has to be called before denoise().")
+        is_numpy = isinstance(audio, np.ndarray)
+        if is_numpy:
+            audio = torch.from_numpy(audio)
+        single = audio.dim() == 1
+        if single:
+            audio = audio.unsqueeze(0)
+
+        magnitude, phase = self._magphase(audio.float())
+        self.bias_spec = self.bias_spec.to(audio.device)
+        magnitude = (magnitude - self.bias_spec * strength).clamp_(min=0.0)
+        spec = magnitude.unsqueeze(-1) * phase
+        if _STFT_RETURNS_COMPLEX:
+            spec = torch.view_as_complex(spec.contiguous())
+        audio_denoised = torch.istft(
+            spec,
+            n_fft=self._denoiser_n_fft,
+            hop_length=self._denoiser_n_fft // 4,
+            window=self._stft_window(audio.device),
+            center=True,
+            length=audio.size(1),
+        ).to(audio.dtype)
+
+        if single:
+            audio_denoised, magnitude = audio_denoised[0], magnitude[0]
+        if is_numpy:
+            audio_denoised, magnitude = audio_denoised.cpu().numpy(), magnitude.cpu().numpy()
+        return audio_denoised, magnitude
+
+    def stream(self, mel_spectrogram, chunk_frames=None, crossfade=None):
+        """
+        Vocodes the mel spectrogram chunk by chunk, yielding the audio of each
+        chunk as soon as it is ready, e.g. to start playing it back before the
+        whole utterance is vocoded.
+
+        Args:
+            mel_spectrogram (torch.Tensor): mel spectrogram [B x D x T]
+            chunk_frames (int): number of frames per chunk, defaults to the
+                chunk_frames of the module or 256 if it is 0
+            crossfade (int): number of samples cross-faded around the chunk
+                boundaries, see WaveGlow.infer_chunked
+
+        Yields:
+            audio of consecutive chunks [B x samples], which is not denoised
+        """
+        if self.training:
+            raise ValueError("You are using the WaveGlow Infer Neural Module in training mode.")
+        chunk_frames = chunk_frames or self._chunk_frames or 256
+        chunks = self.waveglow.infer_chunked(
+            mel_spectrogram,
+            sigma=self._sigma,
+            chunk_frames=chunk_frames,
+            context_frames=self._context_frames,
+            crossfade=crossfade,
+        )
+        # Gradients are only disabled while a chunk is vocoded, not in the caller between chunks
+        while True:
+            with torch.no_grad():
+                audio = next(chunks, None)
+            if audio is None:
+                return
+            yield audio
 
     def forward(self, mel_spectrogram):
-        if not self._removed_weight_norm:
-            logging.info("remove WN")
-            self.waveglow = remove_weightnorm(self.waveglow)
-            self._removed_weight_norm = True
         if self.training:
             raise ValueError("You are using the WaveGlow Infer Neural Module in training mode.")
-        with torch.no_grad():
-            audio = self.waveglow.infer(mel_spectrogram, sigma=self._sigma)
+        if self._chunk_frames > 0:
+            audio = torch.cat(list(self.stream(mel_spectrogram)), 1)
+        else:
+            with torch.no_grad():
+                audio = self.waveglow.infer(mel_spectrogram, sigma=self._sigma)
+        if self._denoiser_strength > 0:
+            if self.bias_spec is None:
+                self.setup_denoiser()
+            audio, _ = self.denoise(audio, strength=self._denoiser_strength)
         return audio
 
 
@@ -270,6 +270,8 @@ class EvaluatorCallback(ActionCallback):
         wandb_name=None,
         wandb_project=None,
         eval_at_start=True,
+        reduce_in_place=False,
+        user_combine_callback=None,
     ):
         # TODO: Eval_epoch currently does nothing
         if eval_step is None and eval_epoch is None:
@@ -288,6 +290,10 @@ class EvaluatorCallback(ActionCallback):
         # Callbacks
         self.user_iter_callback = user_iter_callback
         self.user_done_callback = user_epochs_done_callback
+        # In distributed evaluation, run user_iter_callback on every worker and combine the resulting global
+        # variables, instead of gathering all evaluated tensors to rank 0
+        self.reduce_in_place = reduce_in_place
+        self.user_combine_callback = user_combine_callback
 
         # Weights and biases
         self._wandb_project = wandb_project
@@ -356,12 +356,20 @@ class NeuralModuleFactory(object):
         """Exports Neural Module instance for deployment.
 
         Args:
-            module: neural module to export
+            module: neural module to export. Alternatively, a list of NmTensors: their whole inference call chain
+                (e.g. preprocessor -> encoder -> decoder) is then exported as a single graph whose inputs are the
+                data layer outputs it consumes. Only ONNX and TORCHSCRIPT formats support call chains.
             output (str): where export results should be saved
             d_format (DeploymentFormat): which deployment format to use
-            input_example: sometimes tracing will require input examples
+            input_example: sometimes tracing will require input examples. For call chains, a tuple ordered like
+                the data layer output ports or a dict keyed by them; defaults to the first batch of the data layer.
             output_example: Should match inference on input_example
         """
+        if isinstance(module, (list, tuple, NmTensor)):
+            return self._trainer.deployment_export(
+                module=module, output=output, d_format=d_format, input_example=input_example,
+            )
+
         if d_format == DeploymentFormat.JARVIS:
             logging.info("Exporting model to Jarvis.")
             module.deploy_to_jarvis(output=output)
@@ -369,15 +377,17 @@ class NeuralModuleFactory(object):
             return
 
         _inexample, _out_example = module._prepare_for_deployment()
-
-        if input_example is not None:
-            _inexample = input_example
-        if output_example is not None:
-            _out_example = output_example
-
-        return self._trainer.deployment_export(
-            module=module, output=output, d_format=d_format, input_example=_inexample, output_example=_out_example,
-        )
+        try:
+            if input_example is not None:
+                _inexample = input_example
+            if output_example is not None:
+                _out_example = output_example
+
+            return self._trainer.deployment_export(
+                module=module, output=output, d_format=d_format, input_example=_inexample, output_example=_out_example,
+            )
+        finally:
+            module._restore_after_deployment()
 
     def infer(
         self,
@@ -389,6 +399,10 @@ class NeuralModuleFactory(object):
         use_cache=False,
         offload_to_cpu=True,
         modules_to_restore=None,
+        onnx_model=None,
+        output_dir=None,
+        lengths=None,
+        resume=False,
     ):
         """Runs inference to obtain values for tensors
 
@@ -413,10 +427,25 @@ class NeuralModuleFactory(object):
             modules_to_restore (list): Defaults to None, in which case all
                 NMs inside callchain with weights will be restored. If
                 specified only the modules inside this list will be restored.
+            onnx_model (str): Path to an ONNX file exported with deployment_export() from the same `tensors`. If
+                set, everything after the data layer is executed with ONNX Runtime on CPU instead of PyTorch.
+                Defaults to None.
+            output_dir (str): If set, the values of `tensors` are written to
+                this directory after every batch instead of being kept in
+                memory, split into samples along their first axis, together
+                with the dataset index of every sample. Every worker writes
+                its own shard. Defaults to None.
+            lengths (dict): Maps tensors of `tensors` to tensors holding the
+                length of each of their samples, only the values before the
+                length along the second axis are written, e.g. without the
+                padded frames. Only used with output_dir. Defaults to None.
+            resume (bool): Continues the inference written to output_dir
+                after its last completed batch. Defaults to False.
 
         Returns:
             List of evaluated tensors. Each element in the list is also a list
-            where each element is now a batch of tensor values.
+            where each element is now a batch of tensor values. With
+            output_dir, an InferenceStore reading the written values.
         """
         return self._trainer.infer(
             tensors=tensors,
@@ -427,6 +456,10 @@ class NeuralModuleFactory(object):
             use_cache=use_cache,
             offload_to_cpu=offload_to_cpu,
             modules_to_restore=modules_to_restore,
+            onnx_model=onnx_model,
+            output_dir=output_dir,
+            lengths=lengths,
+            resume=resume,
         )
 
     def clear_cache(self):
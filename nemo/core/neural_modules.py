@@ -530,6 +530,10 @@ class NeuralModule(NeuralInterface):
         """
         return None, None
 
+    def _restore_after_deployment(self) -> None:
+        """Undo the patches of _prepare_for_deployment() that must not outlive the export"""
+        pass
+
     @property
     def operation_mode(self):
         """ Returns the operation mode. """
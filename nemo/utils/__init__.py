@@ -20,6 +20,22 @@ from nemo.utils.nemo_logging import LogMode as logging_mode
 
 logging = _Logger()
 
-from .argparse import NemoArgParser
-from .exp_logging import ExpManager, get_logger
-from .helpers import *
+from nemo.utils.lazy_import import lazy_import
+
+# The helpers import torch, they are imported when first accessed.
+__getattr__, __dir__ = lazy_import(
+    __name__,
+    module_attributes={
+        'nemo.utils.argparse': ['NemoArgParser'],
+        'nemo.utils.exp_logging': ['ExpManager', 'get_logger'],
+        'nemo.utils.helpers': [
+            'get_checkpoint_from_dir',
+            'get_cuda_device',
+            'get_device',
+            'maybe_download_from_cloud',
+            'rgetattr',
+            'rsetattr',
+        ],
+        'nemo.utils.inference_store': ['InferenceStore', 'InferenceStoreWriter'],
+    },
+)
@@ -0,0 +1,216 @@
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+"""
+On-disk store of inference outputs, written batch by batch by NeuralModuleFactory.infer(output_dir=...).
+
+Every rank writes its own shard directory rank_<rank> holding, for each output:
+  * <name>.bin: the values of the samples, one after the other, in C order
+  * <name>.index: int64 rows of [offset in values, shape of the sample...]
+and sample_ids.bin, the int64 indices in the dataset of the samples. progress.json records the sizes of the files
+after the last completed batch, it is replaced atomically, so that a run can resume after a crash, dropping whatever
+was written past it.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+__all__ = ['InferenceStoreWriter', 'InferenceStore']
+
+_PROGRESS = 'progress.json'
+_SAMPLE_IDS = 'sample_ids.bin'
+
+
+def _shard_dir(path: str, rank: int) -> str:
+    return os.path.join(path, f'rank_{rank}')
+
+
+class InferenceStoreWriter(object):
+    """
+    Appends the outputs of inference batches to the shard of a rank.
+
+    Args:
+        path: directory of the store
+        rank: rank writing the shard
+        resume: continues after the last completed batch of an existing shard, otherwise the shard must not exist
+    """
+
+    def __init__(self, path: str, rank: int = 0, resume: bool = False):
+        self.path = _shard_dir(path, rank)
+        progress_path = os.path.join(self.path, _PROGRESS)
+        if os.path.exists(progress_path):
+            if not resume:
+                raise FileExistsError(f"{self.path} already holds inference outputs, set resume to continue them.")
+            with open(progress_path, 'r') as f:
+                self._progress = json.load(f)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self._progress = {'batches': 0, 'samples': 0, 'outputs': {}, 'sizes': {}}
+        # Drops what was written after the last completed batch
+        for file_name in os.listdir(self.path):
+            if file_name != _PROGRESS and file_name not in self._progress['sizes']:
+                os.remove(os.path.join(self.path, file_name))
+        for file_name, size in self._progress['sizes'].items():
+            with open(os.path.join(self.path, file_name), 'ab') as f:
+                f.truncate(size)
+        self._files = {}
+
+    @property
+    def completed_batches(self) -> int:
+        return self._progress['batches']
+
+    @property
+    def completed_samples(self) -> int:
+        return self._progress['samples']
+
+    def _file(self, file_name: str):
+        if file_name not in self._files:
+            self._files[file_name] = open(os.path.join(self.path, file_name), 'ab')
+        return self._files[file_name]
+
+    def write(self, outputs: Dict[str, np.ndarray], sample_ids, lengths: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Appends a batch.
+
+        Args:
+            outputs: values of the outputs of the batch, by name, with the samples along the first axis
+            sample_ids: indices in the dataset of the samples of the batch
+            lengths: lengths of the samples of some outputs, by name, only the first length elements of the second
+                axis of a sample are written, e.g. the frames before the padding
+        """
+        sample_ids = np.asarray(sample_ids, dtype=np.int64)
+        lengths = lengths or {}
+        for name, values in outputs.items():
+            values = np.asarray(values)
+            if values.ndim == 0 or len(values) != len(sample_ids):
+                raise ValueError(
+                    f"Output {name} of shape {values.shape} does not have the {len(sample_ids)} samples of the "
+                    f"batch along its first axis."
+                )
+            spec = self._progress['outputs'].setdefault(name, {'dtype': values.dtype.str, 'ndim': values.ndim - 1})
+            if values.dtype.str != spec['dtype'] or values.ndim - 1 != spec['ndim']:
+                raise ValueError(
+                    f"Output {name} of type {values.dtype} with {values.ndim - 1} dimensions per sample was stored as "
+                    f"{spec['dtype']} with {spec['ndim']} dimensions."
+                )
+            index = np.zeros((len(values), 1 + spec['ndim']), dtype=np.int64)
+            index[:, 1:] = values.shape[1:]
+            if name in lengths:
+                if spec['ndim'] == 0:
+                    raise ValueError(f"Output {name} has no axis to cut to lengths.")
+                index[:, 1] = np.minimum(np.asarray(lengths[name]).reshape(-1), values.shape[1])
+            sizes = index[:, 1:].prod(axis=1)
+            index[:, 0] = self._progress['sizes'].get(f'{name}.bin', 0) // values.itemsize + np.concatenate(
+                ([0], np.cumsum(sizes)[:-1])
+            )
+            data_file = self._file(f'{name}.bin')
+            if name in lengths:
+                for sample, length in zip(values, index[:, 1]):
+                    data_file.write(np.ascontiguousarray(sample[:length]).tobytes())
+            else:
+                data_file.write(np.ascontiguousarray(values).tobytes())
+            self._file(f'{name}.index').write(index.tobytes())
+        self._file(_SAMPLE_IDS).write(sample_ids.tobytes())
+        self._commit(len(sample_ids))
+
+    def _commit(self, num_samples: int):
+        sizes = {}
+        for file_name, f in self._files.items():
+            f.flush()
+            os.fsync(f.fileno())
+            sizes[file_name] = f.tell()
+        self._progress['sizes'].update(sizes)
+        self._progress['batches'] += 1
+        self._progress['samples'] += num_samples
+        tmp_path = os.path.join(self.path, _PROGRESS + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._progress, f)
+        os.replace(tmp_path, os.path.join(self.path, _PROGRESS))
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class _Shard(object):
+    def __init__(self, path: str):
+        with open(os.path.join(path, _PROGRESS), 'r') as f:
+            progress = json.load(f)
+        self.outputs = progress['outputs']
+        self.sample_ids = self._memmap(path, _SAMPLE_IDS, progress, np.int64)
+        self.values = {}
+        self.index = {}
+        for name, spec in self.outputs.items():
+            self.values[name] = self._memmap(path, f'{name}.bin', progress, np.dtype(spec['dtype']))
+            index = self._memmap(path, f'{name}.index', progress, np.int64)
+            self.index[name] = index.reshape(-1, 1 + spec['ndim'])
+
+    @staticmethod
+    def _memmap(path: str, file_name: str, progress: dict, dtype) -> np.ndarray:
+        # Only the completed batches are read
+        count = progress['sizes'].get(file_name, 0) // np.dtype(dtype).itemsize
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(path, file_name), dtype=dtype, mode='r', shape=(count,))
+
+
+class InferenceStore(object):
+    """
+    Reads the outputs written by NeuralModuleFactory.infer(output_dir=...), from the shards of all ranks in rank
+    order, without loading them into memory.
+
+    Args:
+        path: directory of the store
+    """
+
+    def __init__(self, path: str):
+        ranks = sorted(
+            int(name[len('rank_') :])
+            for name in os.listdir(path)
+            if name.startswith('rank_') and os.path.exists(os.path.join(path, name, _PROGRESS))
+        )
+        if not ranks:
+            raise FileNotFoundError(f"No inference outputs were found in {path}.")
+        self._shards = [_Shard(_shard_dir(path, rank)) for rank in ranks]
+        self.names: List[str] = list(self._shards[0].outputs)
+        self.sample_ids = np.concatenate([shard.sample_ids for shard in self._shards])
+        # Shard and position in the shard of each sample
+        self._shard_of = np.concatenate([np.full(len(s.sample_ids), i) for i, s in enumerate(self._shards)])
+        self._position = np.concatenate([np.arange(len(shard.sample_ids)) for shard in self._shards])
+
+    def __len__(self) -> int:
+        return len(self.sample_ids)
+
+    def shapes(self, name: str) -> np.ndarray:
+        """Shapes of the samples of an output [len(self) x number of dimensions per sample]."""
+        return np.concatenate([shard.index[name][:, 1:] for shard in self._shards])
+
+    def get(self, name: str, i: int) -> np.ndarray:
+        """
+        Values of an output for the i-th stored sample, with the id self.sample_ids[i]. The array maps the file,
+        copy it to keep it past the store.
+        """
+        shard = self._shards[self._shard_of[i]]
+        row = shard.index[name][self._position[i]]
+        offset, shape = int(row[0]), tuple(int(d) for d in row[1:])
+        return shard.values[name][offset : offset + int(np.prod(shape, dtype=np.int64))].reshape(shape)
+
+    def __getitem__(self, name: str) -> List[np.ndarray]:
+        """Values of an output for all stored samples."""
+        return [self.get(name, i) for i in range(len(self))]
@@ -0,0 +1,63 @@
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import importlib
+import importlib.util
+import sys
+
+__all__ = ['lazy_import']
+
+
+def lazy_import(package_name, submodules=None, module_attributes=None):
+    """
+    Creates the module level __getattr__ and __dir__ functions (PEP 562) of a package, which import its submodules
+    and the attributes it re-exports only when they are first accessed, so importing the package stays cheap.
+
+    Usage, in the __init__.py of the package:
+
+        __getattr__, __dir__ = lazy_import(__name__, submodules={...}, module_attributes={...})
+
+    Args:
+        package_name (str): __name__ of the package
+        submodules (dict): attribute name -> name of the module imported as that attribute
+        module_attributes (dict): module name -> names of the attributes of the module re-exported by the package
+
+    Returns:
+        __getattr__ and __dir__ functions of the package. Other submodules of the package are also imported on
+        attribute access, as they would be after an eager import.
+    """
+    submodules = dict(submodules or {})
+    attribute_modules = {
+        name: module_name for module_name, names in (module_attributes or {}).items() for name in names
+    }
+
+    def __getattr__(name):
+        if name in submodules:
+            value = importlib.import_module(submodules[name])
+        elif name in attribute_modules:
+            value = getattr(importlib.import_module(attribute_modules[name]), name)
+        elif not name.startswith('__') and importlib.util.find_spec(f"{package_name}.{name}") is not None:
+            value = importlib.import_module(f"{package_name}.{name}")
+        else:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        # Later accesses do not go through __getattr__ anymore.
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package_name])) | set(submodules) | set(attribute_modules))
+
+    return __getattr__, __dir__
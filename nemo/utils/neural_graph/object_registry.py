@@ -29,6 +29,14 @@ class ObjectRegistry(WeakSet):
         """
         super().__init__()
         self._base_type_name = base_type_name
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """
+            Counter incremented whenever an object is registered.
+        """
+        return self._version
 
     def register(self, new_obj, name: str) -> str:
         """
@@ -61,6 +69,7 @@ class ObjectRegistry(WeakSet):
 
         # Finally, add object to the set.
         self.add(new_obj)
+        self._version += 1
 
         # Return the name.
         return unique_name
@@ -29,6 +29,12 @@ class NmTensorNameRegistry:
         self._nmtensor_naming_dict = {"loss": "loss"}  # Reserve keyname of 'loss'
         # Create a dict that maps unique_names to tensors for use with TrainingState.get_tensor()
         self._nmtensor_uniname_dict = WeakValueDictionary()
+        self._version = 0
+
+    @property
+    def version(self):
+        """Counter incremented whenever a NmTensor is registered or renamed."""
+        return self._version
 
     @property
     def unique_names(self):
@@ -50,6 +56,7 @@ class NmTensorNameRegistry:
 
         # Finally, add object to the set.
         self._nmtensor_uniname_dict[tensor.unique_name] = tensor
+        self._version += 1
 
     def rename_NmTensor(self, tensor: 'NmTensor', new_name: str):
         """Helper function that changes the naming dictionary to facilitate user name -> tensor.unique_name lookup.
@@ -70,6 +77,7 @@ class NmTensorNameRegistry:
         if new_name in self._nmtensor_naming_dict:
             raise KeyError(f"{new_name} already exists in current graph. Please use a unique name")
         self._nmtensor_naming_dict[new_name] = tensor.unique_name
+        self._version += 1
 
     def __getitem__(self, key: str):
         """
@@ -0,0 +1,128 @@
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This script compares the speed and the transcripts of the two beam searches of BeamSearchDecoderWithLM: the native
+# CTC prefix beam search and Baidu's CTC decoders (ctc_decoders, see install_decoders.sh), if they are installed.
+#
+# The log probabilities are read from a .npz file with one [T x len(vocab) + 1] array per utterance, e.g. saved from
+# the outputs of JasperDecoderForCTC, or are drawn at random, peaked on the blank like the ones of a trained model.
+
+import argparse
+import time
+
+import numpy as np
+
+from nemo.collections.asr.parts.ctc_beam_search import (
+    CTCPrefixBeamSearch,
+    create_pool,
+    decode_batch,
+    load_language_model,
+)
+
+parser = argparse.ArgumentParser(description="Benchmark the CTC beam searches of BeamSearchDecoderWithLM.")
+parser.add_argument(
+    "--lm_path",
+    default=None,
+    type=str,
+    help="Path to the n-gram language model, a KenLM binary or a (small) ARPA file. Decodes without LM if not given.",
+)
+parser.add_argument(
+    "--log_probs",
+    default=None,
+    type=str,
+    help="Path to a .npz file with the log probabilities of the utterances. Random ones are used if not given.",
+)
+parser.add_argument(
+    "--vocab",
+    default=" abcdefghijklmnopqrstuvwxyz'",
+    type=str,
+    help="Characters of the vocabulary, without the CTC blank.",
+)
+parser.add_argument("--num_utterances", default=16, type=int, help="Number of random utterances.")
+parser.add_argument("--frames", default=300, type=int, help="Number of frames of the random utterances.")
+parser.add_argument("--beam_width", default=64, type=int)
+parser.add_argument("--alpha", default=2.0, type=float)
+parser.add_argument("--beta", default=1.5, type=float)
+parser.add_argument("--cutoff_prob", default=1.0, type=float)
+parser.add_argument("--cutoff_top_n", default=40, type=int)
+parser.add_argument("--num_cpus", default=1, type=int, help="Number of processes decoding utterances.")
+
+
+def random_log_probs(num_utterances, frames, num_labels, seed=0):
+    """Log probabilities with a few likely labels per frame, mostly the blank (the last label)."""
+    rng = np.random.RandomState(seed)
+    log_probs = []
+    for _ in range(num_utterances):
+        logits = 3.0 * rng.randn(frames, num_labels)
+        logits[:, -1] += 3.0
+        log_probs.append(logits - np.logaddexp.reduce(logits, axis=1, keepdims=True))
+    return log_probs
+
+
+def report(name, seconds, log_probs):
+    frames = sum(len(utterance) for utterance in log_probs)
+    print(f"{name}: {1000 * seconds / len(log_probs):.1f} ms per utterance, {frames / seconds:.0f} frames per second")
+
+
+def main(args):
+    vocab = list(args.vocab)
+    if args.log_probs is not None:
+        with np.load(args.log_probs) as data:
+            log_probs = [data[name].astype(np.float32) for name in data.files]
+    else:
+        log_probs = random_log_probs(args.num_utterances, args.frames, len(vocab) + 1)
+    print(f"{len(log_probs)} utterances, {sum(len(utterance) for utterance in log_probs)} frames")
+
+    search = CTCPrefixBeamSearch(
+        vocab,
+        args.beam_width,
+        alpha=args.alpha,
+        beta=args.beta,
+        language_model=load_language_model(args.lm_path) if args.lm_path is not None else None,
+        cutoff_prob=args.cutoff_prob,
+        cutoff_top_n=args.cutoff_top_n,
+    )
+    pool = create_pool(search, args.num_cpus) if args.num_cpus > 1 else None
+    start = time.perf_counter()
+    native = decode_batch(search, log_probs, pool=pool)
+    report("Native prefix beam search", time.perf_counter() - start, log_probs)
+    if pool is not None:
+        pool.terminate()
+
+    try:
+        from ctc_decoders import Scorer
+        from ctc_decoders import ctc_beam_search_decoder_batch
+    except ImportError:
+        print("ctc_decoders is not installed, see install_decoders.sh.")
+        return
+
+    scorer = Scorer(args.alpha, args.beta, model_path=args.lm_path, vocabulary=vocab) if args.lm_path else None
+    start = time.perf_counter()
+    baidu = ctc_beam_search_decoder_batch(
+        [np.exp(utterance) for utterance in log_probs],
+        vocab,
+        beam_size=args.beam_width,
+        num_processes=args.num_cpus,
+        ext_scoring_func=scorer,
+        cutoff_prob=args.cutoff_prob,
+        cutoff_top_n=args.cutoff_top_n,
+    )
+    report("ctc_decoders", time.perf_counter() - start, log_probs)
+
+    same = sum(1 for a, b in zip(native, baidu) if a and b and a[0][1] == b[0][1])
+    print(f"Same best transcript for {same} of {len(log_probs)} utterances")
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
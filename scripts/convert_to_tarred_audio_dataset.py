@@ -15,12 +15,19 @@
 # This script converts an existing audio dataset with a manifest to
 # a tarred and sharded audio dataset that can be read by the
 # TarredAudioToTextDataLayer.
+#
+# The utterances are assigned to the shards so that the shards have about the same total duration, and the shards
+# are written by several processes concurrently. Next to each shard audio_{i}.tar, the index audio_{i}.index.json
+# lists the name, byte offset and size of the data, and duration of each audio file in it, e.g. to validate the
+# shards or to read single files without scanning the tarball.
 
 import argparse
+import heapq
 import json
 import os
 import random
 import tarfile
+from concurrent.futures import ProcessPoolExecutor
 
 parser = argparse.ArgumentParser(
     description="Convert an existing ASR dataset to tarballs compatible with TarredAudioToTextDataLayer."
@@ -47,35 +54,89 @@ parser.add_argument(
     action='store_true',
     help="Whether or not to randomly shuffle the samples in the manifest before tarring/sharding.",
 )
-args = parser.parse_args()
+parser.add_argument(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of processes writing shards concurrently. Defaults to the number of CPUs.",
+)
+
 
+def squash_filename(audio_filepath):
+    """Name of the audio file in the tarball."""
+    # We squash the filename since we do not preserve directory structure of audio files in the tarball.
+    base, ext = os.path.splitext(audio_filepath)
+    base = base.replace('/', '_')
+    # Need the following replacement as long as WebDataset splits on first period
+    base = base.replace('.', '_')
+    return f'{base}{ext}'
 
-def create_shard(entries, target_dir, new_entries, shard_id):
-    """Creates a tarball containing the audio files from `entries`.
+
+def balance_shards(entries, num_shards):
     """
-    tar = tarfile.open(os.path.join(target_dir, f'audio_{shard_id}.tar'), mode='w')
+    Assigns the entries to num_shards shards with about the same total duration, by adding the longest remaining
+    entry to the shard with the shortest total duration so far. The entries of a shard keep their order.
 
-    for entry in entries:
-        # We squash the filename since we do not preserve directory structure of audio files in the tarball.
-        base, ext = os.path.splitext(entry['audio_filepath'])
-        base = base.replace('/', '_')
-        # Need the following replacement as long as WebDataset splits on first period
-        base = base.replace('.', '_')
-        squashed_filename = f'{base}{ext}'
-        tar.add(entry['audio_filepath'], arcname=squashed_filename)
+    Returns:
+        list of the entries of each shard
+    """
+    shards = [(0.0, shard_id, []) for shard_id in range(num_shards)]
+    heapq.heapify(shards)
+    for idx in sorted(range(len(entries)), key=lambda idx: -entries[idx]['duration']):
+        duration, shard_id, indices = heapq.heappop(shards)
+        indices.append(idx)
+        heapq.heappush(shards, (duration + entries[idx]['duration'], shard_id, indices))
+    shards.sort(key=lambda shard: shard[1])
+    return [[entries[idx] for idx in sorted(indices)] for _, _, indices in shards]
 
-        new_entry = {
-            'audio_filepath': squashed_filename,
-            'duration': entry['duration'],
-            'text': entry['text'],
-            'shard_id': shard_id,  # Keep shard ID for recordkeeping
-        }
-        new_entries.append(new_entry)
 
-    tar.close()
+def create_shard(entries, target_dir, shard_id):
+    """Creates a tarball containing the audio files from `entries`, and its index.
 
+    The index audio_{shard_id}.index.json has one JSON line per member of the tarball with its name, the byte offset
+    and size of its data in the tarball, and its duration.
 
-def main():
+    Returns:
+        the manifest entries of the shard
+    """
+    tar_path = os.path.join(target_dir, f'audio_{shard_id}.tar')
+    index_path = os.path.join(target_dir, f'audio_{shard_id}.index.json')
+    new_entries = []
+    index = []
+    with tarfile.open(tar_path + '.tmp', mode='w') as tar:
+        for entry in entries:
+            squashed_filename = squash_filename(entry['audio_filepath'])
+            tarinfo = tar.gettarinfo(entry['audio_filepath'], arcname=squashed_filename)
+            header_offset = tar.offset
+            with open(entry['audio_filepath'], 'rb') as audio_file:
+                tar.addfile(tarinfo, audio_file)
+            index.append(
+                {
+                    'name': squashed_filename,
+                    'offset': header_offset + len(tarinfo.tobuf(tar.format, tar.encoding, tar.errors)),
+                    'size': tarinfo.size,
+                    'duration': entry['duration'],
+                }
+            )
+
+            new_entry = {
+                'audio_filepath': squashed_filename,
+                'duration': entry['duration'],
+                'text': entry['text'],
+                'shard_id': shard_id,  # Keep shard ID for recordkeeping
+            }
+            new_entries.append(new_entry)
+
+    with open(index_path + '.tmp', 'w') as f:
+        for member in index:
+            json.dump(member, f)
+            f.write('\n')
+    os.replace(tar_path + '.tmp', tar_path)
+    os.replace(index_path + '.tmp', index_path)
+    return new_entries
+
+
+def main(args):
     manifest_path = args.manifest_path
     target_dir = args.target_dir
     num_shards = args.num_shards
@@ -94,24 +155,24 @@ def main():
         print("Shuffling...")
         random.shuffle(entries)
 
-    # Create shards and updated manifest entries
-    new_entries = []
-    for i in range(num_shards):
-        start_idx = (len(entries) // num_shards) * i
-        end_idx = start_idx + (len(entries) // num_shards)
-        if i == num_shards - 1:
-            end_idx = len(entries)  # Last shard gets the leftovers.
-        print(f"Shard {i} will have {end_idx - start_idx} entries.")
+    # Shards with the same total duration, written concurrently
+    shards = balance_shards(entries, num_shards)
+    for i, shard in enumerate(shards):
+        hours = sum(entry['duration'] for entry in shard) / 3600
+        print(f"Shard {i} will have {len(shard)} entries ({hours:.2f} hours).")
 
-        create_shard(entries[start_idx:end_idx], target_dir, new_entries, i)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        shard_entries = executor.map(create_shard, shards, [target_dir] * num_shards, range(num_shards))
 
-    # Write manifest
-    new_manifest_path = os.path.join(target_dir, 'tarred_audio_manifest.json')
-    with open(new_manifest_path, 'w') as m2:
-        for entry in new_entries:
-            json.dump(entry, m2)
-            m2.write('\n')
+        # Write manifest
+        new_manifest_path = os.path.join(target_dir, 'tarred_audio_manifest.json')
+        with open(new_manifest_path + '.tmp', 'w') as m2:
+            for new_entries in shard_entries:
+                for entry in new_entries:
+                    json.dump(entry, m2)
+                    m2.write('\n')
+        os.replace(new_manifest_path + '.tmp', new_manifest_path)
 
 
 if __name__ == "__main__":
-    main()
+    main(parser.parse_args())
@@ -17,12 +17,17 @@
 # =============================================================================
 
 import os
+import tempfile
 from unittest import TestCase
 
+import numpy as np
 import pytest
+import torch
 
-from nemo.backends.pytorch.actions import PtActions
+from nemo.backends.pytorch.actions import PtActions, _EvalShardSampler
 from nemo.backends.pytorch.common import SequenceEmbedding
+from nemo.backends.pytorch.tutorials import MSELoss, RealFunctionDataLayer, TaylorNet
+from nemo.utils.app_state import AppState
 
 
 @pytest.mark.usefixtures("neural_factory")
@@ -66,3 +71,86 @@ class TestTrainers(TestCase):
         self.assertEqual(optimizer.epoch, 0)
         self.assertEqual(len(optimizer.optimizers), 5)
         os.remove(path)
+
+    @pytest.mark.unit
+    def test_eval_shard_sampler(self):
+        dataset = list(range(10))
+        shards = [list(_EvalShardSampler(dataset, num_replicas=3, rank=rank)) for rank in range(3)]
+        # Disjoint, unpadded shards covering the dataset once
+        self.assertEqual(sorted(i for shard in shards for i in shard), dataset)
+        self.assertEqual([len(shard) for shard in shards], [4, 3, 3])
+        self.assertEqual([len(_EvalShardSampler(dataset, 3, rank)) for rank in range(3)], [4, 3, 3])
+
+    @pytest.mark.unit
+    def test_global_var_specs(self):
+        rank_0 = {'count': np.int64(3), 'loss': 0.5, 'preds': [1, 2], 'stats': {'tp': torch.ones(2)}}
+        # A worker with an empty shard never ran the iter callback
+        rank_1 = {'count': 4, 'loss': 1}
+        spec = PtActions._merge_global_var_specs([PtActions._global_var_spec(v) for v in (rank_0, rank_1)])
+        self.assertEqual(list(spec[1]), ['count', 'loss', 'preds', 'stats'])
+        # numpy scalars are summed like arrays, numbers are floats if any worker holds a float
+        self.assertEqual(spec[1]['count'], ('array', (), '<i8', True))
+        self.assertEqual(spec[1]['loss'], ('number', True))
+        self.assertEqual(spec[1]['preds'], ('list', None))
+        self.assertEqual(spec[1]['stats'], ('dict', {'tp': ('tensor', (2,), torch.float32)}))
+        self.assertEqual(PtActions._merge_global_var_specs([('dict', {}), ('dict', {})]), ('dict', {}))
+
+    @pytest.mark.unit
+    def test_execution_plan_cache(self):
+        data_source = RealFunctionDataLayer(n=8, batch_size=4)
+        trainable_module = TaylorNet(dim=4)
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        trainer = self.nf._trainer
+
+        first = self.nf.infer(tensors=[y_pred, x])
+        call_chain = trainer._call_chain_cache[(y_pred.unique_name, x.unique_name)]
+        second = self.nf.infer(tensors=[y_pred, x])
+        # Same call chain and plan are reused for the same requested tensors
+        self.assertIs(trainer._call_chain_cache[(y_pred.unique_name, x.unique_name)], call_chain)
+        self.assertEqual(len(trainer._execution_plans), 1)
+        for a, b in zip(first[0] + first[1], second[0] + second[1]):
+            self.assertTrue(a.equal(b))
+        for batch_x, batch_y_pred in zip(first[1], first[0]):
+            self.assertTrue(trainable_module(force_pt=True, x=batch_x).equal(batch_y_pred))
+
+        # Growing the graph invalidates cached plans
+        loss_tensor = MSELoss()(predictions=y_pred, target=y)
+        self.nf.infer(tensors=[loss_tensor])
+        self.assertNotIn((y_pred.unique_name, x.unique_name), trainer._call_chain_cache)
+        self.assertEqual(len(trainer._execution_plans), 1)
+
+        # So does registering a module, the plans are keyed on the registry versions rather than on their sizes
+        key = (loss_tensor.unique_name,)
+        loss_call_chain = trainer._call_chain_cache[key]
+        version = AppState().modules.version
+        TaylorNet(dim=4)
+        self.assertEqual(AppState().modules.version, version + 1)
+        self.nf.infer(tensors=[loss_tensor])
+        self.assertEqual(len(trainer._call_chain_cache), 1)
+        self.assertIsNot(trainer._call_chain_cache[key], loss_call_chain)
+
+        # The requested tensors are deduplicated without changing the caller's list
+        tensors = [x, x]
+        self.nf.infer(tensors=tensors)
+        self.assertEqual(tensors, [x, x])
+
+    @pytest.mark.unit
+    def test_infer_to_output_dir(self):
+        data_source = RealFunctionDataLayer(n=10, batch_size=4)
+        trainable_module = TaylorNet(dim=4)
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        expected = self.nf.infer(tensors=[y_pred, x])
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            store = self.nf.infer(tensors=[y_pred, x], output_dir=output_dir)
+            self.assertEqual(store.sample_ids.tolist(), list(range(10)))
+            for name, values in ((y_pred.unique_name, expected[0]), (x.unique_name, expected[1])):
+                self.assertTrue(np.array_equal(np.stack(store[name]), torch.cat(values).numpy()))
+
+            with self.assertRaises(FileExistsError):
+                self.nf.infer(tensors=[y_pred, x], output_dir=output_dir)
+            # Nothing is left to infer after the last batch
+            store = self.nf.infer(tensors=[y_pred, x], output_dir=output_dir, resume=True)
+            self.assertEqual(len(store), 10)
@@ -37,13 +37,16 @@ import pytest
 import torch
 
 import nemo
+import nemo.collections.asr as nemo_asr
 import nemo.collections.nlp as nemo_nlp
 import nemo.collections.nlp.nm.trainables.common.token_classification_nm
 import nemo.collections.tts as nemo_tts
 
 from nemo import logging
+from nemo.backends.pytorch.nm import DataLayerNM
 from nemo.core import DeploymentFormat as DF
 from nemo.core import NeuralModule
+from nemo.core.neural_types import AudioSignal, LengthsType, NeuralType
 
 # Check if the required libraries and runtimes are installed.
 # Only initialize GPU after this runner is activated.
@@ -365,3 +368,77 @@ class TestDeployExport:
         tmp_file_name = str(tmpdir.mkdir("export").join("waveglow"))
 
         self.__test_export_route(module=module, out_name=tmp_file_name, mode=df_type, input_example=input_example)
+
+    @pytest.mark.unit
+    def test_call_chain_export(self, tmpdir):
+        """ Tests export of a whole preprocessor -> encoder -> decoder call chain as a single ONNX graph and checks
+            that inference with ONNX Runtime on CPU matches PyTorch.
+
+            Args:
+                tmpdir: Fixture which will provide a temporary directory.
+        """
+
+        class DummyAudioDataLayer(DataLayerNM):
+            def __init__(self):
+                super().__init__()
+                self._batch_size = 4
+                self._num_workers = 0
+
+                class DummyDS(torch.utils.data.Dataset):
+                    def __getitem__(self, index):
+                        generator = torch.Generator().manual_seed(index)
+                        length = torch.randint(low=4000, high=8001, size=[], generator=generator)
+                        audio_signal = torch.randn(8000, generator=generator)
+                        audio_signal[length:] = 0.0
+                        return audio_signal, length
+
+                    def __len__(self):
+                        return 8
+
+                self._dataset = DummyDS()
+
+            @property
+            def output_ports(self):
+                return {
+                    "audio_signal": NeuralType(('B', 'T'), AudioSignal(freq=16000)),
+                    "a_sig_length": NeuralType(tuple('B'), LengthsType()),
+                }
+
+            def __len__(self):
+                return len(self._dataset)
+
+            @property
+            def dataset(self):
+                return self._dataset
+
+        data_layer = DummyAudioDataLayer()
+        preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor(dither=0.0)
+        encoder = NeuralModule.import_from_config("tests/configs/test_deploy_export.yaml", "JasperEncoder")
+        decoder = NeuralModule.import_from_config("tests/configs/test_deploy_export.yaml", "JasperDecoderForCTC")
+
+        audio_signal, a_sig_length = data_layer()
+        processed_signal, processed_length = preprocessor(input_signal=audio_signal, length=a_sig_length)
+        encoded, encoded_len = encoder(audio_signal=processed_signal, length=processed_length)
+        log_probs = decoder(encoder_output=encoded)
+
+        # The reference uses torch.stft, before the export switches the preprocessor to its convolutional STFT
+        torch_log_probs, torch_encoded_len = self.nf.infer(tensors=[log_probs, encoded_len], verbose=False)
+
+        out_name = str(tmpdir.mkdir("export").join("asr_chain.onnx"))
+        preprocessor.featurizer.dither = 1e-5
+        self.nf.deployment_export(module=[log_probs, encoded_len], output=out_name, d_format=DF.ONNX)
+        assert Path(out_name).exists()
+        # The preprocessor is restored once the export is done
+        assert preprocessor.featurizer.dft_basis is None
+        assert preprocessor.featurizer.dither == 1e-5
+        preprocessor.featurizer.dither = 0.0
+
+        ort_log_probs, ort_encoded_len = self.nf.infer(
+            tensors=[log_probs, encoded_len], verbose=False, onnx_model=out_name
+        )
+
+        assert len(ort_log_probs) == len(torch_log_probs) == 2
+        for t_lp, o_lp, t_len, o_len in zip(torch_log_probs, ort_log_probs, torch_encoded_len, ort_encoded_len):
+            assert t_lp.shape == o_lp.shape
+            assert torch.allclose(t_lp, o_lp, atol=1e-3)
+            assert torch.equal(t_len, o_len)
@@ -0,0 +1,157 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import pytest
+import torch
+
+import nemo.collections.asr as nemo_asr
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_nm import (
+    TransformerDecoderNM,
+    TransformerEncoderNM,
+)
+
+
+def _block(filters, residual=True, residual_dense=False):
+    return {
+        'filters': filters,
+        'repeat': 2,
+        'kernel': [5],
+        'stride': [1],
+        'dilation': [1],
+        'dropout': 0.2,
+        'residual': residual,
+        'residual_dense': residual_dense,
+    }
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestActivationCheckpointing(TestCase):
+    def _compare(self, make_module, make_inputs, every, output_index=None):
+        torch.manual_seed(0)
+        reference = make_module(0)
+        checkpointed = make_module(every)
+        checkpointed.load_state_dict(reference.state_dict())
+
+        results = []
+        for module in (reference, checkpointed):
+            module.train()
+            torch.manual_seed(1)
+            inputs = make_inputs()
+            torch.manual_seed(2)
+            output = module(force_pt=True, **inputs)
+            if output_index is not None:
+                output = output[output_index]
+            output.pow(2).mean().backward()
+            grads = {name: p.grad.clone() for name, p in module.named_parameters() if p.grad is not None}
+            results.append((output.detach(), grads, module.state_dict()))
+
+        (ref_output, ref_grads, ref_state), (output, grads, state) = results
+        self.assertTrue(torch.allclose(ref_output, output, atol=1e-6))
+        self.assertEqual(ref_grads.keys(), grads.keys())
+        self.assertTrue(grads)
+        for name in ref_grads:
+            self.assertTrue(torch.allclose(ref_grads[name], grads[name], atol=1e-6), name)
+        # Batch norm statistics are not updated a second time by the recomputation
+        for name in ref_state:
+            self.assertTrue(torch.equal(ref_state[name], state[name]), name)
+        return checkpointed
+
+    def _jasper(self, every):
+        return nemo_asr.JasperEncoder(
+            feat_in=16,
+            activation="relu",
+            jasper=[
+                _block(32, residual=False),
+                _block(32, residual_dense=True),
+                _block(32, residual_dense=True),
+                _block(32, residual_dense=True),
+            ],
+            activation_checkpointing_every=every,
+        )
+
+    @staticmethod
+    def _audio():
+        return {'audio_signal': torch.randn(3, 16, 40), 'length': torch.tensor([40, 31, 22])}
+
+    @pytest.mark.unit
+    def test_jasper_gradients_match(self):
+        for every in (1, 2):
+            encoder = self._compare(self._jasper, self._audio, every, output_index=0)
+            report = encoder.activation_checkpointing.report
+            self.assertEqual(report['checkpointed_layers'], list(range(every - 1, 4, every)))
+            self.assertGreater(report['activation_memory_saved'], 0)
+            self.assertGreater(report['forward_recompute_fraction'], 0)
+
+    @pytest.mark.unit
+    def test_jasper_first_block_gets_gradients(self):
+        # The input of the first block, the features, does not require grad
+        torch.manual_seed(0)
+        encoder = self._jasper(1)
+        encoder.train()
+        encoder(force_pt=True, **self._audio())[0].pow(2).mean().backward()
+        for name, p in encoder.encoder[0].named_parameters():
+            self.assertIsNotNone(p.grad, name)
+
+    @pytest.mark.unit
+    def test_jasper_not_checkpointed_in_eval(self):
+        torch.manual_seed(0)
+        encoder = self._jasper(1)
+        encoder.eval()
+        encoder(force_pt=True, **self._audio())
+        with torch.no_grad():
+            encoder.train()
+            encoder(force_pt=True, **self._audio())
+        self.assertIsNone(encoder.activation_checkpointing.report)
+
+    @pytest.mark.unit
+    def test_transformer_gradients_match(self):
+        kwargs = dict(
+            vocab_size=20,
+            d_model=16,
+            d_inner=32,
+            max_seq_length=12,
+            num_layers=3,
+            num_attn_heads=2,
+            ffn_dropout=0.1,
+            attn_score_dropout=0.1,
+            attn_layer_dropout=0.1,
+        )
+        mask = torch.tensor([[1] * 10, [1] * 6 + [0] * 4]).float()
+
+        def encoder_inputs():
+            return {'input_ids': torch.randint(20, (2, 10)), 'input_mask_src': mask}
+
+        def decoder_inputs():
+            return {
+                'input_ids_tgt': torch.randint(20, (2, 10)),
+                'hidden_states_src': torch.randn(2, 10, 16),
+                'input_mask_src': mask,
+                'input_mask_tgt': mask,
+            }
+
+        for every in (1, 2):
+            self._compare(
+                lambda every: TransformerEncoderNM(activation_checkpointing_every=every, **kwargs),
+                encoder_inputs,
+                every,
+            )
+            self._compare(
+                lambda every: TransformerDecoderNM(activation_checkpointing_every=every, **kwargs),
+                decoder_inputs,
+                every,
+            )
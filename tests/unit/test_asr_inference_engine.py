@@ -0,0 +1,95 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+import nemo.collections.asr as nemo_asr
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestASRInferenceEngine(TestCase):
+    labels = [" ", "a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m", "n", "o", "p", "'"]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor(dither=0.0, features=32)
+        self.encoder = nemo_asr.JasperEncoder(
+            feat_in=32,
+            activation="relu",
+            conv_mask=True,
+            jasper=[
+                {
+                    'filters': 64,
+                    'repeat': 1,
+                    'kernel': [11],
+                    'stride': [2],
+                    'dilation': [1],
+                    'dropout': 0.0,
+                    'residual': False,
+                },
+                {
+                    'filters': 64,
+                    'repeat': 2,
+                    'kernel': [5],
+                    'stride': [1],
+                    'dilation': [1],
+                    'dropout': 0.0,
+                    'residual': True,
+                },
+            ],
+        )
+        self.decoder = nemo_asr.JasperDecoderForCTC(feat_in=64, num_classes=len(self.labels))
+        rng = np.random.RandomState(0)
+        self.audios = [rng.randn(n).astype(np.float32) for n in (3000, 8000, 5500, 1600, 7000)]
+
+    def _engine(self, **kwargs):
+        return nemo_asr.ASRInferenceEngine(self.preprocessor, self.encoder, self.decoder, self.labels, **kwargs)
+
+    @pytest.mark.unit
+    def test_batched_matches_single(self):
+        engine = self._engine()
+        single = [engine.transcribe_batch([audio])[0] for audio in self.audios]
+        self.assertEqual(engine.transcribe_batch(self.audios), single)
+
+    @pytest.mark.unit
+    def test_dither_disabled(self):
+        self.preprocessor.featurizer.dither = 1.0
+        engine = self._engine()
+        self.assertEqual(engine.transcribe_batch(self.audios), engine.transcribe_batch(self.audios))
+        # The engine does not change the preprocessor it was created with
+        self.assertEqual(self.preprocessor.featurizer.dither, 1.0)
+
+    @pytest.mark.unit
+    def test_concurrent_requests(self):
+        engine = self._engine()
+        expected = [engine.transcribe_batch([audio])[0] for audio in self.audios]
+        # A small padded duration limit forces some requests into later micro-batches
+        with self._engine(max_batch_size=3, max_wait_ms=50.0, max_batch_duration=1.0) as engine:
+            futures = [engine.submit(audio) for audio in self.audios]
+            self.assertEqual([f.result(timeout=60) for f in futures], expected)
+
+    @pytest.mark.unit
+    def test_errors(self):
+        engine = self._engine()
+        with self.assertRaises(RuntimeError):
+            engine.submit(self.audios[0])
+        with self.assertRaises(ValueError):
+            engine.submit(self.audios[0], beam=True)
+        with self.assertRaises(ValueError):
+            engine.transcribe_batch([np.zeros((2, 100), dtype=np.float32)])
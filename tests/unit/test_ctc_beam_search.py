@@ -0,0 +1,247 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import itertools
+import math
+import os
+import shutil
+import sys
+import tempfile
+import types
+from unittest import TestCase, mock
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.asr.beam_search_decoder import BeamSearchDecoderWithLM
+from nemo.collections.asr.parts.ctc_beam_search import (
+    OOV_SCORE,
+    ArpaLanguageModel,
+    CTCPrefixBeamSearch,
+    rescore_nbest,
+)
+
+_ARPA = """
+\\data\\
+ngram 1=5
+ngram 2=4
+
+\\1-grams:
+-99 <s> -0.3
+-0.5 </s>
+-0.6 a -0.2
+-0.9 b -0.25
+-1.2 ab
+
+\\2-grams:
+-0.2 <s> a
+-0.4 a b
+-0.7 b a
+-0.3 a </s>
+
+\\end\\
+"""
+
+_VOCAB = ['a', 'b', ' ']
+
+
+def _exhaustive_search(log_probs, language_model, alpha, beta):
+    """Scores of all transcripts, summing the probabilities of all alignments of each."""
+    blank = len(_VOCAB)
+    ctc_log_probs = {}
+    for alignment in itertools.product(range(blank + 1), repeat=len(log_probs)):
+        labels = [
+            label for i, label in enumerate(alignment) if label != blank and (i == 0 or alignment[i - 1] != label)
+        ]
+        text = ''.join(_VOCAB[label] for label in labels)
+        log_prob = sum(log_probs[t, label] for t, label in enumerate(alignment))
+        ctc_log_probs[text] = np.logaddexp(ctc_log_probs.get(text, -np.inf), log_prob)
+
+    scores = {}
+    for text, log_prob in ctc_log_probs.items():
+        context = ('<s>',)
+        for word in text.split():
+            log_prob += alpha * language_model.score(context, word) + beta
+            context = context + (word,)
+        scores[text] = log_prob
+    return scores
+
+
+class TestCTCBeamSearch(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.lm_path = os.path.join(self.tmp_dir, 'lm.arpa')
+        with open(self.lm_path, 'w') as f:
+            f.write(_ARPA)
+        self.language_model = ArpaLanguageModel(self.lm_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @pytest.mark.unit
+    def test_arpa_scores(self):
+        ln10 = math.log(10)
+        lm = self.language_model
+        self.assertEqual(lm.order, 2)
+        self.assertAlmostEqual(lm.score(('<s>',), 'a'), -0.2 * ln10)
+        # Back-off
+        self.assertAlmostEqual(lm.score(('<s>',), 'b'), (-0.3 - 0.9) * ln10)
+        self.assertAlmostEqual(lm.score(('<s>', 'a'), 'b'), -0.4 * ln10)
+        self.assertAlmostEqual(lm.score(('b',), 'b'), (-0.25 - 0.9) * ln10)
+        self.assertAlmostEqual(lm.score(('ab',), 'a'), -0.6 * ln10)
+        self.assertEqual(lm.score(('a',), 'c'), OOV_SCORE)
+
+        # The score cache is bounded
+        lm = ArpaLanguageModel(self.lm_path, cache_size=2)
+        for word in ('a', 'b', 'ab', 'a'):
+            lm.score(('<s>',), word)
+        self.assertEqual(list(lm._cache), [(('<s>',), 'ab'), (('<s>',), 'a')])
+
+    @pytest.mark.unit
+    def test_matches_exhaustive_search(self):
+        rng = np.random.RandomState(0)
+        for alpha, beta in ((0.0, 0.0), (1.0, 0.5), (2.5, -1.0)):
+            log_probs = np.log(rng.dirichlet(np.ones(len(_VOCAB) + 1) * 0.5, size=6))
+            expected = _exhaustive_search(log_probs, self.language_model, alpha, beta)
+            expected = sorted(expected.items(), key=lambda item: -item[1])[:10]
+
+            # A beam keeping all prefixes is exact
+            search = CTCPrefixBeamSearch(_VOCAB, 10000, alpha, beta, language_model=self.language_model)
+            results = search.decode(log_probs)[:10]
+            self.assertEqual([text for _, text in results], [text for text, _ in expected])
+            for (score, _), (_, expected_score) in zip(results, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+            # The best transcript is found with a smaller beam
+            search = CTCPrefixBeamSearch(_VOCAB, 32, alpha, beta, language_model=self.language_model)
+            self.assertEqual(search.decode(log_probs)[0][1], expected[0][0])
+
+    @pytest.mark.unit
+    def test_pruning_to_best_label_is_greedy(self):
+        log_probs = np.log(np.random.RandomState(1).dirichlet(np.ones(len(_VOCAB) + 1), size=20))
+        best = log_probs.argmax(axis=1)
+        greedy = ''.join(
+            _VOCAB[label] for i, label in enumerate(best) if label != len(_VOCAB) and (i == 0 or best[i - 1] != label)
+        )
+        for kwargs in ({'cutoff_top_n': 1}, {'cutoff_prob': 1e-6}):
+            search = CTCPrefixBeamSearch(_VOCAB, 16, **kwargs)
+            results = search.decode(log_probs)
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0][1], greedy)
+            self.assertAlmostEqual(results[0][0], log_probs.max(axis=1).sum())
+
+    @pytest.mark.unit
+    def test_rescored_nbest_matches_search(self):
+        rng = np.random.RandomState(2)
+        log_probs = [np.log(rng.dirichlet(np.ones(len(_VOCAB) + 1) * 0.5, size=length)) for length in (6, 4, 5)]
+        search = CTCPrefixBeamSearch(_VOCAB, 10000, 1.0, 0.5, language_model=self.language_model)
+        nbest = [search.decode_nbest(utterance) for utterance in log_probs]
+        for hypotheses in nbest:
+            for hypothesis in hypotheses:
+                words = hypothesis.text.split()
+                self.assertEqual(hypothesis.num_words, len(words))
+                self.assertAlmostEqual(
+                    hypothesis.score, hypothesis.acoustic_score + 1.0 * hypothesis.lm_score + 0.5 * len(words)
+                )
+
+        # A beam keeping all prefixes rescores exactly
+        weights = [(0.0, 0.0), (1.0, 0.5), (2.5, -1.0), (0.3, 2.0)]
+        best = rescore_nbest(nbest, [alpha for alpha, _ in weights], [beta for _, beta in weights])
+        self.assertEqual(best.shape, (len(weights), len(log_probs)))
+        for (alpha, beta), indices in zip(weights, best):
+            search = CTCPrefixBeamSearch(_VOCAB, 10000, alpha, beta, language_model=self.language_model)
+            for utterance, hypotheses, i in zip(log_probs, nbest, indices):
+                expected_score, expected_text = search.decode(utterance)[0]
+                self.assertEqual(hypotheses[i].text, expected_text)
+                self.assertAlmostEqual(
+                    hypotheses[i].acoustic_score + alpha * hypotheses[i].lm_score + beta * hypotheses[i].num_words,
+                    expected_score,
+                )
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestBeamSearchDecoderWithLM(TestCase):
+    @pytest.mark.unit
+    def test_batch_decoded_in_processes(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            lm_path = os.path.join(tmp_dir, 'lm.arpa')
+            with open(lm_path, 'w') as f:
+                f.write(_ARPA)
+            kwargs = dict(vocab=_VOCAB, beam_width=8, alpha=1.0, beta=0.5, lm_path=lm_path)
+            log_probs = torch.randn(4, 12, len(_VOCAB) + 1).log_softmax(dim=-1)
+            lengths = torch.tensor([12, 7, 10, 3])
+            search = CTCPrefixBeamSearch(_VOCAB, 8, 1.0, 0.5, language_model=ArpaLanguageModel(lm_path))
+            expected = [search.decode(log_probs[i, :length].numpy()) for i, length in enumerate(lengths)]
+
+            # The native search is the default, whether ctc_decoders is installed or not
+            with mock.patch.dict(sys.modules, {'ctc_decoders': types.ModuleType('ctc_decoders')}):
+                decoder = BeamSearchDecoderWithLM(num_cpus=2, **kwargs)
+                results = decoder(force_pt=True, log_probs=log_probs, log_probs_length=lengths)[0]
+                self.assertEqual(results, expected)
+
+            # Lists of probabilities
+            decoder = BeamSearchDecoderWithLM(num_cpus=1, input_tensor=False, **kwargs)
+            probs = [log_probs[i, :length].exp().numpy() for i, length in enumerate(lengths)]
+            results = decoder(force_pt=True, log_probs=probs, log_probs_length=None)[0]
+            for result, expected_result in zip(results, expected):
+                self.assertEqual([text for _, text in result], [text for _, text in expected_result])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @pytest.mark.unit
+    def test_ctc_decoders_backend(self):
+        calls = []
+        ctc_decoders = types.ModuleType('ctc_decoders')
+        ctc_decoders.Scorer = lambda alpha, beta, model_path, vocabulary: ('scorer', alpha, beta, model_path)
+
+        def ctc_beam_search_decoder_batch(probs_split, vocabulary, **kwargs):
+            calls.append((probs_split, vocabulary, kwargs))
+            return [[(0.0, 'a')] for _ in probs_split]
+
+        ctc_decoders.ctc_beam_search_decoder_batch = ctc_beam_search_decoder_batch
+        log_probs = torch.randn(2, 5, len(_VOCAB) + 1).log_softmax(dim=-1)
+        lengths = torch.tensor([5, 3])
+        with mock.patch.dict(sys.modules, {'ctc_decoders': ctc_decoders}):
+            decoder = BeamSearchDecoderWithLM(
+                vocab=_VOCAB,
+                beam_width=8,
+                alpha=1.0,
+                beta=0.5,
+                lm_path='lm.binary',
+                num_cpus=4,
+                cutoff_top_n=3,
+                backend='ctc_decoders',
+            )
+            results = decoder(force_pt=True, log_probs=log_probs, log_probs_length=lengths)[0]
+        self.assertIsNone(decoder.search)
+        self.assertEqual(results, [[(0.0, 'a')]] * 2)
+        probs_split, vocabulary, kwargs = calls[0]
+        self.assertEqual(vocabulary, _VOCAB)
+        for probs, log_prob, length in zip(probs_split, log_probs, lengths):
+            self.assertTrue(np.allclose(probs, log_prob[:length].exp().numpy()))
+        self.assertEqual(kwargs['beam_size'], 8)
+        self.assertEqual(kwargs['num_processes'], 4)
+        self.assertEqual(kwargs['ext_scoring_func'], ('scorer', 1.0, 0.5, 'lm.binary'))
+        self.assertEqual(kwargs['cutoff_top_n'], 3)
+
+        # The backend has to be chosen explicitly, and installed
+        with mock.patch.dict(sys.modules, {'ctc_decoders': None}):
+            with self.assertRaises(ImportError):
+                BeamSearchDecoderWithLM(_VOCAB, 8, 1.0, 0.5, None, 1, backend='ctc_decoders')
+        with self.assertRaises(ValueError):
+            BeamSearchDecoderWithLM(_VOCAB, 8, 1.0, 0.5, None, 1, backend='baidu')
@@ -0,0 +1,85 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase, mock
+
+import pytest
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from torchvision.transforms import Compose, Resize, ToTensor
+
+from nemo.collections.cv.modules.data_layers import InMemoryImageIterator, in_memory_image_iterator
+
+
+class TestInMemoryImageIterator(TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.images = torch.randint(256, (10, 3, 32, 32), dtype=torch.uint8)
+
+    @pytest.mark.unit
+    def test_matches_torchvision_transforms(self):
+        for size in [32, 64, 224, 28]:
+            iterator = InMemoryImageIterator(self.images, lambda i, x: (i, x), 4, False, size, size)
+            self.assertEqual(len(iterator), 3)
+            batches = list(iterator)
+            indices = torch.cat([batch[0] for batch in batches])
+            images = torch.cat([batch[1] for batch in batches])
+
+            transforms = Compose([Resize((size, size)), ToTensor()])
+            expected = torch.stack(
+                [transforms(Image.fromarray(image.permute(1, 2, 0).numpy())) for image in self.images]
+            )
+            self.assertTrue(torch.equal(indices, torch.arange(10)))
+            self.assertEqual(images.dtype, torch.float32)
+            self.assertEqual(images.shape, expected.shape)
+            # PIL rounds the resized images to uint8
+            self.assertLessEqual((images - expected).abs().max().item(), 1.01 / 255)
+
+    @pytest.mark.unit
+    def test_downscale_without_antialias(self):
+        # Before torch 1.11, F.interpolate has no antialias argument
+        with mock.patch.object(in_memory_image_iterator, '_INTERPOLATE_HAS_ANTIALIAS', False):
+            iterator = InMemoryImageIterator(self.images, lambda i, x: (i, x), 4, False, 8, 8)
+            images = torch.cat([batch[1] for batch in iterator])
+        self.assertTrue(torch.allclose(images, F.avg_pool2d(self.images.float() / 255, 4)))
+
+    @pytest.mark.unit
+    def test_shuffle_covers_dataset(self):
+        iterator = InMemoryImageIterator(self.images, lambda i, x: (i, x), 3, True, 32, 32)
+        indices, images = zip(*iterator)
+        indices = torch.cat(indices)
+        self.assertTrue(torch.equal(indices.sort()[0], torch.arange(10)))
+        self.assertTrue(torch.equal(torch.cat(images), self.images[indices].float() / 255))
+
+    @pytest.mark.unit
+    def test_random_crop_and_flip(self):
+        iterator = InMemoryImageIterator(
+            self.images, lambda i, x: (i, x), 10, False, 32, 32, random_flip=True, random_crop_padding=4
+        )
+        _, images = next(iter(iterator))
+        padded = F.pad(self.images.float() / 255, [4] * 4)
+        for image, padded_image in zip(images, padded):
+            crops = [
+                crop
+                for top in range(9)
+                for left in range(9)
+                for crop in [padded_image[:, top : top + 32, left : left + 32]]
+                for crop in [crop, crop.flip(2)]
+            ]
+            self.assertTrue(any(torch.equal(image, crop) for crop in crops))
@@ -0,0 +1,108 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import pytest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules which must not be loaded by importing the namespaces
+_HEAVY_MODULES = [
+    'h5py',
+    'librosa',
+    'matplotlib',
+    'numba',
+    'sentencepiece',
+    'sklearn',
+    'torchvision',
+    'transformers',
+    'webdataset',
+]
+
+# Generous bound on the time of `import nemo`, which should not import torch anymore
+_MAX_IMPORT_NEMO_SECONDS = 3.0
+
+
+def _import_in_subprocess(module_name):
+    """Imports a module in a fresh interpreter and returns the import time and the names of the loaded modules."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module_name}\n"
+        "print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))\n"
+    )
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([_REPO_ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    output = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=_REPO_ROOT)
+    import_time, modules = json.loads(output.decode().strip().splitlines()[-1])
+    return import_time, set(modules)
+
+
+class TestLazyImports(TestCase):
+    @pytest.mark.unit
+    def test_import_nemo(self):
+        import_time, modules = _import_in_subprocess('nemo')
+        self.assertLess(import_time, _MAX_IMPORT_NEMO_SECONDS)
+        loaded = [
+            m for m in ['torch', 'nemo.core', 'nemo.backends', 'nemo.collections'] + _HEAVY_MODULES if m in modules
+        ]
+        self.assertEqual(loaded, [])
+
+    @pytest.mark.unit
+    def test_import_collections(self):
+        for collection in ['asr', 'cv', 'nlp', 'simple_gan', 'tts']:
+            _, modules = _import_in_subprocess(f'nemo.collections.{collection}')
+            loaded = [m for m in _HEAVY_MODULES if m in modules]
+            self.assertEqual(loaded, [], f'Importing nemo.collections.{collection} loaded {loaded}')
+            nemo_modules = [m for m in modules if m.startswith(f'nemo.collections.{collection}.')]
+            self.assertEqual(nemo_modules, [], f'Importing nemo.collections.{collection} loaded {nemo_modules}')
+
+    @pytest.mark.unit
+    def test_lazy_attributes(self):
+        import nemo
+        import nemo.collections.asr as nemo_asr
+        import nemo.collections.nlp as nemo_nlp
+        import nemo.collections.tts as nemo_tts
+        from nemo.collections.asr.audio_preprocessing import __all__ as preprocessing__all__
+        from nemo.collections.nlp.neural_types import __all__ as neural_types__all__
+        from nemo.collections.tts.tacotron2_modules import __all__ as tacotron2__all__
+
+        for collection in [nemo_asr, nemo_nlp, nemo_tts]:
+            for name in collection.__all__:
+                self.assertIn(name, dir(collection))
+                self.assertIsNotNone(getattr(collection, name))
+        self.assertLessEqual(set(preprocessing__all__), set(dir(nemo_asr)))
+        self.assertLessEqual(set(tacotron2__all__), set(nemo_tts.__all__))
+        self.assertLessEqual({'callbacks', 'data', 'nm', 'utils'} | set(neural_types__all__), set(nemo_nlp.__all__))
+        namespace = {}
+        exec('from nemo.collections.nlp import *', namespace)
+        self.assertIs(namespace['nm'], sys.modules['nemo.collections.nlp.nm'])
+        self.assertIs(namespace['MultiWOZBeliefState'], nemo_nlp.MultiWOZBeliefState)
+
+        self.assertIs(nemo.core.NeuralModuleFactory, sys.modules['nemo.core'].NeuralModuleFactory)
+        self.assertIs(nemo.tutorials, sys.modules['nemo.backends.pytorch.tutorials'])
+        self.assertIs(nemo_nlp.nm.trainables, sys.modules['nemo.collections.nlp.nm.trainables'])
+        # Submodules which are not re-exported are imported on access, as packages do after an eager import
+        self.assertIs(nemo_asr.helpers, sys.modules['nemo.collections.asr.helpers'])
+        with self.assertRaises(AttributeError):
+            nemo_asr.NotAModule
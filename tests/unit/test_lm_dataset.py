@@ -0,0 +1,211 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.datasets.lm_bert_dataset import BertPretrainingPreprocessedDataset
+from nemo.collections.nlp.data.datasets.lm_transformer_dataset import LanguageModelingDataset
+from nemo.collections.nlp.nm.data_layers import BertPretrainingPreprocessedDataLayer
+
+
+class _HashTokenizer:
+    """Maps every whitespace separated word to an id derived from its characters."""
+
+    pad_id = 0
+
+    def __init__(self, vocab_size, base=31):
+        self.vocab_size = vocab_size
+        self.base = base
+
+    def text_to_ids(self, text):
+        return [self._hash(word) % (self.vocab_size - 1) + 1 for word in text.split()]
+
+    def _hash(self, word):
+        return sum(ord(c) * self.base ** i for i, c in enumerate(word))
+
+
+class TestLanguageModelingDataset(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.dataset = os.path.join(self.data_dir, "train.txt")
+        rng = np.random.RandomState(0)
+        words = ["the", "a", "cat", "dog", "sat", "on", "mat", "log", "and", "ran"]
+        with open(self.dataset, "w") as f:
+            for _ in range(50):
+                f.write(" ".join(rng.choice(words, rng.randint(1, 12))) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _reference_ids(self, tokenizer):
+        with open(self.dataset) as f:
+            return np.array([i for line in f for i in tokenizer.text_to_ids(line)])
+
+    @pytest.mark.unit
+    def test_windows_match_tokenized_text(self):
+        tokenizer = _HashTokenizer(1000)
+        ids = self._reference_ids(tokenizer)
+        dataset = LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=16, batch_step=5)
+
+        self.assertEqual(dataset.ids.dtype, np.uint16)
+        self.assertEqual(len(dataset), (len(ids) - 16) // 5)
+        for idx in [0, 3, len(dataset) - 1]:
+            src_ids, src_mask, labels = dataset[idx]
+            self.assertEqual(src_ids.dtype, np.int64)
+            np.testing.assert_array_equal(src_ids, ids[idx * 5 : idx * 5 + 16])
+            np.testing.assert_array_equal(labels, ids[idx * 5 + 1 : idx * 5 + 17])
+            np.testing.assert_array_equal(src_mask, np.ones(16, dtype=np.float32))
+
+        # the token stream is reused by the next dataset
+        mtime = os.path.getmtime(dataset.ids.filename)
+        LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=16, batch_step=5)
+        self.assertEqual(os.path.getmtime(dataset.ids.filename), mtime)
+
+    @pytest.mark.unit
+    def test_stale_token_stream_not_reused(self):
+        tokenizer = _HashTokenizer(1000)
+        dataset = LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=8)
+
+        # A tokenizer of the same type and size with other ids
+        other_tokenizer = _HashTokenizer(1000, base=37)
+        other_dataset = LanguageModelingDataset(other_tokenizer, self.dataset, max_seq_length=8)
+        self.assertNotEqual(other_dataset.ids.filename, dataset.ids.filename)
+        np.testing.assert_array_equal(other_dataset.ids, self._reference_ids(other_tokenizer))
+
+        # A changed text file
+        with open(self.dataset, "a") as f:
+            f.write("the cat sat on the log\n")
+        dataset = LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=8)
+        np.testing.assert_array_equal(dataset.ids, self._reference_ids(tokenizer))
+
+    @pytest.mark.unit
+    def test_large_vocabulary_dtype(self):
+        tokenizer = _HashTokenizer(100000)
+        dataset = LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=8)
+        self.assertEqual(dataset.ids.dtype, np.int32)
+        np.testing.assert_array_equal(dataset.ids, self._reference_ids(tokenizer))
+
+    @pytest.mark.unit
+    def test_random_offsets_stay_in_bounds(self):
+        torch.manual_seed(0)
+        tokenizer = _HashTokenizer(1000)
+        ids = self._reference_ids(tokenizer)
+        dataset = LanguageModelingDataset(tokenizer, self.dataset, max_seq_length=16, batch_step=7, random_offset=True)
+
+        offsets = set()
+        for _ in range(20):
+            for idx in [0, len(dataset) - 1]:
+                src_ids, _, labels = dataset[idx]
+                self.assertEqual(len(src_ids), 16)
+                self.assertEqual(len(labels), 16)
+                windows = [o for o in range(7) if np.array_equal(src_ids, ids[idx * 7 + o : idx * 7 + o + 16])]
+                self.assertTrue(windows)
+                np.testing.assert_array_equal(labels[:-1], src_ids[1:])
+                offsets.update(windows)
+        self.assertGreater(len(offsets), 1)
+
+
+def _old_preprocessed_sample(inputs, index, max_pred_length):
+    """BertPretrainingPreprocessedDataset.__getitem__ building the masks sample by sample."""
+    input_ids, input_mask, segment_ids, masked_lm_positions, masked_lm_ids, next_sentence_labels = [
+        input[index].astype(np.int64) for input in inputs
+    ]
+    output_mask = np.zeros_like(input_ids)
+    output_ids = input_ids.copy()
+    index = max_pred_length
+    padded_mask_indices = (masked_lm_positions == 0).nonzero()
+    if len(padded_mask_indices[0]) != 0:
+        index = padded_mask_indices[0][0]
+    output_mask[masked_lm_positions[:index]] = 1.0
+    output_ids[masked_lm_positions[:index]] = masked_lm_ids[:index]
+    return input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestBertPretrainingPreprocessedDataset(TestCase):
+    max_pred_length = 5
+
+    def setUp(self):
+        import h5py
+
+        self.data_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        n, seq_length = 37, 12
+        positions = np.zeros((n, self.max_pred_length), dtype=np.int32)
+        for i in range(n):
+            num_masked = rng.randint(0, self.max_pred_length + 1)
+            positions[i, :num_masked] = np.sort(rng.choice(np.arange(1, seq_length), num_masked, replace=False))
+        self.inputs = [
+            rng.randint(1, 100, (n, seq_length)).astype(np.int32),
+            (np.arange(seq_length) < rng.randint(4, seq_length + 1, (n, 1))).astype(np.int8),
+            rng.randint(0, 2, (n, seq_length)).astype(np.int8),
+            positions,
+            rng.randint(1, 100, (n, self.max_pred_length)).astype(np.int32),
+            rng.randint(0, 2, n).astype(np.int8),
+        ]
+        self.files = []
+        for i, rows in enumerate((slice(0, 20), slice(20, n))):
+            path = os.path.join(self.data_dir, f'part_{i}.hdf5')
+            with h5py.File(path, 'w') as f:
+                for key, values in zip(BertPretrainingPreprocessedDataset.keys, self.inputs):
+                    f.create_dataset(key, data=values[rows], chunks=(3,) + values.shape[1:])
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_lazy_batches_match_samples(self):
+        inputs = [values[:20] for values in self.inputs]
+        indices = [17, 2, 9, 3, 19, 0, 4]
+        expected = [_old_preprocessed_sample(inputs, i, self.max_pred_length) for i in indices]
+        for lazy in (False, True):
+            dataset = BertPretrainingPreprocessedDataset(self.files[0], self.max_pred_length, lazy=lazy, block_size=4)
+            self.assertEqual(len(dataset), 20)
+            # Blocks are aligned with the chunks of the file
+            self.assertEqual(dataset.block_size, 6)
+            batch = dataset.mask_batch(*dataset[indices])
+            for values, expected_values in zip(batch, zip(*expected)):
+                np.testing.assert_array_equal(values, np.stack(expected_values))
+            for values, expected_values in zip(dataset[9], inputs):
+                np.testing.assert_array_equal(values, expected_values[9])
+
+    @pytest.mark.unit
+    def test_data_layer_reads_every_sample(self):
+        for lazy, num_workers in ((False, 0), (True, 2)):
+            data_layer = BertPretrainingPreprocessedDataLayer(
+                self.data_dir, self.max_pred_length, mode='eval', batch_size=4, lazy=lazy, num_workers=num_workers
+            )
+            self.assertEqual(len(data_layer), len(self.inputs[0]))
+            samples = {}
+            for batch in data_layer.data_iterator:
+                self.assertLessEqual(len(batch[0]), 4)
+                for sample in zip(*batch):
+                    samples[tuple(sample[0].tolist())] = [value.numpy() for value in sample]
+            self.assertEqual(len(samples), len(self.inputs[0]))
+            for i in range(len(self.inputs[0])):
+                expected = _old_preprocessed_sample(self.inputs, i, self.max_pred_length)
+                for value, expected_value in zip(samples[tuple(self.inputs[0][i].tolist())], expected):
+                    np.testing.assert_array_equal(value, expected_value)
@@ -0,0 +1,75 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.callbacks.machine_translation_callback import (
+    eval_epochs_done_callback,
+    eval_iter_callback,
+)
+from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+
+
+class _WordTokenizer:
+    pad_id = 0
+
+    def __init__(self, vocab):
+        self.vocab = ["<pad>"] + vocab
+
+    def ids_to_text(self, ids):
+        return " ".join(self.vocab[i] for i in ids if i != self.pad_id)
+
+
+class TestMachineTranslationCallback(TestCase):
+    @pytest.mark.unit
+    def test_bleu_matches_corpus_bleu(self):
+        rng = np.random.RandomState(0)
+        tokenizer = _WordTokenizer(["the", "cat", "sat", "on", "a", "mat", "dog", "ran", ".", ","])
+        num_sentences, batch_size = 20, 4
+        ref_ids = [rng.randint(1, 11, size=rng.randint(3, 12)) for _ in range(num_sentences)]
+        sys_ids = [np.where(rng.rand(len(r)) < 0.7, r, rng.randint(1, 11, size=len(r))) for r in ref_ids]
+
+        def pad(sentences):
+            batch = torch.zeros(len(sentences), max(len(s) for s in sentences), dtype=torch.long)
+            for i, s in enumerate(sentences):
+                batch[i, : len(s)] = torch.from_numpy(s)
+            return batch
+
+        global_vars = {}
+        # The last batch is repeated, as a distributed sampler does, and must be scored once
+        starts = list(range(0, num_sentences, batch_size)) + [num_sentences - batch_size]
+        for start in starts:
+            ids = list(range(start, start + batch_size))
+            tensors = {
+                "output_ids~~~beam_search": [pad([sys_ids[i] for i in ids])],
+                "tgt~~~data_layer": [pad([ref_ids[i] for i in ids])],
+                "sent_ids~~~data_layer": [torch.tensor(ids)],
+                "loss~~~loss": [torch.tensor(1.0)],
+            }
+            eval_iter_callback(tensors, global_vars, tokenizer)
+        metrics = eval_epochs_done_callback(global_vars)
+
+        sys = [tokenizer.ids_to_text(s) for s in sys_ids]
+        ref = [tokenizer.ids_to_text(r) for r in ref_ids]
+        self.assertEqual(metrics["token_bleu"], corpus_bleu(sys, [ref], tokenize="fairseq").score)
+        self.assertEqual(metrics["sacre_bleu"], corpus_bleu(sys, [ref], tokenize="13a").score)
+        self.assertAlmostEqual(metrics["eval_loss"], 1.0)
@@ -0,0 +1,150 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import math
+from unittest import TestCase
+
+import pytest
+import torch
+from torch import nn
+
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import MultiHeadAttention
+from nemo.collections.nlp.utils.transformer_utils import form_attention_mask, form_future_bias
+
+
+class _SeparateProjectionsAttention(nn.Module):
+    """MultiHeadAttention with separate query, key and value projections, computing the scores in float32."""
+
+    def __init__(self, hidden_size, num_attention_heads):
+        super().__init__()
+        self.num_attention_heads = num_attention_heads
+        self.attn_head_size = hidden_size // num_attention_heads
+        self.query_net = nn.Linear(hidden_size, hidden_size)
+        self.key_net = nn.Linear(hidden_size, hidden_size)
+        self.value_net = nn.Linear(hidden_size, hidden_size)
+        self.out_projection = nn.Linear(hidden_size, hidden_size)
+        self.layer_norm = nn.LayerNorm(hidden_size, eps=1e-5)
+
+    def _split_heads(self, x):
+        return x.view(*x.shape[:-1], self.num_attention_heads, self.attn_head_size).permute(0, 2, 1, 3)
+
+    def forward(self, queries, keys, values, attention_mask):
+        query = self._split_heads(self.query_net(queries))
+        key = self._split_heads(self.key_net(keys))
+        value = self._split_heads(self.value_net(values))
+        scores = torch.matmul(query, key.transpose(-1, -2)).float() / math.sqrt(self.attn_head_size)
+        if attention_mask is not None:
+            scores = scores + attention_mask.float()
+        context = torch.matmul(torch.softmax(scores, dim=-1), value).permute(0, 2, 1, 3)
+        output_states = self.out_projection(context.reshape(queries.shape))
+        return self.layer_norm(queries + output_states)
+
+
+def _old_form_attention_mask(input_mask, diagonal=None):
+    attn_shape = (1, input_mask.shape[1], input_mask.shape[1])
+    attn_mask = input_mask.byte().unsqueeze(1)
+    if diagonal is not None:
+        attn_mask = attn_mask & torch.tril(torch.ones(attn_shape).byte(), diagonal)
+    return ((1 - attn_mask.to(torch.float)) * -10000.0).unsqueeze(1)
+
+
+class TestMultiHeadAttention(TestCase):
+    hidden_size = 16
+    num_heads = 4
+
+    def setUp(self):
+        torch.manual_seed(0)
+        self.reference = _SeparateProjectionsAttention(self.hidden_size, self.num_heads)
+        for parameter in self.reference.parameters():
+            nn.init.normal_(parameter)
+        self.states = torch.randn(3, 7, self.hidden_size)
+        self.memory = torch.randn(3, 9, self.hidden_size)
+        self.input_mask = torch.tensor([[1.0] * 7, [1.0] * 5 + [0.0] * 2, [1.0] * 2 + [0.0] * 5])
+        self.memory_mask = torch.tensor([[1.0] * 9, [1.0] * 4 + [0.0] * 5, [1.0] * 8 + [0.0]])
+
+    def _attention(self, **kwargs):
+        attention = MultiHeadAttention(self.hidden_size, self.num_heads, **kwargs)
+        # Checkpoints with separate query, key and value projections load into the fused one
+        attention.load_state_dict(self.reference.state_dict())
+        return attention.eval()
+
+    def _check(self, attention, queries, keys, values, attention_mask, **kwargs):
+        expected = self.reference(queries, keys, values, attention_mask)
+        if kwargs:
+            # The same masks, given as a key padding mask and the diagonal of the future mask
+            output = attention(queries, keys, values, **kwargs)
+        else:
+            output = attention(queries, keys, values, attention_mask)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    @pytest.mark.unit
+    def test_fused_matches_separate_projections(self):
+        for memory_efficient in (False, True):
+            attention = self._attention(memory_efficient=memory_efficient)
+            self_mask = form_attention_mask(self.input_mask, diagonal=0)
+            memory_mask = form_attention_mask(self.memory_mask)
+            # self-attention, cross-attention and attention with separate keys and values
+            self._check(attention, self.states, self.states, self.states, self_mask)
+            self._check(attention, self.states, self.memory, self.memory, memory_mask)
+            self._check(attention, self.states, self.memory, self.memory.flip(1), None)
+            for diagonal in (None, 0, 1):
+                self._check(
+                    attention,
+                    self.states,
+                    self.states,
+                    self.states,
+                    form_attention_mask(self.input_mask, diagonal=diagonal),
+                    key_padding_mask=self.input_mask,
+                    diagonal=diagonal,
+                )
+            # Future mask only
+            future_mask = form_attention_mask(self.input_mask[:1], 0)
+            self._check(attention, self.states, self.states, self.states, future_mask, diagonal=0)
+            self._check(
+                attention, self.states, self.memory, self.memory, memory_mask, key_padding_mask=self.memory_mask
+            )
+
+    @pytest.mark.unit
+    def test_state_dict_roundtrip(self):
+        attention = self._attention()
+        self.assertEqual(
+            set(attention.state_dict()),
+            {'qkv_net.weight', 'qkv_net.bias', 'out_projection.weight', 'out_projection.bias'}
+            | {'layer_norm.weight', 'layer_norm.bias'},
+        )
+        loaded = MultiHeadAttention(self.hidden_size, self.num_heads)
+        loaded.load_state_dict(attention.state_dict())
+        for name, tensor in attention.state_dict().items():
+            self.assertTrue(torch.equal(tensor, loaded.state_dict()[name]), name)
+
+    @pytest.mark.unit
+    def test_form_attention_mask(self):
+        for diagonal in (None, -1, 0, 1):
+            expected = _old_form_attention_mask(self.input_mask, diagonal)
+            self.assertTrue(torch.equal(form_attention_mask(self.input_mask, diagonal), expected))
+            mask = form_attention_mask(self.input_mask, diagonal, dtype=torch.float16)
+            self.assertEqual(mask.dtype, torch.float16)
+            self.assertTrue(torch.equal(mask.float(), expected))
+
+    @pytest.mark.unit
+    def test_form_future_bias(self):
+        for diagonal in (-1, 0, 1):
+            expected = form_attention_mask(torch.ones(1, 7), diagonal)[0, 0]
+            self.assertTrue(torch.equal(form_future_bias(7, 7, diagonal, torch.device('cpu')), expected))
+        # With cached states, the queries are the last of the keys
+        bias = form_future_bias(2, 5, 0, torch.device('cpu'), torch.float16)
+        self.assertEqual(bias.dtype, torch.float16)
+        self.assertTrue(torch.equal(bias, form_attention_mask(torch.ones(1, 5), 0)[0, 0, 3:].half()))
@@ -0,0 +1,164 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.collections.nlp.data.datasets.sgd_dataset.data_processor import SGDDataProcessor
+from nemo.collections.nlp.data.datasets.sgd_dataset.sgd_dataset import SGDDataset
+
+_SCHEMA_CONFIG = {
+    "MAX_SEQ_LENGTH": 6,
+    "MAX_NUM_CAT_SLOT": 2,
+    "MAX_NUM_NONCAT_SLOT": 3,
+    "MAX_NUM_VALUE_PER_CAT_SLOT": 4,
+    "MAX_NUM_INTENT": 2,
+}
+
+
+class _ToyProcessor(SGDDataProcessor):
+    """SGDDataProcessor creating one random example per turn, without a tokenizer or schemas."""
+
+    def __init__(self, data_dir, num_workers):
+        self.data_dir = data_dir
+        self.schema_config = _SCHEMA_CONFIG
+        self._task_name = "toy"
+        self._file_ranges = {"train": range(1, 6)}
+        self._num_workers = num_workers
+        self.dial_files = {("toy", "train"): os.path.join(data_dir, "toy_train_examples")}
+        self.slots_relation_file = os.path.join(data_dir, "toy_train_slots_relation_list.np")
+        self.schema_emb_processor = SimpleNamespace(update_slots_relation_list=lambda relations: None)
+
+    def _create_examples_from_dialog(self, dialog, schemas, dataset, slot_carryover_candlist):
+        examples = []
+        for turn in dialog["turns"]:
+            rng = np.random.RandomState(turn)
+            c = self.schema_config
+            slot_carryover_candlist[("service", f"slot_{turn % 3}", "other", "slot")] += 1
+            examples.append(
+                SimpleNamespace(
+                    example_id_num=[turn, 0, 1, 2],
+                    service_schema=SimpleNamespace(service_id=turn % 5),
+                    is_real_example=True,
+                    utterance_ids=rng.randint(1000, size=c["MAX_SEQ_LENGTH"]).tolist(),
+                    utterance_segment=rng.randint(2, size=c["MAX_SEQ_LENGTH"]).tolist(),
+                    utterance_mask=rng.randint(2, size=c["MAX_SEQ_LENGTH"]).tolist(),
+                    categorical_slot_status=rng.randint(3, size=c["MAX_NUM_CAT_SLOT"]).tolist(),
+                    cat_slot_status_mask=rng.randint(2, size=c["MAX_NUM_CAT_SLOT"]).tolist(),
+                    categorical_slot_values=rng.randint(4, size=c["MAX_NUM_CAT_SLOT"]).tolist(),
+                    cat_slot_values_mask=rng.randint(
+                        2, size=(c["MAX_NUM_CAT_SLOT"], c["MAX_NUM_VALUE_PER_CAT_SLOT"])
+                    ).tolist(),
+                    noncategorical_slot_status=rng.randint(3, size=c["MAX_NUM_NONCAT_SLOT"]).tolist(),
+                    noncat_slot_status_mask=rng.randint(2, size=c["MAX_NUM_NONCAT_SLOT"]).tolist(),
+                    noncategorical_slot_value_start=rng.randint(6, size=c["MAX_NUM_NONCAT_SLOT"]).tolist(),
+                    noncategorical_slot_value_end=rng.randint(6, size=c["MAX_NUM_NONCAT_SLOT"]).tolist(),
+                    start_char_idx=rng.randint(50, size=c["MAX_SEQ_LENGTH"]).tolist(),
+                    end_char_idx=rng.randint(50, size=c["MAX_SEQ_LENGTH"]).tolist(),
+                    num_slots=int(rng.randint(5)),
+                    requested_slot_status=rng.randint(
+                        2, size=c["MAX_NUM_CAT_SLOT"] + c["MAX_NUM_NONCAT_SLOT"]
+                    ).tolist(),
+                    requested_slot_mask=rng.randint(2, size=c["MAX_NUM_CAT_SLOT"] + c["MAX_NUM_NONCAT_SLOT"]).tolist(),
+                    intent_status_mask=rng.randint(2, size=c["MAX_NUM_INTENT"] + 1).tolist(),
+                    intent_status_labels=int(rng.randint(3)),
+                )
+            )
+        return examples
+
+
+def _example_features(ex):
+    """Features of an InputExample as returned by SGDDataset before the examples were stored as columns."""
+    return (
+        np.array(ex.example_id_num),
+        np.array(ex.service_schema.service_id),
+        np.array(ex.is_real_example, dtype=int),
+        np.array(ex.utterance_ids),
+        np.array(ex.utterance_segment),
+        np.array(ex.utterance_mask, dtype=np.long),
+        np.array(ex.categorical_slot_status),
+        np.array(ex.cat_slot_status_mask),
+        np.array(ex.categorical_slot_values),
+        np.array(ex.cat_slot_values_mask),
+        np.array(ex.noncategorical_slot_status),
+        np.array(ex.noncat_slot_status_mask),
+        np.array(ex.noncategorical_slot_value_start),
+        np.array(ex.noncategorical_slot_value_end),
+        np.array(ex.start_char_idx),
+        np.array(ex.end_char_idx),
+        np.array(ex.num_slots),
+        np.array(ex.requested_slot_status, dtype=np.float32),
+        np.array(ex.requested_slot_mask),
+        np.array(ex.intent_status_mask),
+        np.array(ex.intent_status_labels),
+    )
+
+
+class TestSGDDataset(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.data_dir, "train"))
+        turn = 0
+        for i in range(1, 6):
+            dialogs = []
+            for _ in range(i):
+                dialogs.append({"turns": list(range(turn, turn + 3))})
+                turn += 3
+            with open(os.path.join(self.data_dir, "train", "dialogues_{:03d}.json".format(i)), "w") as f:
+                json.dump(dialogs, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_parallel_examples_match_serial(self):
+        serial_examples, serial_relations = _ToyProcessor(self.data_dir, 1)._generate_dialog_examples("train", None)
+        parallel_examples, parallel_relations = _ToyProcessor(self.data_dir, 3)._generate_dialog_examples(
+            "train", None
+        )
+        self.assertEqual(len(serial_examples["example_id_num"]), 45)
+        self.assertEqual(serial_examples.keys(), parallel_examples.keys())
+        for name in serial_examples:
+            np.testing.assert_array_equal(serial_examples[name], parallel_examples[name])
+        self.assertEqual(list(serial_relations.items()), list(parallel_relations.items()))
+
+    @pytest.mark.unit
+    def test_getitem_slices_stored_columns(self):
+        processor = _ToyProcessor(self.data_dir, 2)
+        examples, slots_relation_list = processor._generate_dialog_examples("train", None)
+        processor._save_columns(processor.dial_files[("toy", "train")], examples)
+        with open(processor.slots_relation_file, "wb") as f:
+            pickle.dump(slots_relation_list, f)
+
+        dataset = SGDDataset("train", processor)
+        self.assertEqual(len(dataset), 45)
+        # turns are numbered across the dialogue files, so the example of turn idx is the idx-th example
+        for idx in [0, 17, 44]:
+            expected = processor._create_examples_from_dialog({"turns": [idx]}, None, "train", defaultdict(int))[0]
+            for item, expected_item in zip(dataset[idx], _example_features(expected)):
+                self.assertEqual(item.dtype, expected_item.dtype)
+                np.testing.assert_array_equal(item, expected_item)
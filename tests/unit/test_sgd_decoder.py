@@ -0,0 +1,125 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.nm.trainables import SGDDecoderNM
+
+
+class _SchemaEmbeddings:
+    """Random schema embeddings with the interface of SchemaPreprocessor used by SGDDecoderNM."""
+
+    schema_config = {
+        "MAX_NUM_INTENT": 2,
+        "MAX_NUM_CAT_SLOT": 3,
+        "MAX_NUM_VALUE_PER_CAT_SLOT": 4,
+        "MAX_NUM_NONCAT_SLOT": 5,
+    }
+    is_trainable = True
+
+    def __init__(self, num_services, embedding_dim):
+        self.schemas = SimpleNamespace(services=[f'service_{i}' for i in range(num_services)])
+        rng = np.random.RandomState(0)
+        config = self.schema_config
+        self._embeddings = {
+            'intent_emb': rng.randn(num_services, config["MAX_NUM_INTENT"], embedding_dim),
+            'cat_slot_emb': rng.randn(num_services, config["MAX_NUM_CAT_SLOT"], embedding_dim),
+            'cat_slot_value_emb': rng.randn(
+                num_services, config["MAX_NUM_CAT_SLOT"], config["MAX_NUM_VALUE_PER_CAT_SLOT"], embedding_dim
+            ),
+            'noncat_slot_emb': rng.randn(num_services, config["MAX_NUM_NONCAT_SLOT"], embedding_dim),
+            'req_slot_emb': rng.randn(
+                num_services, config["MAX_NUM_CAT_SLOT"] + config["MAX_NUM_NONCAT_SLOT"], embedding_dim
+            ),
+        }
+
+    def get_schema_embeddings(self):
+        return {k: v.astype(np.float32) for k, v in self._embeddings.items()}
+
+
+def _concatenated_logits(layer, encoded_utterance, element_embeddings):
+    """Logits.forward() computed on the concatenation of the repeated utterance and the element embeddings."""
+    utterance_embedding = layer.activation(layer.utterance_proj(encoded_utterance))
+    repeated = utterance_embedding.unsqueeze(1).repeat(1, element_embeddings.size(1), 1)
+    logits = layer.layer1(torch.cat([repeated, element_embeddings], axis=2))
+    return layer.layer2(layer.activation(logits))
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestSGDDecoder(TestCase):
+    @pytest.mark.unit
+    def test_matches_concatenated_projections(self):
+        torch.manual_seed(0)
+        embedding_dim, batch_size, num_tokens = 32, 3, 11
+        decoder = SGDDecoderNM(embedding_dim, _SchemaEmbeddings(4, embedding_dim))
+
+        encoded_utterance = torch.randn(batch_size, embedding_dim)
+        token_embeddings = torch.randn(batch_size, num_tokens, embedding_dim)
+        utterance_mask = (torch.arange(num_tokens)[None, :] < torch.tensor([[11], [7], [3]])).long()
+        service_ids = torch.tensor([0, 3, 1])
+        intent_status_mask = torch.ones(batch_size, 3, dtype=torch.long)
+        cat_slot_values_mask = torch.ones(batch_size, 3, 4, dtype=torch.long)
+
+        with torch.no_grad():
+            outputs = decoder(
+                force_pt=True,
+                encoded_utterance=encoded_utterance,
+                token_embeddings=token_embeddings,
+                utterance_mask=utterance_mask,
+                cat_slot_values_mask=cat_slot_values_mask,
+                service_ids=service_ids,
+                intent_status_mask=intent_status_mask,
+            )
+            (logit_intent_status, _, _, _, logit_noncat_slot_status, span_start_logits, span_end_logits) = outputs
+
+            intent_embeddings = decoder.intents_emb(service_ids).view(batch_size, -1, embedding_dim)
+            intent_embeddings = torch.cat(
+                [decoder.none_intent_vector.repeat(batch_size, 1, 1), intent_embeddings], axis=1
+            )
+            expected_intent_status = _concatenated_logits(decoder.intent_layer, encoded_utterance, intent_embeddings)
+
+            noncat_slot_emb = decoder.noncat_slot_emb(service_ids).view(batch_size, -1, embedding_dim)
+            expected_noncat_status = _concatenated_logits(
+                decoder.noncat_slot_layer, encoded_utterance, noncat_slot_emb
+            )
+            num_slots = noncat_slot_emb.size(1)
+            slot_token_embeddings = torch.cat(
+                [
+                    noncat_slot_emb.unsqueeze(2).repeat(1, 1, num_tokens, 1),
+                    token_embeddings.unsqueeze(1).repeat(1, num_slots, 1, 1),
+                ],
+                axis=3,
+            )
+            expected_span = decoder.noncat_layer2(
+                decoder.noncat_activation(decoder.noncat_layer1(slot_token_embeddings))
+            )
+
+        self.assertTrue(torch.allclose(logit_intent_status, expected_intent_status.squeeze(-1), atol=1e-5))
+        self.assertTrue(torch.allclose(logit_noncat_slot_status, expected_noncat_status, atol=1e-5))
+
+        mask = utterance_mask.bool().unsqueeze(1).expand(-1, num_slots, -1)
+        self.assertTrue(torch.allclose(span_start_logits[mask], expected_span[..., 0][mask], atol=1e-5))
+        self.assertTrue(torch.allclose(span_end_logits[mask], expected_span[..., 1][mask], atol=1e-5))
+        negative_logit = torch.finfo(span_start_logits.dtype).max * -0.7
+        self.assertTrue((span_start_logits[~mask] == negative_logit).all())
+        self.assertTrue((span_end_logits[~mask] == negative_logit).all())
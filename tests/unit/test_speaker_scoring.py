@@ -0,0 +1,90 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+from scipy.interpolate import interp1d
+from scipy.optimize import brentq
+from sklearn.metrics import roc_curve
+
+from nemo.collections.asr.speaker_scoring import (
+    equal_error_rate,
+    identify_speakers,
+    min_detection_cost,
+    score_trials,
+    speaker_centroids,
+)
+
+
+class TestSpeakerScoring(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.rng = rng
+        self.embeddings = torch.from_numpy(rng.randn(50, 8))
+        self.speaker_ids = torch.from_numpy(rng.randint(0, 7, 50))
+
+    @pytest.mark.unit
+    def test_centroids_and_trial_scores(self):
+        centroids = speaker_centroids(self.embeddings, self.speaker_ids)
+        means = speaker_centroids(self.embeddings, self.speaker_ids, normalize=False)
+        enroll_ids, test_ids = torch.from_numpy(self.rng.randint(0, 7, (2, 30)))
+        scores = score_trials(centroids, enroll_ids, test_ids)
+        for speaker in range(7):
+            expected = self.embeddings[self.speaker_ids == speaker].mean(0)
+            self.assertTrue(torch.allclose(means[speaker], expected))
+        for score, enroll_id, test_id in zip(scores, enroll_ids, test_ids):
+            expected = torch.nn.functional.cosine_similarity(means[enroll_id], means[test_id], dim=0)
+            self.assertAlmostEqual(float(score), float(expected))
+
+    @pytest.mark.unit
+    def test_error_rates_match_roc_curve(self):
+        for trial in range(10):
+            labels = self.rng.randint(0, 2, 200)
+            scores = self.rng.randn(200) + labels
+            if trial % 2:
+                # Tied scores
+                scores = np.round(scores, 1)
+            fpr, tpr, thresholds = roc_curve(labels, scores, pos_label=1)
+            expected = brentq(lambda x: 1.0 - x - interp1d(fpr, tpr)(x), 0.0, 1.0)
+            eer, _ = equal_error_rate(torch.from_numpy(scores), torch.from_numpy(labels))
+            self.assertAlmostEqual(eer, expected)
+
+            costs = 0.01 * (1 - tpr) + 0.99 * fpr
+            min_dcf, threshold = min_detection_cost(torch.from_numpy(scores), torch.from_numpy(labels))
+            self.assertAlmostEqual(min_dcf, costs.min() / 0.01)
+            if np.argmin(costs) > 0:
+                # The first threshold accepts no trial
+                self.assertEqual(threshold, thresholds[np.argmin(costs)])
+
+    @pytest.mark.unit
+    def test_error_rates_need_both_labels(self):
+        scores = torch.randn(10)
+        for labels in (torch.ones(10), torch.zeros(10), torch.zeros(0)):
+            for metric in (equal_error_rate, min_detection_cost):
+                with self.assertRaises(ValueError):
+                    metric(scores[: len(labels)], labels)
+
+    @pytest.mark.unit
+    def test_identify_speakers(self):
+        enrollment = speaker_centroids(self.embeddings, self.speaker_ids)
+        scores, indices = identify_speakers(self.embeddings, enrollment, top_k=3)
+        similarities = torch.nn.functional.normalize(self.embeddings, dim=1) @ enrollment.t()
+        expected = similarities.argsort(dim=1, descending=True)[:, :3]
+        self.assertTrue(torch.equal(indices, expected))
+        self.assertTrue(torch.allclose(scores, similarities.gather(1, expected)))
@@ -0,0 +1,123 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+from sklearn.metrics import classification_report
+
+from nemo.collections.nlp.callbacks import punctuation_capitalization_callback
+from nemo.collections.nlp.callbacks.token_classification_callback import (
+    eval_epochs_done_callback,
+    eval_iter_callback,
+)
+from nemo.collections.nlp.utils.callback_utils import (
+    get_classification_report_from_cm,
+    get_f1_scores,
+    get_f1_scores_from_cm,
+    get_prediction_sample,
+    update_confusion_matrix,
+    update_prediction_sample,
+)
+
+
+class TestTokenClassificationCallback(TestCase):
+    label_ids = {'O': 0, 'B-LOC': 1, 'I-LOC': 2, 'B-PER': 3, 'I-PER': 4, 'B-ORG': 5}
+
+    def _batches(self, num_batches=5, batch_size=4, seq_len=12):
+        torch.manual_seed(0)
+        num_classes = len(self.label_ids)
+        batches = []
+        for _ in range(num_batches):
+            # label 5 is never used, so that unused labels are dropped from the report as before
+            labels = torch.randint(0, num_classes - 1, (batch_size, seq_len))
+            logits = torch.randn(batch_size, seq_len, num_classes)
+            logits.scatter_add_(2, labels.unsqueeze(-1), 1.5 * torch.rand(batch_size, seq_len, 1))
+            subtokens_mask = (torch.rand(batch_size, seq_len) > 0.3).float()
+            batches.append((logits, labels, subtokens_mask))
+        return batches
+
+    @pytest.mark.unit
+    def test_metrics_match_sklearn(self):
+        batches = self._batches()
+        global_vars = {}
+        for logits, labels, subtokens_mask in batches:
+            eval_iter_callback(
+                {'logits~~~': [logits], 'labels~~~': [labels], 'subtokens_mask~~~': [subtokens_mask]}, global_vars
+            )
+
+        mask = torch.cat([m.reshape(-1) for _, _, m in batches]) > 0.5
+        labels = torch.cat([l.reshape(-1) for _, l, _ in batches])[mask].numpy()
+        preds = torch.cat([lg.argmax(-1).reshape(-1) for lg, _, _ in batches])[mask].numpy()
+
+        cm = global_vars['confusion_matrix']
+        self.assertEqual(int(cm.sum()), len(labels))
+        self.assertLessEqual(len(global_vars['sample_preds']), 20)
+
+        result = eval_epochs_done_callback(global_vars, self.label_ids)
+        self.assertAlmostEqual(result['Accuracy'], float(np.mean(labels == preds)))
+        average_modes = ['weighted', 'macro', 'micro']
+        self.assertEqual(get_f1_scores_from_cm(cm, average_modes), get_f1_scores(labels, preds, average_modes))
+
+        ids_to_labels = {v: k for k, v in self.label_ids.items()}
+        used = sorted(set(labels) | set(preds))
+        expected_report = classification_report(
+            labels, preds, labels=used, target_names=[f'{ids_to_labels[i]} (label id: {i})' for i in used], digits=4
+        )
+        self.assertEqual(get_classification_report_from_cm(cm, self.label_ids), expected_report)
+
+    @pytest.mark.unit
+    def test_prediction_sample(self):
+        labels, preds = torch.arange(100), torch.arange(100) + 1
+        worker_vars = []
+        for _ in range(3):
+            global_vars = {}
+            update_prediction_sample(global_vars, labels, preds)
+            worker_vars.append(global_vars)
+        # Samples of the workers concatenated by the cross-worker combine
+        combined = {
+            key: [v for global_vars in worker_vars for v in global_vars[key]]
+            for key in ('sample_labels', 'sample_preds')
+        }
+        sample_labels, sample_preds = get_prediction_sample(combined)
+        self.assertIn(sample_labels, [global_vars['sample_labels'] for global_vars in worker_vars])
+        self.assertEqual(sample_preds, [label + 1 for label in sample_labels])
+
+        # No evaluation batch ran, e.g. on an empty evaluation set
+        self.assertEqual(eval_epochs_done_callback({}, self.label_ids), {})
+        self.assertEqual(punctuation_capitalization_callback.eval_epochs_done_callback({}, {}, {}), {})
+
+    @pytest.mark.unit
+    def test_update_confusion_matrix(self):
+        labels = torch.tensor([0, 1, 2, 2, 1])
+        preds = torch.tensor([0, 2, 2, 2, 1])
+        mask = torch.tensor([True, True, True, False, True])
+        cm = update_confusion_matrix(None, labels, preds, 3, mask=mask)
+        cm = update_confusion_matrix(cm, labels, preds, 3)
+        expected = torch.tensor([[2, 0, 0], [0, 2, 2], [0, 0, 3]])
+        self.assertTrue(torch.equal(cm, expected))
+
+        binary_labels = torch.tensor([0, 1, 1, 0, 1, 1])
+        binary_preds = torch.tensor([0, 1, 0, 1, 1, 1])
+        binary_cm = update_confusion_matrix(None, binary_labels, binary_preds, 2)
+        self.assertEqual(
+            get_f1_scores_from_cm(binary_cm, ['binary']),
+            get_f1_scores(binary_labels.numpy(), binary_preds.numpy(), ['binary']),
+        )
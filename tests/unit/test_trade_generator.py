@@ -0,0 +1,137 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.nm.trainables import TRADEGenerator
+
+
+class _Vocab:
+    pad_id = 1
+
+    def __len__(self):
+        return 23
+
+
+def _reference_point_outputs(generator, encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, max_res_len):
+    """Previous TRADEGenerator decoding loop, repeating the encoder states for all slots at every step."""
+    num_slots, batch_size = len(generator.slots), encoder_hidden.shape[0]
+    slot_emb = generator.slot_emb(generator.domain_idx) + generator.slot_emb(generator.subslot_idx)
+    decoder_input = slot_emb.unsqueeze(1).repeat(1, batch_size, 1).view(-1, generator.hidden_size)
+    hidden = encoder_hidden[:, 0:1, :].transpose(0, 1).repeat(num_slots, 1, 1).view(-1, generator.hidden_size)
+    hidden = hidden.unsqueeze(0)
+    enc_len = dialog_lens.repeat(num_slots)
+    padding_mask_bool = ~(torch.arange(encoder_outputs.size(1))[None, :] <= enc_len[:, None])
+    padding_mask = torch.zeros_like(padding_mask_bool, dtype=encoder_outputs.dtype).masked_fill(
+        padding_mask_bool, -np.inf
+    )
+    outputs = []
+    for _ in range(max_res_len):
+        dec_state, hidden = generator.rnn(decoder_input.unsqueeze(1), hidden)
+        enc_out = encoder_outputs.repeat(num_slots, 1, 1)
+        cond = hidden.squeeze(0)
+        scores = torch.softmax(cond.unsqueeze(1).expand_as(enc_out).mul(enc_out).sum(2) + padding_mask, dim=1)
+        context_vec = scores.unsqueeze(2).expand_as(enc_out).mul(enc_out).sum(1)
+        p_vocab = TRADEGenerator.attend_vocab(generator.embedding.weight, cond)
+        switch = generator.sigmoid(
+            generator.w_ratio(torch.cat([dec_state.squeeze(1), context_vec, decoder_input], -1))
+        )
+        p_context_ptr = torch.zeros(p_vocab.size()).scatter_add_(1, dialog_ids.repeat(num_slots, 1), scores)
+        final_p_vocab = (1 - switch) * p_context_ptr + switch * p_vocab
+        outputs.append(final_p_vocab.view(num_slots, batch_size, -1))
+        decoder_input = generator.embedding(torch.argmax(final_p_vocab, dim=1))
+    return torch.stack(outputs, dim=2).transpose(0, 1)
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestTRADEGenerator(TestCase):
+    slots = ['hotel-area', 'hotel-stars', 'train-day', 'train-departure', 'taxi-leaveat']
+
+    def setUp(self):
+        torch.manual_seed(0)
+        self.hidden_size, self.batch_size, self.max_len, self.max_res_len = 16, 3, 7, 4
+        self.embedding = torch.nn.Embedding(len(_Vocab()), self.hidden_size)
+        self.encoder_hidden = torch.randn(self.batch_size, self.max_len, self.hidden_size)
+        self.encoder_outputs = torch.randn(self.batch_size, self.max_len, self.hidden_size)
+        self.dialog_ids = torch.randint(2, len(_Vocab()), (self.batch_size, self.max_len))
+        self.dialog_lens = torch.tensor([7, 4, 2])
+        self.targets = torch.randint(2, len(_Vocab()), (self.batch_size, len(self.slots), self.max_res_len))
+
+    def _generator(self, **kwargs):
+        torch.manual_seed(1)
+        generator = TRADEGenerator(
+            _Vocab(), self.embedding, self.hidden_size, 0.0, self.slots, 3, max_res_len=self.max_res_len, **kwargs
+        )
+        generator.eval()
+        return generator
+
+    def _inputs(self, targets=None):
+        return dict(
+            encoder_hidden=self.encoder_hidden,
+            encoder_outputs=self.encoder_outputs,
+            dialog_ids=self.dialog_ids,
+            dialog_lens=self.dialog_lens,
+            targets=targets,
+        )
+
+    @pytest.mark.unit
+    def test_outputs_match_reference(self):
+        generator = self._generator()
+        with torch.no_grad():
+            point_outputs, gate_outputs = generator(force_pt=True, **self._inputs(self.targets))
+            expected = _reference_point_outputs(
+                generator, self.encoder_hidden, self.encoder_outputs, self.dialog_ids, self.dialog_lens, 4
+            )
+        self.assertEqual(point_outputs.shape, (self.batch_size, len(self.slots), self.max_res_len, len(_Vocab())))
+        self.assertEqual(gate_outputs.shape, (self.batch_size, len(self.slots), 3))
+        self.assertTrue(torch.allclose(point_outputs, expected, atol=1e-6))
+        self.assertTrue(torch.equal(point_outputs.argmax(-1), expected.argmax(-1)))
+
+    @pytest.mark.unit
+    def test_compact_outputs(self):
+        point_outputs, gate_outputs = self._generator()(force_pt=True, **self._inputs(self.targets))
+        point_preds, point_log_probs, compact_gate_outputs = self._generator(compact_outputs=True)(
+            force_pt=True, **self._inputs(self.targets)
+        )
+        self.assertTrue(torch.equal(point_preds, point_outputs.argmax(-1)))
+        expected_log_probs = torch.log(point_outputs.gather(-1, self.targets.unsqueeze(-1)).squeeze(-1).clamp(1e-10))
+        self.assertTrue(torch.allclose(point_log_probs, expected_log_probs))
+        self.assertTrue(torch.equal(compact_gate_outputs, gate_outputs))
+
+        # the loss is differentiable through the compact log-probabilities
+        point_log_probs.sum().backward()
+
+    @pytest.mark.unit
+    def test_gated_slots_stop_early(self):
+        generator = self._generator(compact_outputs=True)
+        with torch.no_grad():
+            point_preds, _, gate_outputs = generator(force_pt=True, **self._inputs())
+            expected = _reference_point_outputs(
+                generator, self.encoder_hidden, self.encoder_outputs, self.dialog_ids, self.dialog_lens, 4
+            ).argmax(-1)
+
+        generated = gate_outputs.argmax(-1) == generator.ptr_gate_id
+        self.assertTrue(generated.any() and not generated.all())
+        # slots with a generated value are decoded as before, the others only for the first step
+        self.assertTrue(torch.equal(point_preds[generated], expected[generated]))
+        self.assertTrue(torch.equal(point_preds[~generated][:, 0], expected[~generated][:, 0]))
+        self.assertTrue((point_preds[~generated][:, 1:] == _Vocab.pad_id).all())
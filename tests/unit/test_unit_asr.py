@@ -16,18 +16,27 @@
 # limitations under the License.
 # =============================================================================
 
+import importlib.util
+import json
 import os
 import shutil
+import sys
 import tarfile
+import tempfile
 import unittest
 from unittest import TestCase
 
+import kaldi_io
+import numpy as np
 import pytest
+import soundfile
+import torch
 from ruamel.yaml import YAML
 
 import nemo
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.parts import AudioDataset, WaveformFeaturizer, collections, parsers
+from nemo.collections.asr.parts.dataset import KaldiFeatureDataset
 from nemo.core import DeviceType
 from nemo.utils import logging
 
@@ -365,3 +374,174 @@ class TestUnitASRPytorch(TestCase):
             if installed_torchaudio:
                 self.assertTrue(spec[0].shape[1] == 201)  # n_fft // 2 + 1 bins
                 self.assertTrue(mfcc[0].shape[1] == 15)
+
+
+class TestKaldiFeatureDataset(TestCase):
+    def setUp(self):
+        self.kaldi_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.features = {}
+        with open(os.path.join(self.kaldi_dir, 'feats.scp'), 'w') as scp, open(
+            os.path.join(self.kaldi_dir, 'text'), 'w'
+        ) as text, open(os.path.join(self.kaldi_dir, 'utt2dur'), 'w') as utt2dur:
+            for ark_id, dtype in enumerate((np.float32, np.float64)):
+                ark_path = os.path.join(self.kaldi_dir, f'feats_{ark_id}.ark')
+                with open(ark_path, 'wb') as ark:
+                    for i in range(3):
+                        utt_id = f'utt{ark_id}_{i}'
+                        self.features[utt_id] = rng.randn(rng.randint(5, 20), 4).astype(dtype)
+                        offset = ark.tell() + len(utt_id) + 1
+                        kaldi_io.write_mat(ark, self.features[utt_id], key=utt_id)
+                        scp.write(f'{utt_id} {ark_path}:{offset}\n')
+                        text.write(f'{utt_id} ab\n')
+                        utt2dur.write(f'{utt_id} {len(self.features[utt_id]) / 100}\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.kaldi_dir)
+
+    @pytest.mark.unit
+    def test_features_read_lazily(self):
+        self.assertEqual(
+            {utt_id: features.shape for utt_id, features in kaldi_io.read_mat_scp(f'{self.kaldi_dir}/feats.scp')},
+            {utt_id: features.shape for utt_id, features in self.features.items()},
+        )
+        for kwargs in ({}, {'cache_size': 2}, {'fp16_features': True}):
+            dataset = KaldiFeatureDataset(self.kaldi_dir, labels=[' ', 'a', 'b'], eos_id=3, **kwargs)
+            self.assertEqual(len(dataset), 6)
+            dtype = torch.float16 if kwargs.get('fp16_features') else torch.float32
+            # Twice, the second time from the cache if any
+            for _ in range(2):
+                for i, sample in enumerate(dataset.data):
+                    features, length, tokens, _ = dataset[i]
+                    expected = torch.from_numpy(self.features[sample['utt_id']]).t().to(dtype)
+                    self.assertEqual(features.dtype, dtype)
+                    self.assertTrue(torch.equal(features, expected))
+                    self.assertEqual(int(length), expected.shape[1])
+                    self.assertEqual(tokens.tolist(), [1, 2, 3])
+            self.assertLessEqual(len(dataset._cache), kwargs.get('cache_size', 0))
+
+        # Workers open their own memory maps
+        loader = torch.utils.data.DataLoader(dataset, batch_size=None, num_workers=2)
+        for (features, _, _, _), sample in zip(loader, dataset.data):
+            expected = torch.from_numpy(self.features[sample['utt_id']]).t().half()
+            self.assertTrue(torch.equal(features, expected))
+
+    @pytest.mark.unit
+    def test_fp16_copy_of_the_arks(self):
+        fp16_path = os.path.join(self.kaldi_dir, 'feats_fp16.bin')
+        dataset = KaldiFeatureDataset(self.kaldi_dir, labels=[' ', 'a', 'b'], fp16_features=True)
+        # Features are read from the float16 copy, with half the size of float32 matrices
+        self.assertEqual(os.path.getsize(fp16_path), sum(2 * features.size for features in self.features.values()))
+        self.assertTrue(all(sample['audio'][0] == fp16_path for sample in dataset.data))
+        stamp = os.stat(fp16_path).st_mtime_ns
+
+        # Reused while the arks are unchanged, written again otherwise
+        KaldiFeatureDataset(self.kaldi_dir, labels=[' ', 'a', 'b'], fp16_features=True)
+        self.assertEqual(os.stat(fp16_path).st_mtime_ns, stamp)
+        ark_path = os.path.join(self.kaldi_dir, 'feats_0.ark')
+        with open(ark_path, 'r+b') as f:
+            data = f.read()
+            f.seek(0)
+            f.write(data.replace(self.features['utt0_0'].tobytes(), (2 * self.features['utt0_0']).tobytes()))
+        os.utime(ark_path, ns=(stamp + 10 ** 9, stamp + 10 ** 9))
+        dataset = KaldiFeatureDataset(self.kaldi_dir, labels=[' ', 'a', 'b'], fp16_features=True)
+        index = [sample['utt_id'] for sample in dataset.data].index('utt0_0')
+        expected = torch.from_numpy(2 * self.features['utt0_0']).t().half()
+        self.assertTrue(torch.equal(dataset[index][0], expected))
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestConvertToTarredAudioDataset(TestCase):
+    labels = [' ', 'a', 'b']
+
+    def setUp(self):
+        script_path = os.path.join(os.path.dirname(__file__), '../../scripts/convert_to_tarred_audio_dataset.py')
+        spec = importlib.util.spec_from_file_location('convert_to_tarred_audio_dataset', script_path)
+        self.script = importlib.util.module_from_spec(spec)
+        # Registered so that the shards can be written by worker processes
+        sys.modules[spec.name] = self.script
+        spec.loader.exec_module(self.script)
+
+        self.data_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.data_dir, 'wavs'))
+        rng = np.random.RandomState(0)
+        self.entries = []
+        for i in range(11):
+            # The period is squashed in the name of the file in the tarball
+            audio_filepath = os.path.join(self.data_dir, 'wavs', f'utt.{i}.wav')
+            audio = rng.uniform(-0.5, 0.5, rng.randint(freq // 5, freq)).astype(np.float32)
+            soundfile.write(audio_filepath, audio, freq)
+            self.entries.append({'audio_filepath': audio_filepath, 'duration': len(audio) / freq, 'text': 'ab'})
+        self.manifest_path = os.path.join(self.data_dir, 'manifest.json')
+        with open(self.manifest_path, 'w') as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry) + '\n')
+
+    def tearDown(self):
+        del sys.modules['convert_to_tarred_audio_dataset']
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_balance_shards(self):
+        shards = self.script.balance_shards(self.entries, 3)
+        self.assertEqual(len(shards), 3)
+        # Every entry is in exactly one shard, in the order of the manifest
+        positions = [[self.entries.index(entry) for entry in shard] for shard in shards]
+        self.assertEqual(sorted(p for shard in positions for p in shard), list(range(len(self.entries))))
+        for shard in positions:
+            self.assertEqual(shard, sorted(shard))
+        # Adding the longest remaining entry to the shortest shard keeps the shards within one entry of each other
+        durations = [sum(entry['duration'] for entry in shard) for shard in shards]
+        self.assertLessEqual(max(durations) - min(durations), max(entry['duration'] for entry in self.entries))
+
+    @pytest.mark.unit
+    def test_convert_and_read_back(self):
+        target_dir = os.path.join(self.data_dir, 'tarred')
+        args = self.script.parser.parse_args(
+            ['--manifest_path', self.manifest_path, '--target_dir', target_dir, '--num_shards', '3', '--workers', '2']
+        )
+        self.script.main(args)
+
+        tar_paths = [os.path.join(target_dir, f'audio_{i}.tar') for i in range(3)]
+        names = []
+        for i, tar_path in enumerate(tar_paths):
+            with open(os.path.join(target_dir, f'audio_{i}.index.json')) as f:
+                index = [json.loads(line) for line in f]
+            with tarfile.open(tar_path) as tar:
+                members = tar.getmembers()
+            self.assertEqual([member['name'] for member in index], [member.name for member in members])
+            self.assertEqual([member['offset'] for member in index], [member.offset_data for member in members])
+            self.assertEqual([member['size'] for member in index], [member.size for member in members])
+            # The data of each file can be read at its offset, without scanning the tarball
+            with open(tar_path, 'rb') as tar_file:
+                for member in index:
+                    tar_file.seek(member['offset'])
+                    data = tar_file.read(member['size'])
+                    entry = next(
+                        e for e in self.entries if self.script.squash_filename(e['audio_filepath']) == member['name']
+                    )
+                    with open(entry['audio_filepath'], 'rb') as audio_file:
+                        self.assertEqual(data, audio_file.read())
+                    self.assertEqual(member['duration'], entry['duration'])
+            names.extend(member['name'] for member in index)
+        self.assertEqual(
+            sorted(names), sorted(self.script.squash_filename(entry['audio_filepath']) for entry in self.entries)
+        )
+
+        data_layer = nemo_asr.TarredAudioToTextDataLayer(
+            audio_tar_filepaths=tar_paths,
+            manifest_filepath=os.path.join(target_dir, 'tarred_audio_manifest.json'),
+            labels=self.labels,
+            batch_size=4,
+        )
+        self.assertEqual(len(data_layer), len(self.entries))
+        expected = {}
+        for entry in self.entries:
+            audio, _ = soundfile.read(entry['audio_filepath'], dtype='float32')
+            expected[len(audio)] = audio
+        count = 0
+        for audio, audio_length, transcript, _ in data_layer.dataset:
+            self.assertTrue(np.allclose(audio.numpy(), expected.pop(int(audio_length)), atol=1e-6))
+            self.assertEqual(transcript.tolist(), [1, 2])
+            count += 1
+        self.assertEqual(count, len(self.entries))
@@ -0,0 +1,271 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import librosa
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.tts.parts.fastspeech import LengthRegulator
+from nemo.collections.tts.parts.layers import get_mask_from_lengths
+from nemo.collections.tts.parts.tacotron2 import Decoder
+from nemo.collections.tts.waveglow_modules import WaveGlowInferNM, WaveGlowNM
+
+
+def _length_regulator_reference(encoder_output, duration_predictor_output, alpha, mel_max_length=None):
+    """Per utterance implementation the batched LengthRegulator.get_output() must match."""
+    output, dec_pos = [], []
+    for i in range(encoder_output.size(0)):
+        repeats = torch.round(duration_predictor_output[i].float() * alpha).long()
+        output.append(torch.repeat_interleave(encoder_output[i], repeats, dim=0))
+        dec_pos.append(torch.arange(1, output[i].shape[0] + 1))
+    output = torch.nn.utils.rnn.pad_sequence(output, batch_first=True)
+    dec_pos = torch.nn.utils.rnn.pad_sequence(dec_pos, batch_first=True)
+    if mel_max_length:
+        output = output[:, :mel_max_length]
+        dec_pos = dec_pos[:, :mel_max_length]
+    return output, dec_pos
+
+
+def _tacotron2_infer_reference(decoder, memory, memory_lengths):
+    """Step by step Tacotron 2 inference decoding all utterances until the last one is finished."""
+    decoder_input = decoder.get_go_frame(memory)
+    mask = ~get_mask_from_lengths(memory_lengths) if memory.size(0) > 1 else None
+    decoder.initialize_decoder_states(memory, mask=mask)
+
+    mel_lengths = torch.zeros([memory.size(0)], dtype=torch.int32)
+    not_finished = torch.ones([memory.size(0)], dtype=torch.int32)
+    mel_outputs, gate_outputs, alignments = [], [], []
+    while True:
+        decoder_input = decoder.prenet(decoder_input, inference=True)
+        mel_output, gate_output, alignment = decoder.decode(decoder_input)
+        dec = torch.le(torch.sigmoid(gate_output), decoder.gate_threshold).to(torch.int32).squeeze(1)
+        not_finished = not_finished * dec
+        mel_lengths += not_finished
+        if torch.sum(not_finished) == 0:
+            break
+        mel_outputs += [mel_output]
+        gate_outputs += [gate_output]
+        alignments += [alignment]
+        if len(mel_outputs) == decoder.max_decoder_steps:
+            break
+        decoder_input = mel_output
+
+    mel_outputs, gate_outputs, alignments = decoder.parse_decoder_outputs(mel_outputs, gate_outputs, alignments)
+    return mel_outputs, gate_outputs, alignments, mel_lengths
+
+
+class _StepCountingGate(torch.nn.Module):
+    """Stops every utterance at the step stored in the first channel of its encoder outputs."""
+
+    def __init__(self, stop_channel):
+        super().__init__()
+        self.stop_channel = stop_channel
+        self.step = 0
+
+    def forward(self, decoder_hidden_attention_context):
+        self.step += 1
+        # The attention context of an utterance is a weighted average of encoder outputs, all with this value
+        stop_step = decoder_hidden_attention_context[:, self.stop_channel : self.stop_channel + 1]
+        return (self.step - stop_step + 0.5) * 10.0
+
+
+class TestUnitTTS(TestCase):
+    @pytest.mark.unit
+    def test_length_regulator_matches_reference(self):
+        torch.manual_seed(0)
+        encoder_output = torch.randn(4, 9, 5)
+        # Integer target durations (training) and float predicted durations (inference), including zeros and
+        # a fully padded utterance
+        target = torch.randint(0, 4, (4, 9))
+        target[2] = 0
+        predicted = torch.clamp_min(torch.randn(4, 9).exp() * 2 - 1, 0)
+
+        for durations in [target, predicted]:
+            for alpha in [1.0, 0.5, 1.7]:
+                for mel_max_length in [None, 7, 1000]:
+                    output, dec_pos = LengthRegulator.get_output(encoder_output, durations, alpha, mel_max_length)
+                    expected_output, expected_dec_pos = _length_regulator_reference(
+                        encoder_output, durations, alpha, mel_max_length
+                    )
+                    self.assertTrue(torch.equal(output, expected_output))
+                    self.assertTrue(torch.equal(dec_pos, expected_dec_pos))
+                    self.assertEqual(dec_pos.dtype, expected_dec_pos.dtype)
+
+    @pytest.mark.unit
+    def test_tacotron2_infer_matches_reference(self):
+        torch.manual_seed(0)
+        decoder_rnn_dim = 16
+        decoder = Decoder(
+            n_mel_channels=8,
+            n_frames_per_step=1,
+            encoder_embedding_dim=12,
+            attention_dim=8,
+            attention_location_n_filters=4,
+            attention_location_kernel_size=3,
+            attention_rnn_dim=16,
+            decoder_rnn_dim=decoder_rnn_dim,
+            prenet_dim=8,
+            max_decoder_steps=30,
+            gate_threshold=0.5,
+            p_attention_dropout=0.1,
+            p_decoder_dropout=0.1,
+            early_stopping=True,
+            stop_check_interval=4,
+        ).eval()
+        memory_lengths = torch.tensor([11, 7, 9, 3, 11, 5])
+        memory = torch.randn(6, 11, 12)
+
+        # The utterances are finished at different steps, within and after the checks of the stop condition, or
+        # not before the maximum number of steps
+        for stop_steps in ([5, 17, 9, 2, 40, 12], [5, 17, 9, 2, 22, 12], [2, 2, 2, 2, 2, 2], [3]):
+            batch_size = len(stop_steps)
+            batch_memory = memory[:batch_size].clone()
+            batch_memory[:, :, 0] = torch.tensor(stop_steps, dtype=torch.float).unsqueeze(1)
+            with torch.no_grad():
+                results = []
+                for infer in (_tacotron2_infer_reference, Decoder.infer):
+                    decoder.gate_layer = _StepCountingGate(decoder_rnn_dim)
+                    torch.manual_seed(1)
+                    results.append(infer(decoder, batch_memory, memory_lengths[:batch_size]))
+
+            (ref_mels, ref_gates, ref_alignments, ref_lengths), (mels, gates, alignments, lengths) = results
+            self.assertTrue(torch.equal(lengths, ref_lengths))
+            self.assertEqual(lengths.tolist(), [min(step - 1, 30) for step in stop_steps])
+            self.assertEqual(mels.shape, ref_mels.shape)
+            self.assertEqual(alignments.shape, ref_alignments.shape)
+            for i, length in enumerate(lengths.tolist()):
+                self.assertTrue(torch.allclose(mels[i, :, :length], ref_mels[i, :, :length], atol=1e-6))
+                self.assertTrue(torch.allclose(gates[i, :length], ref_gates[i, :length], atol=1e-6))
+                self.assertTrue(torch.allclose(alignments[i, :length], ref_alignments[i, :length], atol=1e-6))
+                self.assertFalse(mels[i, :, length:].any())
+
+
+def _librosa_denoise_reference(audio, bias_audio, strength):
+    """Denoising of WaveGlowInferNM with librosa, one utterance at a time."""
+    # Pads the signal like torch.stft
+    bias_spec, _ = librosa.magphase(librosa.stft(bias_audio, n_fft=1024, pad_mode='reflect'))
+    audio_spec, audio_angles = librosa.magphase(librosa.stft(audio, n_fft=1024, pad_mode='reflect'))
+    audio_spec_denoised = np.clip(audio_spec - bias_spec[:, :1] * strength, a_min=0.0, a_max=None)
+    return librosa.istft(audio_spec_denoised * audio_angles), audio_spec_denoised
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestWaveGlowInfer(TestCase):
+    config = dict(
+        sample_rate=22050,
+        n_mel_channels=8,
+        n_flows=4,
+        n_group=8,
+        n_early_every=2,
+        n_early_size=2,
+        n_wn_layers=2,
+        n_wn_channels=8,
+        wn_kernel_size=3,
+    )
+
+    def setUp(self):
+        torch.manual_seed(0)
+        self.waveglow = WaveGlowNM(**self.config)
+        # The output layers of the couplings are initialized to zero
+        for wn in self.waveglow.waveglow.WN:
+            torch.nn.init.normal_(wn.end.weight, std=0.1)
+        self.waveglow.eval()
+        self.spect = torch.randn(2, 8, 37)
+
+    def _infer_nm(self, **kwargs):
+        infer_nm = WaveGlowInferNM(**self.config, **kwargs)
+        infer_nm.load_state_dict(self.waveglow.state_dict())
+        return infer_nm.eval()
+
+    @pytest.mark.unit
+    def test_weight_norm_folded_on_load(self):
+        infer_nm = self._infer_nm()
+        self.assertFalse([name for name in infer_nm.state_dict() if name.endswith(('weight_g', 'weight_v'))])
+        torch.manual_seed(1)
+        with torch.no_grad():
+            expected = self.waveglow.waveglow.infer(self.spect, sigma=0.6)
+        torch.manual_seed(1)
+        audio = infer_nm(force_pt=True, mel_spectrogram=self.spect)
+        self.assertEqual(audio.shape, (2, 37 * 256))
+        self.assertTrue(torch.allclose(audio, expected, atol=1e-5))
+
+    @pytest.mark.unit
+    def test_chunked_matches_whole_utterance(self):
+        infer_nm = self._infer_nm()
+        torch.manual_seed(1)
+        expected = infer_nm(force_pt=True, mel_spectrogram=self.spect)
+        for chunk_frames in (1, 5, 16, 64):
+            torch.manual_seed(1)
+            chunks = list(infer_nm.stream(self.spect, chunk_frames=chunk_frames))
+            self.assertEqual(len(chunks), -(-37 // chunk_frames))
+            self.assertFalse(chunks[0].requires_grad)
+            self.assertTrue(torch.allclose(torch.cat(chunks, 1), expected, atol=1e-5), chunk_frames)
+
+        infer_nm = self._infer_nm(chunk_frames=10)
+        torch.manual_seed(1)
+        audio = infer_nm(force_pt=True, mel_spectrogram=self.spect)
+        self.assertTrue(torch.allclose(audio, expected, atol=1e-5))
+
+        # Stopping early does not leave gradients disabled in the caller
+        stream = infer_nm.stream(self.spect)
+        for _ in stream:
+            self.assertTrue(torch.is_grad_enabled())
+            break
+        self.assertTrue(torch.is_grad_enabled())
+
+    @pytest.mark.unit
+    def test_chunked_crossfade_without_context(self):
+        waveglow = self._infer_nm().waveglow
+        with torch.no_grad():
+            noise = waveglow.sample_noise(2, 37 * 32, sigma=0.6)
+            expected = waveglow.infer(self.spect, noise=noise)
+            chunks = list(waveglow.infer_chunked(self.spect, chunk_frames=8, context_frames=0, noise=noise))
+        self.assertEqual([chunk.size(1) for chunk in chunks], [8 * 256 - 256] + [8 * 256] * 3 + [5 * 256 + 256])
+        audio = torch.cat(chunks, 1)
+        # Away from the chunk boundaries, the audio does not depend on the context
+        self.assertTrue(torch.allclose(audio[:, 1024:1536], expected[:, 1024:1536], atol=1e-5))
+        self.assertFalse(torch.allclose(audio, expected, atol=1e-5))
+
+    @pytest.mark.unit
+    def test_denoiser_matches_librosa(self):
+        infer_nm = self._infer_nm()
+        infer_nm.setup_denoiser()
+        with torch.no_grad():
+            bias_audio = infer_nm.waveglow.infer(torch.zeros(1, 8, 88), sigma=0.0)[0].numpy()
+        torch.manual_seed(1)
+        audio = infer_nm(force_pt=True, mel_spectrogram=self.spect)
+        atol = 1e-5 * audio.abs().max().item()
+
+        denoised, spec = infer_nm.denoise(audio, strength=0.5)
+        for i in range(audio.size(0)):
+            expected_audio, expected_spec = _librosa_denoise_reference(audio[i].numpy(), bias_audio, 0.5)
+            self.assertTrue(np.allclose(denoised[i].numpy(), expected_audio, atol=atol))
+            self.assertTrue(np.allclose(spec[i].numpy(), expected_spec, atol=10 * atol))
+            # Single utterances as numpy arrays
+            denoised_i, spec_i = infer_nm.denoise(audio[i].numpy(), strength=0.5)
+            self.assertTrue(np.allclose(denoised_i, expected_audio, atol=atol))
+            self.assertEqual(spec_i.shape, expected_spec.shape)
+
+        # Denoised in the graph
+        denoising_nm = self._infer_nm(denoiser_strength=0.5)
+        torch.manual_seed(1)
+        audio = denoising_nm(force_pt=True, mel_spectrogram=self.spect)
+        self.assertTrue(torch.allclose(audio, denoised, atol=atol))
@@ -0,0 +1,93 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright (c) 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.utils.inference_store import InferenceStore, InferenceStoreWriter
+
+
+class TestInferenceStore(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.batches = [
+            (rng.randn(3, 5, 2).astype(np.float32), rng.randint(0, 9, 3), np.array([5, 2, 4]), [0, 1, 2]),
+            (rng.randn(2, 4, 2).astype(np.float32), rng.randint(0, 9, 2), np.array([1, 4]), [3, 4]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _check(self, store, batches):
+        expected_ids = [i for batch in batches for i in batch[3]]
+        self.assertEqual(store.sample_ids.tolist(), expected_ids)
+        self.assertEqual(sorted(store.names), ['labels', 'logits'])
+        logits = [values[:length] for values, _, lengths, _ in batches for values, length in zip(values, lengths)]
+        labels = [label for _, labels, _, _ in batches for label in labels]
+        self.assertEqual(store.shapes('logits').tolist(), [[len(values), 2] for values in logits])
+        for stored, expected in zip(store['logits'], logits):
+            self.assertTrue(np.array_equal(stored, expected))
+        self.assertEqual([int(label) for label in store['labels']], labels)
+
+    @pytest.mark.unit
+    def test_write_and_read_shards(self):
+        for rank in range(2):
+            writer = InferenceStoreWriter(self.path, rank=rank)
+            for logits, labels, lengths, sample_ids in self.batches:
+                writer.write(
+                    {'logits': logits, 'labels': labels}, [2 * i + rank for i in sample_ids], {'logits': lengths}
+                )
+            writer.close()
+        store = InferenceStore(self.path)
+        # The shards of both ranks, in rank order
+        shards = [[(v, l, n, [2 * i + rank for i in ids]) for v, l, n, ids in self.batches] for rank in range(2)]
+        self._check(store, shards[0] + shards[1])
+
+        with self.assertRaises(FileExistsError):
+            InferenceStoreWriter(self.path, rank=0)
+        with self.assertRaises(ValueError):
+            InferenceStoreWriter(self.path, rank=0, resume=True).write(
+                {'logits': self.batches[0][0].astype(np.float64)}, [0, 1, 2]
+            )
+
+    @pytest.mark.unit
+    def test_resume_drops_incomplete_batch(self):
+        writer = InferenceStoreWriter(self.path)
+        logits, labels, lengths, sample_ids = self.batches[0]
+        writer.write({'logits': logits, 'labels': labels}, sample_ids, {'logits': lengths})
+        writer.close()
+        # A crash in the middle of the second batch
+        with open(os.path.join(self.path, 'rank_0', 'logits.bin'), 'ab') as f:
+            f.write(b'\0' * 12)
+        open(os.path.join(self.path, 'rank_0', 'other.bin'), 'wb').close()
+        self._check(InferenceStore(self.path), self.batches[:1])
+
+        writer = InferenceStoreWriter(self.path, resume=True)
+        self.assertEqual((writer.completed_batches, writer.completed_samples), (1, 3))
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'rank_0', 'other.bin')))
+        logits, labels, lengths, sample_ids = self.batches[1]
+        writer.write({'logits': logits, 'labels': labels}, sample_ids, {'logits': lengths})
+        writer.close()
+        self._check(InferenceStore(self.path), self.batches)